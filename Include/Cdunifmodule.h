@@ -31,6 +31,7 @@ typedef struct {
   int recdim;
   CuFileType filetype;			     /* CuNetcdf, CdGrads, etc. */
   PyObject *diminfo;			     /* {name:(units,typecode,fileName,relatedVar,dimensionType,internalId) */
+  void *lock;				     /* per-file read lock, NULL to use the global lock */
 } PyCdunifFileObject;
 
 
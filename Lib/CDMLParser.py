@@ -5,6 +5,7 @@ Parse a CDML/XML file
 from .cdxmllib import XMLParser
 from . import CDML
 import re
+from xml.parsers import expat
 from . import cdmsNode
 
 # Error constants
@@ -74,10 +75,9 @@ class CDMLParser(XMLParser):
 
             # Check that attributes are valid
             validDict = self.dtd[tag]
-            validAttrs = list(validDict.keys())
             attrnames = list(attrs.keys())
             for attrname in attrnames:
-                if attrname not in validAttrs:
+                if attrname not in validDict:
                     self.cdml_syntax_error(self.lineno,
                                            'unknown attribute %s of element %s' %
                                            (attrname, tag))
@@ -92,14 +92,13 @@ class CDMLParser(XMLParser):
 
             # Check that required attributes are present,
             # and add default values
-            for attrname in validAttrs:
-                (atttype, attdefault) = validDict[attrname]
-                if attdefault == CDML.Required and attrname not in attrnames:
+            for attrname, (atttype, attdefault) in validDict.items():
+                if attdefault == CDML.Required and attrname not in attrs:
                     self.cdml_syntax_error(self.lineno,
                                            'element %s requires an attribute %s' %
                                            (tag, attrname))
                 if isinstance(attdefault, type(
-                        "")) and attrname not in attrnames:
+                        "")) and attrname not in attrs:
                     attrs[attrname] = attdefault
         method(attrs)
 
@@ -341,6 +340,105 @@ class CDMLParser(XMLParser):
         XMLParser.close(self)
 
 
+class ExpatCDMLParser(CDMLParser):
+    """CDML parser based on the expat C parser.
+
+    Builds the same cdmsNode tree as CDMLParser, with the same tag handlers
+    and attribute checks, but tokenizes the document with xml.parsers.expat
+    instead of the pure Python cdxmllib. Malformed documents raise
+    xml.parsers.expat.ExpatError.
+    """
+
+    def __init__(self, verbose=0):
+        CDMLParser.__init__(self, verbose)
+        self._text = []               # Character data of the current element
+        self._incdata = 0
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+        self._parser.CharacterDataHandler = self._character_data
+        self._parser.StartCdataSectionHandler = self._start_cdata
+        self._parser.EndCdataSectionHandler = self._end_cdata
+        self._parser.ProcessingInstructionHandler = self.handle_proc
+
+    # Character data may be split in several calls by expat; deliver it to
+    # handle_data in one piece, as node content is set (not appended) from it.
+    def _flush_text(self):
+        if self._text:
+            data = ''.join(self._text)
+            self._text = []
+            if self._incdata:
+                self.handle_cdata(data)
+            else:
+                self.handle_data(data)
+
+    def _character_data(self, data):
+        self._text.append(data)
+
+    def _start_cdata(self):
+        self._flush_text()
+        self._incdata = 1
+
+    def _end_cdata(self):
+        self._flush_text()
+        self._incdata = 0
+
+    def _start_element(self, tag, attrs):
+        self._flush_text()
+        self.lineno = self._parser.CurrentLineNumber
+        method = getattr(self, 'start_' + tag, None)
+        if method is not None:
+            self.handle_starttag(tag, method, attrs)
+        else:
+            self.unknown_starttag(tag, attrs)
+
+    def _end_element(self, tag):
+        self._flush_text()
+        self.lineno = self._parser.CurrentLineNumber
+        method = getattr(self, 'end_' + tag, None)
+        if method is not None:
+            self.handle_endtag(tag, method)
+        else:
+            self.unknown_endtag(tag)
+
+    def feed(self, data):
+        self._parser.Parse(data, 0)
+
+    def close(self):
+        self._parser.Parse('', 1)
+        self._flush_text()
+
+
+def parseCDML(text, verbose=0):
+    """Parse a CDML document.
+
+    Parameters
+    ----------
+    text : CDML document, str or bytes.
+    verbose : 1 to print the elements as they are parsed.
+
+    Returns
+    -------
+    The root cdmsNode of the parse tree.
+
+    The expat based parser is used first. Documents it rejects, for
+    instance with undeclared entities, are parsed again with the more
+    lenient cdxmllib parser.
+    """
+    p = ExpatCDMLParser(verbose)
+    try:
+        p.feed(text)
+        p.close()
+    except expat.ExpatError:
+        if isinstance(text, bytes):
+            text = text.decode('utf-8', 'replace')
+        p = CDMLParser(verbose)
+        p.feed(text)
+        p.close()
+    return p.getRoot()
+
+
 if __name__ == '__main__':
     import sys
 
@@ -19,6 +19,7 @@ from cdms2.grid import AbstractRectGrid
 from cdms2.error import CDMSError
 # from numpy.ma import *
 from cdms2.axis import allclose as axisAllclose, TransientAxis, concatenate as axisConcatenate, take as axisTake
+from cdms2.expression import Expression, lazy  # noqa
 
 create_mask = make_mask_none
 e = numpy.e
@@ -37,7 +38,9 @@ def fill_value(ar):
 
 def _makeMaskedArg(x):
     """If x is a variable, turn it into a TransientVariable."""
-    if isinstance(x, AbstractVariable) and not isinstance(
+    if isinstance(x, Expression):
+        return x.evaluate()
+    elif isinstance(x, AbstractVariable) and not isinstance(
             x, TransientVariable):
         return x.subSlice()
     elif isinstance(x, TransientVariable):
@@ -77,19 +80,24 @@ def _extractMetadata(a, axes=None, attributes=None,
 
 
 class var_unary_operation:
-    def __init__(self, mafunc):
+    def __init__(self, mafunc, elementwise=True):
         """
         Parameters
         ----------
 
-        var_unary_operation(mafunc)
+        var_unary_operation(mafunc, elementwise=True)
 
         mafunc is an numpy.ma masked_unary_function.
+        elementwise is False if the result does not have the shape of the argument;
+        the operation is then not deferred on Expressions.
         """
         self.mafunc = mafunc
+        self.elementwise = elementwise
         self.__doc__ = mafunc.__doc__
 
     def __call__(self, a, **kwargs):
+        if isinstance(a, Expression) and self.elementwise:
+            return Expression(self.mafunc, (a,), kwargs, 'unary')
         axes, attributes, id, grid = _extractMetadata(a)
         maresult = self.mafunc(_makeMaskedArg(a), **kwargs)
         return TransientVariable(
@@ -157,45 +165,7 @@ def commonAxes(a, bdom, omit=None):
     'b' : is an axislist or None.
     """
     if isinstance(a, AbstractVariable) and bdom is not None:
-        adom = a.getAxisList()
-        arank = len(adom)
-        brank = len(bdom)
-        if arank > brank:
-            maxrank = arank
-            minrank = brank
-        else:
-            maxrank = brank
-            minrank = arank
-        diffrank = maxrank - minrank
-        if maxrank == arank:
-            maxdom = adom
-        else:
-            maxdom = bdom
-        common = [None] * maxrank
-        if omit is None:
-            iomit = None
-        else:
-            iomit = omit - minrank
-
-        # Check shared dimensions, last to first
-        for i in range(minrank):
-            j = -i - 1
-            if j == iomit:
-                continue
-            aj = adom[j]
-            bj = bdom[j]
-            if len(aj) != len(bj):
-                return None
-            elif axisAllclose(aj, bj):
-                common[j] = aj
-            else:
-                common[j] = TransientAxis(numpy.arange(len(aj)))
-
-        # Copy leading (non-shared) axes
-        for i in range(diffrank):
-            common[i] = maxdom[i]
-
-        return common
+        return _commonAxisList(a.getAxisList(), bdom, omit=omit)
     elif isinstance(a, AbstractVariable):
         common = a.getAxisList()
         if omit is not None:
@@ -207,6 +177,48 @@ def commonAxes(a, bdom, omit=None):
         return bdom
 
 
+def _commonAxisList(adom, bdom, omit=None):
+    "Common axes of the axis lists adom and bdom, see commonAxes."
+    arank = len(adom)
+    brank = len(bdom)
+    if arank > brank:
+        maxrank = arank
+        minrank = brank
+    else:
+        maxrank = brank
+        minrank = arank
+    diffrank = maxrank - minrank
+    if maxrank == arank:
+        maxdom = adom
+    else:
+        maxdom = bdom
+    common = [None] * maxrank
+    if omit is None:
+        iomit = None
+    else:
+        iomit = omit - minrank
+
+    # Check shared dimensions, last to first
+    for i in range(minrank):
+        j = -i - 1
+        if j == iomit:
+            continue
+        aj = adom[j]
+        bj = bdom[j]
+        if len(aj) != len(bj):
+            return None
+        elif axisAllclose(aj, bj):
+            common[j] = aj
+        else:
+            common[j] = TransientAxis(numpy.arange(len(aj)))
+
+    # Copy leading (non-shared) axes
+    for i in range(diffrank):
+        common[i] = maxdom[i]
+
+    return common
+
+
 def commonGrid(a, b, axes):
     """
     Common Grid
@@ -246,6 +258,11 @@ def commonGrid1(a, gb, axes):
     else:
         ga = None
 
+    return _commonGrid(ga, gb, axes)
+
+
+def _commonGrid(ga, gb, axes):
+    "Common grid of the grids (or None) ga and gb, see commonGrid."
     if ga is gb:
         result = ga
     elif ga is None:                    # e.g., var*scalar
@@ -280,6 +297,8 @@ class var_binary_operation:
         self.__doc__ = mafunc.__doc__
 
     def __call__(self, a, b, **kwargs):
+        if isinstance(a, Expression) or isinstance(b, Expression):
+            return Expression(self.mafunc, (a, b), kwargs, 'binary')
         id = "variable_%i" % TransientVariable.variable_count
         TransientVariable.variable_count += 1
         axes = commonDomain(a, b)
@@ -343,6 +362,8 @@ greater = var_binary_operation(numpy.ma.greater)
 
 def power(a, b, third=None):
     "a**b"
+    if isinstance(a, Expression) or isinstance(b, Expression):
+        return Expression(numpy.ma.power, (a, b, third), kind='unary')
     ta = _makeMaskedArg(a)
     tb = _makeMaskedArg(b)
     maresult = numpy.ma.power(ta, tb, third)
@@ -434,7 +455,7 @@ sinh = var_unary_operation(numpy.ma.sinh)
 cosh = var_unary_operation(numpy.ma.cosh)
 tanh = var_unary_operation(numpy.ma.tanh)
 fabs = var_unary_operation(numpy.ma.fabs)
-nonzero = var_unary_operation(numpy.ma.nonzero)
+nonzero = var_unary_operation(numpy.ma.nonzero, elementwise=False)
 around = var_unary_operation(numpy.ma.around)
 floor = var_unary_operation(numpy.ma.floor)
 ceil = var_unary_operation(numpy.ma.ceil)
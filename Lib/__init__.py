@@ -6,6 +6,7 @@ CDMS module-level API
 from .error import CDMSError  # noqa
 from lazy_object_proxy import Proxy
 from . import dataset
+from . import filepool
 from . import selectors
 from . import avariable
 from . import tvariable
@@ -15,6 +16,8 @@ from . import mvVsWriter
 from . import mvVTKSGWriter
 from . import mvVTKUGWriter
 from . import mvCdmsRegrid
+from . import regridcache
+from . import spatialindex
 from . import cdmsobj
 from . import axis
 from . import grid
@@ -28,7 +31,9 @@ __all__ = ["cdmsobj", "axis", "coord", "grid", "hgrid", "avariable",
            "sliceut", "error", "variable", "fvariable", "tvariable", "dataset",
            "database", "cache", "selectors", "MV2", "convention", "bindex",
            "auxcoord", "gengrid", "gsHost", "gsStaticVariable", "gsTimeVariable",
-           "mvBaseWriter", "mvSphereMesh", "mvVsWriter", "mvCdmsRegrid"]
+           "mvBaseWriter", "mvSphereMesh", "mvVsWriter", "mvCdmsRegrid", "filepool",
+           "regridcache", "lazy", "streamwriter", "timeconv", "sharedvariable",
+           "netcdf3", "expression", "spatialindex"]
 
 
 # CDMS datatypes
@@ -72,18 +77,28 @@ isGrid = Proxy(lambda: grid.isGrid)
 openDataset = Proxy(lambda: dataset.openDataset)
 createDataset = Proxy(lambda: dataset.createDataset)
 useNetcdf3 = Proxy(lambda: dataset.useNetcdf3)
+setReadExecutor = Proxy(lambda: dataset.setReadExecutor)
+getReadExecutor = Proxy(lambda: dataset.getReadExecutor)
+setCdmlCacheFlag = Proxy(lambda: dataset.setCdmlCacheFlag)
+getCdmlCacheFlag = Proxy(lambda: dataset.getCdmlCacheFlag)
+setLazyMetadataFlag = Proxy(lambda: dataset.setLazyMetadataFlag)
+getLazyMetadataFlag = Proxy(lambda: dataset.getLazyMetadataFlag)
 
 setNetcdfClassicFlag = Proxy(lambda: dataset.setNetcdfClassicFlag)
 setNetcdfShuffleFlag = Proxy(lambda: dataset.setNetcdfShuffleFlag)
 setNetcdfDeflateFlag = Proxy(lambda: dataset.setNetcdfDeflateFlag)
 setNetcdfDeflateLevelFlag = Proxy(lambda: dataset.setNetcdfDeflateLevelFlag)
 setNetcdfUseNCSwitchModeFlag = Proxy(lambda: dataset.setNetcdfUseNCSwitchModeFlag)
+setNetcdfPerFileLockFlag = Proxy(lambda: dataset.setNetcdfPerFileLockFlag)
+setNetcdfMemmapFlag = Proxy(lambda: dataset.setNetcdfMemmapFlag)
 
 getNetcdfClassicFlag = Proxy(lambda: dataset.getNetcdfClassicFlag)
 getNetcdfShuffleFlag = Proxy(lambda: dataset.getNetcdfShuffleFlag)
 getNetcdfDeflateFlag = Proxy(lambda: dataset.getNetcdfDeflateFlag)
 getNetcdfDeflateLevelFlag = Proxy(lambda: dataset.getNetcdfDeflateLevelFlag)
 getNetcdfUseNCSwitchModeFlag = Proxy(lambda: dataset.getNetcdfUseNCSwitchModeFlag)
+getNetcdfPerFileLockFlag = Proxy(lambda: dataset.getNetcdfPerFileLockFlag)
+getNetcdfMemmapFlag = Proxy(lambda: dataset.getNetcdfMemmapFlag)
 
 setCompressionWarnings = Proxy(lambda: dataset.setCompressionWarnings)
 
@@ -93,6 +108,9 @@ getNetcdf4Flag = Proxy(lambda: dataset.getNetcdf4Flag)
 setNetcdfUseParallelFlag = Proxy(lambda: dataset.setNetcdfUseParallelFlag)
 getNetcdfUseParallelFlag = Proxy(lambda: dataset.getNetcdfUseParallelFlag)
 
+setFilePoolSize = Proxy(lambda: filepool.setFilePoolSize)
+getFilePoolSize = Proxy(lambda: filepool.getFilePoolSize)
+
 getMpiRank = Proxy(lambda: dataset.getMpiRank)
 getMpiSize = Proxy(lambda: dataset.getMpiSize)
 
@@ -127,6 +145,14 @@ VsWriter = Proxy(lambda: mvVsWriter.VsWriter)
 VTKSGWriter = Proxy(lambda: mvVTKSGWriter.VTKSGWriter)
 VTKUGWriter = Proxy(lambda: mvVTKUGWriter.VTKUGWriter)
 CdmsRegrid = Proxy(lambda: mvCdmsRegrid.CdmsRegrid)
+setRegridCacheSize = Proxy(lambda: regridcache.setRegridCacheSize)
+getRegridCacheSize = Proxy(lambda: regridcache.getRegridCacheSize)
+setRegridCacheDir = Proxy(lambda: regridcache.setRegridCacheDir)
+getRegridCacheDir = Proxy(lambda: regridcache.getRegridCacheDir)
+clearRegridCache = Proxy(lambda: regridcache.clearRegridCache)
+setSpatialIndexCacheSize = Proxy(lambda: spatialindex.setSpatialIndexCacheSize)
+getSpatialIndexCacheSize = Proxy(lambda: spatialindex.getSpatialIndexCacheSize)
+clearSpatialIndexCache = Proxy(lambda: spatialindex.clearSpatialIndexCache)
 
 # Gridspec is not installed by default so just pass on if it isn't installed
 try:
@@ -14,7 +14,7 @@ from .error import CDMSError
 from .axis import axisMatchIndex, axisMatchAxis, axisMatches, unspecified, CdtimeTypes, AbstractAxis
 from . import selectors
 import copy
-from .mvCdmsRegrid import CdmsRegrid, getBoundList, _getCoordList
+from .mvCdmsRegrid import getBoundList, _getCoordList
 from regrid2.mvGenericRegrid import guessPeriodicity
 # import PropertiedClasses
 from .convention import CF1
@@ -1208,7 +1208,7 @@ class AbstractVariable(CdmsObj, Slab):
         # principle, cdms2 files should not import regrid2, we're bending
         # rules here...
         import regrid2
-        from regrid2 import Horizontal
+        from . import regridcache
 
         if togrid is None:
             return self
@@ -1325,7 +1325,7 @@ avariable.regrid: We chose regridMethod = %s for you among the following choices
                     keywords['diag']['regridTool'] = 'regrid'
 
                 # the original cdms2 regridder
-                regridf = Horizontal(fromgrid, togrid)
+                regridf = regridcache.getHorizontal(fromgrid, togrid)
                 return regridf(self, missing=missing, order=order,
                                mask=mask, **keywords)
 
@@ -1336,16 +1336,13 @@ avariable.regrid: We chose regridMethod = %s for you among the following choices
 #            if numpy.any(self.mask == True):
 #                srcGridMask = getMinHorizontalMask(self)
 
-            # compute the interpolation weights
-            ro = CdmsRegrid(fromgrid, togrid,
-                            dtype=self.dtype,
-                            regridMethod=regridMethod,
-                            regridTool=regridTool,
-                            srcGridMask=srcGridMask,
-                            srcGridAreas=None,
-                            dstGridMask=None,
-                            dstGridAreas=None,
-                            **keywords)
+            # compute the interpolation weights, or reuse cached ones
+            ro = regridcache.getCdmsRegrid(fromgrid, togrid,
+                                           dtype=self.dtype,
+                                           regridMethod=regridMethod,
+                                           regridTool=regridTool,
+                                           srcGridMask=srcGridMask,
+                                           **keywords)
             # now interpolate
             return ro(self, **keywords)
 
@@ -6,6 +6,8 @@ from future import standard_library
 import sys
 import types
 import copy
+import hashlib
+import weakref
 import numpy
 # import regrid2._regrid
 from . import cdmsNode
@@ -15,6 +17,7 @@ from .cdmsobj import CdmsObj, Max32int
 from .sliceut import reverseSlice, splitSlice, splitSliceExt
 from .error import CDMSError
 from . import forecast
+from . import timeconv
 # import warnings
 from six import string_types
 standard_library.install_aliases()
@@ -264,9 +267,104 @@ def mapLinearExt(axis, bounds, interval, indicator='ccn',
     The corresponding index interval (i,j), where i<j, indicating the
     half-open index interval [i,j), or None if the intersection is empty.
     """
+    return _mapLinearLookup(_AxisLookup(axis, bounds), interval, indicator, epsilon)
+
+
+def _sameLookupKey(key1, key2):
+    return key1[0] == key2[0] and all(a is b for a, b in zip(key1[1], key2[1]))
+
+
+class _AxisLookup(object):
+    """Values of an axis prepared for coordinate to index mapping.
+
+    values : the axis values, filled, in axis order.
+    ar, bd : the values and (n,2) bounds in increasing order.
+    direc : 'inc' or 'dec', the direction of the axis.
+    linear : (start, delta) if ar is uniformly spaced, else None.
+    epsilon : default tolerance on the interval endpoints.
+    extended : lookups of the values extended over several cycles, for
+               wraparound on circular axes, keyed by number of cycles.
+    """
+
+    def __init__(self, axis, bounds, key=None):
+        self.key = key
+        self.values = values = numpy.ma.filled(axis[:])
+        # bounds may be a function returning the bounds, called when needed
+        self._bounds = bounds
+        self._bd = None
+        if values[0] > values[-1]:
+            self.ar = values[::-1]
+            self.direc = 'dec'
+        else:
+            self.ar = values
+            self.direc = 'inc'
+        ar = self.ar
+        eps = 1.0e-5
+        if len(ar) > 1:
+            self.epsilon = eps * min(abs(ar[1] - ar[0]), abs(ar[-1] - ar[-2]))
+        else:
+            self.epsilon = eps
+        self.linear = None
+        if len(ar) > 2 and ar.dtype.char in numpy.typecodes['AllFloat'] + numpy.typecodes['AllInteger']:
+            delta = (float(ar[-1]) - float(ar[0])) / (len(ar) - 1)
+            if delta > 0 and numpy.all(numpy.absolute(numpy.diff(ar) - delta) <= 1.e-6 * delta):
+                self.linear = (float(ar[0]), delta)
+        self.extended = {}
+
+    def _getbd(self):
+        if self._bd is None:
+            bounds = self._bounds
+            if callable(bounds):
+                bounds = bounds()
+            bounds = numpy.ma.filled(bounds)
+            if self.direc == 'dec':
+                if bounds[0, 0] < bounds[0, 1]:
+                    self._bd = bounds[::-1]
+                else:
+                    self._bd = bounds[::-1, ::-1]
+            else:
+                if bounds[0, 0] < bounds[0, 1]:
+                    self._bd = bounds
+                else:
+                    self._bd = bounds[:, ::-1]
+            self._bounds = None
+        return self._bd
+    bd = property(_getbd)
+
+    def search(self, x):
+        """Return numpy.searchsorted(self.ar, x), x a scalar or an array.
+
+        On a uniformly spaced axis the index is computed, then corrected
+        to match searchsorted exactly.
+        """
+        x = numpy.asarray(x)
+        if self.linear is None or not numpy.all(numpy.isfinite(x)):
+            return numpy.searchsorted(self.ar, x)
+        ar = self.ar
+        n = len(ar)
+        start, delta = self.linear
+        index = numpy.clip(numpy.ceil((x - start) / delta), 0, n).astype(numpy.intp)
+        while True:
+            down = (index > 0) & (ar[numpy.maximum(index - 1, 0)] >= x)
+            up = (index < n) & (ar[numpy.minimum(index, n - 1)] < x)
+            if not (down.any() or up.any()):
+                break
+            index = index - down + up
+        return index
+
+
+def _mapLinearLookup(lookup, interval, indicator='ccn', epsilon=None, index=None):
+    """mapLinearExt on the prepared values of an axis.
+
+    lookup is an _AxisLookup, index the searchsorted positions (i,j) of the
+    ordered interval endpoints in lookup.ar, if already known.
+    """
 
     indicator = indicator.lower()
-    length = len(axis)
+    ar = lookup.ar
+    bd = lookup.bd
+    direc = lookup.direc
+    length = len(ar)
 
     # Make the interval and search array non-decreasing
     x, y = interval
@@ -282,27 +380,8 @@ def mapLinearExt(axis, bounds, interval, indicator='ccn',
         xind = indicator[0]
         yind = indicator[1]
 
-    if axis[0] > axis[-1]:
-        ar = axis[::-1]
-        if bounds[0, 0] < bounds[0, 1]:
-            bd = bounds[::-1]
-        else:
-            bd = bounds[::-1, ::-1]
-        direc = 'dec'
-    else:
-        ar = axis
-        if bounds[0, 0] < bounds[0, 1]:
-            bd = bounds
-        else:
-            bd = bounds[:, ::-1]
-        direc = 'inc'
-
     if(epsilon is None):
-        eps = 1.0e-5
-        if len(ar) > 1:
-            epsilon = eps * min(abs(ar[1] - ar[0]), abs(ar[-1] - ar[-2]))
-        else:
-            epsilon = eps
+        epsilon = lookup.epsilon
 
     #
     #  interval bound +/- epsilon
@@ -357,7 +436,10 @@ def mapLinearExt(axis, bounds, interval, indicator='ccn',
     # The intersection is nonempty; use searchsorted to get left/right limits
     # for testing
 
-    ii, jj = numpy.searchsorted(ar, (x, y))
+    if index is None:
+        ii, jj = lookup.search((x, y))
+    else:
+        ii, jj = index
 
     #
     #  find index range for left (iStart,iEnd) and right (jStart,jEnd)
@@ -604,12 +686,13 @@ def lookupArray(ar, value):
 
     Parameters
     ----------
-    ar : Input array
-    value : Value to search
+    ar : Input array, or axis. The prepared values of an axis are reused
+         from one lookup to the next.
+    value : Value to search, or array of values
 
     Returns
     -------
-    index:
+    index (array of indices if value is an array):
         * ar is monotonically increasing.
         * value <= ar[index], index==0..len(ar)-1
             * value > ar[index], index==len(ar)
@@ -617,17 +700,26 @@ def lookupArray(ar, value):
                 * value >= ar[index], index==0..len(ar)-1
                 * value < ar[index], index==len(ar)
     """
-    ar = numpy.ma.filled(ar)
+    if isinstance(ar, AbstractAxis):
+        lookup = ar._getLookup()
+        ar = lookup.values
+    else:
+        lookup = None
+        ar = numpy.ma.filled(ar)
     ascending = (ar[0] < ar[-1]) or len(ar) == 1
-    if ascending:
-        index = numpy.searchsorted(ar, value)
+    if lookup is not None and ascending == (lookup.direc == 'inc'):
+        # lookup.ar holds the values of ar in increasing order
+        revar = lookup.ar
+        index = lookup.search(value)
     else:
-        revar = ar[::-1]
+        revar = ar if ascending else ar[::-1]
         index = numpy.searchsorted(revar, value)
-        if index < len(revar) and value == revar[index]:
-            index = len(ar) - index - 1
-        else:
-            index = len(ar) - index
+    if not ascending:
+        n = len(revar)
+        found = (index < n) & (revar[numpy.minimum(index, n - 1)] == value)
+        index = numpy.where(found, n - index - 1, n - index)
+    if numpy.ndim(index) == 0:
+        index = int(index)
     return index
 
 # Lookup a value in a monotonic 1-D array. value is a scalar
@@ -719,9 +811,19 @@ def allclose(ax1, ax2, rtol=1.e-5, atol=1.e-8):
     >>> b = ma.array([1e10, 1e-8, 42.0], mask=[0, 0, 1])
     >>> ma.allclose(a, b)
     False
+
+    Axes which share their data array, such as the axes copied by
+    TransientVariable.copyAxis until either is written to, are close without
+    comparing their values if the values are finite.
     """
-    return ((ax1 is ax2) or numpy.ma.allclose(
-        ax1[:], ax2[:], rtol=rtol, atol=atol))
+    if ax1 is ax2:
+        return True
+    if isinstance(ax1, AbstractAxis) and isinstance(ax2, AbstractAxis):
+        data = ax1.__dict__.get('_data_')
+        if data is not None and data is ax2.__dict__.get('_data_') and \
+                (data.dtype.kind not in 'fc' or numpy.isfinite(data).all()):
+            return True
+    return bool(numpy.ma.allclose(ax1[:], ax2[:], rtol=rtol, atol=atol))
 
 # AbstractAxis defines the common axis interface.
 # Concrete axis classes are derived from this class.
@@ -738,6 +840,8 @@ class AbstractAxis(CdmsObj):
         self._data_ = None
         # Cached wraparound values for circular axes
         self._doubledata_ = None
+        # Cached values prepared for coordinate lookups, see _getLookup
+        self._lookup_ = None
 
     def __str__(self):
         return "\n".join(self.listall()) + "\n"
@@ -931,6 +1035,39 @@ class AbstractAxis(CdmsObj):
     def isForecastTime(self):
         return self.isForecast()
 
+    def _components(self, calendar):
+        # (year, month, day, hour, minute, second) arrays of the axis, or None
+        # if they cannot be computed without cdtime
+        key = ('components', self.units, calendar)
+        cache = self._timeConversions()
+        if key not in cache:
+            cache[key] = timeconv.components(self[:], self.units, calendar)
+        return cache[key]
+
+    def asComponentArrays(self, calendar=None):
+        """Return the component times of the axis as arrays.
+
+        Parameters
+        ----------
+        calendar : cdtime calendar, default is the axis calendar.
+
+        Returns
+        -------
+        (year, month, day, hour, minute, second) arrays; second is floating point.
+        """
+        if not hasattr(self, 'units'):
+            raise CDMSError("No time units defined")
+        if calendar is None:
+            calendar = self.getCalendar()
+        result = None
+        if not self.isForecast():
+            result = self._components(calendar)
+        if result is None:
+            comptimes = self.asComponentTime(calendar)
+            result = tuple(numpy.array([getattr(c, name) for c in comptimes])
+                           for name in ['year', 'month', 'day', 'hour', 'minute', 'second'])
+        return tuple(numpy.array(a) for a in result)
+
     def asComponentTime(self, calendar=None):
         "Array version of cdtime tocomp. Returns a list of component times."
         if not hasattr(self, 'units'):
@@ -940,9 +1077,13 @@ class AbstractAxis(CdmsObj):
         if self.isForecast():
             result = [forecast.comptime(t) for t in self[:]]
         else:
-            result = []
-            for val in self[:]:
-                result.append(cdtime.reltime(val, self.units).tocomp(calendar))
+            comps = self._components(calendar)
+            if comps is not None:
+                result = [cdtime.comptime(*c) for c in zip(*[a.tolist() for a in comps])]
+            else:
+                result = []
+                for val in self[:]:
+                    result.append(cdtime.reltime(val, self.units).tocomp(calendar))
         return result
 
     #
@@ -955,6 +1096,9 @@ class AbstractAxis(CdmsObj):
         result = []
         if calendar is None:
             calendar = self.getCalendar()
+        comps = self._components(calendar)
+        if comps is not None:
+            return ["%04d%02d%02d%02d" % c for c in zip(*[a.tolist() for a in comps[:4]])]
         for val in self[:]:
             comptime = cdtime.reltime(val, self.units).tocomp(calendar)
             s = repr(comptime)
@@ -980,6 +1124,14 @@ class AbstractAxis(CdmsObj):
         result = []
         if calendar is None:
             calendar = self.getCalendar()
+        comps = self._components(calendar)
+        if comps is not None:
+            year, month, day, hour, minute, second = [a.tolist() for a in comps]
+            for i in range(len(year)):
+                result.append(datetime.datetime(
+                    year[i], month[i], day[i], hour[i], minute[i], int(second[i]),
+                    int((second[i] - int(second[i])) * 1000)))
+            return result
         for val in self[:]:
             c = cdtime.reltime(val, self.units).tocomp(calendar)
             dtg = datetime.datetime(
@@ -988,6 +1140,41 @@ class AbstractAxis(CdmsObj):
             result.append(dtg)
         return result
 
+    def asDatetime64(self, calendar=None):
+        """Return the axis times as a numpy.datetime64 array, in microseconds.
+
+        Parameters
+        ----------
+        calendar : cdtime calendar, default is the axis calendar. Only the
+                   gregorian calendars can be represented.
+
+        Returns
+        -------
+        numpy array of dtype datetime64[us].
+        """
+        if not hasattr(self, 'units'):
+            raise CDMSError("No time units defined")
+        if calendar is None:
+            calendar = self.getCalendar()
+        key = ('datetime64', self.units, calendar)
+        cache = self._timeConversions()
+        if key not in cache:
+            cache[key] = timeconv.datetime64(self[:], self.units, calendar)
+        if cache[key] is None:
+            raise CDMSError("Cannot represent the times of axis %s as datetime64 in calendar %s" %
+                            (self.id, calendarToTag.get(calendar, calendar)))
+        return cache[key].copy()
+
+    def _rescaled(self, units, calendar, newcalendar, values=None):
+        # Values (default: the axis values) converted to new units, or None
+        if values is not None:
+            return timeconv.rescale(values, self.units, calendar, units, newcalendar)
+        key = ('rescale', self.units, calendar, units, newcalendar)
+        cache = self._timeConversions()
+        if key not in cache:
+            cache[key] = timeconv.rescale(self[:], self.units, calendar, units, newcalendar)
+        return cache[key]
+
     def asRelativeTime(self, units=None):
         "Array version of cdtime torel. Returns a list of relative times."
         sunits = getattr(self, 'units', None)
@@ -999,6 +1186,9 @@ class AbstractAxis(CdmsObj):
             result = [forecast.comptime(t).torel(units) for t in self[:]]
         else:
             cal = self.getCalendar()
+            values = self._rescaled(units, cal, cal)
+            if values is not None:
+                return [cdtime.reltime(v, units) for v in values.tolist()]
             result = [
                 cdtime.reltime(
                     t,
@@ -1018,6 +1208,18 @@ class AbstractAxis(CdmsObj):
             calendar = scal
         else:
             self.setCalendar(calendar)
+        values = self._rescaled(units, scal, calendar)
+        if values is not None and b is not None:
+            bounds = self._rescaled(units, scal, calendar, values=b)
+            if bounds is None:
+                values = None
+        if values is not None:
+            # Converted in bulk
+            self[:] = values.astype(self[:].dtype.char)
+            if b is not None:
+                self.setBounds(bounds.astype(b.dtype.char))
+            self.units = units
+            return
         for i in range(n):
             tmp = cdtime.reltime(self[i], self.units).tocomp(scal)
             tmp2 = numpy.array(
@@ -1208,6 +1410,65 @@ class AbstractAxis(CdmsObj):
                 value = cdtime.s2c(value, cal).torel(self.units, cal).value
         return value
 
+    def _lookupKey(self):
+        # What the prepared lookup values depend on, besides explicit changes
+        # of values and bounds: bounds generation uses the id, axis and units.
+        return ((len(self), getAutoBounds(), self.id, self.__dict__.get('axis'), getattr(self, 'units', None)),
+                (self.__dict__.get('_data_'), self.__dict__.get('_bounds_'),
+                 self.__dict__.get('_boundsArray_')))
+
+    def _getLookup(self):
+        """Return the axis values and bounds prepared for coordinate lookups.
+
+        The result is cached until the values or bounds of the axis change.
+        """
+        key = self._lookupKey()
+        lookup = self.__dict__.get('_lookup_')
+        if lookup is not None and _sameLookupKey(lookup.key, key):
+            return lookup
+        if self._data_ is None:
+            self._data_ = self.getData()
+
+        def bounds():
+            bd = self.getBounds()
+            if bd is None:              # In case autobounds is off
+                bd = self.genGenericBounds()
+            return bd
+        lookup = _AxisLookup(self[:], bounds, self._lookupKey())
+        self.__dict__['_lookup_'] = lookup
+        return lookup
+
+    def _invalidateLookup(self):
+        self.__dict__['_lookup_'] = None
+        self.__dict__['_timecache_'] = None
+        self.__dict__['_doubledata_'] = None
+
+    def fingerprint(self):
+        """Return a fingerprint of the axis values.
+
+        Returns
+        -------
+        (shape, dtype, sha1 hex digest) tuple. Axes with the same fingerprint
+        have the same values. The fingerprint is computed from the current
+        values on every call.
+        """
+        values = self[:]
+        data = numpy.ascontiguousarray(numpy.ma.getdata(values))
+        mask = numpy.ma.getmaskarray(values)
+        h = hashlib.sha1(data.view(numpy.uint8).ravel())
+        if mask.any():
+            h.update(numpy.ascontiguousarray(mask).view(numpy.uint8).ravel())
+        return (data.shape, data.dtype.str, h.hexdigest())
+
+    def _timeConversions(self):
+        # Cache of converted time values, valid as long as the lookup values
+        key = self._lookupKey()
+        cache = self.__dict__.get('_timecache_')
+        if cache is None or not _sameLookupKey(cache[0], key):
+            cache = (key, {})
+            self.__dict__['_timecache_'] = cache
+        return cache[1]
+
     def getModuloCycle(self):
 
         if hasattr(self, 'modulo'):
@@ -1284,20 +1545,64 @@ class AbstractAxis(CdmsObj):
         """Like mapInterval, but returns (i,j,k) where k is stride,
         and (i,j) is not restricted to one cycle."""
 
-        # nCycleMax : max number of cycles a user a specify in wrapping
-
-        nCycleMax = 6
-
         # interval is None returns the full interval
         if interval is None or interval == ':':
             return (0, len(self), 1)
 
+        interval, indicator = self._parseInterval(interval, indicator)
+        return self._mapParsedInterval(self._getLookup(), interval, indicator)
+
+    def mapIntervals(self, intervals, indicator='ccn'):
+        """Map a sequence of coordinate intervals to index intervals.
+
+        Same as [self.mapIntervalExt(interval, indicator) for interval in intervals],
+        but the axis values are prepared once, and the endpoints of all the
+        intervals which do not wrap around the axis are looked up together.
+
+        Parameters
+        ----------
+        intervals : sequence of intervals, of the forms accepted by mapInterval.
+        indicator : indicator of the intervals which do not specify one.
+
+        Returns
+        -------
+        list of (i,j,k) index intervals, or None for empty intersections.
+        """
+        lookup = self._getLookup()
+        parsed = []
+        for interval in intervals:
+            if interval is None or interval == ':':
+                parsed.append(None)
+            else:
+                parsed.append(self._parseInterval(interval, indicator))
+        ends = numpy.array([sorted(p[0]) if p is not None else (0, 0) for p in parsed],
+                           numpy.float64).reshape((len(parsed), 2))
+        index = lookup.search(ends)
+        armin = min(lookup.values[0], lookup.values[-1])
+        armax = max(lookup.values[0], lookup.values[-1])
+        if self.isCircular():
+            wraps = ((ends < armin) | (ends > armax)).any(axis=1)
+        else:
+            wraps = numpy.zeros(len(parsed), numpy.bool_)
+        result = []
+        for k, p in enumerate(parsed):
+            if p is None:
+                result.append((0, len(self), 1))
+            elif wraps[k]:
+                result.append(self._mapParsedInterval(lookup, p[0], p[1]))
+            else:
+                result.append(self._mapParsedInterval(lookup, p[0], p[1], index=tuple(index[k])))
+        return result
+
+    def _parseInterval(self, interval, indicator):
+        # Return the (x,y) interval in axis coordinates and its indicator
+
         # Allow intervals of the same form as getRegion.
         if len(interval) == 3:
             x, y, indicator = interval
             interval = (x, y)
         elif len(interval) == 4:
-            x, y, indicator, cycle = interval
+            x, y, indicator, cycle = interval  # cycle is given by the axis modulo
             interval = (x, y)
 
         # check length of indicator if overridden by user
@@ -1318,19 +1623,25 @@ class AbstractAxis(CdmsObj):
                 "EEE: 3-character interval/intersection indicator incomplete or incorrect = " +
                 indicator)
 
-        if self._data_ is None:
-            self._data_ = self.getData()
-
         # ttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttttt
         # Handle time types
         interval = (
             self._time2value(
                 interval[0]), self._time2value(
                 interval[1]))
+        return interval, indicator
+
+    def _mapParsedInterval(self, lookup, interval, indicator, index=None):
+        # Map a parsed interval on the prepared values of the axis. index is
+        # the position of the ordered endpoints in lookup.ar, if known.
+
+        # nCycleMax : max number of cycles a user a specify in wrapping
+
+        nCycleMax = 6
 
         # If the interval is reversed wrt self, reverse the interval and
         # set the stride to -1
-        if (interval[0] <= interval[1]) == (self[0] <= self[-1]):
+        if (interval[0] <= interval[1]) == (lookup.values[0] <= lookup.values[-1]):
             stride = 1
         else:
             stride = -1
@@ -1345,8 +1656,8 @@ class AbstractAxis(CdmsObj):
 
         xi, yi = interval
 
-        length = len(self)
-        ar = self[:]
+        ar = lookup.values
+        length = len(ar)
         ar0 = ar[0]
         arn = ar[-1]
         armin = min(ar0, arn)
@@ -1367,8 +1678,6 @@ class AbstractAxis(CdmsObj):
             intervalLength = yi - xi
             intervalCycles = intervalLength / cycle
 
-            bd = self.getBounds()
-
             nPointsCycle = len(ar)
 
             ar0 = ar[0]
@@ -1411,26 +1720,26 @@ class AbstractAxis(CdmsObj):
             if(nCycle >= nCycleMax):
                 raise CDMSError(InvalidNCycles + repr(nCycle))
 
-            self._doubledata_ = numpy.concatenate((ar, ar + cycle))
-            k = 2
-            while(k < nCycle):
-                self._doubledata_ = numpy.concatenate(
-                    (self._doubledata_, ar + k * cycle))
-                k = k + 1
+            ncopies = max(2, int(nCycle))
+            extended = lookup.extended.get((ncopies, cycle))
+            if extended is None:
+                self._doubledata_ = numpy.concatenate([ar + k * cycle for k in range(ncopies)])
 
-            # Map the canonical coordinate interval (xp,yp) in the 'extended' data array
-            # create axis to get the bounds array
+                # Map the canonical coordinate interval (xp,yp) in the 'extended' data array
+                # create axis to get the bounds array
 
-            bigar = self._doubledata_
-            bigarAxis = createAxis(bigar)
-            bd = bigarAxis.getBounds()
-            if bd is None:              # In case autobounds is off
-                bd = bigarAxis.genGenericBounds()
+                bigar = self._doubledata_
+                bigarAxis = createAxis(bigar)
+                bd = bigarAxis.getBounds()
+                if bd is None:              # In case autobounds is off
+                    bd = bigarAxis.genGenericBounds()
+                extended = lookup.extended[(ncopies, cycle)] = _AxisLookup(bigar, bd)
+            else:
+                self._doubledata_ = extended.values
 
             # run the more general mapLinearExt to get the indices
 
-            indexInterval = mapLinearExt(
-                bigar, bd, (xp, yp), indicator, wrapped=1)
+            indexInterval = _mapLinearLookup(extended, (xp, yp), indicator)
 
             #
             # check to make sure we got an interval
@@ -1457,10 +1766,7 @@ class AbstractAxis(CdmsObj):
             retval = (i, j)
 
         else:
-            bd = self.getBounds()
-            if bd is None:              # In case autobounds is off
-                bd = self.genGenericBounds()
-            retval = mapLinearExt(ar, bd, interval, indicator)
+            retval = _mapLinearLookup(lookup, interval, indicator, index=index)
 
         if retval is not None:
             i, j = retval
@@ -1704,7 +2010,7 @@ class AbstractAxis(CdmsObj):
             mycopy = createAxis(self[:])
         mycopy.id = self.id
         mydict = self.__dict__
-        newdict = {k: mydict[k] for k in mydict if k not in ['_data_']}
+        newdict = {k: mydict[k] for k in mydict if k not in ['_data_', '_shared_']}
         mycopy.__dict__.update(newdict)
         mycopy._obj_ = None  # Erase Cdfile object if exist
         try:
@@ -1887,6 +2193,14 @@ class Axis(AbstractAxis):
 # In-memory coordinate axis
 
 
+class _SharedData(weakref.WeakSet):
+    # The transient axes which use the same data array. Pickled and deep
+    # copied empty: an axis outside the set copies the array before writing.
+
+    def __reduce__(self):
+        return (_SharedData, ())
+
+
 class TransientAxis(AbstractAxis):
     axis_count = 0
 
@@ -1942,14 +2256,44 @@ class TransientAxis(AbstractAxis):
         return self._data_[low:high]
 
     def __setitem__(self, index, value):
+        self._invalidateLookup()
+        self._ownData()
         self._data_[index] = numpy.ma.filled(value)
 
     def __setslice__(self, low, high, value):
+        self._invalidateLookup()
+        self._ownData()
         self._data_[low:high] = numpy.ma.filled(value)
 
     def __len__(self):
         return len(self._data_)
 
+    def _ownData(self):
+        # Copy the data array before writing to it, if other axes use it
+        shared = self.__dict__.get('_shared_')
+        if shared is not None:
+            if len(shared) > 1 or self not in shared:
+                self._data_ = numpy.array(self._data_)
+            shared.discard(self)
+            self.__dict__['_shared_'] = None
+
+    def _sharedCopy(self):
+        # A copy of self which uses the same data and bounds arrays until it
+        # or self writes to the data. Bounds are never written in place,
+        # setBounds replaces them.
+        mycopy = TransientAxis(self._data_, id=self.id)
+        mycopy._bounds_ = self._bounds_
+        mycopy._genericBounds_ = self._genericBounds_
+        for k, v in list(self.attributes.items()):
+            setattr(mycopy, k, v)
+        shared = self.__dict__.get('_shared_')
+        if shared is None:
+            shared = _SharedData([self])
+            self.__dict__['_shared_'] = shared
+        shared.add(mycopy)
+        mycopy.__dict__['_shared_'] = shared
+        return mycopy
+
     def getBounds(self, isGeneric=None):
         if (isGeneric):
             isGeneric[0] = self._genericBounds_
@@ -1980,6 +2324,7 @@ class TransientAxis(AbstractAxis):
     # a file
     def setBounds(self, bounds, persistent=0, validate=0,
                   index=None, boundsid=None, isGeneric=False):
+        self._invalidateLookup()
         if bounds is not None:
             if isinstance(bounds, numpy.ma.MaskedArray):
                 bounds = numpy.ma.filled(bounds)
@@ -2244,6 +2589,7 @@ class FileAxis(AbstractAxis):
             raise CDMSError(ReadOnlyAxis + self.id)
         if self.parent is None:
             raise CDMSError(FileWasClosed + self.id)
+        self._invalidateLookup()
         # need setslice to create a new shape using [newaxis]
         if(isinstance(index, slice)):
             if(index.start is not None):
@@ -2266,6 +2612,7 @@ class FileAxis(AbstractAxis):
             raise CDMSError(ReadOnlyAxis + self.id)
         if self.parent is None:
             raise CDMSError(FileWasClosed + self.id)
+        self._invalidateLookup()
         return self._obj_.setslice(*(low, high, numpy.ma.filled(value)))
 
     def __len__(self):
@@ -2330,6 +2677,7 @@ class FileAxis(AbstractAxis):
     # isGeneric is only used for TransientAxis
     def setBounds(self, bounds, persistent=0, validate=0,
                   index=None, boundsid=None, isGeneric=False):
+        self._invalidateLookup()
         if persistent:
             if index is None:
                 if validate:
@@ -1,15 +1,23 @@
 """
 CDMS cache management and file movement objects
+
+The data cache index is a SQLite database in WAL mode, shared by all the
+processes of a node: lookups do not block each other, and updates wait on
+the database lock instead of polling a lock file. Downloads are written to
+a temporary file and renamed into place when complete. The total size of
+the cached files can be bounded, see setCacheMaxSize, in which case the
+least recently used files are evicted.
 """
-import cdurllib
+from . import cdurllib
 import urllib.parse
 import tempfile
 import os
 import time
-import cdmsobj
-import sys
+import socket
+import sqlite3
+import threading
+from . import cdmsobj
 import errno
-import shelve
 from .error import CDMSError
 MethodNotImplemented = "Method not yet implemented"
 SchemeNotSupported = "Scheme not supported: "
@@ -21,6 +29,40 @@ RequestManagerNotSupported = "Request manager interface not supported (module re
 _lock_max_tries = 10                    # Number of tries for a lock
 _lock_naptime = 1                       # Seconds between lock tries
 _cache_tempdir = None                   # Default temporary directory
+_cache_max_size = None                  # Maximum size of the cached files in bytes, or None
+_index_timeout = 60.                    # Seconds to wait for the index database lock
+_touch_interval = 10.                   # Seconds between access time updates of an entry
+
+ReadPending = "__READ_PENDING__"        # Index value of a file being transferred
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def setCacheMaxSize(value):
+    """Bound the total size of the files in the data cache.
+
+    Parameters
+    ----------
+    value : size in bytes, or None for no bound. When a new file brings the cache
+            over the bound, the least recently used files are removed.
+
+    Returns
+    -------
+    No return value.
+    """
+    global _cache_max_size
+    if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+        raise CDMSError("setCacheMaxSize value must be None or a non-negative integer")
+    _cache_max_size = value
+
+
+def getCacheMaxSize():
+    """Return the maximum size of the data cache in bytes, or None."""
+    return _cache_max_size
+
+
+def getCacheStats():
+    """Return a dictionary of the hits, misses and evictions of this process."""
+    return dict(_stats)
 
 
 def lock(filename):
@@ -56,8 +98,8 @@ def lock(filename):
 
         # If the open failed because the file already exists, keep trying, otherwise
         # reraise the error
-        except OSError:
-            if sys.exc_value.errno != errno.EEXIST:
+        except OSError as err:
+            if err.errno != errno.EEXIST:
                 raise
             tries = tries + 1
         else:
@@ -270,31 +312,183 @@ def copyFile(fromURL, toURL, callback=None,
 # A simple data cache
 
 
+def _owner():
+    return "%s:%d" % (socket.gethostname(), os.getpid())
+
+
+def _isAlive(owner):
+    # False if owner is a process of this host which no longer exists
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except OSError as err:
+        return err.errno == errno.EPERM
+    except ValueError:
+        return False
+    return True
+
+
+class SQLiteIndex(object):
+    """Persistent cache index, safe for concurrent processes.
+
+    Maps a file key to the path of the cached file. Each entry records the
+    file size, the last access time and, for transfers in progress, the
+    process owning the transfer.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        with self._transaction() as cur:
+            cur.execute("CREATE TABLE IF NOT EXISTS entries "
+                        "(key TEXT PRIMARY KEY, path TEXT, size INTEGER, atime REAL, owner TEXT)")
+            cur.execute("CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime)")
+        try:
+            # Make the index world writeable, as the cache directory
+            os.chmod(path, 0o666)
+        except BaseException:
+            pass
+
+    def _connection(self):
+        # One connection per process, sqlite connections must not cross a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=_index_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _transaction(self, write=True):
+        return _Transaction(self, write)
+
+    def get(self, key):
+        """Return the path of key, ReadPending, or None. Touches the entry."""
+        # Readers do not block each other in WAL mode. The access time is
+        # updated at most every _touch_interval seconds, in a short write.
+        with self._transaction(write=False) as cur:
+            row = cur.execute("SELECT path, atime FROM entries WHERE key=?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[0] != ReadPending and now - row[1] > _touch_interval:
+            with self._transaction() as cur:
+                cur.execute("UPDATE entries SET atime=? WHERE key=?", (now, key))
+        return row[0]
+
+    def claim(self, key):
+        """Mark key as being transferred by this process.
+
+        Returns
+        -------
+        True if this process owns the transfer, False if the key is already
+        present or being transferred by another process.
+        """
+        with self._transaction() as cur:
+            cur.execute("INSERT OR IGNORE INTO entries VALUES (?, ?, 0, ?, ?)",
+                        (key, ReadPending, time.time(), _owner()))
+            return cur.rowcount == 1
+
+    def put(self, key, path):
+        """Set the path of key, and evict least recently used files if needed."""
+        size = 0
+        if path != ReadPending and os.path.isfile(path):
+            size = os.path.getsize(path)
+        owner = _owner() if path == ReadPending else None
+        with self._transaction() as cur:
+            cur.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                        (key, path, size, time.time(), owner))
+            evicted = self._evict(cur, key)
+        for victim in evicted:
+            try:
+                os.unlink(victim)
+            except OSError:
+                pass
+
+    def _evict(self, cur, keep):
+        if _cache_max_size is None:
+            return []
+        total = cur.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        evicted = []
+        if total <= _cache_max_size:
+            return evicted
+        rows = cur.execute("SELECT key, path, size FROM entries WHERE path != ? AND key != ? "
+                           "ORDER BY atime", (ReadPending, keep)).fetchall()
+        for key, path, size in rows:
+            if total <= _cache_max_size:
+                break
+            cur.execute("DELETE FROM entries WHERE key=?", (key,))
+            evicted.append(path)
+            total -= size
+        _stats['evictions'] += len(evicted)
+        return evicted
+
+    def delete(self, key):
+        with self._transaction() as cur:
+            cur.execute("DELETE FROM entries WHERE key=?", (key,))
+
+    def items(self):
+        with self._transaction(write=False) as cur:
+            return cur.execute("SELECT key, path FROM entries").fetchall()
+
+    def cleanPending(self):
+        """Remove the transfers in progress whose process has died."""
+        with self._transaction() as cur:
+            rows = cur.execute("SELECT key, owner FROM entries WHERE path=?", (ReadPending,)).fetchall()
+            for key, owner in rows:
+                if owner is None or not _isAlive(owner):
+                    cur.execute("DELETE FROM entries WHERE key=?", (key,))
+
+    def size(self):
+        """Return (number of cached files, total size in bytes)."""
+        with self._transaction(write=False) as cur:
+            return cur.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries "
+                               "WHERE path != ?", (ReadPending,)).fetchone()
+
+
+class _Transaction(object):
+    # Serializes the threads of the process on the connection, and wraps the
+    # statements in a transaction, write locked from the start if write is
+    # true so that it never has to be upgraded.
+
+    def __init__(self, index, write):
+        self.index = index
+        self.write = write
+
+    def __enter__(self):
+        self.index._lock.acquire()
+        try:
+            self.cursor = self.index._connection().cursor()
+            self.cursor.execute("BEGIN IMMEDIATE" if self.write else "BEGIN")
+        except BaseException:
+            self.index._lock.release()
+            raise
+        return self.cursor
+
+    def __exit__(self, type, value, traceback):
+        try:
+            if type is None:
+                self.cursor.execute("COMMIT")
+            else:
+                self.cursor.execute("ROLLBACK")
+        finally:
+            self.index._lock.release()
+
+
 class Cache:
 
     indexpath = None                    # Path of data cache index
 
     def __init__(self):
         if self.indexpath is None:
-            self.indexpath = lockpath(".index")
-            # This is a kluge to handle the very real possibility that
-            # a lock was left over from an aborted process. Unfortunately,
-            # this might also screw up a transfer in progress ...
-            try:
-                unlock("index_lock")
-            except BaseException:
-                pass
-            lock("index_lock")
-            self.index = shelve.open(self.indexpath)  # Persistent cache index
-            try:
-                # Make index file world writeable
-                os.chmod(self.indexpath, 0o666)
-            except BaseException:
-                pass
-            self.index.close()
-            unlock("index_lock")
-            # Clean up pending read notifications in the cache. This will also
-            # mess up tranfers in progress...
+            self.indexpath = lockpath("index.sqlite")
+            self.index = SQLiteIndex(self.indexpath)  # Persistent cache index
+            # Clean up pending read notifications left by dead processes
             self.clean()
             self.direc = os.path.dirname(self.indexpath)  # Cache directory
 
@@ -306,19 +500,15 @@ class Cache:
         ----------
         <filekey> : filekey for cache
         """
-        filekey = str(filekey)
-        lock("index_lock")
-        try:
-            self.index = shelve.open(self.indexpath)
-            value = self.index[filekey]
-        except KeyError:
+        value = self.index.get(str(filekey))
+        if value is not None and value != ReadPending and not os.path.isfile(value):
+            # removed behind the back of the cache
+            self.index.delete(str(filekey))
             value = None
-        except BaseException:
-            self.index.close()
-            unlock("index_lock")
-            raise
-        self.index.close()
-        unlock("index_lock")
+        if value is None:
+            _stats['misses'] += 1
+        elif value != ReadPending:
+            _stats['hits'] += 1
         return value
 
     def put(self, filekey, path):
@@ -329,24 +519,11 @@ class Cache:
         ----------
         filekey : for cache
         """
-
-        filekey = str(filekey)
-
-        # Create a semaphore
-        lock("index_lock")
-        try:
-            if cdmsobj._debug:
-                print(
-                    'Process %d: Adding cache file %s,\n   key %s' %
-                    (os.getpid(), path, filekey))
-            self.index = shelve.open(self.indexpath)
-            self.index[filekey] = path
-        except BaseException:
-            self.index.close()
-            unlock("index_lock")
-            raise
-        self.index.close()
-        unlock("index_lock")
+        if cdmsobj._debug:
+            print(
+                'Process %d: Adding cache file %s,\n   key %s' %
+                (os.getpid(), path, filekey))
+        self.index.put(str(filekey), path)
 
     def deleteEntry(self, filekey):
         """
@@ -356,19 +533,19 @@ class Cache:
         ----------
         <filekey> : filekey for cache
         """
-        filekey = str(filekey)
+        self.index.delete(str(filekey))
 
-        # Create a semaphore
-        lock("index_lock")
-        self.index = shelve.open(self.indexpath)
-        try:
-            del self.index[filekey]
-        except BaseException:
-            pass
-        unlock("index_lock")
+    def stats(self):
+        """
+        Return a dictionary with the hits, misses and evictions of this process, and the
+        number of files (entries) and total size in bytes (bytes) of the cache.
+        """
+        result = getCacheStats()
+        result['entries'], result['bytes'] = self.index.size()
+        return result
 
     def copyFile(self, fromURL, filekey, lcpath=None,
-                 userid=None, useReplica=None):
+                 userid=None, useReplica=None, claimed=False):
         """
         Copy the file <fromURL> into the cache. Return the result path.
 
@@ -381,33 +558,36 @@ class Cache:
 
         <useReplica> : is true iff the request manager should search the replica
                        catalog for the actual file to transfer.
+
+        <claimed> : true if the read pending notification is already set by this process.
         """
 
         # Put a notification into the cache, that this file is being read.
-        self.put(filekey, "__READ_PENDING__")
+        if not claimed:
+            self.put(filekey, ReadPending)
 
-        # Get a temporary file in the cache
-        tempdir = tempfile.tempdir
-        tempfile.tempdir = self.direc
-        toPath = tempfile.mktemp()
-        tempfile.tempdir = tempdir
-
-        # Copy to the temporary file
+        # Transfer to a temporary file in the cache, renamed when complete so
+        # that readers never see a partial file.
+        fd, toPath = tempfile.mkstemp(dir=self.direc)
+        os.close(fd)
+        partPath = toPath + '.part'
         try:
             copyFile(
                 fromURL,
-                toPath,
+                partPath,
                 lcpath=lcpath,
                 userid=userid,
                 useReplica=useReplica)
             # Make cache files world writeable
-            os.chmod(toPath, 0o666)
+            os.chmod(partPath, 0o666)
+            os.rename(partPath, toPath)
         except BaseException:
             # Remove the notification on error, and the temp file, then
             # re-raise
             self.deleteEntry(filekey)
-            if os.path.isfile(toPath):
-                os.unlink(toPath)
+            for path in (partPath, toPath):
+                if os.path.isfile(path):
+                    os.unlink(path)
             raise
 
         # Add to the cache index
@@ -428,9 +608,9 @@ class Cache:
 
         Parameters
         ----------
-        <naptime> : is the number of seconds between retries,
+        <naptime> : is the maximum number of seconds between retries,
 
-        <maxtries> : is the maximum number of retries. Otherwise, copy it from the remote file.
+        <maxtries> : the wait for another process times out after naptime * maxtries seconds.
 
         <filekey> : is the cache index key. A good choice is (datasetDN, filename) where
 
@@ -454,50 +634,28 @@ class Cache:
         The function does not guarantee that the file is still in the cache
         by the time it returns.
         """
-        # If the file is being read into the cache, just wait for it
-        tempname = self.get(filekey)
-        # Note: This is not bulletproof: another process could set the cache at
-        # this point
-        if tempname is None:
-            fpath = self.copyFile(
-                fromURL,
-                filekey,
-                lcpath=lcpath,
-                userid=userid,
-                useReplica=useReplica)
-        elif tempname == "__READ_PENDING__":
-            success = 0
-            for i in range(maxtries):
+        key = str(filekey)
+        kwargs = dict(lcpath=lcpath, userid=userid, useReplica=useReplica)
+        fpath = self.get(filekey)
+        nap = min(0.05, naptime)
+        deadline = time.time() + naptime * maxtries
+        while fpath is None or fpath == ReadPending:
+            if fpath is None:
+                # Only one process transfers the file, the others wait for it
+                if self.index.claim(key):
+                    fpath = self.copyFile(fromURL, filekey, claimed=True, **kwargs)
+                    break
+            elif time.time() > deadline:
+                raise CDMSError(TimeOutError + repr(filekey))
+            else:
                 if cdmsobj._debug:
                     print(
                         'Process %d: Waiting for read completion, %s' %
                         (os.getpid(), repr(filekey)))
-                time.sleep(naptime)
-                tempname = self.get(filekey)
-
-                # The read failed, or the entry was deleted.
-                if tempname is None:
-                    fpath = self.copyFile(
-                        fromURL,
-                        filekey,
-                        lcpath=lcpath,
-                        userid=userid,
-                        useReplica=useReplica)
-
-                # The read is not yet complete
-                elif tempname == "__READ_PENDING__":
-                    continue
-
-                # The read is finished.
-                else:
-                    fpath = tempname
-                    success = 1
-                    break
-            if not success:
-                raise CDMSError(TimeOutError + repr(filekey))
-
-        else:
-            fpath = tempname
+                time.sleep(nap)
+                nap = min(2 * nap, naptime)
+                self.index.cleanPending()
+            fpath = self.get(filekey)
 
         if cdmsobj._debug:
             print(
@@ -510,11 +668,8 @@ class Cache:
         Delete the cache.
         """
         if self.indexpath is not None:
-            lock("index_lock")
-            self.index = shelve.open(self.indexpath)
-            for key in list(self.index.keys()):
-                path = self.index[key]
-                if path == "__READ_PENDING__":
+            for key, path in self.index.items():
+                if path == ReadPending:
                     continue  # Don't remove read-pending notifications
                 try:
                     if cdmsobj._debug:
@@ -524,21 +679,11 @@ class Cache:
                     os.unlink(path)
                 except BaseException:
                     pass
-
-                del self.index[key]
-            self.index.close()
-            unlock("index_lock")
+                self.index.delete(key)
             self.indexpath = None
 
     def clean(self):
         """
-        Clean pending read notifications.
+        Clean pending read notifications of processes which no longer exist.
         """
-        lock("index_lock")
-        self.index = shelve.open(self.indexpath)
-        for key in list(self.index.keys()):
-            path = self.index[key]
-            if path == "__READ_PENDING__":
-                del self.index[key]
-        self.index.close()
-        unlock("index_lock")
+        self.index.cleanPending()
@@ -162,8 +162,9 @@ class CdmsNode:
         self.tag = tag                  # XML tag string
         self.content = None             # XML content string
         # CDML Document Type Definition for this tag
-        self.dtd = CDML.CDML().dtd.get(self.tag)
-        self.extra = CDML.CDML().extra.get(self.tag)  # Extra datatype constraints
+        cdml = CDML.CDML()
+        self.dtd = cdml.dtd.get(self.tag)
+        self.extra = cdml.extra.get(self.tag)  # Extra datatype constraints
         CdmsNode.mapToExternal(self)    # Don't call subclass mapToExternal!
 
     # Map to external attributes
@@ -572,15 +573,12 @@ class AxisNode(CdmsNode):
         numericType = CdToNumericType.get(datatype)
         if numericType is None:
             raise CDMSError(InvalidDatatype + datatype)
-        stringlist = _ArraySep.split(datastring)
-        numlist = []
-        for numstring in stringlist:
-            if numstring == '':
-                continue
-            numlist.append(float(numstring))
+        # Large explicit axes are common: split on the separators of
+        # _ArraySep with str methods, and convert all values at once
+        numlist = datastring.replace('[', ' ').replace(']', ' ').replace(',', ' ').split()
         if len(numlist) > 0:
             # NB! len(zero-length array) causes IndexError on Linux!
-            dataArray = numpy.array(numlist, numericType)
+            dataArray = numpy.array(numlist, numpy.float64).astype(numericType)
             self.data = dataArray
             self.length = len(self.data)
 
@@ -3,6 +3,7 @@ from __future__ import print_function
 
 import sys
 import getopt
+import json
 import cdms2
 from cdms2.grid import lookupArray
 from cdms2.axis import calendarToTag, tagToCalendar
@@ -17,6 +18,7 @@ import re
 from functools import reduce
 from cdms2.error import CDMSError
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from six import string_types
 usage = """Usage:
     cdscan [options] <files>
@@ -96,6 +98,14 @@ Options:
     --ignore-open-error:
                    Ignore open errors. Print a warning and continue.
 
+    --incremental: Rescan an archive incrementally. Requires -x. A manifest of the
+                   size and modification time of the scanned files is written next
+                   to the XML file (xmlfile.manifest). If the XML file and its manifest
+                   exist, files which are unchanged since the previous scan are not
+                   opened again: their description is taken from the existing XML
+                   file, and only new or modified files are scanned. Files no longer
+                   listed are dropped. Not compatible with --forecast.
+
     --include var,var,...
                    Only include specified variables in the output. The argument
                    is a comma-separated list of variables containing no blanks.
@@ -160,6 +170,10 @@ Options:
 
                    Note (6) compares this option with [-i] and [-r]
 
+    --workers n:   open the files and read their axes with n threads. The files are
+                   still combined in the order given, so the output does not depend
+                   on n. Default: 1.
+
     --var-locate 'var,file_pattern':
                    Only scan a variable if the basename of the file matches the pattern. This
                    may be used to resolve duplicate variable errors. var and file_pattern are
@@ -176,6 +190,7 @@ Options:
 Example:
 
     cdscan -c noleap -d test -x test.xml [uv]*.nc
+    cdscan --incremental --workers 8 -d test -x test.xml [uv]*.nc
     cdscan -d pcmdi_6h -i 0.25 -r 'days since 1979-1-1' *6h*.ctl
 
 Notes:
@@ -620,7 +635,7 @@ def setNodeDict(node, mydict):
 
 def initialize_filemap(filemap, timedict, levdict, timeid, extendDset, splitOnTime,
                        referenceTime, timeIsLinear, referenceDelta, splitOnLevel,
-                       dirlen, overrideCalendar):
+                       dirlen, overrideCalendar, keepPaths=None):
     # This function was formerly part of the body of "main".
     # Initialize filemap : varid => (tc0, tc1, lc0, lc1, path, timeid, levid)
     # where tc0 is the first time index relative to the reference time, tc1 the last,
@@ -631,6 +646,9 @@ def initialize_filemap(filemap, timedict, levdict, timeid, extendDset, splitOnTi
     #
     # levdict : (path, levelid) => (levelarray, levelunits, None)
     #
+    # keepPaths : if not None, the set of absolute file paths to keep, the
+    # other files of the dataset are dropped (see --incremental)
+    #
     initfilemap = cdms2.dataset.parseFileMap(extendDset.cdms_filemap)
     dsetdirec = extendDset.directory
     for namelist, slicelist in initfilemap:
@@ -669,6 +687,8 @@ def initialize_filemap(filemap, timedict, levdict, timeid, extendDset, splitOnTi
             varmaplist = []
             for t0, t1, lev0, lev1, path in slicelist:
                 fullpath = os.path.join(dsetdirec, path)
+                if keepPaths is not None and os.path.abspath(fullpath) not in keepPaths:
+                    continue
                 basepath = fullpath[dirlen:]
                 if t0 is not None:
                     tc0 = timeindex(
@@ -699,11 +719,99 @@ def initialize_filemap(filemap, timedict, levdict, timeid, extendDset, splitOnTi
                     lc0 = lc1 = None
                 varmaplist.append(
                     (tc0, tc1, lc0, lc1, basepath, timeid, levid, calendar))
+            if len(varmaplist) == 0:
+                continue
             if name in filemap:
                 filemap[name].extend(varmaplist)
             else:
                 filemap[name] = varmaplist
 
+
+def fileFingerprint(path):
+    """Return the (size, mtime) fingerprint of a file, used by --incremental."""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime]
+
+
+def readManifest(manifestpath):
+    """Read a manifest written by writeManifest.
+
+    Returns a dictionary absolute path => fingerprint, empty if the manifest
+    does not exist or cannot be read.
+    """
+    try:
+        with open(manifestpath) as f:
+            manifest = json.load(f)
+        return dict(manifest['files'])
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return {}
+
+
+def writeManifest(manifestpath, fingerprints):
+    """Write the fingerprints of the scanned files next to the XML file."""
+    tmppath = manifestpath + '.tmp'
+    with open(tmppath, 'w') as f:
+        json.dump({'files': fingerprints}, f, indent=0, sort_keys=True)
+    os.rename(tmppath, manifestpath)
+
+
+def harvestFile(path):
+    """Open a file and read the values of its axes.
+
+    Axes of files opened read-only cache their values, so the main thread
+    then scans the file without further reads.
+    """
+    f = cdms2.open(path)
+    try:
+        for axis in list(f.axes.values()):
+            axis[:]
+            axis.getBounds()
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+def openFiles(paths, workers=1):
+    """Open files, in worker threads if workers > 1.
+
+    Yields (path, file, error) tuples in the order of paths, where error is
+    the exception raised when opening the file, or None. At most 2*workers
+    files are opened ahead of the one being processed.
+    """
+    if workers <= 1:
+        for path in paths:
+            try:
+                result = (path, cdms2.open(path), None)
+            except BaseException as err:
+                result = (path, None, err)
+            yield result
+        return
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        pending = []
+        paths = iter(paths)
+        while True:
+            while len(pending) < 2 * workers:
+                path = next(paths, None)
+                if path is None:
+                    break
+                pending.append((path, executor.submit(harvestFile, path)))
+            if len(pending) == 0:
+                break
+            path, future = pending.pop(0)
+            try:
+                result = (path, future.result(), None)
+            except BaseException as err:
+                result = (path, None, err)
+            yield result
+    finally:
+        # close the files opened ahead, e.g. after an error
+        for path, future in pending:
+            if not future.cancel() and future.exception() is None:
+                future.result().close()
+        executor.shutdown()
+
 # ------------------------------------------------------------------------
 
 
@@ -719,7 +827,7 @@ def main(argv):
         args, lastargs = getopt.getopt(
             argv[1:], "a:c:d:e:f:hi:jl:m:p:qr:s:t:x:",
             ["include=", "include-file=", "exclude=", "exclude-file=", "forecast", "time-linear=",
-             "notrim-lat", "var-locate=", "ignore-open-error"])
+             "notrim-lat", "var-locate=", "ignore-open-error", "incremental", "workers="])
     except getopt.error:
         print(sys.exc_info()[1], file=sys.stderr)
         print(usage, file=sys.stderr)
@@ -753,6 +861,8 @@ def main(argv):
     excludePattern = None
     includePattern = None
     forecast = False
+    incremental = False
+    workers = 1
     for flag, arg in args:
         if flag == '-a':
             aliasMapFile = arg
@@ -801,6 +911,8 @@ def main(argv):
             timeIsVector = None
         elif flag == '--ignore-open-error':
             ignoreOpenError = True
+        elif flag == '--incremental':
+            incremental = True
         elif flag == '--include':
             if arg[0] == '-':
                 raise RuntimeError("--include option requires an argument")
@@ -850,10 +962,17 @@ def main(argv):
                 varLocate = {}
             vname, pattern = arg.split(',')
             varLocate[vname] = pattern
+        elif flag == '--workers':
+            workers = int(arg)
         elif flag == '-x':
             writeToStdout = 0
             xmlpath = arg
 
+    if incremental and writeToStdout:
+        raise RuntimeError("--incremental requires the -x option")
+    if incremental and forecast:
+        raise RuntimeError("--incremental is not compatible with --forecast")
+
     # If overriding time, process time as vector so that no gaps result
     if overrideTimeLinear is not None:
         timeIsVector = 1
@@ -886,6 +1005,35 @@ def main(argv):
         else:
             fileargs.append(arg)
 
+    # Incremental rescan: files unchanged since the previous scan are
+    # described by the existing XML file, only the other files are opened.
+    keepPaths = None
+    if incremental:
+        manifestpath = xmlpath + '.manifest'
+        manifest = readManifest(manifestpath)
+        statted = {}
+        newargs = []
+        for arg in fileargs:
+            fullpath = os.path.abspath(arg.strip())
+            try:
+                statted[fullpath] = fileFingerprint(fullpath)
+            except OSError:
+                pass                    # reported when the file is opened
+            if statted.get(fullpath) is not None and manifest.get(fullpath) == statted[fullpath]:
+                if keepPaths is None:
+                    keepPaths = set()
+                keepPaths.add(fullpath)
+            else:
+                newargs.append(arg)
+        fingerprints = dict((path, statted[path]) for path in keepPaths or ())
+        if keepPaths is not None and os.path.isfile(xmlpath):
+            if verbose:
+                print('Reusing %s for %d unchanged files' % (xmlpath, len(keepPaths)))
+            fileargs = newargs
+            dsetargs.append(xmlpath)
+        else:
+            keepPaths = None
+
     # Generate a list of pathnames for datasets
     dsetfiles = []
     for path in dsetargs:
@@ -897,10 +1045,15 @@ def main(argv):
             raise RuntimeError(
                 'Dataset must have a directory attribute: ' + path)
         dsetdirec = dset.directory
+        dsetKeepPaths = keepPaths if (keepPaths is not None and path == xmlpath) else None
         initfilemap = cdms2.dataset.parseFileMap(dset.cdms_filemap)
         for namelist, slicelist in initfilemap:
             for t0, t1, lev0, lev1, path in slicelist:
-                dsetfiles.append(os.path.join(dsetdirec, path))
+                fullpath = os.path.join(dsetdirec, path)
+                if dsetKeepPaths is not None and os.path.abspath(fullpath) not in dsetKeepPaths:
+                    continue
+                dsetfiles.append(fullpath)
+        dset.close()
     augmentedArgs = fileargs + dsetfiles
 
     # Find the common directory
@@ -992,9 +1145,10 @@ def main(argv):
         #
         # levdict : (path, levelid) => (levelarray, levelunits, None)
         #
+        dsetKeepPaths = keepPaths if (keepPaths is not None and extendPath == xmlpath) else None
         initialize_filemap(filemap, timedict, levdict, timeid, extendDset, splitOnTime,
                            referenceTime, timeIsLinear, referenceDelta, splitOnLevel,
-                           dirlen, overrideCalendar)
+                           dirlen, overrideCalendar, dsetKeepPaths)
 
         # axisdict : id => transient_axis
         #   for non-partitioned axes only
@@ -1049,8 +1203,15 @@ def main(argv):
     if verbose:
         print('Scanning files ...')
 
+    # Variables of the existing dataset which are only in dropped files
+    if keepPaths is not None:
+        for varname in list(vardict.keys()):
+            if varname not in filemap:
+                del vardict[varname]
+
     boundsmap = {}                      # boundsmap : varid => timebounds_id
     boundsdict = {}                     # Same as vardict for time bounds
+    scanpaths = []
     for path in fileargs:
         path = path.strip()
 
@@ -1067,12 +1228,12 @@ def main(argv):
             mobj = re.match(excludePattern, base)
             if mobj is not None:
                 continue
+        scanpaths.append(path)
 
+    for path, f, openError in openFiles(scanpaths, workers):
         if verbose:
             print(path)
-        try:
-            f = cdms2.open(path)
-        except BaseException:
+        if openError is not None:
             if not ignoreOpenError:
                 raise RuntimeError('Error opening file ' + path)
             else:
@@ -1080,6 +1241,8 @@ def main(argv):
                     'Warning: cannot open file, skipping: %s' %
                     path, file=sys.stderr)
                 continue
+        if incremental and os.path.abspath(path) in statted:
+            fingerprints[os.path.abspath(path)] = statted[os.path.abspath(path)]
 
         # Add/modify attributes
         addAttrs(f, extraAttrs)
@@ -1835,6 +1998,8 @@ def main(argv):
         datasetnode.dump(xmlpath)
         if verbose:
             print(xmlpath, 'written')
+        if incremental:
+            writeManifest(manifestpath, fingerprints)
 
 
 # ------------------------------------------------------------------------
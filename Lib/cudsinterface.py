@@ -31,6 +31,14 @@ class cuDataset():
                     raise CDMSError("No such variable or grid, " + id)
             except (AttributeError, TypeError):
                 raise CDMSError("No such variable, " + id)
+        if getattr(self, '_lazy_', False):
+            # Opened with lazy=True: only index selection is supported
+            if kwargs:
+                raise CDMSError("Lazy datasets only support index selection, variable " + id)
+            result = v.to_dask()
+            if args:
+                result = result[args]
+            return result
         return v(*args, **kwargs)
 
     def __getitem__(self, key):
@@ -1,4 +1,5 @@
-import zlib
+import pickle
+import numpy
 from . import tvariable
 from . import fvariable
 from cdms2 import open
@@ -11,14 +12,37 @@ createVariable = tvariable.createVariable
 
 
 def serialize_TV(tv):
-    state = zlib.compress(tv.dumps().encode("utf-8"))
-    return {"TV": state}, []
+    """Send data and mask as raw frames, axes, grid and attributes as a pickled header."""
+    meta, data, mask = tv.serialize()
+    header = {"TV2": pickle.dumps(meta, protocol=pickle.HIGHEST_PROTOCOL),
+              "dtype": data.dtype.str,
+              "shape": data.shape,
+              "masked": mask is not None}
+    frames = [memoryview(data.reshape(-1).view(numpy.uint8))]
+    if mask is not None:
+        frames.append(memoryview(mask.reshape(-1).view(numpy.uint8)))
+    return header, frames
+
+
+def _frameArray(frame, dtype, shape):
+    ar = numpy.frombuffer(frame, dtype=dtype).reshape(shape)
+    if not ar.flags.writeable:
+        # Frames received as bytes are read-only
+        ar = ar.copy()
+    return ar
 
 
 def deserialize_TV(header, frames):
-    TV = header['TV']
-    newvar = createVariable(TV, fromJSON=True)
-    return newvar
+    if "TV" in header:
+        # JSON state sent by older versions
+        return createVariable(header['TV'], fromJSON=True)
+    meta = pickle.loads(header["TV2"])
+    shape = tuple(header["shape"])
+    data = _frameArray(frames[0], numpy.dtype(header["dtype"]), shape)
+    mask = None
+    if header["masked"]:
+        mask = _frameArray(frames[1], numpy.ma.MaskType, shape)
+    return tvariable._restoreTransientVariable(meta, data, mask)
 
 
 def serialize_FV(fv):
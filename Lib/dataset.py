@@ -9,7 +9,9 @@ from . import Cdunif
 import numpy
 from . import cdmsNode
 import os
+import pickle
 import string
+import tempfile
 try:
     from urllib.parse import urlparse, urlunparse
     from urllib.request import urlopen
@@ -18,7 +20,7 @@ except ImportError:
     from urllib import urlopen
 from . import cdmsobj
 import re
-from .CDMLParser import CDMLParser
+from .CDMLParser import parseCDML
 from .cdmsobj import CdmsObj
 from .axis import Axis, FileAxis, FileVirtualAxis, isOverlapVector
 from .coord import FileAxis2D, DatasetAxis2D
@@ -29,10 +31,14 @@ from .gengrid import FileGenericGrid, DatasetGenericGrid
 from .variable import DatasetVariable
 from .fvariable import FileVariable
 from .tvariable import asVariable
+from .streamwriter import StreamWriter
 from .cdmsNode import CdDatatypes
 from . import convention
+from . import filepool
+from . import netcdf3
 import warnings
 from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
 from six import string_types
 
 # Default is serial mode until setNetcdfUseParallelFlag(1) is called
@@ -111,6 +117,13 @@ _IndexList5 = re.compile(
 
 _NPRINT = 20
 _showCompressWarnings = True
+_readExecutor = None                    # Executor for partitioned reads, see setReadExecutor
+_readExecutorOwned = False              # True if _readExecutor was created by setReadExecutor
+_cdmlCache = False                      # Cache parsed CDML files, see setCdmlCacheFlag
+_lazyMetadata = False                   # Build file metadata on demand, see setLazyMetadataFlag
+_netcdfMemmap = False                   # Map netCDF-3 variables into memory, see setNetcdfMemmapFlag
+_CdmlCacheVersion = 1
+_ChunkBytes = 1 << 20                   # Size of the default netCDF-4 chunks, see defaultChunkSizes
 
 
 def setCompressionWarnings(value=None):
@@ -171,6 +184,169 @@ def setNetcdfUseNCSwitchModeFlag(value):
         Cdunif.CdunifSetNCFLAGS("use_define_mode", 1)
 
 
+def setNetcdfPerFileLockFlag(value):
+    """Lock files opened read-only individually instead of all together.
+
+       With the flag set (the default), threads reading different netCDF files
+       no longer wait for each other. Set it to 0 if the netCDF/HDF5 library
+       was not built thread-safe; every netCDF call then takes the global lock.
+       Only files opened after the call are affected.
+
+       Parameters
+       ----------
+       value : 0/1, False/True.
+
+       Returns
+       -------
+       No return value.
+    """
+
+    if value not in [True, False, 0, 1]:
+        raise CDMSError(
+            "Error PerFileLock flag must be 1(per file)/0(global lock) or true/False")
+    if value in [0, False]:
+        Cdunif.CdunifSetNCFLAGS("per_file_lock", 0)
+    else:
+        Cdunif.CdunifSetNCFLAGS("per_file_lock", 1)
+
+
+def _makeReadExecutor(executor):
+    """Return (executor, owned), owned is True if the executor was created here."""
+    if executor is None or isinstance(executor, Executor):
+        return executor, False
+    if isinstance(executor, int) and not isinstance(executor, bool) and executor > 0:
+        return ThreadPoolExecutor(max_workers=executor), True
+    raise CDMSError(
+        "Read executor must be None, a positive number of threads or a concurrent.futures.Executor")
+
+
+def _shutdownReadExecutor(executor, owned):
+    # Executors passed in by the caller are left running
+    if owned and executor is not None:
+        executor.shutdown()
+
+
+def setReadExecutor(executor):
+    """Set the executor used to read the files of partitioned datasets.
+
+       When a slice of a dataset variable spans several files, the chunks are
+       read concurrently by the executor instead of one after another.
+
+       Parameters
+       ----------
+       executor : None (read sequentially, the default), a number of threads,
+                  or a concurrent.futures.Executor. Process pools are used
+                  for datasets opened from a local CDML file, the files of
+                  other datasets are read in the calling thread. A thread pool
+                  created from a number of threads is shut down when it is
+                  replaced; an executor passed in is left to the caller.
+
+       Returns
+       -------
+       No return value.
+    """
+    global _readExecutor, _readExecutorOwned
+    old = (_readExecutor, _readExecutorOwned)
+    _readExecutor, _readExecutorOwned = _makeReadExecutor(executor)
+    _shutdownReadExecutor(*old)
+
+
+def getReadExecutor():
+    """Get the default executor used to read partitioned datasets, or None."""
+    return _readExecutor
+
+
+def setCdmlCacheFlag(value):
+    """Cache the parse trees of CDML files in binary sidecar files.
+
+       With the flag set, opening a local CDML file stores its parse tree
+       in a pickled file .<name>.cdmlcache next to it. Later opens read the
+       tree from the sidecar as long as the size and modification time of
+       the CDML file are unchanged. Sidecars are only read if they belong
+       to the current user, and directories which are not writable are
+       skipped.
+
+       Parameters
+       ----------
+       value : 0/1, False/True.
+
+       Returns
+       -------
+       No return value.
+    """
+    global _cdmlCache
+    if value not in [True, False, 0, 1]:
+        raise CDMSError(
+            "Error CdmlCache flag must be 1(cache)/0(do not cache) or true/False")
+    _cdmlCache = value in [1, True]
+
+
+def getCdmlCacheFlag():
+    """Get the CDML cache flag, see setCdmlCacheFlag."""
+    return int(_cdmlCache)
+
+
+def setLazyMetadataFlag(value):
+    """Build the variables, axes and grids of files on demand.
+
+       With the flag set, opening a file read-only only reads the netCDF
+       header. File variables and axes are created the first time they are
+       accessed, e.g. by f[name], f.getVariable or f.variables.values(), and
+       the same object is returned afterwards. The grid of a variable is
+       assigned when the variable is created. Grid names are the same as
+       when the flag is not set, except for different grids of the same
+       shape, which are suffixed in order of access rather than file order.
+
+       Parameters
+       ----------
+       value : 0/1, False/True.
+
+       Returns
+       -------
+       No return value.
+    """
+    global _lazyMetadata
+    if value not in [True, False, 0, 1]:
+        raise CDMSError(
+            "Error LazyMetadata flag must be 1(lazy)/0(eager) or true/False")
+    _lazyMetadata = value in [1, True]
+
+
+def getLazyMetadataFlag():
+    """Get the lazy metadata flag, see setLazyMetadataFlag."""
+    return int(_lazyMetadata)
+
+
+def setNetcdfMemmapFlag(value):
+    """Read the variables of netCDF-3 files through memory maps.
+
+       With the flag set, variables of classic, 64-bit offset and CDF-5
+       files opened read-only are sliced from a read-only numpy.memmap of the
+       file instead of being copied by the netCDF library. Small reads from
+       large files then only touch the pages they need. The data of the
+       result is a read-only, big-endian view of the file. Only files opened
+       after the call are affected.
+
+       Parameters
+       ----------
+       value : 0/1, False/True.
+
+       Returns
+       -------
+       No return value.
+    """
+    global _netcdfMemmap
+    if value not in [True, False, 0, 1]:
+        raise CDMSError(
+            "Error NetcdfMemmap flag must be 1(memory map)/0(copy) or true/False")
+    _netcdfMemmap = value in [1, True]
+
+
+def getNetcdfMemmapFlag():
+    """Get the netCDF-3 memory map flag, see setNetcdfMemmapFlag."""
+    return int(_netcdfMemmap)
+
+
 def setNetcdfUseParallelFlag(value):
     """Enable/Disable NetCDF MPI I/O (Paralllelism).
 
@@ -326,6 +502,16 @@ def getNetcdfUseNCSwitchModeFlag():
     return Cdunif.CdunifGetNCFLAGS("use_define_mode")
 
 
+def getNetcdfPerFileLockFlag():
+    """Get netCDF per file lock flag value.
+
+       Returns
+       -------
+       1 if read-only files are locked individually, 0 for the global lock.
+    """
+    return Cdunif.CdunifGetNCFLAGS("per_file_lock")
+
+
 def getNetcdfUseParallelFlag():
     """Get NetCDF UseParallel flag value.
 
@@ -402,18 +588,127 @@ def useNetcdf3():
     setNetcdfDeflateLevelFlag(0)
     setNetcdf4Flag(0)
 
+
+def defaultChunkSizes(shape, itemsize, chunkbytes=None):
+    """Return netCDF-4 chunk sizes balancing map and time-series reads.
+
+    The first (time) dimension and the last two (horizontal) dimensions are
+    chunked so that reading one time step of a field and reading the time
+    series at one grid point touch the same number of chunks, each chunk
+    holding about chunkbytes bytes. Other dimensions (levels) get chunks of
+    length 1.
+
+    Parameters
+    ----------
+    shape : variable shape.
+    itemsize : size of a value in bytes.
+    chunkbytes : target chunk size in bytes, default 1 MiB.
+
+    Returns
+    -------
+    tuple of chunk sizes, or None for scalars and 1-D variables, which are
+    left to the netCDF library.
+    """
+    rank = len(shape)
+    if rank < 2:
+        return None
+    if chunkbytes is None:
+        chunkbytes = _ChunkBytes
+    shape = [max(int(n), 1) for n in shape]
+    horizontal = list(range(max(1, rank - 2), rank))
+    chunks = [1] * rank
+    nvalues = max(int(chunkbytes) // int(itemsize), 1)
+    total = shape[0] * numpy.prod([shape[i] for i in horizontal])
+    if total <= nvalues:
+        for i in [0] + horizontal:
+            chunks[i] = shape[i]
+        return tuple(chunks)
+
+    # Both reads touch nchunks = sqrt(total / nvalues) chunks
+    nchunks = numpy.sqrt(float(total) / nvalues)
+    chunks[0] = int(min(max(numpy.ceil(shape[0] / nchunks), 1), shape[0]))
+    size = numpy.prod([shape[i] for i in horizontal])
+    ratio = min((float(nvalues) / (chunks[0] * size)) ** (1. / len(horizontal)), 1.)
+    for i in horizontal:
+        chunks[i] = int(min(max(numpy.ceil(shape[i] * ratio), 1), shape[i]))
+    return tuple(chunks)
+
+
+def _compressionArgs(shuffle, deflate, deflate_level):
+    # Per variable compression settings for Cdunif createVariable, () to use
+    # the module flags.
+    if shuffle is None and deflate is None and deflate_level is None:
+        return ()
+    if shuffle is None:
+        shuffle = getNetcdfShuffleFlag()
+    if deflate is None:
+        deflate = 1 if deflate_level else getNetcdfDeflateFlag()
+    if deflate_level is None:
+        deflate_level = getNetcdfDeflateLevelFlag()
+    if shuffle not in [True, False, 0, 1] or deflate not in [True, False, 0, 1]:
+        raise CDMSError("Error shuffle and deflate must be 1/0 or True/False")
+    if deflate_level not in [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]:
+        raise CDMSError("Error deflate_level must be an integer < 10")
+    return (int(shuffle), int(deflate), int(deflate_level))
+
 # Create a tree from a file path.
 # Returns the parse tree root node.
 
 
+def _cdmlCachePath(path):
+    dirname, basename = os.path.split(os.path.abspath(path))
+    return os.path.join(dirname, '.' + basename + '.cdmlcache')
+
+
+def _cdmlCacheKey(st):
+    return (_CdmlCacheVersion, st.st_size, st.st_mtime)
+
+
+def _readCdmlCache(path, st):
+    cachepath = _cdmlCachePath(path)
+    try:
+        cst = os.stat(cachepath)
+        if hasattr(os, 'getuid') and cst.st_uid != os.getuid():
+            return None
+        with open(cachepath, 'rb') as fd:
+            if pickle.load(fd) != _cdmlCacheKey(st):
+                return None
+            return pickle.load(fd)
+    except Exception:
+        # missing, stale or unreadable cache: parse the CDML file
+        return None
+
+
+def _writeCdmlCache(path, st, root):
+    cachepath = _cdmlCachePath(path)
+    try:
+        fd, tmppath = tempfile.mkstemp(dir=os.path.dirname(cachepath))
+    except (IOError, OSError):
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(_cdmlCacheKey(st), f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(root, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmppath, cachepath)
+    except Exception:
+        # the cache is an optimization only
+        if os.path.exists(tmppath):
+            os.remove(tmppath)
+
+
 def load(path):
+    if _cdmlCache:
+        st = os.stat(path)
+        root = _readCdmlCache(path, st)
+        if root is not None:
+            return root
     fd = open(path)
     text = fd.read()
     fd.close()
-    p = CDMLParser()
-    p.feed(text)
-    p.close()
-    return p.getRoot()
+    root = parseCDML(text)
+    if _cdmlCache and root is not None:
+        _writeCdmlCache(path, st, root)
+    return root
 
 # Create a tree from a URI
 # URI is of the form scheme://netloc/path;parameters?query#fragment
@@ -427,10 +722,7 @@ def loadURI(uri):
     fd = urlopen(uripath)
     text = fd.read()
     fd.close()
-    p = CDMLParser()
-    p.feed(text)
-    p.close()
-    return p.getRoot()
+    return parseCDML(text)
 
 # Create a dataset
 # 'path' is the XML file name, or netCDF filename for simple file create
@@ -459,7 +751,7 @@ def createDataset(path, template=None):
 # 'mode' is 'r', 'r+', 'a', or 'w'
 
 def openDataset(uri, mode='r', template=None,
-                dods=1, dpath=None, hostObj=None):
+                dods=1, dpath=None, hostObj=None, lazy=False):
     """
     Open Dataset
 
@@ -470,11 +762,19 @@ def openDataset(uri, mode='r', template=None,
     template : A string template for the datafile(s), for dataset creation
     dods : (int) Default set to 1
     dpath : (str) Destination path.
+    lazy : (bool) If True, calling the file (f('ta')) returns a dask backed
+           cdms2.lazy.LazyVariable instead of reading the data. Read mode only.
 
     Returns
     -------
     file handle.
     """
+    if lazy:
+        if mode != 'r':
+            raise CDMSError(ModeNotSupported + mode)
+        dataset = openDataset(uri, mode, template, dods, dpath, hostObj)
+        dataset._lazy_ = True
+        return dataset
     uri = uri.strip()
     (scheme, netloc, path, parameters, query, fragment) = urlparse(uri)
     if scheme in ('', 'file'):
@@ -520,6 +820,9 @@ def openDataset(uri, mode='r', template=None,
                     file1.close()
                     file = CdmsFile(path, mode)
                 return file
+            elif mode == 'r':
+                # the file is already open for reading
+                return file1
             else:
                 file1.close()
                 return CdmsFile(path, mode)
@@ -741,6 +1044,12 @@ class Dataset(CdmsObj, cuDataset):
         self.grids = {}
         self.xlinks = {}
         self._gridmap_ = {}
+        # Paths of data files opened through the file pool
+        self._poolpaths_ = set()
+        # Executor for partitioned reads, None to use the module default,
+        # and whether it was created by setReadExecutor
+        self._readexecutor_ = None
+        self._ownsreadexecutor_ = False
         # Gridmap:(latname,lonname,order,maskname,gridclass) => grid
         (scheme, netloc, xmlpath, parameters,
          query, fragment) = urlparse(uri)
@@ -947,6 +1256,11 @@ class Dataset(CdmsObj, cuDataset):
 
     # Close all files
     def close(self):
+        filepool.invalidate(self._poolpaths_)
+        self._poolpaths_ = set()
+        _shutdownReadExecutor(self._readexecutor_, self._ownsreadexecutor_)
+        self._readexecutor_ = None
+        self._ownsreadexecutor_ = False
         for dict in list(self.dictdict.values()):
             for obj in list(dict.values()):
                 obj.parent = None
@@ -1083,9 +1397,43 @@ class Dataset(CdmsObj, cuDataset):
         result = sorted(pathdict.keys())
         return result
 
+    def setReadExecutor(self, executor):
+        """Set the executor used to read partitioned variables of this dataset.
+
+           Parameters
+           ----------
+           executor : as for cdms2.setReadExecutor. None restores the default.
+                      A thread pool created from a number of threads is shut
+                      down when it is replaced or the dataset is closed.
+        """
+        old = (self._readexecutor_, self._ownsreadexecutor_)
+        self._readexecutor_, self._ownsreadexecutor_ = _makeReadExecutor(executor)
+        _shutdownReadExecutor(*old)
+
+    def getReadExecutor(self):
+        """Return the executor used to read partitioned variables, or None."""
+        if self._readexecutor_ is not None:
+            return self._readexecutor_
+        return _readExecutor
+
+    def _localFilePath(self, filename):
+        """Return the path of a data file of a dataset opened from a local CDML file, else None."""
+        if self.parent is None:
+            return os.path.join(self.datapath, filename)
+        return None
+
+    # Open a local data file through the process-wide handle pool, and
+    # remember the path so that close() can invalidate it.
+    def _openPooled(self, path, mode):
+        f = filepool.openFile(path, mode)
+        if isinstance(f, filepool.PooledFile):
+            self._poolpaths_.add(path)
+        return f
+
     # Open a data file associated with this dataset.
     # <filename> is relative to the self.datapath
     # <mode> is the open mode.
+    # Read-only files are pooled: f.close() returns the handle to the pool.
     def openFile(self, filename, mode):
 
         # Opened via a local XML file?
@@ -1094,7 +1442,7 @@ class Dataset(CdmsObj, cuDataset):
             if cdmsobj._debug == 1:
                 sys.stdout.write(path + '\n')
                 sys.stdout.flush()
-            f = Cdunif.CdunifFile(path, mode)
+            f = self._openPooled(path, mode)
             return f
 
         # Opened via a database
@@ -1123,7 +1471,7 @@ class Dataset(CdmsObj, cuDataset):
                     if cdmsobj._debug == 1:
                         sys.stdout.write(fileurl + '\n')
                         sys.stdout.flush()
-                    f = Cdunif.CdunifFile(path, mode)
+                    f = self._openPooled(path, mode)
                     return f
 
             # See if request manager is being used for file transfer
@@ -1143,10 +1491,10 @@ class Dataset(CdmsObj, cuDataset):
                     userid=db.userid,
                     useReplica=db.useReplica)
                 try:
-                    f = Cdunif.CdunifFile(path, mode)
+                    f = self._openPooled(path, mode)
                 except BaseException:                    # Try again, in case another process clobbered this file
                     path = cache.getFile(fileurl, fileDN)
-                    f = Cdunif.CdunifFile(path, mode)
+                    f = self._openPooled(path, mode)
                 return f
 
             # Try to read via FTP:
@@ -1160,11 +1508,11 @@ class Dataset(CdmsObj, cuDataset):
                     fileDN = (self.uri, filename)  # Global file name
                     path = cache.getFile(fileurl, fileDN)
                     try:
-                        f = Cdunif.CdunifFile(path, mode)
+                        f = self._openPooled(path, mode)
                     except BaseException:                        # Try again, in case another process clobbered this
                         # file
                         path = cache.getFile(fileurl, fileDN)
-                        f = Cdunif.CdunifFile(path, mode)
+                        f = self._openPooled(path, mode)
                     return f
 
             # File not found
@@ -1239,6 +1587,120 @@ class Dataset(CdmsObj, cuDataset):
 # 'mode')
 
 
+_Unbuilt = object()                     # Placeholder of a lazily built object
+
+
+class _LazyObjectDict(dict):
+    """Dictionary of file objects which are built on first access.
+
+    The keys are known when the file is opened. The value of a key is
+    created by factory(key) the first time it is looked up, stored, then
+    passed to init(key, value) if given. Iteration goes through the keys,
+    so copies such as dict(d) build the values instead of exposing the
+    placeholders.
+    """
+
+    def __init__(self, keys, factory, init=None):
+        dict.__init__(self, [(key, _Unbuilt) for key in keys])
+        self._factory = factory
+        self._init = init
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if value is _Unbuilt:
+            value = self._factory(key)
+            dict.__setitem__(self, key, value)
+            if self._init is not None:
+                self._init(key, value)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def __iter__(self):
+        # A dict subclass with its own __iter__ is copied by dict(), update()
+        # and ** through keys() and __getitem__, not from the raw values
+        return iter(list(dict.keys(self)))
+
+    def values(self):
+        return [self[key] for key in list(self.keys())]
+
+    def items(self):
+        return [(key, self[key]) for key in list(self.keys())]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            dict.__delitem__(self, key)
+            return value
+        return dict.pop(self, key, *default)
+
+    def copy(self):
+        return dict(self.items())
+
+    __copy__ = copy
+
+    def builtValues(self):
+        "Return the objects built so far."
+        return [value for value in dict.values(self) if value is not _Unbuilt]
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
+class _LazyGridDict(dict):
+    """Dictionary of file grids, completed by fill() before it is read."""
+
+    def __init__(self, fill):
+        dict.__init__(self)
+        self._fill = fill
+
+    def __contains__(self, key):
+        self._fill()
+        return dict.__contains__(self, key)
+
+    def __getitem__(self, key):
+        self._fill()
+        return dict.__getitem__(self, key)
+
+    def __iter__(self):
+        self._fill()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._fill()
+        return dict.__len__(self)
+
+    def get(self, key, default=None):
+        self._fill()
+        return dict.get(self, key, default)
+
+    def keys(self):
+        self._fill()
+        return dict.keys(self)
+
+    def values(self):
+        self._fill()
+        return dict.values(self)
+
+    def items(self):
+        self._fill()
+        return dict.items(self)
+
+    def copy(self):
+        self._fill()
+        return dict(dict.items(self))
+
+    def builtValues(self):
+        "Return the grids built so far."
+        return list(dict.values(self))
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
 class CdmsFile(CdmsObj, cuDataset):
 
     def __init__(self, path, mode, hostObj=None, mpiBarrier=False):
@@ -1276,6 +1738,12 @@ class CdmsFile(CdmsObj, cuDataset):
         except Exception as err:
             raise CDMSError('Cannot open file %s (%s)' % (path, err))
         self._file_ = _fileobj_   # Cdunif file object
+        self._netcdf3_ = None     # netCDF-3 header, for memory mapped reads
+        if mode == 'r' and _netcdfMemmap and netcdf3.isNetcdf3(path):
+            try:
+                self._netcdf3_ = netcdf3.Netcdf3Header(path)
+            except (ValueError, KeyError, IOError, OSError):
+                pass
         self.variables = {}
         self.axes = {}
         self.grids = {}
@@ -1313,40 +1781,37 @@ class CdmsFile(CdmsObj, cuDataset):
             coords1d = self._convention_.getAxisIds(self._file_.variables)
             coordsaux = self._convention_.getAxisAuxIds(
                 self._file_.variables, coords1d)
+            self._coords1d_ = coords1d
+            self._coordsaux_ = coordsaux
+            varnames = [name for name in list(self._file_.variables.keys()) if name not in coords1d]
+            axisnames = sorted(self._file_.dimensions.keys())
+
+            if self._mode_ == 'r' and _lazyMetadata:
+                # Only the header has been read. Variables and axes are built
+                # on first access, and a variable's grid is assigned when it
+                # is built. Listing the grids builds all the variables, in
+                # file order.
+                self._gridnames_ = varnames
+                self._gridpending_ = []
+                self._gridpass_ = False
+                self.variables = _LazyObjectDict(varnames, self._newVariable, self._initVariable)
+                self.axes = _LazyObjectDict(axisnames, self._newAxis)
+                self.grids = _LazyGridDict(self._assignGrids)
+            else:
+                # Build variable list
+                for name in varnames:
+                    self.variables[name] = self._newVariable(name)
 
-            # Build variable list
-            for name in list(self._file_.variables.keys()):
-                if name not in coords1d:
-                    cdunifvar = self._file_.variables[name]
-                    if name in coordsaux:
-                        # Put auxiliary coordinate axes with variables, since there may be
-                        # a dimension with the same name.
-                        if len(cdunifvar.shape) == 2:
-                            self.variables[name] = FileAxis2D(
-                                self, name, cdunifvar)
-                        else:
-                            self.variables[name] = FileAuxAxis1D(
-                                self, name, cdunifvar)
-                    else:
-                        self.variables[name] = FileVariable(
-                            self, name, cdunifvar)
-
-            # Build axis list
-            for name in sorted(self._file_.dimensions.keys()):
-                if name in coords1d:
-                    cdunifvar = self._file_.variables[name]
-                elif name in coordsaux:
-                    cdunifvar = self._file_.variables[name]
-                else:
-                    cdunifvar = None
-                self.axes[name] = FileAxis(self, name, cdunifvar)
-            self.axes = OrderedDict(sorted(self.axes.items()))
+                # Build axis list
+                for name in axisnames:
+                    self.axes[name] = self._newAxis(name)
+                self.axes = OrderedDict(sorted(self.axes.items()))
 
-            # Attach boundary variables
-            for name in coordsaux:
-                var = self.variables[name]
-                bounds = self._convention_.getVariableBounds(self, var)
-                var.setBounds(bounds)
+                # Attach boundary variables
+                for name in coordsaux:
+                    var = self.variables[name]
+                    bounds = self._convention_.getVariableBounds(self, var)
+                    var.setBounds(bounds)
 
             self.dictdict = {
                 'variable': self.variables,
@@ -1355,96 +1820,141 @@ class CdmsFile(CdmsObj, cuDataset):
                 'curveGrid': self.grids,
                 'genericGrid': self.grids}
 
-            # Initialize variable domains
-            for var in list(self.variables.values()):
-                var.initDomain(self.axes)
+            if not isinstance(self.variables, _LazyObjectDict):
+                # Initialize variable domains
+                for var in list(self.variables.values()):
+                    var.initDomain(self.axes)
 
-            # Build grids
-            for var in list(self.variables.values()):
-                # Get grid information for the variable. gridkey has the form
-                # (latname,lonname,order,maskname, abstract_class).
-                gridkey, lat, lon = var.generateGridkey(
-                    self._convention_, self.variables)
-
-                # If the variable is gridded, lookup the grid. If no such grid exists,
-                # create a unique gridname, create the grid, and add to the
-                # gridmap.
-                if gridkey is None:
-                    grid = None
-                else:
-                    grid = self._gridmap_.get(gridkey)
-                    if grid is None:
+                # Build grids
+                for var in list(self.variables.values()):
+                    self._assignGrid(var)
+        except BaseException:
+            self.close()
+            raise
 
-                        if hasattr(var, 'grid_type'):
-                            gridtype = var.grid_type
-                        else:
-                            gridtype = "generic"
+    def _newVariable(self, name):
+        cdunifvar = self._file_.variables[name]
+        if name in self._coordsaux_:
+            # Put auxiliary coordinate axes with variables, since there may be
+            # a dimension with the same name.
+            if len(cdunifvar.shape) == 2:
+                return FileAxis2D(self, name, cdunifvar)
+            return FileAuxAxis1D(self, name, cdunifvar)
+        return FileVariable(self, name, cdunifvar)
+
+    def _newAxis(self, name):
+        if name in self._coords1d_ or name in self._coordsaux_:
+            cdunifvar = self._file_.variables[name]
+        else:
+            cdunifvar = None
+        return FileAxis(self, name, cdunifvar)
+
+    def _initVariable(self, name, var):
+        # Second stage of a lazily built variable: bounds, domain and grid.
+        # Variables built while a grid is assigned (e.g. the coordinates of
+        # a curvilinear grid) get theirs once that grid is done.
+        if name in self._coordsaux_:
+            var.setBounds(self._convention_.getVariableBounds(self, var))
+        var.initDomain(self.axes)
+        self._gridpending_.append(var)
+        if self._gridpass_:
+            return
+        self._gridpass_ = True
+        try:
+            while self._gridpending_:
+                self._assignGrid(self._gridpending_.pop(0))
+        finally:
+            self._gridpass_ = False
+
+    def _assignGrids(self):
+        # Complete the grids: build all the variables, in file order
+        if self._gridpass_ or self._status_ == 'closed':
+            return
+        for name in self._gridnames_:
+            self.variables[name]
+
+    def _assignGrid(self, var):
+        # Get grid information for the variable. gridkey has the form
+        # (latname,lonname,order,maskname, abstract_class).
+        gridkey, lat, lon = var.generateGridkey(
+            self._convention_, self.variables)
+
+        # If the variable is gridded, lookup the grid. If no such grid exists,
+        # create a unique gridname, create the grid, and add to the
+        # gridmap.
+        if gridkey is None:
+            grid = None
+        else:
+            grid = self._gridmap_.get(gridkey)
+            if grid is None:
 
-                        candidateBasename = None
-                        if gridkey[4] == 'rectGrid':
-                            gridshape = (len(lat), len(lon))
-                        elif gridkey[4] == 'curveGrid':
-                            gridshape = lat.shape
-                        elif gridkey[4] == 'genericGrid':
-                            gridshape = lat.shape
-                            candidateBasename = 'grid_%d' % gridshape
-                        else:
-                            gridshape = (len(lat), len(lon))
+                if hasattr(var, 'grid_type'):
+                    gridtype = var.grid_type
+                else:
+                    gridtype = "generic"
+
+                candidateBasename = None
+                if gridkey[4] == 'rectGrid':
+                    gridshape = (len(lat), len(lon))
+                elif gridkey[4] == 'curveGrid':
+                    gridshape = lat.shape
+                elif gridkey[4] == 'genericGrid':
+                    gridshape = lat.shape
+                    candidateBasename = 'grid_%d' % gridshape
+                else:
+                    gridshape = (len(lat), len(lon))
 
-                        if candidateBasename is None:
-                            candidateBasename = 'grid_%dx%d' % gridshape
-                        if candidateBasename not in self.grids:
-                            gridname = candidateBasename
-                        else:
-                            foundname = 0
-                            for i in range(97, 123):  # Lower-case letters
-                                candidateName = candidateBasename + \
-                                    '_' + chr(i)
-                                if candidateName not in self.grids:
-                                    gridname = candidateName
-                                    foundname = 1
-                                    break
+                if candidateBasename is None:
+                    candidateBasename = 'grid_%dx%d' % gridshape
+                if candidateBasename not in self.grids:
+                    gridname = candidateBasename
+                else:
+                    foundname = 0
+                    for i in range(97, 123):  # Lower-case letters
+                        candidateName = candidateBasename + \
+                            '_' + chr(i)
+                        if candidateName not in self.grids:
+                            gridname = candidateName
+                            foundname = 1
+                            break
 
-                            if not foundname:
-                                print(
-                                    'Warning: cannot generate a grid for variable', var.id)
-                                continue
+                    if not foundname:
+                        print(
+                            'Warning: cannot generate a grid for variable', var.id)
+                        return
 
-                        # Create the grid
-                        if gridkey[4] == 'rectGrid':
-                            grid = FileRectGrid(
-                                self, gridname, lat, lon, gridkey[2], gridtype)
+                # Create the grid
+                if gridkey[4] == 'rectGrid':
+                    grid = FileRectGrid(
+                        self, gridname, lat, lon, gridkey[2], gridtype)
+                else:
+                    if gridkey[3] != '':
+                        if gridkey[3] in self.variables:
+                            maskvar = self.variables[gridkey[3]]
                         else:
-                            if gridkey[3] != '':
-                                if gridkey[3] in self.variables:
-                                    maskvar = self.variables[gridkey[3]]
-                                else:
-                                    print(
-                                        'Warning: mask variable %s not found' %
-                                        gridkey[3])
-                                    maskvar = None
-                            else:
-                                maskvar = None
-                            if gridkey[4] == 'curveGrid':
-                                grid = FileCurveGrid(
-                                    lat, lon, gridname, parent=self, maskvar=maskvar)
-                            else:
-                                try:
-                                    grid = FileGenericGrid(
-                                        lat, lon, gridname, parent=self, maskvar=maskvar)
-                                except BaseException:
-                                    if(lat.rank() == 1 and lon.rank() == 1):
-                                        grid = FileRectGrid(
-                                            self, gridname, lat, lon, gridkey[2], gridtype)
+                            print(
+                                'Warning: mask variable %s not found' %
+                                gridkey[3])
+                            maskvar = None
+                    else:
+                        maskvar = None
+                    if gridkey[4] == 'curveGrid':
+                        grid = FileCurveGrid(
+                            lat, lon, gridname, parent=self, maskvar=maskvar)
+                    else:
+                        try:
+                            grid = FileGenericGrid(
+                                lat, lon, gridname, parent=self, maskvar=maskvar)
+                        except BaseException:
+                            if(lat.rank() == 1 and lon.rank() == 1):
+                                grid = FileRectGrid(
+                                    self, gridname, lat, lon, gridkey[2], gridtype)
 
-                        self.grids[grid.id] = grid
-                        self._gridmap_[gridkey] = grid
+                self.grids[grid.id] = grid
+                self._gridmap_[gridkey] = grid
 
-                # Set the variable grid
-                var.setGrid(grid)
-        except BaseException:
-            self.close()
-            raise
+        # Set the variable grid
+        var.setGrid(grid)
 
     def __enter__(self):
         return self
@@ -1501,11 +2011,17 @@ class CdmsFile(CdmsObj, cuDataset):
             return
         if hasattr(self, 'dictdict'):
             for dict in list(self.dictdict.values()):
-                for obj in list(dict.values()):
+                if isinstance(dict, (_LazyObjectDict, _LazyGridDict)):
+                    # do not build objects just to close them
+                    objects = dict.builtValues()
+                else:
+                    objects = list(dict.values())
+                for obj in objects:
                     obj.parent = None
                     del obj
         self.dictdict = self.variables = self.axes = {}
         self._file_.close()
+        self._netcdf3_ = None
         self._status_ = 'closed'
 
 # Note: Removed to allow garbage collection of reference cycles
@@ -1770,7 +2286,8 @@ class CdmsFile(CdmsObj, cuDataset):
     # 'axesOrGrids' is a list of axes, grids. (Note: this should be
     #   generalized to allow subintervals of axes and/or grids)
     # Return a variable object.
-    def createVariable(self, name, datatype, axesOrGrids, fill_value=None):
+    def createVariable(self, name, datatype, axesOrGrids, fill_value=None, chunksizes=None,
+                       shuffle=None, deflate=None, deflate_level=None, chunk_cache=None):
         """
         Create a variable.
 
@@ -1785,6 +2302,16 @@ class CdmsFile(CdmsObj, cuDataset):
 
         fill_value : fill_value (cast into data type).
 
+        chunksizes : netCDF-4 chunk sizes, one per dimension. 'contiguous' for
+                     unchunked, uncompressed storage. The default is defaultChunkSizes(shape).
+
+        shuffle, deflate, deflate_level : netCDF-4 compression of this variable. The
+                     default is the value of the module flags, see setNetcdfShuffleFlag,
+                     setNetcdfDeflateFlag and setNetcdfDeflateLevelFlag.
+
+        chunk_cache : netCDF-4 chunk cache size in bytes, for this variable while the
+                      file is open.
+
         Notes
         -----
         This should be generalized to allow subintervals of axes and/or grids.
@@ -1812,21 +2339,49 @@ class CdmsFile(CdmsObj, cuDataset):
             else:
                 raise InvalidDomain
 
+        if isinstance(chunksizes, string_types) and chunksizes == 'contiguous':
+            # netCDF-4 filters need chunked storage, ignore the module flags
+            if shuffle or deflate or deflate_level:
+                raise CDMSError("Variable %s: contiguous storage cannot be shuffled or deflated" % name)
+            compression = _compressionArgs(0, 0, 0)
+        else:
+            compression = _compressionArgs(shuffle, deflate, deflate_level)
         try:
             # Compatibility: revert to old typecode for cdunif
             #            numericType = typeconv.oldtypecodes[numericType]
             numericType = numpy.dtype(numericType).char
-            cuvar = cufile.createVariable(str(name), numericType, tuple(dimensions))
+            cuvar = cufile.createVariable(str(name), numericType, tuple(dimensions), *compression)
         except Exception as err:
             print(err)
             raise CDMSError("Creating variable " + name)
         var = FileVariable(self, name, cuvar)
         var.initDomain(self.axes)
         self.variables[name] = var
+        self._setStorage(var, chunksizes, chunk_cache)
         if fill_value is not None:
             var.setMissing(fill_value)
         return var
 
+    def _setStorage(self, var, chunksizes, chunk_cache):
+        # Chunking and chunk cache of a new variable, no-ops for non netCDF-4 files
+        if isinstance(chunksizes, string_types):
+            if chunksizes != 'contiguous':
+                raise CDMSError("Invalid chunksizes %s, variable %s" % (chunksizes, var.id))
+            storage = None
+        elif chunksizes is None:
+            storage = defaultChunkSizes(var.shape, numpy.dtype(var.typecode()).itemsize)
+        else:
+            storage = tuple(int(c) for c in chunksizes)
+            if len(storage) != var.rank():
+                raise CDMSError("chunksizes must have one size per dimension, variable " + var.id)
+        if storage is not None or chunksizes is not None:
+            try:
+                var._obj_.setchunking(storage)
+            except (IOError, ValueError) as err:
+                raise CDMSError("Setting the chunking of %s: %s" % (var.id, err))
+        if chunk_cache is not None:
+            var.setChunkCache(chunk_cache)
+
     # Search for a pattern in a string-valued attribute. If attribute is None,
     # search all string attributes. If tag is 'cdmsFile', just check the dataset,
     # else check all nodes in the dataset of class type matching the tag. If tag
@@ -1965,7 +2520,9 @@ class CdmsFile(CdmsObj, cuDataset):
         return resultlist
 
     def createVariableCopy(self, var, id=None, attributes=None, axes=None, extbounds=None,
-                           extend=0, fill_value=None, index=None, newname=None, grid=None):
+                           extend=0, fill_value=None, index=None, newname=None, grid=None,
+                           chunksizes=None, shuffle=None, deflate=None, deflate_level=None,
+                           chunk_cache=None):
         """Define a new variable, with the same axes and attributes as in <var>.
 
         Note
@@ -1996,6 +2553,9 @@ class CdmsFile(CdmsObj, cuDataset):
 
         grid : The variable grid.  `none` the value of var.getGrid() will used.
 
+        chunksizes, shuffle, deflate, deflate_level, chunk_cache : netCDF-4 storage of the
+            variable, see createVariable.
+
         Returns
         -------
         file variable (cdms2.fvariable.FileVariable)
@@ -2100,7 +2660,9 @@ class CdmsFile(CdmsObj, cuDataset):
 
         # Create the new variable
         datatype = cdmsNode.NumericToCdType.get(var.typecode())
-        newvar = self.createVariable(str(newname), datatype, axislist)
+        newvar = self.createVariable(str(newname), datatype, axislist, chunksizes=chunksizes,
+                                     shuffle=shuffle, deflate=deflate, deflate_level=deflate_level,
+                                     chunk_cache=chunk_cache)
         for attname, attval in list(attributes.items()):
             if attname not in ["id", "datatype", "parent"]:
                 if isinstance(attval, string_types):
@@ -2116,7 +2678,8 @@ class CdmsFile(CdmsObj, cuDataset):
         return newvar
 
     def write(self, var, attributes=None, axes=None, extbounds=None, id=None,
-              extend=None, fill_value=None, index=None, typecode=None, dtype=None, pack=False):
+              extend=None, fill_value=None, index=None, typecode=None, dtype=None, pack=False,
+              chunksizes=None, shuffle=None, deflate=None, deflate_level=None, chunk_cache=None):
         """Write var to the file.
 
         Notes
@@ -2153,6 +2716,9 @@ class CdmsFile(CdmsObj, cuDataset):
 
         typecode : Deprecated, for backward compatibility only
 
+        chunksizes, shuffle, deflate, deflate_level, chunk_cache : netCDF-4 storage of the
+            variable, see createVariable. Only used when the variable is created.
+
         Returns
         -------
         File variable
@@ -2217,7 +2783,9 @@ class CdmsFile(CdmsObj, cuDataset):
             else:
                 typ = var.dtype
             v = self.createVariableCopy(var.astype(typ), attributes=attributes, axes=axes, extbounds=extbounds,
-                                        id=varid, extend=extend, fill_value=fill_value, index=index)
+                                        id=varid, extend=extend, fill_value=fill_value, index=index,
+                                        chunksizes=chunksizes, shuffle=shuffle, deflate=deflate,
+                                        deflate_level=deflate_level, chunk_cache=chunk_cache)
 
         # If var has typecode numpy.int, and v is created from var, then v will have
         # typecode numpy.int32. (This is a Cdunif 'feature'). This causes a downcast error
@@ -2295,6 +2863,25 @@ class CdmsFile(CdmsObj, cuDataset):
                 v.valid_max = M.astype(var.dtype)
         return v
 
+    def createStreamWriter(self, id=None, buffersize=100, **keywords):
+        """Return a writer appending time steps of a variable in blocks.
+
+        Parameters
+        ----------
+        id : name of the variable in the file. Default is the id of the first appended variable.
+
+        buffersize : number of time steps buffered in memory between writes.
+
+        **keywords : passed to write when the variable is created.
+
+        Returns
+        -------
+        cdms2.streamwriter.StreamWriter, also usable as a context manager.
+        """
+        if self._status_ == "closed":
+            raise CDMSError(FileWasClosed + self.id)
+        return StreamWriter(self, id, buffersize, **keywords)
+
     def write_it_yourself(self, obj):
         """Tell obj to write itself to self (already open for writing), using its
            writeg method (AbstractCurveGrid has such a method, for example).
@@ -0,0 +1,305 @@
+"""
+Deferred MV2 expressions, evaluated in blocks.
+
+Each MV2 operation returns a new TransientVariable with its own data, mask
+and axes, so a formula such as (a - b) ** 2 / c over a large field makes
+several full size temporaries. MV2.lazy(var) returns an Expression
+instead. The elementwise MV2 operations (arithmetic, comparisons, power and
+functions such as MV2.sqrt or MV2.arctan2) on an Expression return a new
+Expression, which records the operation:
+
+    e = (MV2.lazy(a) - b) ** 2 / c
+    result = e.evaluate()
+
+evaluate() resolves the axes, grid and attributes of the result once, as
+the MV2 operations would, then computes the whole expression over blocks
+of the first axis and writes each block into the result, so the
+temporaries have the size of a block. The numpy.ma functions are applied
+to each block: masks propagate as in the MV2 operations. File variables
+are read one block at a time. The other MV2 functions (reductions,
+reordering, ...) evaluate their Expression arguments first.
+"""
+import numpy
+from .error import CDMSError
+from .avariable import AbstractVariable
+from .grid import AbstractRectGrid
+from .tvariable import TransientVariable
+
+# Number of values computed at a time by Expression.evaluate
+_blockSize = 1 << 18
+
+
+def _metadata(x):
+    # (axes, attributes, grid) of an operand
+    if isinstance(x, Expression):
+        return x._metadata()
+    if isinstance(x, AbstractVariable):
+        grid = x.getGrid()
+        if isinstance(grid, AbstractRectGrid):
+            grid = None
+        return x.getAxisList(), x.attributes, grid
+    return None, None, None
+
+
+def _isArray(x):
+    return isinstance(x, AbstractVariable) or (isinstance(x, numpy.ndarray) and x.ndim > 0)
+
+
+def _broadcastShape(shapes):
+    rank = max([len(shape) for shape in shapes] + [0])
+    result = [1] * rank
+    for shape in shapes:
+        for i, n in enumerate(shape, rank - len(shape)):
+            if n != 1:
+                if result[i] not in (1, n):
+                    raise CDMSError("Expression operands of shapes %s cannot be broadcast together" %
+                                    ", ".join([repr(s) for s in shapes]))
+                result[i] = n
+    return tuple(result)
+
+
+class _Source(object):
+    # An array operand of an expression, read one block at a time
+
+    def __init__(self, x, shape):
+        self.shape = tuple(x.shape)
+        # Only operands which span the first axis of the result are split
+        self.split = (len(self.shape) == len(shape) and len(shape) > 0 and
+                      self.shape[0] == shape[0] and shape[0] != 1)
+        if isinstance(x, TransientVariable):
+            x = numpy.ma.array(x, copy=False, subok=False)
+        elif isinstance(x, AbstractVariable):
+            if not self.split:
+                x = x.getSlice(raw=1, squeeze=0)
+        self.x = x
+
+    def block(self, key):
+        if not self.split:
+            return self.x
+        if isinstance(self.x, AbstractVariable):
+            if key is Ellipsis:
+                key = slice(None)
+            return self.x.getSlice(key, raw=1, squeeze=0)
+        return self.x[key]
+
+
+class Expression(object):
+    """An MV2 operation on variables, arrays or expressions, computed on demand.
+
+    Expressions are made by MV2.lazy, and by the elementwise MV2 operations
+    on expressions. See cdms2.expression.
+    """
+
+    # numpy arrays defer to the reflected operators of Expression
+    __array_ufunc__ = None
+
+    def __init__(self, func, args, kwargs=None, kind=None):
+        """
+        Parameters
+        ----------
+        func : numpy.ma function, or None for a leaf.
+        args : operands of func: expressions, variables, arrays or scalars.
+        kwargs : keywords of func.
+        kind : None for a leaf (the single operand itself), 'unary' for the
+               metadata of the first operand, 'binary' for the common domain
+               of the first two operands.
+        """
+        self.func = func
+        self.args = tuple([numpy.ma.asarray(x) if isinstance(x, (list, tuple)) else x for x in args])
+        self.kwargs = kwargs or {}
+        self.kind = kind
+
+    def _metadata(self):
+        axes, attributes, grid = _metadata(self.args[0])
+        if self.kind is None:
+            return axes, attributes, grid
+        if self.kind == 'unary':
+            return axes, attributes, (grid if axes is not None else None)
+        baxes, battributes, bgrid = _metadata(self.args[1])
+        if axes is None:
+            common = baxes
+        elif baxes is None:
+            common = axes
+        else:
+            common = MV._commonAxisList(axes, baxes)
+        if common is None:
+            return None, None, None
+        return common, None, MV._commonGrid(grid, bgrid, common)
+
+    def _sources(self, sources):
+        for x in self.args:
+            if isinstance(x, Expression):
+                x._sources(sources)
+            elif _isArray(x):
+                sources[id(x)] = x
+        return sources
+
+    def _compute(self, values, memo):
+        # Value of the expression for one block; memo holds the values of
+        # the subexpressions used more than once
+        key = id(self)
+        if key not in memo:
+            args = []
+            for x in self.args:
+                if isinstance(x, Expression):
+                    args.append(x._compute(values, memo))
+                else:
+                    args.append(values.get(id(x), x))
+            if self.func is None:
+                memo[key] = args[0]
+            else:
+                memo[key] = self.func(*args, **self.kwargs)
+        return memo[key]
+
+    @property
+    def shape(self):
+        return _broadcastShape([tuple(x.shape) for x in self._sources({}).values()])
+
+    def evaluate(self, blocksize=None):
+        """Compute the expression.
+
+        Parameters
+        ----------
+        blocksize : number of values computed at a time, default 2**18.
+
+        Returns
+        -------
+        TransientVariable, with the axes, grid and attributes the MV2
+        operations would give.
+        """
+        if blocksize is None:
+            blocksize = _blockSize
+        arrays = self._sources({})
+        shape = _broadcastShape([tuple(x.shape) for x in arrays.values()])
+        sources = dict((key, _Source(x, shape)) for key, x in arrays.items())
+        if len(shape) == 0 or shape[0] == 0:
+            blocks = [Ellipsis]
+        else:
+            rowsize = int(numpy.prod(shape[1:], dtype=numpy.int64))
+            step = max(1, blocksize // max(rowsize, 1))
+            blocks = [slice(i, min(i + step, shape[0])) for i in range(0, shape[0], step)]
+
+        data = None
+        mask = numpy.ma.nomask
+        for key in blocks:
+            values = dict((k, source.block(key)) for k, source in sources.items())
+            result = numpy.ma.asarray(self._compute(values, {}))
+            if data is None:
+                data = numpy.empty(shape, result.dtype)
+                fill_value = result.fill_value
+            data[key] = numpy.ma.getdata(result)
+            blockmask = numpy.ma.getmask(result)
+            if blockmask is not numpy.ma.nomask and blockmask.any():
+                if mask is numpy.ma.nomask:
+                    mask = numpy.zeros(shape, numpy.bool_)
+                mask[key] = blockmask
+        maresult = numpy.ma.MaskedArray(data, mask=mask, fill_value=fill_value)
+
+        axes, attributes, grid = self._metadata()
+        if self.kind != 'binary' and axes is None:
+            return TransientVariable(maresult, attributes=attributes)
+        id = "variable_%i" % TransientVariable.variable_count
+        TransientVariable.variable_count += 1
+        if self.kind == 'binary':
+            return TransientVariable(maresult, axes=axes, grid=grid, no_update_from=True, id=id)
+        return TransientVariable(maresult, axes=axes, attributes=attributes, id=id, grid=grid)
+
+    def _describe(self):
+        args = []
+        for x in self.args:
+            if isinstance(x, Expression):
+                args.append(x._describe())
+            elif isinstance(x, AbstractVariable):
+                args.append(x.id)
+            elif _isArray(x):
+                args.append("array%s" % repr(tuple(x.shape)))
+            elif x is not None:
+                args.append(repr(x))
+        if self.func is None:
+            return args[0]
+        return "%s(%s)" % (getattr(self.func, '__name__', 'function'), ", ".join(args))
+
+    def __repr__(self):
+        return "<Expression %s>" % self._describe()
+
+    def __abs__(self):
+        return MV.absolute(self)
+
+    def __neg__(self):
+        return MV.negative(self)
+
+    def __add__(self, other):
+        return MV.add(self, other)
+
+    def __radd__(self, other):
+        return MV.add(other, self)
+
+    def __sub__(self, other):
+        return MV.subtract(self, other)
+
+    def __rsub__(self, other):
+        return MV.subtract(other, self)
+
+    def __mul__(self, other):
+        return MV.multiply(self, other)
+
+    def __rmul__(self, other):
+        return MV.multiply(other, self)
+
+    def __floordiv__(self, other):
+        return MV.floor_divide(self, other)
+
+    def __rfloordiv__(self, other):
+        return MV.floor_divide(other, self)
+
+    def __truediv__(self, other):
+        return MV.true_divide(self, other)
+
+    def __rtruediv__(self, other):
+        return MV.true_divide(other, self)
+
+    __div__ = __truediv__
+    __rdiv__ = __rtruediv__
+
+    def __pow__(self, other, third=None):
+        return MV.power(self, other, third)
+
+    def __rpow__(self, other):
+        return MV.power(other, self)
+
+    def __eq__(self, other):
+        return MV.equal(self, other)
+
+    def __ne__(self, other):
+        return MV.not_equal(self, other)
+
+    def __lt__(self, other):
+        return MV.less(self, other)
+
+    def __le__(self, other):
+        return MV.less_equal(self, other)
+
+    def __gt__(self, other):
+        return MV.greater(self, other)
+
+    def __ge__(self, other):
+        return MV.greater_equal(self, other)
+
+
+def lazy(x):
+    """Return x as an Expression: the MV2 operations on it are deferred.
+
+    Parameters
+    ----------
+    x : variable (transient or file variable), array or expression.
+
+    Returns
+    -------
+    Expression, computed by its evaluate method.
+    """
+    if isinstance(x, Expression):
+        return x
+    return Expression(None, (x,))
+
+
+from . import MV2 as MV  # noqa
@@ -0,0 +1,212 @@
+"""
+Process-wide pool of read-only Cdunif file handles.
+
+Multi-file (CDML) datasets read each partition file through
+Dataset.openFile. Without pooling every slice reopens and re-parses the
+netCDF header of every file it touches. The pool keeps a bounded number of
+read-only handles open, keyed by resolved path, and evicts the least
+recently used idle handle when the bound is reached.
+"""
+import os
+import threading
+from collections import OrderedDict
+from . import Cdunif
+from .error import CDMSError
+
+_pool_max_size = 64                     # Maximum number of pooled descriptors
+
+
+class _PoolEntry(object):
+    """A single pooled Cdunif file handle."""
+
+    def __init__(self, path, stamp):
+        self.path = path
+        self.stamp = stamp
+        self.file = Cdunif.CdunifFile(path, 'r')
+        self.refcount = 0
+        self.stale = False
+
+    def close(self):
+        try:
+            self.file.close()
+        except BaseException:
+            pass
+
+
+class PooledFile(object):
+    """Proxy for a pooled Cdunif file handle.
+
+    Behaves like the underlying CdunifFile, except that close() hands the
+    handle back to the pool instead of closing the descriptor.
+    """
+
+    def __init__(self, pool, entry):
+        self.__dict__['_pool_'] = pool
+        self.__dict__['_entry_'] = entry
+
+    def __getattr__(self, name):
+        entry = self.__dict__['_entry_']
+        if entry is None:
+            raise CDMSError("Pooled file was released: ")
+        return getattr(entry.file, name)
+
+    def __setattr__(self, name, value):
+        raise CDMSError("Pooled files are read-only")
+
+    def close(self):
+        entry = self.__dict__['_entry_']
+        if entry is not None:
+            self.__dict__['_entry_'] = None
+            self.__dict__['_pool_'].release(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __repr__(self):
+        entry = self.__dict__['_entry_']
+        if entry is None:
+            return "<PooledFile: released>"
+        return "<PooledFile: '%s'>" % entry.path
+
+
+class FilePool(object):
+    """LRU-bounded pool of read-only Cdunif handles, keyed by resolved path.
+
+    Handles that are in use (acquired but not yet released) are never
+    evicted, so the pool may temporarily hold more than maxsize handles.
+    """
+
+    def __init__(self, maxsize=None):
+        if maxsize is None:
+            maxsize = _pool_max_size
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, path):
+        """Return a PooledFile for path, opening it if needed."""
+        path = os.path.realpath(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime, st.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and (entry.stale or entry.stamp != stamp):
+                # The file changed on disk: forget the old handle
+                self._discard(entry)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                entry = _PoolEntry(path, stamp)
+                self._entries[path] = entry
+            else:
+                self.hits += 1
+                self._entries.move_to_end(path)
+            entry.refcount += 1
+            self._evict()
+        return PooledFile(self, entry)
+
+    def release(self, entry):
+        """Return an acquired handle to the pool."""
+        with self._lock:
+            entry.refcount -= 1
+            if entry.refcount <= 0 and (entry.stale or self._entries.get(entry.path) is not entry):
+                entry.close()
+            else:
+                self._evict()
+
+    def invalidate(self, paths=None):
+        """Close pooled handles for paths, or all handles if paths is None.
+
+        Handles currently in use are closed when they are released.
+        """
+        with self._lock:
+            if paths is None:
+                paths = list(self._entries.keys())
+            for path in paths:
+                entry = self._entries.get(os.path.realpath(path))
+                if entry is not None:
+                    self._discard(entry)
+
+    def resize(self, maxsize):
+        """Set the maximum number of idle handles kept open."""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, entry):
+        entry.stale = True
+        if self._entries.get(entry.path) is entry:
+            del self._entries[entry.path]
+        if entry.refcount <= 0:
+            entry.close()
+
+    def _evict(self):
+        # Walk from least to most recently used, skipping handles in use
+        if len(self._entries) <= self.maxsize:
+            return
+        for path in list(self._entries.keys()):
+            if len(self._entries) <= self.maxsize:
+                break
+            entry = self._entries[path]
+            if entry.refcount <= 0:
+                self._discard(entry)
+
+
+_pool = FilePool()
+
+
+def getFilePool():
+    """Return the process-wide file handle pool."""
+    return _pool
+
+
+def setFilePoolSize(value):
+    """Set the maximum number of pooled read-only file handles.
+
+    Parameters
+    ----------
+    value : int >= 0. 0 disables pooling; idle handles are closed immediately.
+
+    Returns
+    -------
+    No return value.
+    """
+    global _pool_max_size
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise CDMSError("setFilePoolSize value must be a non-negative integer")
+    _pool_max_size = value
+    _pool.resize(value)
+
+
+def getFilePoolSize():
+    """Return the maximum number of pooled read-only file handles."""
+    return _pool_max_size
+
+
+def isPoolable(path, mode='r'):
+    """Return True if path is opened through the pool: an existing local file, opened read-only."""
+    return mode == 'r' and _pool_max_size > 0 and os.path.isfile(path)
+
+
+def openFile(path, mode='r'):
+    """Open a Cdunif file, through the pool if read-only and pooling is enabled.
+
+    Only existing local files are pooled. Anything else, such as an OPeNDAP
+    URL, is opened directly by Cdunif.
+    """
+    if not isPoolable(path, mode):
+        return Cdunif.CdunifFile(path, mode)
+    return _pool.acquire(path)
+
+
+def invalidate(paths=None):
+    """Close pooled handles for paths, or all pooled handles if paths is None."""
+    _pool.invalidate(paths)
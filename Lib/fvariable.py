@@ -20,6 +20,7 @@ class FileVariable(DatasetVariable):
     def __init__(self, parent, varname, cdunifobj=None):
         DatasetVariable.__init__(self, parent, varname)
         self._obj_ = cdunifobj
+        self.__dict__['_fileid_'] = varname
         if cdunifobj is not None:
             for attname, attval in list(cdunifobj.__dict__.items()):
                 self.__dict__[attname] = attval
@@ -95,15 +96,34 @@ class FileVariable(DatasetVariable):
             raise CDMSError(FileClosed + self.id)
         if self.rank() == 0:
             return self._obj_.getValue()
-        result = self._obj_.getitem(*slist)
+        mapped = self._mappedArray()
+        if mapped is not None:
+            result = mapped[tuple(slist)]
+        else:
+            result = self._obj_.getitem(*slist)
 
         # If slices with negative strides were input, apply the appropriate
         # reversals.
         if haveReversals:
-            result = result[revlist]
+            result = result[tuple(revlist)]
 
         return result
 
+    def _mappedArray(self):
+        # Read-only view of the whole variable in a memory mapped netCDF-3
+        # file, or None, see cdms2.setNetcdfMemmapFlag
+        header = getattr(self.parent, '_netcdf3_', None)
+        if header is None or self._fileid_ not in header.variables:
+            return None
+        layout = header.variables[self._fileid_]
+        if layout.dtype.kind == 'S' or layout.dtype.newbyteorder('=') != numpy.dtype(self.typecode()):
+            return None
+        try:
+            return header.array(self._fileid_, self._obj_.shape[0] if layout.record else None)
+        except (TypeError, ValueError):
+            # file shorter than the header says, e.g. while it is written
+            return None
+
     def __setitem__(self, index, value):
         if self.parent is None:
             raise CDMSError(FileClosedWrite + self.id)
@@ -179,6 +199,52 @@ class FileVariable(DatasetVariable):
             del(self.attributes[name])
         del self.__dict__[name]
 
+    def getChunking(self):
+        """Return the chunk sizes of a netCDF-4 variable, None if it is stored contiguously."""
+        if self.parent is None:
+            raise CDMSError(FileClosed + self.id)
+        return self._obj_.chunking()
+
+    def getCompression(self):
+        """Return the (shuffle, deflate, deflate_level) settings of a netCDF-4 variable.
+
+        Returns
+        -------
+        tuple of ints, or None for a scalar or a non netCDF variable.
+        """
+        if self.parent is None:
+            raise CDMSError(FileClosed + self.id)
+        return self._obj_.deflate()
+
+    def setChunkCache(self, size=None, nelems=None, preemption=None):
+        """Set the netCDF-4 chunk cache of the variable, for the file currently open.
+
+        Parameters
+        ----------
+        size : cache size in bytes, None to keep the current size.
+        nelems : number of chunk slots in the cache, None to keep the current number.
+        preemption : 0. to 1., how readily fully read chunks are evicted. None to keep
+                     the current value.
+
+        Returns
+        -------
+        (size, nelems, preemption) in use, or None if the variable has no chunk cache.
+        """
+        if self.parent is None:
+            raise CDMSError(FileClosed + self.id)
+        args = [-1 if v is None else v for v in (size, nelems)]
+        args.append(-1. if preemption is None else float(preemption))
+        try:
+            return self._obj_.chunkcache(int(args[0]), int(args[1]), args[2])
+        except (IOError, ValueError) as err:
+            raise CDMSError("Setting the chunk cache of %s: %s" % (self.id, err))
+
+    def getChunkCache(self):
+        """Return the (size, nelems, preemption) chunk cache settings of the variable."""
+        if self.parent is None:
+            raise CDMSError(FileClosed + self.id)
+        return self._obj_.chunkcache()
+
     def getValue(self, squeeze=1):
         """Return the entire set of values."""
         if self.parent is None:
@@ -5,7 +5,7 @@
 
 import numpy
 # import PropertiedClasses
-from . import bindex
+from . import spatialindex
 from .error import CDMSError
 from .grid import LongitudeType, LatitudeType, CoordTypeToLoc
 from .hgrid import AbstractHorizontalGrid
@@ -198,14 +198,35 @@ class AbstractGenericGrid(AbstractHorizontalGrid):
         return ((islice, ), (inewaxis, ))
 
     def getIndex(self):
-        """Get the grid index"""
+        """Get the grid index, a spatial index of the grid points.
+
+        Returns
+        -------
+        spatialindex.SpatialIndex, shared by the grids with the same
+        coordinates.
+        """
         if self._index_ is None:
-            latlin = numpy.ma.filled(self._lataxis_)
-            lonlin = numpy.ma.filled(self._lonaxis_)
-            self._index_ = bindex.bindexHorizontalGrid(latlin, lonlin)
+            self._index_ = spatialindex.getSpatialIndex(self._lataxis_[:], self._lonaxis_[:])
 
         return self._index_
 
+    def findCells(self, lat, lon):
+        """Find the grid cells which contain a set of locations.
+
+        Parameters
+        ----------
+        lat, lon : latitudes and longitudes of the locations.
+
+        Returns
+        -------
+        array of the shape of lat, index of the cell containing each location,
+        or -1.
+        """
+        latbounds, lonbounds = self.getBounds()
+        if latbounds is None or lonbounds is None:
+            raise CDMSError('Grid %s has no cell bounds' % self.id)
+        return self.getIndex().locate(lat, lon, latbounds, lonbounds)
+
     def intersect(self, spec):
         """Intersect with the region specification.
 
@@ -223,19 +244,9 @@ class AbstractGenericGrid(AbstractHorizontalGrid):
         """
 
         ncell = self.shape
-        index = self.getIndex()
         latspec = spec[CoordTypeToLoc[LatitudeType]]
         lonspec = spec[CoordTypeToLoc[LongitudeType]]
-        latlin = numpy.ma.filled(self._lataxis_)
-        lonlin = numpy.ma.filled(self._lonaxis_)
-        lonlin = numpy.ma.where(
-            numpy.ma.greater_equal(
-                lonlin,
-                360.0),
-            lonlin - 360.0,
-            lonlin)
-        points = bindex.intersectHorizontalGrid(
-            latspec, lonspec, latlin, lonlin, index)
+        points = self.getIndex().intersect(latspec, lonspec)
         if len(points) == 0:
             raise CDMSError(
                 'No data in the specified region, longitude=%s, latitude=%s' %
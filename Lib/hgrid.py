@@ -13,8 +13,7 @@ from .error import CDMSError
 from .grid import AbstractGrid, LongitudeType, LatitudeType, CoordTypeToLoc
 from .axis import TransientVirtualAxis
 from .axis import getAutoBounds, allclose
-from cdms2 import bindex
-from cdms2 import _bindex
+from cdms2 import spatialindex
 from functools import reduce
 import copy
 
@@ -700,21 +699,35 @@ class AbstractCurveGrid(AbstractHorizontalGrid):
         return ((islice, jslice), (inewaxis, jnewaxis))
 
     def getIndex(self):
-        """Get the grid index"""
+        """Get the grid index, a spatial index of the grid points.
+
+        Returns
+        -------
+        spatialindex.SpatialIndex, shared by the grids with the same
+        coordinates. Its indices are positions in the raveled grid.
+        """
         if self._index_ is None:
-            # Trying to stick in Stephane Raynaud's patch for autodetection
-            nj, ni = self._lataxis_.shape
-            dlon = numpy.max(self._lonaxis_[:]) - numpy.min(self._lonaxis_[:])
-            dx = max(dlon / ni, dlon / nj)
-            dlat = numpy.max(self._lataxis_[:]) - numpy.min(self._lataxis_[:])
-            dy = max(dlat / ni, dlat / nj)
-            latlin = numpy.ravel(numpy.ma.filled(self._lataxis_[:]))
-            lonlin = numpy.ravel(numpy.ma.filled(self._lonaxis_[:]))
-            _bindex.setDeltas(dx, dy)
-            self._index_ = bindex.bindexHorizontalGrid(latlin, lonlin)
+            self._index_ = spatialindex.getSpatialIndex(self._lataxis_[:], self._lonaxis_[:])
 
         return self._index_
 
+    def findCells(self, lat, lon):
+        """Find the grid cells which contain a set of locations.
+
+        Parameters
+        ----------
+        lat, lon : latitudes and longitudes of the locations.
+
+        Returns
+        -------
+        array of the shape of lat, index of the cell containing each location
+        in the raveled grid, or -1.
+        """
+        latbounds, lonbounds = self.getBounds()
+        if latbounds is None or lonbounds is None:
+            raise CDMSError('Grid %s has no cell bounds' % self.id)
+        return self.getIndex().locate(lat, lon, latbounds, lonbounds)
+
     def intersect(self, spec):
         """Intersect with the region specification.
 
@@ -734,13 +747,9 @@ class AbstractCurveGrid(AbstractHorizontalGrid):
                       variable with the given grid.
         """
         ni, nj = self.shape
-        index = self.getIndex()
         latspec = spec[CoordTypeToLoc[LatitudeType]]
         lonspec = spec[CoordTypeToLoc[LongitudeType]]
-        latlin = numpy.ravel(numpy.ma.filled(self._lataxis_[:]))
-        lonlin = numpy.ravel(numpy.ma.filled(self._lonaxis_[:]))
-        points = bindex.intersectHorizontalGrid(
-            latspec, lonspec, latlin, lonlin, index)
+        points = self.getIndex().intersect(latspec, lonspec)
         if len(points) == 0:
             raise CDMSError(
                 'No data in the specified region, longitude=%s, latitude=%s' %
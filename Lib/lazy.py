@@ -0,0 +1,259 @@
+"""
+Lazy, dask backed variables.
+
+DatasetVariable.to_dask (and FileVariable.to_dask) return a LazyVariable: a
+dask array whose chunks are read from the file(s) on demand, together with the
+axes and attributes of the variable. The dask chunks follow the storage of the
+data:
+
+- for netCDF-4 files, the native chunk sizes of the variable, or multiples of
+  them close to the dask default chunk size,
+- for CDML datasets, the partition boundaries of the partitioned (time, level)
+  axes, so that each dask chunk is read from a single file.
+
+dask is an optional dependency, only needed by this module.
+"""
+import os
+import numpy
+from six.moves.urllib.parse import urlparse
+from .error import CDMSError
+
+try:
+    import dask
+    import dask.array
+except ImportError:
+    dask = None
+
+NoDask = "dask is not installed, lazy variables are not available"
+
+
+def _partitionChunks(partition, length):
+    # Chunk lengths along an axis of length `length`, split at the partition
+    # boundaries. Gaps between partitions (missing files) get their own chunk.
+    bounds = set([0, length])
+    for start, stop in numpy.reshape(partition, (-1, 2)):
+        bounds.add(min(max(int(start), 0), length))
+        bounds.add(min(max(int(stop), 0), length))
+    bounds = sorted(bounds)
+    return tuple(b - a for a, b in zip(bounds[:-1], bounds[1:]) if b > a)
+
+
+def nativeChunks(var):
+    """Return the storage chunks of a file or dataset variable.
+
+    Parameters
+    ----------
+    var : FileVariable or DatasetVariable.
+
+    Returns
+    -------
+    For a chunked netCDF-4 variable, a tuple of chunk sizes. For a partitioned
+    dataset variable, a tuple with the chunk lengths along each axis, one
+    tuple per axis. None if the data is stored contiguously.
+    """
+    obj = getattr(var, '_obj_', None)
+    if obj is not None:
+        chunking = getattr(obj, 'chunking', None)
+        if chunking is None:
+            return None
+        chunks = chunking()
+        if chunks is None:
+            return None
+        return tuple(int(c) for c in chunks)
+
+    chunks = []
+    partitioned = False
+    for (axis, start, length, true_length) in var.getDomain():
+        if hasattr(axis, 'partition'):
+            partitioned = True
+            chunks.append(_partitionChunks(var.getPartition(axis), length))
+        else:
+            chunks.append((length,))
+    if not partitioned:
+        return None
+    return tuple(chunks)
+
+
+def _daskChunks(var, chunks, dtype):
+    native = nativeChunks(var)
+    shape = var.shape
+    if chunks == 'native':
+        if native is None:
+            return shape
+        return native
+    if chunks != 'auto':
+        return dask.array.core.normalize_chunks(chunks, shape, dtype=dtype)
+    if native is None:
+        return dask.array.core.normalize_chunks('auto', shape, dtype=dtype)
+    if isinstance(native[0], tuple):
+        # Partitioned dataset: keep the file boundaries, let dask size the rest
+        auto = tuple(c if len(c) > 1 else 'auto' for c in native)
+        return dask.array.core.normalize_chunks(auto, shape, dtype=dtype)
+    # Multiples of the netCDF-4 chunks
+    return dask.array.core.normalize_chunks('auto', shape, dtype=dtype,
+                                            previous_chunks=native)
+
+
+def _absoluteURI(uri):
+    (scheme, netloc, path, parameters, query, fragment) = urlparse(uri)
+    if scheme in ('', 'file'):
+        if netloc:
+            path = netloc + path
+        return os.path.abspath(os.path.expanduser(path))
+    return uri
+
+
+class _ChunkReader(object):
+    """Array-like source for dask.array.from_array.
+
+    Reads hyperslabs through getSlice, so that missing values are masked and
+    packed data is decoded. When pickled, only the dataset URI and variable id
+    are sent, and the variable is reopened on first use.
+    """
+
+    def __init__(self, var, uri, dtype):
+        self._var = var
+        self.uri = uri
+        self.id = var.id
+        self.shape = tuple(var.shape)
+        self.ndim = len(self.shape)
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return {'uri': self.uri, 'id': self.id, 'shape': self.shape,
+                'ndim': self.ndim, 'dtype': self.dtype}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._var = None
+
+    def _variable(self):
+        if self._var is None:
+            from .dataset import openDataset
+            self._var = openDataset(self.uri)[self.id]
+        return self._var
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if self.ndim == 0:
+            return numpy.ma.asarray(self._variable().getValue())
+        slices = []
+        for s, length in zip(key, self.shape):
+            if not isinstance(s, slice):
+                raise CDMSError("Lazy reads only support slices, got %s" % repr(s))
+            slices.append(slice(*s.indices(length)))
+        shape = tuple(len(range(s.start, s.stop, s.step)) for s in slices)
+        if 0 in shape:
+            return numpy.ma.zeros(shape, self.dtype)
+        result = self._variable().getSlice(*slices, raw=1, squeeze=0)
+        return numpy.ma.asarray(result).reshape(shape)
+
+
+def toDask(var, chunks='auto'):
+    """Return a dask backed LazyVariable reading var on demand.
+
+    Parameters
+    ----------
+    var : FileVariable or DatasetVariable.
+    chunks : 'auto' (default) for dask sized chunks aligned on the storage
+             chunks, 'native' for the storage chunks themselves, or any dask
+             chunk specification.
+
+    Returns
+    -------
+    LazyVariable.
+    """
+    if dask is None:
+        raise CDMSError(NoDask)
+    if var.parent is None:
+        raise CDMSError("Cannot read from closed file or dataset, variable: " + var.id)
+    if var.isEncoded():
+        dtype = numpy.dtype(var._decodedType())
+    else:
+        dtype = numpy.dtype(var.typecode())
+    uri = _absoluteURI(var.parent.uri)
+    daskchunks = _daskChunks(var, chunks, dtype)
+    reader = _ChunkReader(var, uri, dtype)
+    name = 'cdms2-%s-%s' % (var.id, dask.base.tokenize(uri, var.id, daskchunks))
+    data = dask.array.from_array(reader, chunks=daskchunks, name=name,
+                                 asarray=False, fancy=False,
+                                 meta=numpy.ma.zeros((0,) * reader.ndim, dtype))
+    axes = [axis.clone() for axis in var.getAxisList()]
+    return LazyVariable(data, axes, dict(var.attributes), var.id)
+
+
+class LazyVariable(object):
+    """A dask array, with the axes and attributes of a variable.
+
+    Indexing with integers and slices returns a LazyVariable with the
+    matching axes. compute() reads the data and returns a TransientVariable.
+    Other dask operations can be applied to the data attribute.
+    """
+
+    def __init__(self, data, axes, attributes, id):
+        self.data = data
+        self.axes = axes
+        self.attributes = attributes
+        self.id = id
+
+    shape = property(lambda self: self.data.shape)
+    dtype = property(lambda self: self.data.dtype)
+    ndim = property(lambda self: self.data.ndim)
+    chunks = property(lambda self: self.data.chunks)
+
+    def getAxis(self, n):
+        return self.axes[n]
+
+    def getAxisList(self):
+        return list(self.axes)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if key.count(Ellipsis) > 1:
+            raise CDMSError("Only one ellipsis is allowed")
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            key = key[:i] + (slice(None),) * (self.ndim - len(key) + 1) + key[i + 1:]
+        if len(key) > self.ndim:
+            raise CDMSError("Too many indices for variable " + self.id)
+        key = key + (slice(None),) * (self.ndim - len(key))
+        axes = []
+        for k, axis in zip(key, self.axes):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(len(axis))
+                if stop < 0:
+                    # reversed slice running to the first element
+                    stop = None
+                axes.append(axis.subaxis(start, stop, step, wrap=False))
+            elif not isinstance(k, (int, numpy.integer)):
+                raise CDMSError("Lazy variables only support integer and slice indices")
+        return LazyVariable(self.data[key], axes, self.attributes, self.id)
+
+    def compute(self, **kwargs):
+        """Read the data, and return it as a TransientVariable.
+
+        Keywords are passed to dask compute, e.g. scheduler='threads'.
+        """
+        from .tvariable import TransientVariable
+        ar = numpy.ma.asarray(self.data.compute(**kwargs))
+        if self.ndim == 0:
+            return ar
+        return TransientVariable(ar, axes=self.axes, attributes=self.attributes, id=self.id)
+
+    def __array__(self, dtype=None, copy=None):
+        # The data are read on conversion: copy=False cannot be honored
+        if copy is False:
+            raise ValueError("Unable to avoid a copy while converting a LazyVariable to an array")
+        ar = numpy.ma.filled(self.data.compute())
+        if copy:
+            # compute may return the source array of the dask graph
+            return numpy.array(ar, dtype=dtype, copy=True)
+        return numpy.asarray(ar, dtype=dtype)
+
+    def __repr__(self):
+        return "<LazyVariable %s, shape %s, chunks %s>" % (self.id, self.shape, self.data.chunksize)
@@ -6,10 +6,25 @@
 """
 Abstract class for writing data into file
 
+The points of the mesh and the values of the variable are written from
+numpy arrays: legacy VTK files in ASCII or binary (big endian), and VTK XML
+files with raw or zlib compressed appended data. writePVD writes a .pvd
+collection of VTK XML files, e.g. one per time step.
 """
 
+import os
+import time
+import zlib
+from xml.sax.saxutils import quoteattr
+import numpy
 from . import mvSphereMesh
 
+# VTK XML types of numpy types
+_xmlTypes = {'f4': 'Float32', 'f8': 'Float64', 'i4': 'Int32', 'i8': 'Int64', 'u1': 'UInt8'}
+
+# Values per line of legacy ASCII arrays are formatted at a time
+_asciiRows = 1 << 16
+
 
 class BaseWriter:
     """
@@ -65,3 +80,203 @@ class BaseWriter:
         """
         raise NotImplementedError(
             'write method not implemented in derived class')
+
+    def getPointData(self, dtype=numpy.float32):
+        """
+        Values of the variable at the points of the mesh
+
+        Parameters
+        ----------
+
+             dtype type of the values
+
+        Returns
+        -------
+
+             flat array, masked values are NaN
+        """
+        n0, n1, n2 = self.shape
+        data = numpy.ma.ravel(self.var).astype(dtype)
+        return numpy.ma.filled(data, numpy.nan).reshape((n0 * n1 * n2,))
+
+    def getCells(self):
+        """
+        Cells of the unstructured mesh: hexahedra, or quadrilaterals if
+        the mesh has one dimension of size 1, or lines
+
+        Returns
+        -------
+
+             (connectivity, VTK cell type), connectivity is an array of
+             point indices of shape (number of cells, points per cell)
+        """
+        shape = tuple(self.shape)
+        strides = numpy.cumprod((1,) + shape[:0:-1])[::-1]
+        active = [d for d in range(3) if shape[d] > 1]
+        corners = [0]
+        # The corners of a cell, in the VTK order of the points of lines,
+        # quads and hexahedra
+        for d in active[::-1]:
+            if len(corners) == 4:
+                corners = corners + [c + strides[d] for c in corners]
+            else:
+                corners = corners + [c + strides[d] for c in corners[::-1]]
+        cellType = {0: 1, 1: 3, 2: 9, 3: 12}[len(active)]
+        index = numpy.arange(numpy.prod(shape), dtype=numpy.int64).reshape(shape)
+        first = index[tuple(slice(0, n - 1) if n > 1 else slice(None) for n in shape)].ravel()
+        return first[:, numpy.newaxis] + numpy.array(corners, numpy.int64), cellType
+
+
+def writeLegacyHeader(f, dataset, binary=False):
+    """
+    Write the header of a legacy VTK file
+
+    Parameters
+    ----------
+
+         f file object, opened in binary mode
+
+         dataset VTK dataset type, e.g. STRUCTURED_GRID
+
+         binary True for binary, False for ASCII data
+    """
+    f.write(b'# vtk DataFile Version 2.0\n')
+    f.write(('generated on %s\n' % time.asctime()).encode())
+    f.write(b'BINARY\n' if binary else b'ASCII\n')
+    f.write(('DATASET %s\n' % dataset).encode())
+
+
+def writeLegacyArray(f, array, fmt='%f', binary=False):
+    """
+    Write an array to a legacy VTK file, one row per line in ASCII
+
+    Parameters
+    ----------
+
+         f file object, opened in binary mode
+
+         array 1D or 2D array
+
+         fmt format of one value in ASCII
+
+         binary True to write the values in binary, big endian
+    """
+    if binary:
+        dtype = numpy.dtype('>i4') if array.dtype.kind in 'iu' else numpy.dtype('>f4')
+        numpy.ascontiguousarray(array, dtype=dtype).tofile(f)
+        f.write(b'\n')
+        return
+    array = array.reshape((array.shape[0], -1))
+    line = ' '.join([fmt] * array.shape[1]) + '\n'
+    for i in range(0, array.shape[0], _asciiRows):
+        block = array[i:i + _asciiRows]
+        f.write(((line * block.shape[0]) % tuple(block.ravel().tolist())).encode())
+
+
+class AppendedData:
+    """
+    Arrays of a VTK XML file, stored in its appended data section
+
+    Parameters
+    ----------
+
+      compress
+          False for raw data, True (or a zlib level) for zlib compressed data
+    """
+
+    def __init__(self, compress=True, blocksize=1 << 20):
+        self.compress = compress
+        self.blocksize = blocksize
+        self.blocks = []
+        self.offset = 0
+
+    def dataArray(self, array, name=None):
+        """
+        Add an array
+
+        Parameters
+        ----------
+
+             array array of shape (n,) or (n, number of components)
+
+             name name of the array
+
+        Returns
+        -------
+
+             DataArray element of the array
+        """
+        array = numpy.asarray(array)
+        dtype = array.dtype.newbyteorder('<')
+        array = numpy.ascontiguousarray(array, dtype=dtype)
+        raw = memoryview(array.reshape(-1).view(numpy.uint8))
+        if not self.compress:
+            blocks = [numpy.array([len(raw)], '<u8').tobytes(), raw]
+        else:
+            level = 6 if self.compress is True else int(self.compress)
+            chunks = [zlib.compress(raw[i:i + self.blocksize], level)
+                      for i in range(0, len(raw), self.blocksize)]
+            header = [len(chunks), self.blocksize, len(raw) % self.blocksize] + [len(c) for c in chunks]
+            blocks = [numpy.array(header, '<u8').tobytes()] + chunks
+        attributes = 'type="%s"' % _xmlTypes[dtype.str[1:]]
+        if name is not None:
+            attributes += ' Name=%s' % quoteattr(name)
+        ncomponents = array.shape[1] if array.ndim > 1 else 1
+        element = '<DataArray %s NumberOfComponents="%d" format="appended" offset="%d"/>' % \
+            (attributes, ncomponents, self.offset)
+        self.blocks.extend(blocks)
+        self.offset += sum(len(b) for b in blocks)
+        return element
+
+
+def writeXMLFile(filename, vtktype, lines, appended):
+    """
+    Write a VTK XML file
+
+    Parameters
+    ----------
+
+         filename file name
+
+         vtktype VTK dataset type, e.g. StructuredGrid
+
+         lines XML elements of the dataset
+
+         appended AppendedData of the arrays used by the elements
+    """
+    f = open(filename, 'wb')
+    compressor = ' compressor="vtkZLibDataCompressor"' if appended.compress else ''
+    f.write(b'<?xml version="1.0"?>\n')
+    f.write(('<VTKFile type="%s" version="1.0" byte_order="LittleEndian" '
+             'header_type="UInt64"%s>\n' % (vtktype, compressor)).encode())
+    for line in lines:
+        f.write(('  %s\n' % line).encode('utf-8'))
+    f.write(b'  <AppendedData encoding="raw">\n   _')
+    for block in appended.blocks:
+        f.write(block)
+    f.write(b'\n  </AppendedData>\n</VTKFile>\n')
+    f.close()
+
+
+def writePVD(filename, datasets):
+    """
+    Write a .pvd collection of VTK XML files
+
+    Parameters
+    ----------
+
+         filename file name
+
+         datasets list of (time, file name)
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    f = open(filename, 'w')
+    f.write('<?xml version="1.0"?>\n')
+    f.write('<VTKFile type="Collection" version="0.1" byte_order="LittleEndian">\n')
+    f.write('  <Collection>\n')
+    for t, path in datasets:
+        path = os.path.relpath(os.path.abspath(path), dirname)
+        f.write('    <DataSet timestep="%r" group="" part="0" file=%s/>\n' % (float(t), quoteattr(path)))
+    f.write('  </Collection>\n')
+    f.write('</VTKFile>\n')
+    f.close()
@@ -419,6 +419,14 @@ Parameters
 
          dstGridAreas
              array destination cell areas, only needed for conservative regridding
+
+         weights
+             precomputed (row, col, S) sparse weights, zero based flat indices;
+             if given, no weights are computed and regridTool is ignored
+
+         diagnostics
+             diagnostic data of the tool that computed the weights, reported
+             by fillInDiagnosticData instead of the sparse tool's (with weights)
          **args
              additional, tool dependent arguments
     """
@@ -427,6 +435,7 @@ Parameters
                  regridMethod='linear', regridTool='libCF',
                  srcGridMask=None, srcGridAreas=None,
                  dstGridMask=None, dstGridAreas=None,
+                 weights=None, diagnostics=None,
                  **args):
         """
 
@@ -498,6 +507,12 @@ coordMin = %7.2f, boundMin = %7.2f, coordMax = %7.2f, boundMax = %7.2f
             if args['handleCut']:
                 srcBounds = getBoundList(srcCoords)
 
+        if weights is not None:
+            # precomputed weights (e.g. from the regrid weight cache)
+            regridTool = 'sparse'
+            args['weights'] = weights
+            args['diagnostics'] = diagnostics
+
         srcCoordsArrays = [numpy.array(sc) for sc in srcCoords]
         dstCoordsArrays = [numpy.array(dc) for dc in dstCoords]
 
@@ -514,6 +529,18 @@ coordMin = %7.2f, boundMin = %7.2f, coordMax = %7.2f, boundMax = %7.2f
                                                **args)
         self.regridObj.computeWeights(**args)
 
+    def getWeights(self):
+        """
+        Get the interpolation weights as a sparse matrix
+
+        Returns
+        -------
+
+             (row, col, S) zero based flat destination/source indices and
+             weights, or None if the regrid tool cannot export them
+        """
+        return self.regridObj.getWeights()
+
     def __call__(self, srcVar, **args):
         """
         Interpolate, looping over additional (non-latitude/longitude) axes
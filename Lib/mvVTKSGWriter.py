@@ -3,13 +3,14 @@
 # This code is provided with the hope that it will be useful.
 # No guarantee is provided whatsoever. Use at your own risk.
 """
-Write data to VTK file format using the structured grid format
+Write data to VTK file format using the structured grid format, legacy
+(.vtk) or XML (.vts)
 
 """
 
 from __future__ import print_function
 import numpy
-import time
+from xml.sax.saxutils import quoteattr
 from . import mvBaseWriter
 
 
@@ -26,38 +27,61 @@ class VTKSGWriter(mvBaseWriter.BaseWriter):
           _: None
     """
 
-    def write(self, filename):
+    def write(self, filename, binary=False):
         """
+        Write a legacy VTK file
 
+        Parameters
+        ----------
+
+             filename file name
+
+             binary write the points and values in binary rather than ASCII
         """
-        f = open(filename, 'w')
-        print('# vtk DataFile Version 2.0', file=f)
-        print('generated on %s' % time.asctime(), file=f)
-        print('ASCII', file=f)
-        print('DATASET STRUCTURED_GRID', file=f)
+        f = open(filename, 'wb')
+        mvBaseWriter.writeLegacyHeader(f, 'STRUCTURED_GRID', binary)
         shp = self.shape[:]
         shp.reverse()
-        print('DIMENSIONS %d %d %d' % tuple(shp), file=f)
+        f.write(('DIMENSIONS %d %d %d\n' % tuple(shp)).encode())
         npts = self.mesh.shape[0]
-        print('POINTS %d float' % npts, file=f)
-        for i in range(npts):
-            print('%f %f %f' % tuple(self.mesh[i, :]), file=f)
+        f.write(('POINTS %d float\n' % npts).encode())
+        mvBaseWriter.writeLegacyArray(f, self.mesh, binary=binary)
         n0, n1, n2 = self.shape
         # nodal data
-        print('POINT_DATA %d' % (n0 * n1 * n2), file=f)
-        print('SCALARS %s float' % (self.var.id), file=f)
-        print('LOOKUP_TABLE default', file=f)
-        if n0 > 1:
-            for k in range(n0):
-                for j in range(n1):
-                    for i in range(n2):
-                        print('%f' % self.var[k, j, i], file=f)
-        else:
-            for j in range(n1):
-                for i in range(n2):
-                    print('%f' % self.var[j, i], file=f)
+        f.write(('POINT_DATA %d\n' % (n0 * n1 * n2)).encode())
+        f.write(('SCALARS %s float\n' % (self.var.id)).encode())
+        f.write(b'LOOKUP_TABLE default\n')
+        data = self.getPointData(numpy.float32 if binary else numpy.float64)
+        mvBaseWriter.writeLegacyArray(f, data, binary=binary)
         f.close()
 
+    def writeXML(self, filename, compress=True):
+        """
+        Write a VTK XML structured grid (.vts) file
+
+        Parameters
+        ----------
+
+             filename file name
+
+             compress zlib compress the points and values
+        """
+        shp = self.shape[:]
+        shp.reverse()
+        extent = '0 %d 0 %d 0 %d' % tuple(n - 1 for n in shp)
+        appended = mvBaseWriter.AppendedData(compress)
+        lines = ['<StructuredGrid WholeExtent="%s">' % extent,
+                 '<Piece Extent="%s">' % extent,
+                 '<PointData Scalars=%s>' % quoteattr(self.var.id),
+                 appended.dataArray(self.getPointData(), self.var.id),
+                 '</PointData>',
+                 '<Points>',
+                 appended.dataArray(self.mesh),
+                 '</Points>',
+                 '</Piece>',
+                 '</StructuredGrid>']
+        mvBaseWriter.writeXMLFile(filename, 'StructuredGrid', lines, appended)
+
 
 ######################################################################
 
@@ -75,6 +99,7 @@ def test2DRect():
                                axes=(lats, lons))
     vw = VTKSGWriter(var)
     vw.write('test2DRect_SG.vtk')
+    vw.writeXML('test2DRect_SG.vts')
 
 
 def test3D():
@@ -3,13 +3,14 @@
 # This code is provided with the hope that it will be useful.
 # No guarantee is provided whatsoever. Use at your own risk.
 """
-Write data to VTK file format using the unstructured grid format
+Write data to VTK file format using the unstructured grid format, legacy
+(.vtk) or XML (.vtu)
 
 """
 
 from __future__ import print_function
 import numpy
-import time
+from xml.sax.saxutils import quoteattr
 from . import mvBaseWriter
 
 
@@ -27,68 +28,70 @@ class VTKUGWriter(mvBaseWriter.BaseWriter):
 
     """
 
-    def write(self, filename):
+    def write(self, filename, binary=False):
         """
+        Write a legacy VTK file
 
+        Parameters
+        ----------
+
+             filename file name
+
+             binary write the points, cells and values in binary rather than ASCII
         """
-        f = open(filename, 'w')
-        print('# vtk DataFile Version 2.0', file=f)
-        print('generated on %s' % time.asctime(), file=f)
-        print('ASCII', file=f)
-        print('DATASET UNSTRUCTURED_GRID', file=f)
+        f = open(filename, 'wb')
+        mvBaseWriter.writeLegacyHeader(f, 'UNSTRUCTURED_GRID', binary)
         npts = self.mesh.shape[0]
-        print('POINTS %d float' % npts, file=f)
-        for i in range(npts):
-            print('%f %f %f' % tuple(self.mesh[i, :]), file=f)
+        f.write(('POINTS %d float\n' % npts).encode())
+        mvBaseWriter.writeLegacyArray(f, self.mesh, binary=binary)
+        cells, cellType = self.getCells()
+        ncells, nvertices = cells.shape
+        f.write(('CELLS %d %d\n' % (ncells, ncells * (nvertices + 1))).encode())
+        counts = numpy.full((ncells, 1), nvertices, numpy.int64)
+        mvBaseWriter.writeLegacyArray(f, numpy.hstack((counts, cells)), '%d', binary)
+        f.write(('CELL_TYPES %d\n' % ncells).encode())
+        mvBaseWriter.writeLegacyArray(f, numpy.full((ncells,), cellType, numpy.int64), '%d', binary)
+        # nodal data
         n0, n1, n2 = self.shape
-        ncells = (n0 - 1) * (n1 - 1) * (n2 - 1)
-        if ncells != 0:
-            # 3d
-            ntot = ncells * (8 + 1)
-            print('CELLS %d %d' % (ncells, ntot), file=f)
-            for k in range(n0 - 1):
-                for j in range(n1 - 1):
-                    for i in range(n2 - 1):
-                        index = i + n2 * (j + n1 * k)
-                        print('8 %d %d %d %d %d %d %d %d' %
-                              (index, index + 1, index + 1 + n2, index + n2,
-                               index + n1 * n2, index + n1 * n2 + 1,
-                               index + n1 * n2 + 1 + n2, index + n1 * n2 + n2), file=f)
-            print('CELL_TYPES %d' % ncells, file=f)
-            for i in range(ncells):
-                # hexahedron
-                print(12, file=f)
-            # nodal data
-            print('POINT_DATA %d' % (n0 * n1 * n2), file=f)
-            print('SCALARS %s float' % (self.var.id), file=f)
-            print('LOOKUP_TABLE default', file=f)
-            for k in range(n0):
-                for j in range(n1):
-                    for i in range(n2):
-                        print('%f' % self.var[k, j, i], file=f)
-        else:
-            # 2d
-            ncells = (n1 - 1) * (n2 - 1)
-            ntot = ncells * (4 + 1)
-            print('CELLS %d %d' % (ncells, ntot), file=f)
-            for j in range(n1 - 1):
-                for i in range(n2 - 1):
-                    index = i + n2 * j
-                    print('4 %d %d %d %d' %
-                          (index, index + 1, index + 1 + n2, index + n2), file=f)
-            print('CELL_TYPES %d' % ncells, file=f)
-            for i in range(ncells):
-                # quad
-                print(9, file=f)
-            # nodal data
-            print('POINT_DATA %d' % (n0 * n1 * n2), file=f)
-            print('SCALARS %s float' % (self.var.id), file=f)
-            print('LOOKUP_TABLE default', file=f)
-            for j in range(n1):
-                for i in range(n2):
-                    print('%f' % self.var[j, i], file=f)
+        f.write(('POINT_DATA %d\n' % (n0 * n1 * n2)).encode())
+        f.write(('SCALARS %s float\n' % (self.var.id)).encode())
+        f.write(b'LOOKUP_TABLE default\n')
+        data = self.getPointData(numpy.float32 if binary else numpy.float64)
+        mvBaseWriter.writeLegacyArray(f, data, binary=binary)
         f.close()
 
+    def writeXML(self, filename, compress=True):
+        """
+        Write a VTK XML unstructured grid (.vtu) file
+
+        Parameters
+        ----------
+
+             filename file name
+
+             compress zlib compress the points, cells and values
+        """
+        cells, cellType = self.getCells()
+        ncells, nvertices = cells.shape
+        appended = mvBaseWriter.AppendedData(compress)
+        offsets = numpy.arange(1, ncells + 1, dtype=numpy.int64) * nvertices
+        lines = ['<UnstructuredGrid>',
+                 '<Piece NumberOfPoints="%d" NumberOfCells="%d">' % (self.mesh.shape[0], ncells),
+                 '<PointData Scalars=%s>' % quoteattr(self.var.id),
+                 appended.dataArray(self.getPointData(), self.var.id),
+                 '</PointData>',
+                 '<Points>',
+                 appended.dataArray(self.mesh),
+                 '</Points>',
+                 '<Cells>',
+                 appended.dataArray(cells.ravel(), 'connectivity'),
+                 appended.dataArray(offsets, 'offsets'),
+                 appended.dataArray(numpy.full((ncells,), cellType, numpy.uint8), 'types'),
+                 '</Cells>',
+                 '</Piece>',
+                 '</UnstructuredGrid>']
+        mvBaseWriter.writeXMLFile(filename, 'UnstructuredGrid', lines, appended)
+
 
 ######################################################################
 
@@ -106,6 +109,7 @@ def test2DRect():
                                axes=(lats, lons))
     vw = VTKUGWriter(var)
     vw.write('test2DRect.vtk')
+    vw.writeXML('test2DRect.vtu')
 
 
 def test3D():
@@ -0,0 +1,174 @@
+"""
+Memory-mapped access to the variables of netCDF-3 files.
+
+Classic (CDF-1), 64-bit offset (CDF-2) and 64-bit data (CDF-5) files store
+each variable uncompressed: a non-record variable is one contiguous block,
+and a record variable has one block per record, at a fixed stride. The file
+header gives the offset of the first block, so a variable can be read as a
+read-only view of a numpy.memmap of the file. The values are big-endian, the
+dtype of the view takes care of byte swapping.
+"""
+import struct
+import numpy
+
+_magic = {b'CDF\x01': 1, b'CDF\x02': 2, b'CDF\x05': 5}
+
+_NC_DIMENSION = 10
+_NC_VARIABLE = 11
+_NC_ATTRIBUTE = 12
+_STREAMING = 0xffffffff
+
+# netCDF types: (dtype, size)
+_types = {
+    1: ('i1', 1), 2: ('S1', 1), 3: ('>i2', 2), 4: ('>i4', 4), 5: ('>f4', 4), 6: ('>f8', 8),
+    7: ('u1', 1), 8: ('>u2', 2), 9: ('>u4', 4), 10: ('>i8', 8), 11: ('>u8', 8),
+}
+
+
+class _Reader(object):
+    # Header fields, in the integer sizes of the file version
+
+    def __init__(self, fileobj, version):
+        self.fileobj = fileobj
+        self.count = '>Q' if version == 5 else '>I'
+        self.offset = '>I' if version == 1 else '>Q'
+
+    def read(self, fmt):
+        size = struct.calcsize(fmt)
+        buf = self.fileobj.read(size)
+        if len(buf) != size:
+            raise ValueError("truncated netCDF header")
+        return struct.unpack(fmt, buf)[0]
+
+    def int(self):
+        return self.read('>I')
+
+    def nelems(self):
+        return self.read(self.count)
+
+    def name(self):
+        n = self.nelems()
+        name = self.fileobj.read(n)
+        self.fileobj.read(-n % 4)
+        return name.decode('utf-8')
+
+    def list(self, tag):
+        found = self.int()
+        n = self.nelems()
+        if found == 0 and n == 0:
+            return 0
+        if found != tag:
+            raise ValueError("bad netCDF header")
+        return n
+
+    def skipAttributes(self):
+        for i in range(self.list(_NC_ATTRIBUTE)):
+            self.name()
+            nctype = self.int()
+            n = self.nelems()
+            size = n * _types[nctype][1]
+            self.fileobj.seek(size + (-size % 4), 1)
+
+
+class Netcdf3Variable(object):
+    """Layout of a variable in a netCDF-3 file.
+
+    Attributes
+    ----------
+    dtype : big-endian numpy dtype of the values.
+    shape : shape of one record for record variables, else of the variable.
+    record : True for a record variable.
+    begin : file offset of the values, or of the first record.
+    """
+
+    def __init__(self, name, dtype, shape, record, begin):
+        self.name = name
+        self.dtype = numpy.dtype(dtype)
+        self.shape = shape
+        self.record = record
+        self.begin = begin
+
+    def nbytes(self):
+        return int(numpy.prod(self.shape, dtype=numpy.int64)) * self.dtype.itemsize
+
+
+class Netcdf3Header(object):
+    """Parse the header of a netCDF-3 file.
+
+    Parameters
+    ----------
+    path : file path.
+
+    Attributes
+    ----------
+    version : 1, 2 or 5.
+    variables : dictionary of Netcdf3Variable, by name.
+    recsize : distance between two records of a record variable, in bytes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.version = _magic.get(f.read(4))
+            if self.version is None:
+                raise ValueError("%s is not a netCDF-3 file" % path)
+            reader = _Reader(f, self.version)
+            reader.nelems()                         # numrecs, may be stale
+            dims = []
+            for i in range(reader.list(_NC_DIMENSION)):
+                name = reader.name()
+                dims.append(reader.nelems())
+            reader.skipAttributes()
+            self.variables = {}
+            for i in range(reader.list(_NC_VARIABLE)):
+                name = reader.name()
+                dimids = [reader.nelems() for k in range(reader.nelems())]
+                reader.skipAttributes()
+                nctype = reader.int()
+                reader.nelems()                     # vsize, clamped for large variables
+                begin = reader.read(reader.offset)
+                shape = tuple(dims[k] for k in dimids)
+                record = len(shape) > 0 and shape[0] == 0
+                if record:
+                    shape = shape[1:]
+                self.variables[name] = Netcdf3Variable(name, _types[nctype][0], shape, record, begin)
+        records = [v for v in self.variables.values() if v.record]
+        if len(records) == 1:
+            # a single record variable is not padded
+            self.recsize = records[0].nbytes()
+        else:
+            self.recsize = sum(v.nbytes() + (-v.nbytes() % 4) for v in records)
+        self._map = None
+
+    def array(self, name, nrecords=None):
+        """Return a read-only view of a variable.
+
+        Parameters
+        ----------
+        name : variable name.
+        nrecords : number of records of a record variable.
+
+        Returns
+        -------
+        numpy array, a view of a numpy.memmap of the file.
+        """
+        var = self.variables[name]
+        shape = var.shape
+        strides = tuple(numpy.cumprod((var.dtype.itemsize,) + shape[:0:-1])[::-1]) if shape else ()
+        if var.record:
+            shape = (nrecords,) + shape
+            strides = (self.recsize,) + strides
+        if 0 in shape:
+            return numpy.zeros(shape, var.dtype)
+        if self._map is None:
+            self._map = numpy.memmap(self.path, numpy.uint8, mode='r')
+        return numpy.ndarray(shape, var.dtype, buffer=self._map, offset=var.begin, strides=strides)
+
+
+def isNetcdf3(path):
+    """Return True if the file at path is a netCDF-3 file."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4) in _magic
+    except (IOError, OSError):
+        return False
@@ -0,0 +1,390 @@
+"""
+Regrid weight cache.
+
+AbstractVariable.regrid used to build (and compute the weights of) a new
+regridder on every call. Regridders are now looked up by a fingerprint of
+the source grid, destination grid, method, tool, mask and the keywords that
+affect the weights. Two tiers are kept:
+
+- an in-memory LRU of ready-to-use regridder objects, and
+- an optional on-disk directory of sparse weight files, written in the
+  SCRIP/ESMF map layout (S, row, col with one based indices).
+
+The disk tier is only used for tools that can export their weights (ESMF).
+The diagnostic data of the tool, including the ESMF area fractions, are
+stored with the weights so that a disk hit reports the same diagnostics as
+a miss.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy
+from .error import CDMSError
+
+_memory_max_size = 16                   # Number of regridders kept in memory
+_disk_cache_dir = None                  # Directory of weight files, or None
+
+_regridders = OrderedDict()
+_lock = threading.RLock()
+_stats = {'hits': 0, 'diskhits': 0, 'misses': 0}
+
+# Keywords which only matter when applying the weights
+_applyOnlyKeywords = ['diag']
+
+# Diagnostic arrays, and their variable names in the SCRIP/ESMF map file
+_diagArrays = [('srcAreaFractions', 'frac_a'), ('dstAreaFractions', 'frac_b'),
+               ('srcAreas', 'area_a'), ('dstAreas', 'area_b')]
+
+
+def setRegridCacheSize(value):
+    """Set the number of regridders kept in memory.
+
+    Parameters
+    ----------
+    value : int >= 0. 0 disables the in-memory tier.
+
+    Returns
+    -------
+    No return value.
+    """
+    global _memory_max_size
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise CDMSError("setRegridCacheSize value must be a non-negative integer")
+    with _lock:
+        _memory_max_size = value
+        _evict()
+
+
+def getRegridCacheSize():
+    """Return the number of regridders kept in memory."""
+    return _memory_max_size
+
+
+def setRegridCacheDir(path):
+    """Set the directory of the on-disk weight cache.
+
+    Parameters
+    ----------
+    path : directory name, created if needed. None disables the disk tier.
+
+    Returns
+    -------
+    No return value.
+    """
+    global _disk_cache_dir
+    if path is not None:
+        path = os.path.abspath(os.path.expanduser(path))
+        if not os.path.isdir(path):
+            os.makedirs(path)
+    _disk_cache_dir = path
+
+
+def getRegridCacheDir():
+    """Return the directory of the on-disk weight cache, or None."""
+    return _disk_cache_dir
+
+
+def clearRegridCache(disk=False):
+    """Empty the in-memory tier, and the disk tier if disk is True."""
+    with _lock:
+        _regridders.clear()
+        for key in _stats:
+            _stats[key] = 0
+    if disk and _disk_cache_dir is not None:
+        for name in os.listdir(_disk_cache_dir):
+            if name.startswith('regrid_') and name.endswith('.nc'):
+                os.remove(os.path.join(_disk_cache_dir, name))
+
+
+def getRegridCacheStats():
+    """Return a dictionary of memory hits, disk hits and misses."""
+    return dict(_stats)
+
+
+def _updateArray(h, ar):
+    if ar is None:
+        h.update(b'None')
+        return
+    ar = numpy.ascontiguousarray(numpy.ma.filled(ar))
+    h.update(str((ar.shape, ar.dtype.str)).encode())
+    h.update(ar.tobytes())
+
+
+def gridFingerprint(grid, h=None):
+    """Return a hash of the coordinates, bounds and mask of a horizontal grid.
+
+    Parameters
+    ----------
+    grid : CDMS horizontal grid.
+    h : hashlib object to update, a new sha1 if None.
+
+    Returns
+    -------
+    hex digest string.
+    """
+    if h is None:
+        h = hashlib.sha1()
+    h.update(grid.__class__.__name__.encode())
+    if hasattr(grid, 'getOrder'):
+        h.update(str(grid.getOrder()).encode())
+    for c in grid.getLatitude(), grid.getLongitude():
+        _updateArray(h, c[:])
+        _updateArray(h, c.getBounds())
+    _updateArray(h, grid.getMask())
+    return h.hexdigest()
+
+
+def fingerprint(fromgrid, togrid, regridMethod, regridTool, dtype=None,
+                srcGridMask=None, **keywords):
+    """Return the cache key for a regridding between two grids."""
+    h = hashlib.sha1()
+    gridFingerprint(fromgrid, h)
+    gridFingerprint(togrid, h)
+    h.update(str((str(regridMethod).lower(), str(regridTool).lower(),
+                  numpy.dtype(dtype).str if dtype is not None else None)).encode())
+    _updateArray(h, srcGridMask)
+    for key in sorted(keywords.keys()):
+        if key in _applyOnlyKeywords:
+            continue
+        value = keywords[key]
+        h.update(key.encode())
+        if isinstance(value, numpy.ndarray):
+            _updateArray(h, value)
+        else:
+            h.update(repr(value).encode())
+    return h.hexdigest()
+
+
+def _evict():
+    while len(_regridders) > _memory_max_size:
+        _regridders.popitem(last=False)
+
+
+def _remember(key, regridder):
+    with _lock:
+        if _memory_max_size > 0:
+            _regridders[key] = regridder
+            _regridders.move_to_end(key)
+            _evict()
+
+
+def _weightsPath(key):
+    return os.path.join(_disk_cache_dir, 'regrid_%s.nc' % key)
+
+
+def writeWeights(path, weights, srcShape, dstShape, regridMethod, key='', diagnostics=None):
+    """Write sparse weights to a SCRIP/ESMF style netCDF map file.
+
+    Parameters
+    ----------
+    path : output file name. The file is written under a temporary name and
+           renamed, so readers never see a partial file.
+    weights : (row, col, S), zero based flat destination/source indices.
+    srcShape, dstShape : source and destination grid shapes.
+    regridMethod : method name, stored as the map_method attribute.
+    key : cache fingerprint, stored as the cdms_fingerprint attribute.
+    diagnostics : diagnostic data of the tool that computed the weights, as
+                  filled in by fillInDiagnosticData, or None. The area arrays
+                  are stored as frac_a, frac_b, area_a and area_b, the other
+                  entries as cdms_diag_<entry> attributes.
+    """
+    import cdms2
+    row, col, S = weights
+    diagnostics = diagnostics or {}
+    fd, tmppath = tempfile.mkstemp(suffix='.nc', dir=os.path.dirname(path))
+    os.close(fd)
+    f = cdms2.open(tmppath, 'w')
+    try:
+        ns = f.createVirtualAxis('n_s', len(S))
+        rank = f.createVirtualAxis('grid_rank', len(srcShape))
+        for name, data, typecode in (('S', S, 'd'), ('row', numpy.array(row) + 1, 'i'),
+                                     ('col', numpy.array(col) + 1, 'i')):
+            var = f.createVariable(name, typecode, [ns])
+            if len(data) > 0:
+                var[:] = numpy.asarray(data).astype(typecode)
+        # grid dims are stored in Fortran order, as ESMF does
+        for name, shape in (('src_grid_dims', srcShape), ('dst_grid_dims', dstShape)):
+            var = f.createVariable(name, 'i', [rank])
+            var[:] = numpy.array(shape[::-1], 'i')
+        # n_a and n_b are the source and destination sizes, as in ESMF map files
+        sizes = {'a': int(numpy.prod(srcShape)), 'b': int(numpy.prod(dstShape))}
+        gridaxes = {}
+        for entry, name in _diagArrays:
+            if diagnostics.get(entry) is not None:
+                side = name[-1]
+                if side not in gridaxes:
+                    gridaxes[side] = f.createVirtualAxis('n_' + side, sizes[side])
+                var = f.createVariable(name, 'd', [gridaxes[side]])
+                var[:] = numpy.ravel(diagnostics[entry]).astype('d')
+        for entry, value in diagnostics.items():
+            if value is not None and entry not in dict(_diagArrays):
+                setattr(f, 'cdms_diag_' + entry, value)
+        f.map_method = str(regridMethod)
+        f.cdms_fingerprint = key
+    finally:
+        f.close()
+    os.rename(tmppath, path)
+
+
+def readWeights(path, key=None, diagnostics=None):
+    """Read sparse weights written by writeWeights.
+
+    Parameters
+    ----------
+    path : map file name.
+    key : expected cache fingerprint, or None.
+    diagnostics : dictionary filled in with the stored diagnostic data, or None.
+
+    Returns
+    -------
+    ((row, col, S), srcShape, dstShape, regridMethod), or None if key is
+    given and does not match the file.
+    """
+    import cdms2
+    f = cdms2.open(path)
+    try:
+        if key is not None and getattr(f, 'cdms_fingerprint', None) != key:
+            return None
+        S = numpy.ma.filled(f('S'))
+        row = numpy.ma.filled(f('row')).astype(numpy.int64) - 1
+        col = numpy.ma.filled(f('col')).astype(numpy.int64) - 1
+        srcShape = tuple(int(n) for n in numpy.ma.filled(f('src_grid_dims'))[::-1])
+        dstShape = tuple(int(n) for n in numpy.ma.filled(f('dst_grid_dims'))[::-1])
+        method = str(f.map_method)
+        if diagnostics is not None:
+            for entry, name in _diagArrays:
+                if name in f.variables:
+                    shape = srcShape if name.endswith('_a') else dstShape
+                    diagnostics[entry] = numpy.ma.filled(f(name)).reshape(shape)
+            for name, value in f.attributes.items():
+                if name.startswith('cdms_diag_'):
+                    if isinstance(value, numpy.ndarray) and value.size == 1:
+                        value = value.item()
+                    diagnostics[name[len('cdms_diag_'):]] = value
+    finally:
+        f.close()
+    return (row, col, S), srcShape, dstShape, method
+
+
+def _exportsWeights(regridMethod, regridTool):
+    """Return True if the tool keeps its sparse weights when asked to (ESMF).
+
+    Conservative regridding always uses ESMF, see CdmsRegrid.
+    """
+    return re.search('esm', str(regridTool).lower()) is not None or \
+        re.search('conserv', str(regridMethod).lower()) is not None
+
+
+def _toolDiagnostics(ro):
+    """Return the diagnostic data of a CdmsRegrid, including the area arrays it has."""
+    diagnostics = {}
+    ro.regridObj.fillInDiagnosticData(diag=diagnostics, rootPe=0)
+    for entry, name in _diagArrays:
+        diag = {entry: None}
+        try:
+            ro.regridObj.fillInDiagnosticData(diag=diag, rootPe=0)
+        except Exception:
+            # not available for this method, e.g. non conservative ESMF
+            continue
+        if diag[entry] is not None:
+            diagnostics[entry] = numpy.array(diag[entry])
+    return diagnostics
+
+
+def getHorizontal(fromgrid, togrid):
+    """Return a regrid2.Horizontal regridder for the pair of grids, cached in memory."""
+    from regrid2 import Horizontal
+    key = fingerprint(fromgrid, togrid, 'area', 'regrid2')
+    with _lock:
+        regridf = _regridders.get(key)
+        if regridf is not None:
+            _stats['hits'] += 1
+            _regridders.move_to_end(key)
+            return regridf
+    _stats['misses'] += 1
+    regridf = Horizontal(fromgrid, togrid)
+    _remember(key, regridf)
+    return regridf
+
+
+def getCdmsRegrid(fromgrid, togrid, dtype, regridMethod, regridTool,
+                  srcGridMask=None, **keywords):
+    """Return a CdmsRegrid with its weights computed, from the cache if possible.
+
+    Parameters
+    ----------
+    fromgrid, togrid : source and destination CDMS grids.
+    dtype : numpy data type of the data to regrid.
+    regridMethod, regridTool : as for CdmsRegrid.
+    srcGridMask : source grid mask, or None.
+    **keywords : tool dependent arguments, as for CdmsRegrid.
+
+    Returns
+    -------
+    CdmsRegrid object.
+    """
+    from .mvCdmsRegrid import CdmsRegrid, _getCoordList
+    keywords = dict((k, v) for k, v in keywords.items() if k not in _applyOnlyKeywords)
+    key = fingerprint(fromgrid, togrid, regridMethod, regridTool, dtype,
+                      srcGridMask, **keywords)
+    with _lock:
+        ro = _regridders.get(key)
+        if ro is not None:
+            _stats['hits'] += 1
+            _regridders.move_to_end(key)
+            return ro
+
+    # disk tier
+    if _disk_cache_dir is not None:
+        path = _weightsPath(key)
+        if os.path.exists(path):
+            res = None
+            diagnostics = {}
+            try:
+                res = readWeights(path, key, diagnostics)
+            except Exception:
+                # unreadable file, e.g. removed by another process: recompute
+                res = None
+            if res is not None:
+                weights, srcShape, dstShape, method = res
+                _stats['diskhits'] += 1
+                ro = CdmsRegrid(fromgrid, togrid, dtype=dtype,
+                                regridMethod=regridMethod,
+                                regridTool=regridTool,
+                                srcGridMask=srcGridMask,
+                                weights=weights,
+                                diagnostics=diagnostics,
+                                **keywords)
+                _remember(key, ro)
+                return ro
+
+    _stats['misses'] += 1
+    storeWeights = _disk_cache_dir is not None and _exportsWeights(regridMethod, regridTool)
+    if storeWeights:
+        # ask the tool to keep its weights so that they can be stored
+        keywords['factors'] = True
+    ro = CdmsRegrid(fromgrid, togrid, dtype=dtype,
+                    regridMethod=regridMethod,
+                    regridTool=regridTool,
+                    srcGridMask=srcGridMask,
+                    srcGridAreas=None,
+                    dstGridMask=None,
+                    dstGridAreas=None,
+                    **keywords)
+    _remember(key, ro)
+
+    if storeWeights:
+        weights = ro.getWeights()
+        if weights is not None:
+            srcShape = _getCoordList(fromgrid)[0].shape
+            dstShape = _getCoordList(togrid)[0].shape
+            try:
+                writeWeights(_weightsPath(key), weights, srcShape, dstShape,
+                             regridMethod, key, _toolDiagnostics(ro))
+            except Exception:
+                # the cache is an optimization only
+                pass
+    return ro
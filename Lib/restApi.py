@@ -8,8 +8,17 @@ try:
 except BaseException:
     pass
 import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
 from six import string_types
 
+_pageSize = 1000                        # Number of results per search request
+
 
 class esgfConnectionException(Exception):
     pass
@@ -29,6 +38,121 @@ class esgfFilesException(Exception):
     # return msg
 
 
+class QueryCache(object):
+    """On-disk cache of search results, keyed by request URL.
+
+    Parameters
+    ----------
+    directory : cache directory, created if needed.
+    ttl : seconds during which a cached result is used, None for no expiry.
+    """
+
+    def __init__(self, directory, ttl=3600):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self.ttl = ttl
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".xml")
+
+    def get(self, key):
+        """Return the cached bytes for key, or None if absent or expired."""
+        path = self._path(key)
+        try:
+            if self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def put(self, key, value):
+        """Store bytes for key, replacing the file atomically."""
+        fd, tmppath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.rename(tmppath, self._path(key))
+        except BaseException:
+            if os.path.exists(tmppath):
+                os.unlink(tmppath)
+            raise
+
+    def clear(self):
+        """Remove all cached results."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".xml"):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+class _ConnectionPool(object):
+    # Bounded pool of keep-alive HTTP connections, shared by the threads
+    # fetching the pages of a search.
+
+    def __init__(self, timeout=15, maxsize=8):
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            conns = self._idle.get(key, [])
+            if conns:
+                return conns.pop()
+        scheme, netloc = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _put(self, key, conn):
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self.maxsize:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def fetch(self, url):
+        """Return the body of a GET request to url."""
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        for attempt in (0, 1):
+            conn = self._get(key)
+            try:
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                body = resp.read()
+            except (http.client.HTTPException, ConnectionError):
+                # stale keep-alive connection closed by the server: retry once
+                conn.close()
+                if attempt == 1:
+                    raise
+                continue
+            if resp.status != 200:
+                conn.close()
+                raise IOError("HTTP error %d: %s for %s" % (resp.status, resp.reason, url))
+            if resp.will_close:
+                conn.close()
+            else:
+                self._put(key, conn)
+            return body
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle = {}
+
+
 class FacetConnection(object):
     def __init__(self, host='pcmdi9.llnl.gov'):
         self.rqst = "http://%s/esg-search/search?facets=*&type=Dataset&limit=1&latest=true" % host
@@ -101,8 +225,10 @@ validSearchTypes = ["Dataset", "File"]  # "ById","ByTimeStamp"]
 
 class esgfConnection(object):
     def __init__(self, host, port=80, timeout=15, limit=None, offset=0,
-                 mapping=None, datasetids=None, fileids=None, restPath=None):
+                 mapping=None, datasetids=None, fileids=None, restPath=None, queryCache=None):
         self.port = port
+        self.timeout = timeout
+        self.queryCache = queryCache
         url = str(host).replace("://", "^^^---^^^")
         sp = url.split("/")
         host = sp[0].replace("^^^---^^^", "://")
@@ -191,7 +317,23 @@ class esgfConnection(object):
                 "Valid Search types are: %s" %
                 repr(
                     self.validSearchTypes))
-        while search[0] == "&":
+        rqst = self._requestURL(search, searchType)
+        r = self._cachedResult(rqst)
+        if r is None:
+            try:
+                # print "Request:%s"%rqst
+                url = urllib.request.urlopen(rqst)
+            except Exception as msg:
+                raise self.EsgfObjectException(msg)
+            r = url.read()
+            self._cacheResult(rqst, r)
+        if stringType:
+            return r
+        else:
+            return self._parse(r)
+
+    def _requestURL(self, search, searchType):
+        while search[:1] == "&":
             search = search[1:]
         rqst = "%s/?type=%s&%s" % (self.restPath, searchType, search)
         # print "REQUEST: %s%s" % (self.host,rqst)
@@ -201,42 +343,119 @@ class esgfConnection(object):
             urltype = ""
         else:
             urltype = "http://"
+        rqst = "%s%s:%s/%s" % (urltype, myhost, myport, rqst)
+        tmp = rqst[6:].replace("//", "/")
+        return rqst[:6] + tmp
+
+    def _parse(self, r):
         try:
-            rqst = "%s%s:%s/%s" % (urltype, myhost, myport, rqst)
-            tmp = rqst[6:].replace("//", "/")
-            rqst = rqst[:6] + tmp
-            # print "Request:%s"%rqst
-            url = urllib.request.urlopen(rqst)
-        except Exception as msg:
-            raise self.EsgfObjectException(msg)
-        r = url.read()
-        if stringType:
-            return r
-        else:
+            return xml.etree.ElementTree.fromstring(r)
+        except Exception as err:
+            raise self.EsgfObjectException(
+                "Could not interpret server's results: %s" % err)
+
+    def _cachedResult(self, rqst):
+        if getattr(self, "queryCache", None) is None:
+            return None
+        return self.queryCache.get(rqst)
+
+    def _cacheResult(self, rqst, r):
+        if getattr(self, "queryCache", None) is not None:
+            self.queryCache.put(rqst, r)
+
+    def _fetchPage(self, pool, rqst):
+        r = self._cachedResult(rqst)
+        if r is None:
             try:
-                e = xml.etree.ElementTree.fromstring(r)
-                return e
-            except Exception as err:
-                raise self.EsgfObjectException(
-                    "Could not interpret server's results: %s" % err)
+                r = pool.fetch(rqst)
+            except Exception as msg:
+                raise self.EsgfObjectException(msg)
+            self._cacheResult(rqst, r)
+        return self._parse(r)
+
+    def iterPages(self, search, searchType=None, limit=None, offset=0, workers=4,
+                  pageSize=None):
+        """Generate the result pages of a search, fetched concurrently.
+
+        The first page gives the number of results, the other pages are then
+        requested in parallel through a pool of keep-alive connections, and
+        generated in offset order.
+
+        Parameters
+        ----------
+        search : query string, without limit and offset.
+        searchType : "Dataset" or "File", default is the connection default.
+        limit : maximum number of results, None for all.
+        offset : index of the first result.
+        workers : number of concurrent requests.
+        pageSize : number of results per request.
+
+        Returns
+        -------
+        generator of parsed (xml.etree.ElementTree.Element) pages.
+        """
+        if searchType is None:
+            searchType = self.defaultSearchType
+        if searchType not in self.validSearchTypes:
+            raise self.EsgfObjectException(
+                "Valid Search types are: %s" %
+                repr(
+                    self.validSearchTypes))
+        if pageSize is None:
+            pageSize = _pageSize
+        offset = offset or 0
+
+        def url(start, count):
+            return self._requestURL("%s&limit=%i&offset=%i" % (search, count, start), searchType)
+
+        end = None if limit is None else offset + limit
+        pool = _ConnectionPool(timeout=getattr(self, "timeout", 15), maxsize=workers)
+        try:
+            first = self._fetchPage(pool, url(offset, pageSize if end is None else min(pageSize, limit)))
+            yield first
+            numFound = 0
+            for s in first[:]:
+                if s.tag == "result":
+                    numFound = int(s.get("numFound"))
+            if end is None or end > numFound:
+                end = numFound
+            starts = list(range(offset + pageSize, end, pageSize))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = []
+                for start in starts:
+                    pending.append(executor.submit(self._fetchPage, pool,
+                                                   url(start, min(pageSize, end - start))))
+                    # Bound the number of pages held in memory
+                    if len(pending) >= 2 * workers:
+                        yield pending.pop(0).result()
+                while pending:
+                    yield pending.pop(0).result()
+        finally:
+            pool.close()
 
     def generateRequest(self, stringType=False, **keys):
-        search = ""
         params = {"limit": self["limit"], "offset": self["offset"]}
 
         # for k in self.keys():
         # if self[k] is not None and k in self.searchableKeys and k!="type":
         # params[k]=self[k]
 
+        params.update(self._facets(keys))
+        return self._encodeSearch(params)
+
+    def _facets(self, keys):
+        params = {}
         for k in list(keys.keys()):
-            if k == "stringType":
+            if k in ["stringType", "workers", "pageSize"]:
                 continue
             elif k == "type":
                 continue
             #     (repr(k),repr(self.params.keys())))
             if keys[k] is not None:
                 params[k] = keys[k]
+        return params
 
+    def _encodeSearch(self, params):
         search = ""
         for k in list(params.keys()):
             if isinstance(params[k], list):
@@ -254,7 +473,18 @@ class esgfConnection(object):
         search = search.replace(" ", "%20")
         return search
 
+    def iterRequest(self, workers=4, pageSize=None, **keys):
+        """Generate the parsed result pages of a search, fetched concurrently.
+
+        See iterPages. The limit and offset are those of the connection.
+        """
+        search = self._encodeSearch(self._facets(keys))
+        return self.iterPages(search, limit=self["limit"], offset=self["offset"],
+                              workers=workers, pageSize=pageSize)
+
     def request(self, **keys):
+        if keys.get("workers") is not None and not keys.get("stringType", False):
+            return list(self.iterRequest(**keys))
         numFound = 0
         cont = True
         r = []
@@ -310,6 +540,7 @@ class esgfConnection(object):
         stringType = keys.get("stringType", False)
         if stringType:
             return resps
+        keys = dict((k, v) for k, v in keys.items() if k not in ["workers", "pageSize"])
         datasets = []
         for resp in resps:
             for r in resp[:]:
@@ -337,16 +568,21 @@ class esgfConnection(object):
                                     fileids=self.fileids,
                                     keys=tmpkeys,
                                     originalKeys=keys,
-                                    restPath=self.restPath))
+                                    restPath=self.restPath,
+                                    queryCache=self.queryCache,
+                                    timeout=self.timeout))
         return datasets
 
 
 class esgfDataset(esgfConnection):
     def __init__(self, host=None, port=80, limit=1000, offset=0, mapping=None,
-                 datasetids=None, fileids=None, _http=None, restPath=None, keys={}, originalKeys={}):
+                 datasetids=None, fileids=None, _http=None, restPath=None, keys={}, originalKeys={},
+                 queryCache=None, timeout=15):
         if host is None:
             raise esgfDatasetException("You need to pass url")
         self.host = host
+        self.queryCache = queryCache
+        self.timeout = timeout
         # self.host="esg-datanode.jpl.nasa.gov"
         self.port = port
         self.defaultSearchType = "File"
@@ -413,18 +649,20 @@ class esgfDataset(esgfConnection):
     # level=[k,mappoint.keys()]
     # mappoint
     def _extractFiles(self, resp, **inKeys):
+        return list(self._iterFiles(resp))
+
+    def _iterFiles(self, resp):
         # We need to stick in there the bit from Luca to fill in the matching
         # key from facet for now it's empty
-        files = []
-#        skipped = [
-#            "type",
-#            "title",
-#            "timestamp",
-#            "service",
-#            "id",
-#            "score",
-#            "file_url",
-#            "service_type"]
+        # skipped = [
+        #     "type",
+        #     "title",
+        #     "timestamp",
+        #     "service",
+        #     "id",
+        #     "score",
+        #     "file_url",
+        #     "service_type"]
         for r in resp[:]:
             if r.tag == "result":
                 for d in r[:][:]:
@@ -493,8 +731,7 @@ class esgfDataset(esgfConnection):
                         # if not k in keys.keys():
                         # keys[k]=self[k]
                         # print "KEYS:",keys
-                        files.append(esgfFile(**keys))
-        return files
+                        yield esgfFile(**keys)
 
     def info(self):
         print(self)
@@ -508,44 +745,57 @@ class esgfDataset(esgfConnection):
     def clearWebCache(self):
         self.resp = None
 
+    def _cacheFile(self, path):
+        if os.path.isdir(path):
+            path = os.path.join(path, "esgfDatasetsCache.json")
+        return path
+
+    def _readCache(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
     def saveCache(self, target="."):
+        """Save the last search results of the dataset to a JSON file.
+
+        Parameters
+        ----------
+        target : file, or directory holding esgfDatasetsCache.json.
+        """
         if self.resp is None:
             return
-        if os.path.isdir(target):
-            target = os.path.join(target, "esgfDatasetsCache.pckl")
-        if os.path.exists(target):
-            f = open(target)
-            # dict=eval(bz2.decompress(f.read()))
-            dico = eval(f.read())
-            f.close()
-        else:
-            dico = {}
-        dico[self.id] = [self["timestamp"],
-                         xml.etree.ElementTree.tostring(self.resp),
-                         self.originalKeys]
-        f = open(target, "w")
-        # f.write(bz2.compress(repr(self.cache)))
-        f.write(repr(self.cache))
-        f.close()
+        target = self._cacheFile(target)
+        dico = self._readCache(target)
+        resp = self.resp
+        if not isinstance(resp, (bytes, string_types)):
+            resp = xml.etree.ElementTree.tostring(resp)
+        if isinstance(resp, bytes):
+            resp = resp.decode("utf-8")
+        dico[str(self.params.get("id"))] = [self.params.get("timestamp"), resp, self.originalKeys]
+        directory = os.path.dirname(os.path.abspath(target))
+        fd, tmppath = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(dico, f)
+        os.rename(tmppath, target)
 
     def loadCache(self, source):
+        """Load search results saved by saveCache.
+
+        Parameters
+        ----------
+        source : dictionary, file, or directory holding esgfDatasetsCache.json.
+        """
         if isinstance(source, dict):
             dico = source
         else:
-            if os.path.isdir(source):
-                source = os.path.join(source, "esgfDatasetsCache.pckl")
-            if os.path.exists(source):
-                f = open(source)
-                # dict=eval(bz2.decompress(f.read()))
-                dico = eval(f.read())
-                f.close()
-            else:
-                dico = {}
-        vals = dico.get(self.id, ["", None, {}])
+            dico = self._readCache(self._cacheFile(source))
+        vals = dico.get(str(self.params.get("id")), ["", None, {}])
         if vals[1] is not None:
             self.cacheTime = vals[0]
-            self.resp = xml.etree.ElementTree.fromstring(vals[0])
-            self.originalKeys = vals[1]
+            self.resp = xml.etree.ElementTree.fromstring(vals[1])
+            self.originalKeys = vals[2]
 
     def clearOriginalQueryCache(self):
         self.originalKeys = {}
@@ -554,9 +804,7 @@ class esgfDataset(esgfConnection):
         self.clearWebCache()
         self.clearOriginalQueryCache()
 
-    def search(self, **keys):
-        # search = self.generateRequest(**keys)
-        stringType = keys.get("stringType", False)
+    def _searchString(self, keys, skip=()):
         keys.update(self.originalKeys)
         st = ""
         if "limit" not in keys:
@@ -564,18 +812,49 @@ class esgfDataset(esgfConnection):
         if "offset" not in keys:
             keys["offset"] = [self["offset"]]
         for k in keys:
-            if k in ["searchString", "stringType", ]:
+            if k in ["searchString", "stringType", ] or k in skip:
                 continue
             for v in keys[k]:
                 st += "&%s=%s" % (k, v)
             # st+="&%s=%s" % (k,keys[k])
+        return st
+
+    def search(self, **keys):
+        # search = self.generateRequest(**keys)
+        stringType = keys.get("stringType", False)
+        st = self._searchString(keys)
         # if self.resp is None:
-            # self.resp = self._search("dataset_id=%s%s" % (self["id"],st),stringType=stringType)
+        #     self.resp = self._search("dataset_id=%s%s" % (self["id"],st),stringType=stringType)
         self.resp = self._search(st, stringType=stringType)
         if stringType:
             return self.resp
         return esgfFiles(self._extractFiles(self.resp, **keys), self)
 
+    def iterFiles(self, workers=4, pageSize=None, **keys):
+        """Generate the files of the dataset matching a search, page by page.
+
+        The result pages are fetched concurrently (see esgfConnection.iterPages),
+        the files are generated as the pages arrive, without waiting for the
+        whole result set.
+
+        Parameters
+        ----------
+        workers : number of concurrent requests.
+        pageSize : number of results per request.
+        **keys : search facets, as for search. Values are lists.
+
+        Returns
+        -------
+        generator of esgfFile objects.
+        """
+        keys = dict(keys)
+        st = self._searchString(keys, skip=["limit", "offset"])
+        limit, offset = [keys[k][0] if isinstance(keys[k], (list, tuple)) else keys[k]
+                         for k in ["limit", "offset"]]
+        for page in self.iterPages(st, limit=limit, offset=offset, workers=workers, pageSize=pageSize):
+            for f in self._iterFiles(page):
+                yield f
+
 
 class esgfFiles(object):
     def __init__(self, files, parent, mapping=None,
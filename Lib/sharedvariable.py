@@ -0,0 +1,176 @@
+"""
+TransientVariables in shared memory, for multiprocessing workers.
+
+Pickling a TransientVariable to send it to a worker process copies its data
+and mask. A SharedVariable copies them once into shared memory blocks; the
+handle itself only carries the block names and the variable header (axes,
+grid and attributes), and each worker rebuilds a TransientVariable on top of
+the shared blocks without copying:
+
+    with var.share() as handle:
+        with concurrent.futures.ProcessPoolExecutor() as pool:
+            results = list(pool.map(analyse, [handle] * n))
+
+    def analyse(handle):
+        var = handle.attach()
+        ...
+
+The process which created the handle frees the memory (unlink or the with
+statement). The attached variables are views of the shared memory: writes
+to them are seen by every process, and the memory is only released once the
+last of them is gone.
+"""
+import weakref
+import numpy
+from .error import CDMSError
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:                     # Python < 3.8
+    shared_memory = None
+
+# Shared memory blocks mapped in this process, by name, and the number of
+# live arrays built on each. A block is unmapped once it is closed and its
+# last array is gone: numpy does not hold the buffer of the arrays.
+_attached = {}
+_users = {}
+_closing = set()
+
+
+def _release(name):
+    _users[name] -= 1
+    if _users[name] == 0 and name in _closing:
+        _unmap(name)
+
+
+def _unmap(name):
+    block = _attached.pop(name, None)
+    _users.pop(name, None)
+    _closing.discard(name)
+    if block is not None:
+        block.close()
+
+
+def _detach(name):
+    # Unmap the block now, or when its last array is gone
+    if name in _attached:
+        if _users.get(name, 0) > 0:
+            _closing.add(name)
+        else:
+            _unmap(name)
+
+
+def _openBlock(name):
+    try:
+        # Blocks are tracked by the process which created them
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:                   # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedVariable(object):
+    """Handle on a TransientVariable held in shared memory.
+
+    Parameters
+    ----------
+    variable : TransientVariable to copy into shared memory.
+
+    The handle is small when pickled, and can be passed to workers of
+    multiprocessing or concurrent.futures pools started by this process.
+    """
+
+    def __init__(self, variable):
+        if shared_memory is None:
+            raise CDMSError("Shared memory variables need Python 3.8 or later")
+        header, data, mask = variable.serialize()
+        self.header = header
+        self.shape = data.shape
+        self.dtype = data.dtype.str
+        self._blocks = []
+        self._owner = True
+        try:
+            self.dataname = self._create(data)
+            self.maskname = None if mask is None else self._create(mask)
+        except BaseException:
+            self.unlink()
+            raise
+
+    def _create(self, array):
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._blocks.append(block)
+        numpy.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        _attached[block.name] = block
+        return block.name
+
+    def __getstate__(self):
+        return {'header': self.header, 'shape': self.shape, 'dtype': self.dtype,
+                'dataname': self.dataname, 'maskname': self.maskname}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._blocks = []
+        self._owner = False
+
+    def _array(self, name, dtype):
+        block = _attached.get(name)
+        if block is None:
+            try:
+                block = _openBlock(name)
+            except (OSError, ValueError) as err:
+                raise CDMSError("Cannot attach shared variable %s: %s" % (self.header['id'], err))
+            _attached[name] = block
+        _closing.discard(name)
+        array = numpy.ndarray(self.shape, dtype, buffer=block.buf)
+        _users[name] = _users.get(name, 0) + 1
+        weakref.finalize(array, _release, name)
+        return array
+
+    def attach(self):
+        """Return a TransientVariable built on the shared data and mask, without copying.
+
+        Returns
+        -------
+        TransientVariable with the axes, grid and attributes of the shared variable.
+        """
+        from .tvariable import _restoreTransientVariable
+        data = self._array(self.dataname, numpy.dtype(self.dtype))
+        mask = None
+        if self.maskname is not None:
+            mask = self._array(self.maskname, numpy.ma.MaskType)
+        return _restoreTransientVariable(self.header, data, mask)
+
+    def close(self):
+        """Detach this process from the shared memory.
+
+        The memory stays mapped as long as variables returned by attach are in use.
+        """
+        for name in [self.dataname, self.maskname]:
+            if name is not None and not any(block.name == name for block in self._blocks):
+                _detach(name)
+
+    def unlink(self):
+        """Free the shared memory. Only the process which created the handle can do it.
+
+        The memory is released once the attached variables of every process are gone.
+        """
+        if not self._owner:
+            raise CDMSError("Shared variable %s was created by another process" % self.header['id'])
+        for block in self._blocks:
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+            _detach(block.name)
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if self._owner:
+            self.unlink()
+        else:
+            self.close()
+
+    def __repr__(self):
+        return "<SharedVariable %s, shape %s, dtype %s>" % (self.header['id'], repr(self.shape), self.dtype)
@@ -0,0 +1,462 @@
+"""
+Spatial index of the points of curvilinear and generic grids.
+
+The bin index of the bindex module keeps its bin sizes in global variables
+of the C extension, and is rebuilt for every grid object. A SpatialIndex
+holds all its state in numpy arrays which are not modified once built, so
+it can be shared by threads, and by grids which have the same coordinates:
+getSpatialIndex looks up the indices by a fingerprint of the latitudes and
+longitudes, in an in-memory LRU. Two structures are kept:
+
+- the points sorted by latitude, for lat-lon region intersections, and
+- an octree of the points on the unit sphere, for nearest neighbour
+  queries and point-in-cell lookups, built by the first such query.
+
+All queries are vectorized over the query points.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy
+from .error import CDMSError
+
+_memory_max_size = 16                   # Number of indices kept in memory
+
+_indices = OrderedDict()
+_lock = threading.RLock()
+_stats = {'hits': 0, 'misses': 0}
+
+# Target number of points in a cell of the unit sphere hash
+_pointsPerCell = 4
+
+# Number of (query, candidate) pairs handled at a time
+_blockSize = 1 << 20
+
+
+def setSpatialIndexCacheSize(value):
+    """Set the number of spatial indices kept in memory.
+
+    Parameters
+    ----------
+    value : int >= 0. 0 disables the cache.
+
+    Returns
+    -------
+    No return value.
+    """
+    global _memory_max_size
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise CDMSError("setSpatialIndexCacheSize value must be a non-negative integer")
+    with _lock:
+        _memory_max_size = value
+        _evict()
+
+
+def getSpatialIndexCacheSize():
+    """Return the number of spatial indices kept in memory."""
+    return _memory_max_size
+
+
+def clearSpatialIndexCache():
+    """Empty the spatial index cache."""
+    with _lock:
+        _indices.clear()
+        for key in _stats:
+            _stats[key] = 0
+
+
+def getSpatialIndexCacheStats():
+    """Return a dictionary of cache hits and misses."""
+    return dict(_stats)
+
+
+def _evict():
+    while len(_indices) > _memory_max_size:
+        _indices.popitem(last=False)
+
+
+def _asFlat(values):
+    return numpy.ravel(numpy.ma.filled(numpy.ma.asarray(values, dtype=numpy.float64), numpy.nan))
+
+
+def fingerprint(lat, lon):
+    """Return the cache key of the points (lat[i], lon[i])."""
+    h = hashlib.sha1()
+    for values in lat, lon:
+        values = numpy.ascontiguousarray(_asFlat(values))
+        h.update(str(values.shape).encode())
+        h.update(values.tobytes())
+    return h.hexdigest()
+
+
+def getSpatialIndex(lat, lon):
+    """Return the spatial index of a set of points, from the cache if possible.
+
+    Parameters
+    ----------
+    lat, lon : arrays of the same size, latitudes and longitudes of the
+               points in degrees. Masked and non-finite points are not
+               indexed.
+
+    Returns
+    -------
+    SpatialIndex.
+    """
+    key = fingerprint(lat, lon)
+    with _lock:
+        index = _indices.get(key)
+        if index is not None:
+            _indices.move_to_end(key)
+            _stats['hits'] += 1
+            return index
+        _stats['misses'] += 1
+    index = SpatialIndex(lat, lon)
+    with _lock:
+        if _memory_max_size > 0:
+            # another thread may have built the same index meanwhile
+            index = _indices.setdefault(key, index)
+            _indices.move_to_end(key)
+            _evict()
+    return index
+
+
+def _toXYZ(lat, lon):
+    lat = numpy.radians(lat)
+    lon = numpy.radians(lon)
+    coslat = numpy.cos(lat)
+    return numpy.stack([coslat * numpy.cos(lon), coslat * numpy.sin(lon), numpy.sin(lat)], axis=-1)
+
+
+def _ranges(start, count):
+    # Concatenation of the ranges [start[i], start[i] + count[i]), and the
+    # position i of each element
+    owner = numpy.repeat(numpy.arange(len(count)), count)
+    first = numpy.cumsum(count) - count
+    return numpy.repeat(start - first, count) + numpy.arange(owner.size), owner
+
+
+class _Level(object):
+    # Cells of one level of the octree: integer coordinates, ranges of
+    # points and ranges of children in the level below
+
+    def __init__(self, ijk, start, end, childstart, childend):
+        self.ijk = ijk
+        self.start = start
+        self.end = end
+        self.childstart = childstart
+        self.childend = childend
+
+
+def _spread(v):
+    # Insert two zero bits between the bits of v < 2**21
+    v = (v | (v << 32)) & 0x1f00000000ffff
+    v = (v | (v << 16)) & 0x1f0000ff0000ff
+    v = (v | (v << 8)) & 0x100f00f00f00f00f
+    v = (v | (v << 4)) & 0x10c30c30c30c30c3
+    return (v | (v << 2)) & 0x1249249249249249
+
+
+def _morton(ijk):
+    # Morton code of integer cell coordinates
+    return (_spread(ijk[..., 0]) << 2) | (_spread(ijk[..., 1]) << 1) | _spread(ijk[..., 2])
+
+
+def _kthBound(owner, farthest, count, k, n):
+    # For each of n queries, the smallest distance within which the cells
+    # (owner, farthest point, number of points) hold k points, or inf
+    order = numpy.argsort(owner * 8. + farthest)
+    owner = owner[order]
+    count = count[order]
+    total = numpy.cumsum(count)
+    npairs = numpy.bincount(owner, minlength=n)
+    before = numpy.zeros(n, total.dtype)
+    used = npairs > 0
+    before[used] = (total - count)[(numpy.cumsum(npairs) - npairs)[used]]
+    reached = numpy.flatnonzero(total - before[owner] >= k)
+    bound = numpy.full(n, numpy.inf)
+    queries, firstReached = numpy.unique(owner[reached], return_index=True)
+    bound[queries] = farthest[order][reached[firstReached]]
+    return bound
+
+
+class SpatialIndex(object):
+    """Spatial index of a set of points on the sphere.
+
+    Indices returned by the queries are positions in the raveled lat and lon
+    arrays.
+    """
+
+    def __init__(self, lat, lon):
+        """
+        Parameters
+        ----------
+        lat, lon : arrays of the same size, latitudes and longitudes of the
+                   points in degrees. Masked and non-finite points are not
+                   indexed.
+        """
+        lat = _asFlat(lat)
+        lon = _asFlat(lon)
+        if lat.shape != lon.shape:
+            raise CDMSError("Latitude and longitude arrays must have the same size")
+        self.size = lat.size
+        valid = numpy.isfinite(lat) & numpy.isfinite(lon)
+        valid[valid] = numpy.abs(lat[valid]) <= 90.
+        points = numpy.flatnonzero(valid)
+        self._lat = lat
+        self._lon = numpy.where(valid, numpy.mod(numpy.where(valid, lon, 0.), 360.), numpy.nan)
+
+        # points sorted by latitude
+        self._latorder = points[numpy.argsort(lat[points], kind='mergesort')]
+        self._latsorted = lat[self._latorder]
+
+        # the octree is built by the first nearest or locate query
+        self._points = points
+        self._levels = None
+        self._octreeLock = threading.Lock()
+
+    def _buildOctree(self):
+        with self._octreeLock:
+            if self._levels is not None:
+                return
+            # points sorted by the Morton code of their cell, of side h, on
+            # the unit sphere: the points of a cell of any level are contiguous
+            points = self._points
+            xyz = _toXYZ(self._lat[points], self._lon[points])
+            h = 2.
+            if len(points) > _pointsPerCell:
+                h = numpy.sqrt(4. * numpy.pi * _pointsPerCell / len(points))
+                ncells = len(numpy.unique(_morton(self._cells(xyz, h))))
+                # regional grids use a fraction of the cells
+                if len(points) > 2 * _pointsPerCell * ncells:
+                    h *= numpy.sqrt(_pointsPerCell * ncells / float(len(points)))
+            self._h = h
+            self._m = int(numpy.floor(2. / h)) + 1
+            ijk = self._cells(xyz, h)
+            keys = _morton(ijk)
+            order = numpy.argsort(keys, kind='mergesort')
+            self._order = order
+            self._xyz = xyz[order]
+            keys = keys[order]
+            first = numpy.flatnonzero(numpy.diff(keys, prepend=keys[:1] - 1))
+            self._cellkeys = keys[first]
+
+            # octree levels, from the cells of side h to at most 8 cells: the
+            # cells, their points and their children in the level below
+            level = _Level(ijk[order][first], first, numpy.append(first[1:], len(keys)), None, None)
+            levels = [level]
+            while len(level.ijk) > 8:
+                parents = level.ijk >> 1
+                codes = _morton(parents)
+                first = numpy.flatnonzero(numpy.diff(codes, prepend=codes[:1] - 1))
+                children = numpy.append(first[1:], len(codes))
+                level = _Level(parents[first], level.start[first], numpy.append(level.start[first[1:]], len(keys)),
+                               first, children)
+                levels.append(level)
+            # set last, queries in other threads test it without the lock
+            self._levels = levels
+
+    def _cells(self, xyz, h):
+        return numpy.floor((xyz + 1.) / h).astype(numpy.int64)
+
+    def intersect(self, latspec=None, lonspec=None):
+        """Return the points in a lat-lon region.
+
+        Parameters
+        ----------
+        latspec, lonspec : latitude and longitude specifications as defined in
+                           the grid module, (start, end, 'cc'), or None for
+                           the full range.
+
+        Returns
+        -------
+        sorted array of the indices of the points in the region.
+        """
+        if latspec is None:
+            slat, elat, latopt = -90., 90., 'cc'
+        else:
+            slat, elat, latopt = latspec[0], latspec[1], latspec[2]
+        if slat > elat:
+            slat, elat = elat, slat
+        lo = numpy.searchsorted(self._latsorted, slat, side='left' if latopt[0] == 'c' else 'right')
+        hi = numpy.searchsorted(self._latsorted, elat, side='right' if latopt[1] == 'c' else 'left')
+        points = self._latorder[lo:hi]
+
+        if lonspec is not None and abs(lonspec[1] - lonspec[0]) < 360.:
+            slon, elon, lonopt = lonspec[0], lonspec[1], lonspec[2]
+            if slon > elon:
+                slon, elon = elon, slon
+            width = elon - slon
+            if width == 0. and 'o' in lonopt:
+                return numpy.zeros(0, numpy.int64)
+            offset = numpy.mod(self._lon[points] - slon, 360.)
+            inside = (offset < width) if lonopt[1] == 'o' else (offset <= width)
+            if lonopt[0] == 'o':
+                inside &= (offset > 0.)
+            points = points[inside]
+        return numpy.sort(points)
+
+    def nearest(self, lat, lon, k=1):
+        """Find the nearest points of a set of locations.
+
+        Parameters
+        ----------
+        lat, lon : latitudes and longitudes of the locations, in degrees.
+        k : number of neighbours.
+
+        Returns
+        -------
+        (distance, index) arrays, of the shape of lat followed by k unless k
+        is 1. distance is the great circle distance in degrees, in
+        increasing order. Missing neighbours have the index -1 and the
+        distance inf.
+        """
+        if self._levels is None:
+            self._buildOctree()
+        lat = numpy.asarray(lat, dtype=numpy.float64)
+        shape = lat.shape
+        query = _toXYZ(lat.ravel(), numpy.ravel(numpy.asarray(lon, dtype=numpy.float64)))
+        if query.shape[0] != lat.size:
+            raise CDMSError("Latitude and longitude arrays must have the same size")
+        chord = numpy.full((query.shape[0], k), numpy.inf)
+        index = numpy.full((query.shape[0], k), -1, numpy.int64)
+
+        valid = numpy.isfinite(query).all(axis=-1)
+        valid[valid] = numpy.abs(lat.ravel()[valid]) <= 90.
+        pending = numpy.flatnonzero(valid)
+        if len(self._points) == 0:
+            pending = pending[:0]
+        # about k points are within sqrt(k / (pi * _pointsPerCell)) cells
+        radius = int(numpy.ceil(numpy.sqrt(k / (numpy.pi * _pointsPerCell)) + 0.5))
+        if len(pending) > 0 and (2 * radius) ** 3 < len(self._cellkeys):
+            done = self._nearest(query, pending, k, radius, chord, index)
+            pending = pending[~done]
+        if len(pending) > 0:
+            self._descend(query, pending, k, chord, index)
+
+        found = index >= 0
+        distance = numpy.full(chord.shape, numpy.inf)
+        distance[found] = numpy.degrees(2. * numpy.arcsin(numpy.minimum(chord[found] / 2., 1.)))
+        index[found] = self._points[self._order[index[found]]]
+        if k == 1:
+            return distance.reshape(shape), index.reshape(shape)
+        return distance.reshape(shape + (k,)), index.reshape(shape + (k,))
+
+    def _nearest(self, query, pending, k, radius, chord, index):
+        # Search the cube of 2 * radius cells around each pending query.
+        # Returns the queries whose k nearest points are found.
+        span = numpy.arange(-radius, radius)
+        offsets = numpy.stack(numpy.meshgrid(span, span, span, indexing='ij'), axis=-1).reshape((-1, 3))
+        level = self._levels[0]
+        done = numpy.zeros(len(pending), numpy.bool_)
+        step = max(1, _blockSize // (len(offsets) * max(k, _pointsPerCell)))
+        for first in range(0, len(pending), step):
+            block = pending[first:first + step]
+            position = (query[block] + 1.) / self._h
+            corner = numpy.floor(position + 0.5).astype(numpy.int64)
+            cells = corner[:, numpy.newaxis, :] + offsets
+            valid = ((cells >= 0) & (cells < self._m)).all(axis=-1)
+            keys = _morton(numpy.where(valid[..., numpy.newaxis], cells, 0))
+            pos = numpy.minimum(numpy.searchsorted(self._cellkeys, keys), len(self._cellkeys) - 1)
+            found = valid & (self._cellkeys[pos] == keys)
+            start = numpy.where(found, level.start[pos], 0).ravel()
+            count = numpy.where(found, level.end[pos] - level.start[pos], 0).ravel()
+            candidates, owner = _ranges(start, count)
+            self._keepNearest(query, block, owner // len(offsets), candidates, k, chord, index)
+
+            # all the points closer than the faces of the cube are found
+            below = numpy.where(corner - radius <= 0, numpy.inf, position - (corner - radius))
+            above = numpy.where(corner + radius >= self._m, numpy.inf, (corner + radius) - position)
+            bound = numpy.minimum(below, above).min(axis=-1) * self._h
+            done[first:first + step] = chord[block, k - 1] <= bound
+        return done
+
+    def _descend(self, query, pending, k, chord, index):
+        # Walk down the octree, keeping for each query the cells which may
+        # hold one of its k nearest points
+        top = len(self._levels) - 1
+        ntop = len(self._levels[top].ijk)
+        step = max(1, _blockSize // 1024)
+        for first in range(0, len(pending), step):
+            block = pending[first:first + step]
+            owner = numpy.repeat(numpy.arange(len(block)), ntop)
+            cells = numpy.tile(numpy.arange(ntop), len(block))
+            for depth in range(top, -1, -1):
+                level = self._levels[depth]
+                size = self._h * (1 << depth)
+                q = query[block][owner]
+                lower = level.ijk[cells] * size - 1.
+                below = lower - q
+                above = q - (lower + size)
+                nearest = numpy.sqrt((numpy.maximum(numpy.maximum(below, above), 0.) ** 2).sum(axis=-1))
+                farthest = numpy.sqrt((numpy.maximum(-below, -above) ** 2).sum(axis=-1))
+                count = level.end[cells] - level.start[cells]
+                bound = _kthBound(owner, farthest, count, k, len(block))
+                keep = nearest <= bound[owner]
+                owner, cells = owner[keep], cells[keep]
+                if depth > 0:
+                    cells, position = _ranges(level.childstart[cells], level.childend[cells] - level.childstart[cells])
+                    owner = owner[position]
+            level = self._levels[0]
+            candidates, position = _ranges(level.start[cells], level.end[cells] - level.start[cells])
+            self._keepNearest(query, block, owner[position], candidates, k, chord, index)
+
+    def _keepNearest(self, query, block, owner, candidates, k, chord, index):
+        # Record the k nearest candidates of each query of the block. owner,
+        # the position of the query in the block, is sorted.
+        distance = numpy.sqrt(((self._xyz[candidates] - query[block][owner]) ** 2).sum(axis=-1))
+        # the distances are less than 4
+        order = numpy.argsort(owner * 4. + distance)
+        ncandidates = numpy.bincount(owner, minlength=len(block))
+        rank = numpy.arange(len(owner)) - numpy.repeat(numpy.cumsum(ncandidates) - ncandidates, ncandidates)
+        keep = rank < k
+        rows = block[owner[keep]]
+        order = order[keep]
+        chord[rows, rank[keep]] = distance[order]
+        index[rows, rank[keep]] = candidates[order]
+
+    def locate(self, lat, lon, latBounds, lonBounds, k=8):
+        """Find the cells which contain a set of locations.
+
+        Parameters
+        ----------
+        lat, lon : latitudes and longitudes of the locations, in degrees.
+        latBounds, lonBounds : latitudes and longitudes of the vertices of the
+                               cells, of shape (number of points, number of
+                               vertices), in order around each cell.
+        k : number of cells, with the nearest centres, searched for each
+            location.
+
+        Returns
+        -------
+        array of the shape of lat, index of the cell containing each
+        location, or -1.
+        """
+        latBounds = numpy.ma.filled(numpy.ma.asarray(latBounds, dtype=numpy.float64), numpy.nan)
+        lonBounds = numpy.ma.filled(numpy.ma.asarray(lonBounds, dtype=numpy.float64), numpy.nan)
+        nvertices = latBounds.shape[-1]
+        latBounds = latBounds.reshape((-1, nvertices))
+        lonBounds = lonBounds.reshape((-1, nvertices))
+        if latBounds.shape[0] != self.size or lonBounds.shape != latBounds.shape:
+            raise CDMSError("Cell bounds must have one row of vertices per point")
+
+        lat = numpy.asarray(lat, dtype=numpy.float64)
+        shape = lat.shape
+        query = _toXYZ(lat.ravel(), numpy.ravel(numpy.asarray(lon, dtype=numpy.float64)))
+        k = max(1, min(k, len(self._points)))
+        index = self.nearest(lat.ravel(), numpy.ravel(lon), k)[1].reshape((-1, k))
+        result = numpy.full(len(query), -1, numpy.int64)
+        step = max(1, _blockSize // (k * nvertices))
+        for first in range(0, len(query), step):
+            cells = index[first:first + step]
+            q = query[first:first + step, numpy.newaxis, numpy.newaxis, :]
+            vertices = _toXYZ(latBounds[cells], lonBounds[cells])
+            # the location is on the inner side of every edge, a great circle
+            edges = numpy.cross(vertices, numpy.roll(vertices, -1, axis=-2))
+            side = (edges * q).sum(axis=-1)
+            eps = 1.e-12
+            inside = ((side >= -eps).all(axis=-1) | (side <= eps).all(axis=-1)) & \
+                ((vertices * q).sum(axis=-1) > 0.).all(axis=-1) & (cells >= 0) & \
+                numpy.isfinite(side).all(axis=-1)
+            hit = inside.any(axis=-1)
+            result[first:first + step] = numpy.where(hit, cells[numpy.arange(len(cells)), inside.argmax(axis=-1)], -1)
+        return result.reshape(shape)
@@ -0,0 +1,173 @@
+"""
+Buffered writer for time series appended step by step.
+
+CdmsFile.write, called once per time step with an extensible time axis,
+searches the whole time axis of the file for the write position, writes
+the time values and bounds of the step, and syncs the file. Appending many
+small steps gets slower as the file grows. A StreamWriter keeps the time
+steps in memory, writes them in blocks of `buffersize` steps, and tracks
+the write position itself:
+
+    with f.createStreamWriter('tas', buffersize=240) as w:
+        for step in steps:
+            w.append(step)
+
+The file is synced only by flush() and close().
+"""
+import numpy
+from .axis import TransientAxis, isOverlapVector
+from .grid import AbstractRectGrid
+from .tvariable import TransientVariable, asVariable
+from .error import CDMSError
+
+WriterClosed = "Cannot append to a closed stream writer, variable: "
+
+
+class StreamWriter(object):
+    """Append time steps of a variable to a file, in blocks.
+
+    Parameters
+    ----------
+    file : CdmsFile open for writing.
+    id : name of the variable in the file. Default is the id of the first
+         appended variable.
+    buffersize : number of time steps kept in memory before they are written.
+    **keywords : passed to CdmsFile.write when the variable is created, e.g.
+                 attributes, fill_value, dtype, chunksizes, deflate_level.
+
+    The first axis of the appended variables is the extensible (time) axis.
+    Its values must increase from one append to the next.
+    """
+
+    def __init__(self, file, id=None, buffersize=100, **keywords):
+        if file._mode_ == 'r':
+            raise CDMSError("File %s is open read-only" % file.id)
+        if not isinstance(buffersize, int) or buffersize < 1:
+            raise CDMSError("buffersize must be a positive integer")
+        for key in ('pack', 'extend', 'index', 'axes', 'extbounds'):
+            if key in keywords:
+                raise CDMSError("StreamWriter does not support the %s keyword" % key)
+        self.file = file
+        self.id = id
+        self.buffersize = buffersize
+        self.keywords = keywords
+        self._buffer = []               # (data, times, bounds) of each append
+        self._nbuffered = 0
+        self._var = None                # file variable and its time axis
+        self._time = None
+        self._index = None              # next index in the time axis
+        self._last = None               # last time value appended
+        self._closed = False
+        if id is not None and id in file.variables:
+            self._attach(file.variables[id])
+
+    def _attach(self, var):
+        self._var = var
+        self._time = var.getAxis(0)
+        self._index = len(self._time)
+        if self._index > 0:
+            self._last = self._time[self._index - 1]
+
+    def append(self, var):
+        """Buffer one or more time steps.
+
+        Parameters
+        ----------
+        var : variable whose first axis is the time axis, holding the steps to append.
+
+        Returns
+        -------
+        No return value.
+        """
+        if self._closed:
+            raise CDMSError(WriterClosed + str(self.id))
+        var = asVariable(var, writeable=0)
+        if var.rank() == 0:
+            raise CDMSError("Cannot append a scalar, variable: " + str(var.id))
+        if self.id is None:
+            self.id = var.id
+            if self.id in self.file.variables:
+                self._attach(self.file.variables[self.id])
+        axis = var.getAxis(0)
+        times = numpy.array(axis[:])
+        if self._last is not None and times[0] <= self._last:
+            raise CDMSError("Time values of %s must increase: %s follows %s" %
+                            (self.id, repr(times[0]), repr(self._last)))
+        self._last = times[-1]
+        self._buffer.append((var, times, axis.getBounds()))
+        self._nbuffered += len(times)
+        if self._nbuffered >= self.buffersize:
+            self._write()
+
+    def _block(self):
+        # Concatenate the buffered steps
+        data = numpy.ma.concatenate([numpy.ma.asarray(item[0]) for item in self._buffer])
+        times = numpy.concatenate([item[1] for item in self._buffer])
+        bounds = [item[2] for item in self._buffer]
+        if any(b is None for b in bounds):
+            bounds = None
+        else:
+            bounds = numpy.concatenate(bounds)
+        return data, times, bounds
+
+    def _write(self):
+        if self._nbuffered == 0:
+            return
+        data, times, bounds = self._block()
+        if self._var is None:
+            self._create(data, times, bounds)
+        else:
+            n = len(times)
+            index = self._index
+            self._var[index:index + n] = data.astype(self._var.dtype)
+            self._time[index:index + n] = times.astype(self._time.typecode())
+            if bounds is not None:
+                self._time.setBounds(bounds, persistent=1, index=index)
+            self._index = index + n
+        self._buffer = []
+        self._nbuffered = 0
+
+    def _create(self, data, times, bounds):
+        # First block: CdmsFile.write defines the variable, time axis and bounds
+        first = self._buffer[0][0]
+        axis = first.getAxis(0)
+        time = TransientAxis(times, bounds, id=axis.id, attributes=axis.attributes)
+        grid = first.getGrid()
+        if isinstance(grid, AbstractRectGrid):
+            grid = None
+        block = TransientVariable(data, axes=[time] + first.getAxisList()[1:], grid=grid,
+                                  attributes=first.attributes, id=self.id)
+        index = 0
+        fileaxis = self.file.axes.get(time.id)
+        if fileaxis is not None and len(fileaxis) > 0:
+            # Time axis shared with other variables of the file: search it once
+            isoverlap, index = isOverlapVector(times, fileaxis[:])
+            if not isoverlap:
+                raise CDMSError("Time values of %s do not overlap the time axis %s of the file" %
+                                (self.id, time.id))
+        var = self.file.write(block, id=self.id, extend=1, index=index, **self.keywords)
+        self._var = var
+        self._time = var.getAxis(0)
+        self._index = index + len(times)
+
+    def flush(self):
+        """Write the buffered time steps, and sync the file."""
+        if self._closed:
+            raise CDMSError(WriterClosed + str(self.id))
+        self._write()
+        self.file.sync()
+
+    def close(self):
+        """Flush the writer. The file itself is left open."""
+        if not self._closed:
+            self.flush()
+            self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "<StreamWriter %s, %d buffered time steps>" % (self.id, self._nbuffered)
@@ -0,0 +1,239 @@
+"""
+Vectorized relative time conversion.
+
+Converting a time axis value by value through cdtime.reltime(...).tocomp(...)
+parses the units string and runs the calendar arithmetic once per value.
+The functions here convert whole arrays at once for the proleptic gregorian,
+mixed gregorian/julian (dates after the 1582-10-15 changeover only), noleap,
+360_day and julian calendars, and for units of seconds, minutes, hours, days
+and weeks.
+
+Each function returns None when it cannot handle its arguments (month or year
+units, climatological calendars, dates before year 1 or before the mixed
+calendar changeover), and the caller falls back to cdtime. The reference time
+of the units is decoded by cdtime itself.
+"""
+import re
+import numpy
+import cdtime
+
+_secondsPerDay = 86400.
+
+# Length of the units, in seconds
+_unitSeconds = {
+    's': 1., 'sec': 1., 'secs': 1., 'second': 1., 'seconds': 1.,
+    'mn': 60., 'min': 60., 'mins': 60., 'minute': 60., 'minutes': 60.,
+    'h': 3600., 'hr': 3600., 'hrs': 3600., 'hour': 3600., 'hours': 3600.,
+    'd': 86400., 'day': 86400., 'days': 86400.,
+    'week': 604800., 'weeks': 604800.,
+}
+
+_calendarNames = {
+    cdtime.GregorianCalendar: 'gregorian',
+    cdtime.MixedCalendar: 'mixed',
+    cdtime.NoLeapCalendar: 'noleap',
+    cdtime.Calendar360: '360_day',
+    cdtime.JulianCalendar: 'julian',
+}
+
+# Cumulative days before each month of a non-leap year
+_cumDays = numpy.array([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334], numpy.int64)
+
+_unitsPattern = re.compile(r'\s*(\w+)\s+since\s+', re.IGNORECASE)
+_references = {}
+
+
+def _gregorianDays(y, m, d):
+    # Days since 1970-01-01 in the proleptic gregorian calendar
+    y = y - (m <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * numpy.where(m > 2, m - 3, m + 9) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _gregorianDate(z):
+    z = z + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    d = doy - (153 * mp + 2) // 5 + 1
+    m = numpy.where(mp < 10, mp + 3, mp - 9)
+    return yoe + era * 400 + (m <= 2), m, d
+
+
+def _julianDays(y, m, d):
+    # Days since 0000-03-01 in the julian calendar
+    y = y - (m <= 2)
+    era = y // 4
+    yoe = y - era * 4
+    doy = (153 * numpy.where(m > 2, m - 3, m + 9) + 2) // 5 + d - 1
+    return era * 1461 + yoe * 365 + doy
+
+
+def _julianDate(z):
+    era = z // 1461
+    doe = z - era * 1461
+    yoe = numpy.minimum(doe // 365, 3)
+    doy = doe - yoe * 365
+    mp = (5 * doy + 2) // 153
+    d = doy - (153 * mp + 2) // 5 + 1
+    m = numpy.where(mp < 10, mp + 3, mp - 9)
+    return yoe + era * 4 + (m <= 2), m, d
+
+
+def _noleapDays(y, m, d):
+    return y * 365 + _cumDays[m - 1] + d - 1
+
+
+def _noleapDate(z):
+    y = z // 365
+    doy = z - y * 365
+    m = numpy.searchsorted(_cumDays, doy, side='right')
+    return y, m, doy - _cumDays[m - 1] + 1
+
+
+def _days360(y, m, d):
+    return y * 360 + (m - 1) * 30 + d - 1
+
+
+def _date360(z):
+    y = z // 360
+    doy = z - y * 360
+    return y, doy // 30 + 1, doy % 30 + 1
+
+
+# Day number of the first day of the gregorian calendar, 1582-10-15
+_changeover = int(_gregorianDays(numpy.int64(1582), numpy.int64(10), numpy.int64(15)))
+
+_dayFunctions = {
+    'gregorian': (_gregorianDays, _gregorianDate),
+    'mixed': (_gregorianDays, _gregorianDate),
+    'julian': (_julianDays, _julianDate),
+    'noleap': (_noleapDays, _noleapDate),
+    '360_day': (_days360, _date360),
+}
+
+
+def _reference(units, calendar):
+    # Return (unit length in seconds, reference day number, reference seconds
+    # in the day, calendar name), or None if not supported
+    key = (units, calendar)
+    if key not in _references:
+        result = None
+        name = _calendarNames.get(calendar)
+        match = _unitsPattern.match(units)
+        scale = _unitSeconds.get(match.group(1).lower()) if match else None
+        if name is not None and scale is not None:
+            try:
+                c = cdtime.reltime(0, units).tocomp(calendar)
+                toDays = _dayFunctions[name][0]
+                day = int(toDays(numpy.int64(c.year), numpy.int64(c.month), numpy.int64(c.day)))
+                if c.year >= 1 and not (name == 'mixed' and day < _changeover):
+                    result = (scale, day, c.hour * 3600. + c.minute * 60. + c.second, name)
+            except Exception:
+                result = None
+        _references[key] = result
+    return _references[key]
+
+
+def _absolute(values, ref):
+    # Day numbers and seconds in the day of the values
+    scale, day, seconds, name = ref
+    t = numpy.asarray(values, numpy.float64) * scale + seconds
+    days = numpy.floor(t / _secondsPerDay)
+    seconds = numpy.round(t - days * _secondsPerDay, 6)
+    carry = seconds >= _secondsPerDay
+    days = days.astype(numpy.int64) + day + carry
+    seconds = numpy.where(carry, seconds - _secondsPerDay, seconds)
+    return days, seconds
+
+
+def _valid(days, name):
+    # True if the day numbers can be converted without cdtime
+    if days.size == 0:
+        return True
+    if name == 'mixed' and days.min() < _changeover:
+        return False
+    year = _dayFunctions[name][1](numpy.array([days.min()]))[0]
+    return year[0] >= 1
+
+
+def components(values, units, calendar):
+    """Convert relative times to component times.
+
+    Parameters
+    ----------
+    values : array of times, relative to units.
+    units : string of the form "<unit> since <date>".
+    calendar : cdtime calendar.
+
+    Returns
+    -------
+    (year, month, day, hour, minute, second) arrays, second is floating
+    point, or None if the conversion is not supported.
+    """
+    ref = _reference(units, calendar)
+    if ref is None:
+        return None
+    days, seconds = _absolute(values, ref)
+    if not _valid(days, ref[3]):
+        return None
+    year, month, day = _dayFunctions[ref[3]][1](days)
+    hour = (seconds // 3600.).astype(numpy.int64)
+    minute = ((seconds - hour * 3600.) // 60.).astype(numpy.int64)
+    second = seconds - hour * 3600. - minute * 60.
+    return year, month, day, hour, minute, second
+
+
+def rescale(values, units, calendar, newunits, newcalendar=None):
+    """Convert relative times to other units, possibly in another calendar.
+
+    As cdtime.reltime(value, units).tocomp(calendar).torel(newunits, newcalendar),
+    the component times in calendar are taken as times in newcalendar.
+
+    Returns
+    -------
+    array of floating point times relative to newunits, or None if the
+    conversion is not supported.
+    """
+    if newcalendar is None:
+        newcalendar = calendar
+    ref = _reference(units, calendar)
+    newref = _reference(newunits, newcalendar)
+    if ref is None or newref is None:
+        return None
+    days, seconds = _absolute(values, ref)
+    if not _valid(days, ref[3]):
+        return None
+    if ref[3] != newref[3] and not (ref[3] in ['gregorian', 'mixed'] and newref[3] in ['gregorian', 'mixed']):
+        year, month, day = _dayFunctions[ref[3]][1](days)
+        days = _dayFunctions[newref[3]][0](year, month, day)
+        # dates which do not exist in the new calendar are left to cdtime
+        if not numpy.array_equal(_dayFunctions[newref[3]][1](days)[2], day):
+            return None
+    if newref[3] == 'mixed' and days.size and days.min() < _changeover:
+        return None
+    scale, day, seconds0, name = newref
+    return ((days - day) * _secondsPerDay + (seconds - seconds0)) / scale
+
+
+def datetime64(values, units, calendar):
+    """Convert relative times to an array of numpy.datetime64 (microseconds).
+
+    Returns
+    -------
+    datetime64 array, or None if the calendar is not a gregorian one or the
+    conversion is not supported.
+    """
+    ref = _reference(units, calendar)
+    if ref is None or ref[3] not in ['gregorian', 'mixed']:
+        return None
+    days, seconds = _absolute(values, ref)
+    if not _valid(days, ref[3]):
+        return None
+    micro = days * 86400000000 + numpy.round(seconds * 1.e6).astype(numpy.int64)
+    return micro.astype('datetime64[us]')
@@ -17,10 +17,11 @@ from numpy import sctype2char
 from .error import CDMSError
 from .avariable import AbstractVariable
 
-from .axis import createAxis, AbstractAxis
+from .axis import createAxis, AbstractAxis, TransientAxis
 from .grid import createRectGrid, AbstractRectGrid
 from .hgrid import AbstractCurveGrid
 from .gengrid import AbstractGenericGrid
+from .sharedvariable import SharedVariable
 from six import string_types, PY2
 
 # dist array support
@@ -79,6 +80,70 @@ def fromJSON(jsn):
     return V
 
 
+def _axisState(axis):
+    return {'id': axis.id,
+            'values': numpy.ascontiguousarray(axis[:]),
+            'bounds': axis.getExplicitBounds(),
+            'attributes': dict(axis.attributes)}
+
+
+def _restoreAxis(state):
+    axis = createAxis(state['values'], state['bounds'], id=state['id'])
+    for k, v in state['attributes'].items():
+        setattr(axis, k, v)
+        axis.attributes[k] = v
+    return axis
+
+
+def _gridState(grid):
+    # Rectilinear grids are rebuilt from the axes
+    if grid is None or isinstance(grid, AbstractRectGrid):
+        return None
+    if isinstance(grid, AbstractCurveGrid):
+        kind = 'curve'
+    elif isinstance(grid, AbstractGenericGrid):
+        kind = 'generic'
+    else:
+        return None
+    coords = []
+    for c in grid.getLatitude(), grid.getLongitude():
+        coords.append({'id': c.id,
+                       'values': numpy.ascontiguousarray(numpy.ma.filled(c)),
+                       'bounds': c.getBounds(),
+                       'attributes': dict(c.attributes),
+                       'axes': [a.id for a in c.getAxisList()]})
+    return {'kind': kind, 'id': grid.id, 'coords': coords}
+
+
+def _restoreGrid(state, axes):
+    from .coord import TransientAxis2D
+    from .auxcoord import TransientAuxAxis1D
+    from .hgrid import TransientCurveGrid
+    from .gengrid import TransientGenericGrid
+    byid = dict((a.id, a) for a in axes)
+    coords = []
+    for c in state['coords']:
+        cls = TransientAxis2D if state['kind'] == 'curve' else TransientAuxAxis1D
+        coords.append(cls(c['values'], axes=[byid[i] for i in c['axes']],
+                          attributes=c['attributes'], id=c['id'], bounds=c['bounds']))
+    if state['kind'] == 'curve':
+        return TransientCurveGrid(coords[0], coords[1], id=state['id'])
+    return TransientGenericGrid(coords[0], coords[1], id=state['id'])
+
+
+def _restoreTransientVariable(header, data, mask):
+    """Rebuild a TransientVariable from its serialized state, without copying data."""
+    axes = [_restoreAxis(a) for a in header['axes']]
+    grid = None
+    if header['grid'] is not None:
+        grid = _restoreGrid(header['grid'], axes)
+    if mask is None:
+        mask = numpy.ma.nomask
+    return TransientVariable(data, mask=mask, copy=0, axes=axes, grid=grid,
+                             attributes=header['attributes'], id=header['id'],
+                             fill_value=header['fill_value'])
+
+
 class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
     "An in-memory variable."
     variable_count = 0
@@ -286,36 +351,81 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
     missing_value = property(_getmissing, _setmissing)
 
     # Pickling
+    def serialize(self):
+        """Return the serialized state of the variable.
+
+        Returns
+        -------
+        (header, data, mask): header is a small dictionary of axes, grid and
+        attributes, data and mask are C contiguous arrays (mask is None if
+        nothing is masked). The arrays are views of the variable when possible.
+        """
+        attributes = dict((k, v) for k, v in self.attributes.items()
+                          if k != "autoApiInfo")
+        header = {'id': self.id,
+                  'attributes': attributes,
+                  'fill_value': self.fill_value,
+                  'axes': [_axisState(a) for a in self.getAxisList()],
+                  'grid': _gridState(self.getGrid())}
+        data = numpy.ascontiguousarray(numpy.ma.getdata(self))
+        mask = numpy.ma.getmask(self)
+        if mask is numpy.ma.nomask or not mask.any():
+            mask = None
+        else:
+            mask = numpy.ascontiguousarray(mask)
+        return header, data, mask
+
+    def share(self):
+        """Copy the data and mask of the variable to shared memory.
+
+        Returns
+        -------
+        SharedVariable handle, which workers of a multiprocessing pool attach
+        to without copying the data. See cdms2.sharedvariable.
+        """
+        return SharedVariable(self)
+
+    def __reduce_ex__(self, protocol):
+        # Data and mask are pickled as arrays, so that pickle protocol 5 can
+        # send them out of band, without copies.
+        if type(self) is TransientVariable:
+            return (_restoreTransientVariable, self.serialize())
+        return numpy.ma.MaskedArray.__reduce__(self)
+
     def __getstate__(self):
         """Return the internal state of the tvariable, for pickling
-        purposes.
+        purposes: the (header, data, mask) tuple of serialize().
 
         """
-        myjson = self.dumps().encode("utf-8")
-        state = zlib.compress(myjson)
-        return(state)
-        # return(self.dumps().encode("utf-8"))
+        return self.serialize()
 
     def __setstate__(self, state):
         """Restore the internal state of the tvariable, for
         pickling purposes.  ``state`` is typically the output of the
-        ``__getstate__`` output, and is a 5-tuple:
-
-        - json file from dumps()
+        ``__getstate__`` output: the (header, data, mask) tuple of
+        serialize(), or zlib compressed JSON from dumps() for
+        variables pickled by older versions.
 
         """
-        state2 = zlib.decompress(state)
-        (D, axes, attrs) = convertJSON(state2)
-        newvar = createVariable(D["_values"], id=D["id"], typecode=D["_dtype"],
-                                mask=D["_msk"], axes=axes, fill_value=D["_fill_value"], attributes=attrs)
+        if isinstance(state, bytes):
+            state2 = zlib.decompress(state)
+            (D, axes, attrs) = convertJSON(state2)
+            newvar = createVariable(D["_values"], id=D["id"], typecode=D["_dtype"],
+                                    mask=D["_msk"], axes=axes, fill_value=D["_fill_value"],
+                                    attributes=attrs)
+        else:
+            newvar = _restoreTransientVariable(*state)
 
         #
         # Pickle has already create an empty variable by calling __new__()
         # Reset the pickled Transient variable with the new data from nevar
         #
+        for k, v in newvar.__dict__.items():
+            if k not in self.__dict__:
+                self.__dict__[k] = v
         (_, shp, typ, isf, raw) = newvar.data.__reduce__()[2]
         state = (_, shp, typ, isf, raw,
-                 D["_msk"].tobytes('C'), D["_fill_value"])
+                 numpy.ma.getmaskarray(newvar).tobytes('C'), newvar.fill_value)
         super(TransientVariable, self).__setstate__(state)
 
         self.__dict__.update(newvar.__dict__)
@@ -369,7 +479,7 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
             mask = numpy.ma.masked.mask
 
         if dtype is None and data is not None:
-            dtype = numpy.array(data).dtype
+            dtype = numpy.asarray(data).dtype
 
         if any(x == 'N/A' for x in str(fill_value)):
             fill_value = None
@@ -484,6 +594,10 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
             n = n + self.rank()
         if not isinstance(axis, AbstractAxis):
             raise CDMSError("copydimension, other not an axis.")
+        if isinstance(axis, TransientAxis) and not axis.isVirtual():
+            # Copy on write: share the data and bounds arrays
+            self.setAxis(n, axis._sharedCopy())
+            return
         isGeneric = [False]
         b = axis.getBounds(isGeneric)
         mycopy = createAxis(axis[:], b, genericBounds=isGeneric[0])
@@ -744,21 +858,32 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
         return pd.DataFrame(OrderedDict(zip(columns, data)), index=index)
 
     def toVisit(self, filename, format='Vs', sphereRadius=1.0,
-                maxElev=0.1):
+                maxElev=0.1, binary=False, compress=True):
         """
         Save data to file for postprocessing by the VisIt visualization tool
         filename: name of the file where the data will be saved
-        format: 'Vs' for VizSchema, 'VTK' for VTK, ...
+        format: 'Vs' for VizSchema, 'VTK' for legacy VTK, 'VTS' or 'VTU' for
+                VTK XML structured or unstructured grids, ...
+                Time dependent data are written to one file per time step;
+                the VTK XML files are listed in a .pvd collection.
         sphereRadius: radius of the earth
         maxElev: maximum elevation for representation on the sphere
+        binary: write legacy VTK files in binary rather than ASCII
+        compress: zlib compress the data of VTK XML files
         """
+        from . import mvBaseWriter
         from . import mvVTKSGWriter
+        from . import mvVTKUGWriter
         from . import mvVsWriter
-        try:
-            # required by mvVsWriter
-            import tables                # noqa
-        except BaseException:            # fall back
-            format = 'VTK'
+        if format == 'Vs':
+            try:
+                # required by mvVsWriter
+                import tables                # noqa
+            except BaseException:            # fall back
+                format = 'VTK'
+        writers = {'VTK': (mvVTKSGWriter.VTKSGWriter, 'vtk'),
+                   'VTS': (mvVTKSGWriter.VTKSGWriter, 'vts'),
+                   'VTU': (mvVTKUGWriter.VTKUGWriter, 'vtu')}
 
         def generateTimeFileName(filename, tIndex, tIndexMax, suffix):
             ndigits = len('%d' % tIndexMax)
@@ -767,6 +892,17 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
             return re.sub(r'\.' + suffix, '_%s.%s' % (tiStr, suffix),
                           filename)
 
+        def writeFile(var, filename):
+            if format == 'VTK':
+                vw = mvVTKSGWriter.VTKSGWriter(var, sphereRadius, maxElev)
+                vw.write(filename, binary=binary)
+            elif format in writers:
+                vw = writers[format][0](var, sphereRadius, maxElev)
+                vw.writeXML(filename, compress=compress)
+            else:
+                vw = mvVsWriter.VsWriter(var, sphereRadius, maxElev)
+                vw.write(filename)
+
         # determine whether data are time dependent
         timeAxis = self.getTime()
 
@@ -779,39 +915,32 @@ class TransientVariable(AbstractVariable, numpy.ma.MaskedArray):
                 if axis == 'time':
                     timeIndex = counter
 
+        if format in writers:
+            suffix = writers[format][1]
+        elif timeAxis is None or timeIndex == -1:
+            suffix = 'vsh5'
+        else:
+            suffix = 'h5'
+        if filename.find('.' + suffix) == -1:
+            filename += '.' + suffix
+
         if timeAxis is None or timeIndex == -1:
             # static data
-            if format == 'VTK':
-                vw = mvVTKSGWriter.VTKSGWriter(self, maxElev)
-                if filename.find('.vtk') == -1:
-                    filename += '.vtk'
-                vw.write(filename)
-            else:
-                vw = mvVsWriter.VsWriter(self, maxElev)
-                if filename.find('.vsh5') == -1:
-                    filename += '.vsh5'
-                vw.write(filename)
+            writeFile(self, filename)
         else:
             # time dependent data
             tIndexMax = len(timeAxis)
+            datasets = []
             for tIndex in range(tIndexMax):
                 sliceOp = 'self[' + (':,' * timeIndex) + \
                     ('%d,' % tIndex) + '...]'
                 var = eval(sliceOp)
-                if format == 'VTK':
-                    if filename.find('.vtk') == -1:
-                        filename += '.vtk'
-                    tFilename = generateTimeFileName(filename,
-                                                     tIndex, tIndexMax, 'vtk')
-                    vw = mvVTKSGWriter.VTKSGWriter(var, maxElev)
-                    vw.write(tFilename)
-                else:
-                    if filename.find('.h5') == -1:
-                        filename += '.h5'
-                    tFilename = generateTimeFileName(filename,
-                                                     tIndex, tIndexMax, 'h5')
-                    vw = mvVsWriter.VsWriter(var, maxElev)
-                    vw.write(tFilename)
+                tFilename = generateTimeFileName(filename,
+                                                 tIndex, tIndexMax, suffix)
+                writeFile(var, tFilename)
+                datasets.append((timeAxis[tIndex], tFilename))
+            if format in ('VTS', 'VTU'):
+                mvBaseWriter.writePVD(re.sub(r'\.' + suffix + '$', '', filename) + '.pvd', datasets)
 
     # Following are distributed array methods, they require mpi4py
     # to be installed
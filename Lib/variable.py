@@ -8,6 +8,7 @@ import numpy
 from . import cdmsNode
 import cdtime
 import copy
+from concurrent.futures import ProcessPoolExecutor
 # import os
 import string
 # import sys
@@ -42,6 +43,32 @@ def timeindex(value, units, basetime, delta, delunits, calendar):
     return int(newval.value / delta)
 
 
+def _getChunk(f, name, slicelist, fci):
+    var = f.variables[name]
+    if fci is None:
+        chunk = var.getitem(*tuple(slicelist))
+    else:
+        # If there's a forecast axis, the file doesn't know about it so
+        # don't use it in slicing data out of the file.
+        chunk = var.getitem(*tuple(slicelist[0:fci] + slicelist[fci + 1:]))
+        # But the chunk still needs an index in the forecast direction,
+        # which is simple to do because there is only one forecast per file:
+        chunk.resize(list(map(lenSlice, slicelist)))
+    if 0 in chunk.shape:
+        raise CDMSError('Coordinates out of Domain')
+    return chunk
+
+
+def _readFileChunk(path, name, slicelist, fci):
+    """Read a partition chunk in a worker process."""
+    from . import filepool
+    f = filepool.openFile(path, 'r')
+    try:
+        return _getChunk(f, name, slicelist, fci)
+    finally:
+        f.close()
+
+
 class DatasetVariable(AbstractVariable):
     """Variable (parent, variableNode=None)
 
@@ -507,6 +534,145 @@ class DatasetVariable(AbstractVariable):
 
         return result
 
+    def to_dask(self, chunks='auto'):
+        """Return the variable as a dask backed cdms2.lazy.LazyVariable.
+
+        Parameters
+        ----------
+        chunks : 'auto' (default) for dask sized chunks aligned on the netCDF-4
+                 chunks or dataset partitions, 'native' for the storage chunks,
+                 or a dask chunk specification.
+        """
+        from .lazy import toDask
+        return toDask(self, chunks)
+
+    def _readChunkInto(self, filename, slicelist, fci, out):
+        """Read the chunk of one partition file into out, a view of the result.
+
+        Cdunif reads netCDF hyperslabs with one call, straight into the view
+        if it is C-contiguous, else through a contiguous temporary. Other
+        files are read with getitem and copied in.
+        """
+        if 0 in out.shape:
+            raise CDMSError('Coordinates out of Domain')
+        f = self.parent.openFile(filename, 'r')
+        try:
+            var = f.variables[self.name_in_file]
+            fileslices = slicelist
+            fileout = out
+            if fci is not None:
+                # The file doesn't know about the forecast axis, and there is
+                # only one forecast per file.
+                fileslices = slicelist[0:fci] + slicelist[fci + 1:]
+                fileout = out[(slice(None),) * fci + (0,)]
+            readinto = getattr(var, 'readinto', None)
+            if readinto is not None and readinto(fileout, tuple(fileslices)):
+                return
+            chunk = _getChunk(f, self.name_in_file, slicelist, fci)
+        finally:
+            f.close()
+        if chunk.shape != out.shape:
+            raise CDMSError('Partition file chunk has shape %s, expected %s' %
+                            (chunk.shape, out.shape))
+        out[...] = chunk
+
+    def _readPartitions(self, npart, idims, partitionSlices, fci, revlist=None):
+        """Read the chunks returned by expertPaths into a single array.
+
+        The result shape is computed from the slice lists, and one data buffer
+        is allocated. Each chunk is read into a view of the buffer at its
+        offset along the partitioned axes, and the mask is computed once over
+        the whole buffer. If revlist reverses axes, the views are taken on the
+        reversed buffer, so no reversed copy is needed. If the dataset has a
+        read executor, the chunks are fetched concurrently.
+        """
+        if npart == 1:
+            npart1, npart2 = idims[0], None
+            filelists = [[item] for item in partitionSlices]
+        else:
+            npart1, npart2 = idims
+            filelists = partitionSlices
+
+        # Note: This works because slicelist is the same length
+        # as the domain, and var.getitem returns a chunk
+        # with singleton dimensions included. This means that
+        # npart1 (npart2) corresponds to the correct dimension of chunk.
+        shape = list(map(lenSlice, filelists[0][0][1]))
+        shape[npart1] = sum(lenSlice(filelist[0][1][npart1]) for filelist in filelists)
+        if npart2 is not None:
+            shape[npart2] = sum(lenSlice(slicelist[npart2]) for filename, slicelist in filelists[0])
+
+        chunks = []                     # (filename, slicelist, index in result)
+        missing = []                    # Indices of missing partitions
+        start1 = 0
+        for filelist in filelists:
+            start2 = 0
+            for filename, slicelist in filelist:
+                index = [slice(None)] * len(shape)
+                len1 = lenSlice(slicelist[npart1])
+                index[npart1] = slice(start1, start1 + len1)
+                if npart2 is not None:
+                    len2 = lenSlice(slicelist[npart2])
+                    index[npart2] = slice(start2, start2 + len2)
+                    start2 += len2
+                if filename is None:
+                    missing.append(tuple(index))
+                else:
+                    chunks.append((filename, slicelist, tuple(index)))
+            start1 += len1
+
+        # The buffer has the data type of the first file
+        if chunks:
+            f = self.parent.openFile(chunks[0][0], 'r')
+            try:
+                dtype = numpy.dtype(f.variables[self.name_in_file].typecode())
+            finally:
+                f.close()
+        else:
+            dtype = numpy.dtype(self._numericType_)
+        data = numpy.empty(tuple(shape), dtype)
+        view = data
+        if revlist is not None:
+            view = data[tuple(revlist)]
+
+        executor = self.parent.getReadExecutor()
+        futures = []
+        inline = []                     # chunks read in this thread
+        for filename, slicelist, index in chunks:
+            out = view[index]
+            if executor is None:
+                inline.append((filename, slicelist, out))
+            elif isinstance(executor, ProcessPoolExecutor):
+                # Worker processes cannot write into the buffer: they return
+                # the chunks of a local CDML dataset, other chunks are read here
+                path = self.parent._localFilePath(filename)
+                if path is None:
+                    inline.append((filename, slicelist, out))
+                else:
+                    futures.append((out, executor.submit(_readFileChunk, path, self.name_in_file, slicelist, fci)))
+            else:
+                futures.append((None, executor.submit(self._readChunkInto, filename, slicelist, fci, out)))
+        for filename, slicelist, out in inline:
+            self._readChunkInto(filename, slicelist, fci, out)
+        for out, future in futures:
+            chunk = future.result()
+            if out is not None:
+                out[...] = chunk
+
+        # If a partition is missing, interpose missing data
+        for index in missing:
+            view[index] = 0
+        result = self._returnArray(data, 0)
+        if missing:
+            mask = numpy.ma.getmaskarray(result)
+            maskview = mask
+            if revlist is not None:
+                maskview = mask[tuple(revlist)]
+            for index in missing:
+                maskview[index] = True
+            result = numpy.ma.array(data, mask=mask, copy=False, fill_value=result.fill_value)
+        return result
+
     def expertSlice(self, initslist):
 
         # Handle negative slices
@@ -579,111 +745,17 @@ class DatasetVariable(AbstractVariable):
             if 0 in sh:
                 raise CDMSError(IndexError + 'Coordinates out of Domain')
 
-        # If one partitioned axes:
-        elif npart == 1:
-
-            npart1 = idims[0]
-            resultlist = []
-            for filename, slicelist in partitionSlices:
-
-                # If the slice is missing, interpose missing data
-                if filename is None:
-                    shapelist = list(map(lenSlice, slicelist))
-                    chunk = numpy.ma.zeros(
-                        tuple(shapelist), self._numericType_)
-                    chunk[...] = numpy.ma.masked
-
-                # else read the data and close the file
-                else:
-                    f = self.parent.openFile(filename, 'r')
-                    try:
-                        var = f.variables[self.name_in_file]
-                        if fci is None:
-                            chunk = var.getitem(*tuple(slicelist))
-                        else:
-                            # If there's a forecast axis, the file doesn't know about it so
-                            # don't use it in slicing data out of the file.
-                            chunk = var.getitem(
-                                *tuple(slicelist[0:fci] + slicelist[fci + 1:]))
-                            # But the chunk still needs an index in the forecast direction,
-                            # which is simple to do because there is only one
-                            # forecast per file:
-                            chunk.resize(list(map(lenSlice, slicelist)))
-
-                    finally:
-                        f.close()
-                    sh = chunk.shape
-                    if 0 in sh:
-                        raise CDMSError('Coordinates out of Domain')
-
-                resultlist.append(self._returnArray(chunk, 0))
-
-            # Combine the chunks into a single array
-            # Note: This works because slicelist is the same length
-            # as the domain, and var.getitem returns a chunk
-            # with singleton dimensions included. This means that
-            # npart1 corresponds to the correct dimension of chunk.
-            result = numpy.ma.concatenate(resultlist, axis=npart1)
-            for chunk in resultlist:
-                del(chunk)
-
-        # If two partitioned axes, 2-D version of previous case
-        if npart == 2:
-            npart1, npart2 = idims
-
-            resultlist = []
-            for filelist in partitionSlices:
-                chunklist = []
-                for filename, slicelist in filelist:
-
-                    # If the slice is missing, interpose missing data
-                    if filename is None:
-                        shapelist = list(map(lenSlice, slicelist))
-                        chunk = numpy.ma.zeros(
-                            tuple(shapelist), self._numericType_)
-                        chunk[...] = numpy.ma.masked
-
-                    # else read the data and close the file
-                    else:
-                        f = self.parent.openFile(filename, 'r')
-                        try:
-                            var = f.variables[self.name_in_file]
-                            if fci is None:
-                                chunk = var.getitem(*tuple(slicelist))
-                            else:
-                                # If there's a forecast axis, the file doesn't know about it so
-                                # don't use it in slicing data out of the file.
-                                chunk = var.getitem(
-                                    *tuple(slicelist[0:fci] + slicelist[fci + 1:]))
-                                # But the chunk still needs an index in the forecast direction,
-                                # which is simple to do because there is only
-                                # one forecast per file:
-                                chunk.resize(list(map(lenSlice, slicelist)))
-
-                        finally:
-                            f.close()
-                        sh = chunk.shape
-                        if 0 in sh:
-                            raise CDMSError('Coordinates out of Domain')
-                    chunklist.append(self._returnArray(chunk, 0))
-
-                # Note: This works because slicelist is the same length
-                # as the domain, and var.getitem returns a chunk
-                # with singleton dimensions included. This means that
-                # npart1 corresponds to the correct dimension of chunk.
-                bigchunk = numpy.ma.concatenate(chunklist, axis=npart2)
-                for chunk in chunklist:
-                    del(chunk)
-                resultlist.append(bigchunk)
-
-            result = numpy.ma.concatenate(resultlist, axis=npart1)
-            for bigchunk in resultlist:
-                del(bigchunk)
+        # If one or two partitioned axes, read the chunks into the result,
+        # reversing in place
+        else:
+            if haveReversals:
+                return self._readPartitions(npart, idims, partitionSlices, fci, revlist)
+            return self._readPartitions(npart, idims, partitionSlices, fci)
 
         # If slices with negative strides were input, apply the appropriate
         # reversals.
         if haveReversals:
-            result = result[revlist]
+            result = result[tuple(revlist)]
 
         return result
 
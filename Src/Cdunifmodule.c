@@ -28,6 +28,14 @@
 #define NC_CLASSIC_MODEL 0
 int nc_def_var_deflate(int i,int j,int k,int l, int m) {return 0;};
 int nc_def_var_chunking(int i,int j,int k,size_t *l) {return 0;};
+#define NC_CHUNKED 0
+#define NC_CONTIGUOUS 1
+int nc_inq_var_chunking(int i,int j,int *k,size_t *l) {*k = 1; return 0;};
+int nc_inq_var_deflate(int i,int j,int *k,int *l,int *m) {*k = 0; *l = 0; *m = 0; return 0;};
+int nc_get_var_chunk_cache(int i,int j,size_t *k,size_t *l,float *m) {*k = 0; *l = 0; *m = 0.; return 0;};
+int nc_set_var_chunk_cache(int i,int j,size_t k,size_t l,float m) {return 0;};
+#define NC_FORMAT_NETCDF4 3
+#define NC_FORMAT_NETCDF4_CLASSIC 4
 #endif
 
 int cdms_classic = 1;
@@ -38,6 +46,7 @@ int cdms_use_parallel = 1; /* 0 (do not use) or 1 (can use) */
 #else
 int cdms_use_parallel = 0; /* 0 (do not use) or 1 (can use) */
 #endif
+int cdms_per_file_lock = 1; /* 0 (global lock only) or 1 (lock read-only files individually) */
 int cdms_shuffle = 0;
 int cdms_deflate = 1;
 int cdms_deflate_level = 1;
@@ -63,10 +72,21 @@ PyThread_type_lock Cdunif_lock;
 #define acquire_Cdunif_lock() { PyThread_acquire_lock(Cdunif_lock, 1); }
 #define release_Cdunif_lock() { PyThread_release_lock(Cdunif_lock); }
 
+/* Files opened read-only get their own lock, so that threads reading
+ * different files do not serialize.  Every call on such a file, including
+ * inquiries, goes through its lock.  Everything else (open, close, define
+ * mode, writes) still goes through the global lock.  When a file is closed
+ * its lock is taken before the global one, never the other way around.
+ * The lock lives as long as the file object, not just until close. */
+#define acquire_file_lock(f) { if ((f)->lock != NULL) PyThread_acquire_lock((PyThread_type_lock) (f)->lock, 1); else acquire_Cdunif_lock(); }
+#define release_file_lock(f) { if ((f)->lock != NULL) PyThread_release_lock((PyThread_type_lock) (f)->lock); else release_Cdunif_lock(); }
+
 #else
 
 #define acquire_Cdunif_lock() {}
 #define release_Cdunif_lock() {}
+#define acquire_file_lock(f) {}
+#define release_file_lock(f) {}
 
 #endif
 
@@ -1148,11 +1168,11 @@ static void collect_attributes(PyCdunifFileObject *file, int varid,
 	for (i = 0; i < nattrs; i++) {
 		Py_BEGIN_ALLOW_THREADS
 		;
-		acquire_Cdunif_lock()
+		acquire_file_lock(file)
 		;
 		cdattname(file, varid, i, name);
 		cdattinq(file, varid, name, &type, &length);
-		release_Cdunif_lock()
+		release_file_lock(file)
 		;
 		Py_END_ALLOW_THREADS
 		;
@@ -1163,10 +1183,10 @@ static void collect_attributes(PyCdunifFileObject *file, int varid,
 				PyObject *string;
 				Py_BEGIN_ALLOW_THREADS
 				;
-				acquire_Cdunif_lock()
+				acquire_file_lock(file)
 				;
 				cdattget(file, varid, name, s);
-				release_Cdunif_lock()
+				release_file_lock(file)
 				;
 				Py_END_ALLOW_THREADS
 				;
@@ -1187,10 +1207,10 @@ static void collect_attributes(PyCdunifFileObject *file, int varid,
 
 			Py_BEGIN_ALLOW_THREADS
 			;
-			acquire_Cdunif_lock()
+			acquire_file_lock(file)
 			;
 			cdattgetstring(file, varid, name, &t_len, &st);
-			release_Cdunif_lock()
+			release_file_lock(file)
 			;
 			Py_END_ALLOW_THREADS
 			;
@@ -1216,10 +1236,10 @@ static void collect_attributes(PyCdunifFileObject *file, int varid,
 
 				Py_BEGIN_ALLOW_THREADS
 				;
-				acquire_Cdunif_lock()
+				acquire_file_lock(file)
 				;
 				cdattget(file, varid, name, ((PyArrayObject *) array)->data);
-				release_Cdunif_lock()
+				release_file_lock(file)
 				;
 				Py_END_ALLOW_THREADS
 				;
@@ -1378,6 +1398,12 @@ static int check_if_open(PyCdunifFileObject *file, int mode) {
 static void PyCdunifFileObject_dealloc(PyCdunifFileObject *self) {
 	if (self->open)
 		PyCdunifFile_Close(self);
+#ifdef WITH_THREAD
+	if (self->lock != NULL) {
+		PyThread_free_lock((PyThread_type_lock) self->lock);
+		self->lock = NULL;
+	}
+#endif
 	Py_XDECREF(self->dimensions);
 	Py_XDECREF(self->variables);
 	Py_XDECREF(self->attributes);
@@ -1455,6 +1481,7 @@ PyCdunifFile_Open(char *filename, char *mode) {
 	self->name = NULL;
 	self->mode = NULL;
 	self->diminfo = NULL;
+	self->lock = NULL;
 	if (strlen(mode) > 2 || (strlen(mode) == 2 && mode[1] != '+')) {
 		PyErr_SetString(PyExc_IOError, "illegal mode specification");
 		PyCdunifFileObject_dealloc(self);
@@ -1518,6 +1545,10 @@ PyCdunifFile_Open(char *filename, char *mode) {
 		if (self->id != -1) {
 			self->open = 1;
 			Cdunif_file_init(self);
+#ifdef WITH_THREAD
+			if (!rw && cdms_per_file_lock && self->filetype == CuNetcdf)
+				self->lock = (void *) PyThread_allocate_lock();
+#endif
 		}
 	} else {
 		PyCdunifFileObject_dealloc(self);
@@ -1554,10 +1585,10 @@ static int Cdunif_file_init(PyCdunifFileObject *self) {
 	self->diminfo = PyDict_New();
 	Py_BEGIN_ALLOW_THREADS
 	;
-	acquire_Cdunif_lock()
+	acquire_file_lock(self)
 	;
 	cdinquire(self, &ndims, &nvars, &ngattrs, &recdim);
-	release_Cdunif_lock()
+	release_file_lock(self)
 	;
 	Py_END_ALLOW_THREADS
 	;
@@ -1573,10 +1604,10 @@ static int Cdunif_file_init(PyCdunifFileObject *self) {
 		PyObject *size_ob;
 		Py_BEGIN_ALLOW_THREADS
 		;
-		acquire_Cdunif_lock()
+		acquire_file_lock(self)
 		;
 		cddiminq(self, i, name, dimunits, &nctype, &dimtype, vname, &size);
-		release_Cdunif_lock()
+		release_file_lock(self)
 		// Verify for special characters in dimunits
 		// python3 does not allow to convert them to string
             if (dimunits[strspn(dimunits, charset)] != 0) {
@@ -1618,10 +1649,10 @@ static int Cdunif_file_init(PyCdunifFileObject *self) {
 		PyCdunifVariableObject *variable;
 		Py_BEGIN_ALLOW_THREADS
 		;
-		acquire_Cdunif_lock()
+		acquire_file_lock(self)
 		;
 		cdvarinq(self, i, name, &datatype, &ndimensions, NULL, &nattrs);
-		release_Cdunif_lock()
+		release_file_lock(self)
 		;
 		Py_END_ALLOW_THREADS
 		;
@@ -1633,10 +1664,10 @@ static int Cdunif_file_init(PyCdunifFileObject *self) {
 			}
 			Py_BEGIN_ALLOW_THREADS
 			;
-			acquire_Cdunif_lock()
+			acquire_file_lock(self)
 			;
 			cdvarinq(self, i, NULL, NULL, NULL, dimids, NULL);
-			release_Cdunif_lock()
+			release_file_lock(self)
 			;
 			Py_END_ALLOW_THREADS
 			;
@@ -1731,9 +1762,12 @@ int cdms2_nc_def_var(int id, char *name, int ntype, int ndim, int *dimids,
 	return ret;
 }
 
+/* Create a variable, compressed with the given shuffle, deflate and
+ * deflate level settings. */
 static PyCdunifVariableObject *
-PyCdunifFile_CreateVariable(PyCdunifFileObject *file, char *name, int typecode,
-		char **dimension_names, int ndim) {
+create_variable(PyCdunifFileObject *file, char *name, int typecode,
+		char **dimension_names, int ndim, int shuffle, int deflate,
+		int deflate_level) {
 	int *dimids;
 	PyCdunifVariableObject *variable;
 	int ntype, i, ret;
@@ -1788,11 +1822,11 @@ PyCdunifFile_CreateVariable(PyCdunifFileObject *file, char *name, int typecode,
 		Py_BEGIN_ALLOW_THREADS
 		;
 		/* try some compression thing here */
-		if (((cdms_shuffle != 0) || (cdms_deflate != 0)) && (ndim != 0)) {
+		if (((shuffle != 0) || (deflate != 0)) && (ndim != 0)) {
 			acquire_Cdunif_lock()
 			;
-			ret = nc_def_var_deflate(file->id, i, cdms_shuffle, cdms_deflate,
-					cdms_deflate_level);
+			ret = nc_def_var_deflate(file->id, i, shuffle, deflate,
+					deflate_level);
 			release_Cdunif_lock()
 			;
 		}
@@ -1817,6 +1851,15 @@ PyCdunifFile_CreateVariable(PyCdunifFileObject *file, char *name, int typecode,
 		return NULL;
 }
 
+static PyCdunifVariableObject *
+PyCdunifFile_CreateVariable(PyCdunifFileObject *file, char *name, int typecode,
+		char **dimension_names, int ndim) {
+	return create_variable(file, name, typecode, dimension_names, ndim,
+			cdms_shuffle, cdms_deflate, cdms_deflate_level);
+}
+
+/* createVariable(name, type, dimensions[, shuffle, deflate, deflate_level]):
+ * the compression settings default to the module flags. */
 static PyObject *
 PyCdunifFileObject_new_variable(PyCdunifFileObject *self, PyObject *args) {
 	PyCdunifVariableObject *var;
@@ -1826,8 +1869,16 @@ PyCdunifFileObject_new_variable(PyCdunifFileObject *self, PyObject *args) {
 	int ndim;
 	char *type;
 	int i;
-	if (!PyArg_ParseTuple(args, "ssO!", &name, &type, &PyTuple_Type, &dim))
+	int shuffle = cdms_shuffle, deflate = cdms_deflate;
+	int deflate_level = cdms_deflate_level;
+	if (!PyArg_ParseTuple(args, "ssO!|iii", &name, &type, &PyTuple_Type, &dim,
+			&shuffle, &deflate, &deflate_level))
+		return NULL;
+	if (deflate_level < 0 || deflate_level > 9) {
+		PyErr_SetString(PyExc_ValueError,
+				"cdunif: deflate level must be between 0 and 9");
 		return NULL;
+	}
 	ndim = PyTuple_Size(dim);
 	if (ndim == 0)
 		dimension_names = NULL;
@@ -1848,7 +1899,8 @@ PyCdunifFileObject_new_variable(PyCdunifFileObject *self, PyObject *args) {
 			return NULL;
 		}
 	}
-	var = PyCdunifFile_CreateVariable(self, name, type[0], dimension_names, ndim);
+	var = create_variable(self, name, type[0], dimension_names, ndim, shuffle,
+			deflate, deflate_level);
 	free(dimension_names);
 	return (PyObject *) var;
 }
@@ -1968,13 +2020,21 @@ static int PyCdunifFile_Close(PyCdunifFileObject *file) {
 		return -1;
 	Py_BEGIN_ALLOW_THREADS
 	;
-	acquire_Cdunif_lock()
+	acquire_file_lock(file)
+	;
+	if (file->lock != NULL)
+		acquire_Cdunif_lock()
 	;
 	ret = cdclose(file);
-	release_Cdunif_lock()
+	if (file->lock != NULL)
+		release_Cdunif_lock()
+	;
+	release_file_lock(file)
 	;
 	Py_END_ALLOW_THREADS
 	;
+	/* The file lock is kept until the file object is deallocated: other
+	 * threads may still be waiting on it, and must release the same lock. */
 	if (ret != NC_NOERR) {
 		cdunif_signalerror(ret);
 		ret = -1;
@@ -2189,7 +2249,7 @@ Cdunif_variable_new(PyCdunifFileObject *file, char *name, int id, int type,
 		self->unlimited = 0;
 		Py_BEGIN_ALLOW_THREADS
 		;
-		acquire_Cdunif_lock()
+		acquire_file_lock(file)
 		;
 		cdinquire(file, NULL, NULL, NULL, &recdim);
 		self->dimensions = (size_t *) malloc(ndims * sizeof(size_t));
@@ -2202,7 +2262,7 @@ Cdunif_variable_new(PyCdunifFileObject *file, char *name, int id, int type,
 			if (ndims > 0 && self->dimids[0] == self->file->recdim)
 				self->unlimited = 1;
 		}
-		release_Cdunif_lock()
+		release_file_lock(file)
 		;
 		Py_END_ALLOW_THREADS
 		;
@@ -2264,6 +2324,282 @@ PyCdunifVariableObject_getitem(PyCdunifVariableObject *self, PyObject *args) {
 	return PyCdunifVariableObject_subscript(self, args);
 }
 
+/* Read a hyperslab into an existing array, which may be a strided (or
+ * reversed) view of a larger buffer.  The hyperslab is read with a single
+ * nc_get_vars call: straight into the array if it is C-contiguous, else
+ * into a contiguous temporary which is then copied into the array
+ * (nc_get_varm with a non-natural imap reads one row, or one element, at
+ * a time).  Only netCDF variables of the same type as the array are read;
+ * for anything else nothing is read and False is returned, so that the
+ * caller can fall back to getitem. */
+static PyObject *
+PyCdunifVariableObject_readinto(PyCdunifVariableObject *self, PyObject *args) {
+	PyArrayObject *array, *target;
+	PyObject *index;
+	size_t start[CU_MAX_VAR_DIMS];
+	size_t count[CU_MAX_VAR_DIMS];
+	ptrdiff_t stride[CU_MAX_VAR_DIMS];
+	int i, ret;
+
+	if (!PyArg_ParseTuple(args, "O!O!", &PyArray_Type, &array, &PyTuple_Type,
+			&index))
+		return NULL;
+	if (!check_if_open(self->file, -1))
+		return NULL;
+	if (self->file->filetype != CuNetcdf || self->nd == 0
+			|| self->type == NPY_STRING
+			|| PyArray_NDIM(array) != self->nd
+			|| PyTuple_Size(index) != self->nd
+			|| !PyArray_ISWRITEABLE(array)
+			|| !PyArray_ISNOTSWAPPED(array)
+			|| !PyArray_EquivTypenums(PyArray_TYPE(array), self->type))
+		Py_RETURN_FALSE;
+	PyCdunifVariable_GetShape(self);
+	for (i = 0; i < self->nd; i++) {
+		PyObject *subscript = PyTuple_GetItem(index, i);
+		Py_ssize_t istart, istop, istride, slicelen;
+		if (!PySlice_Check(subscript)) {
+			PyErr_SetString(PyExc_TypeError, "readinto: subscripts must be slices");
+			return NULL;
+		}
+		if (PySlice_GetIndicesEx(subscript, self->dimensions[i], &istart,
+				&istop, &istride, &slicelen) < 0)
+			return NULL;
+		if (istride <= 0) {
+			PyErr_SetString(PyExc_IndexError, "illegal index");
+			return NULL;
+		}
+		if (slicelen != PyArray_DIM(array, i))
+			Py_RETURN_FALSE;
+		start[i] = istart;
+		count[i] = slicelen;
+		stride[i] = istride;
+		if (slicelen == 0)
+			Py_RETURN_TRUE;
+	}
+	if (PyArray_IS_C_CONTIGUOUS(array)) {
+		target = array;
+		Py_INCREF(target);
+	} else {
+		target = (PyArrayObject *) PyArray_SimpleNew(self->nd,
+				PyArray_DIMS(array), PyArray_TYPE(array));
+		if (target == NULL)
+			return NULL;
+	}
+	define_mode(self->file, 0);
+	Py_BEGIN_ALLOW_THREADS
+	;
+	acquire_file_lock(self->file)
+	;
+	ret = nc_get_vars(self->file->id, self->id, start, count, stride,
+			PyArray_DATA(target));
+	release_file_lock(self->file)
+	;
+	Py_END_ALLOW_THREADS
+	;
+	if (ret != NC_NOERR) {
+		Py_DECREF(target);
+		cdunif_signalerror(ret);
+		return NULL;
+	}
+	if (target != array && PyArray_CopyInto(array, target) < 0) {
+		Py_DECREF(target);
+		return NULL;
+	}
+	Py_DECREF(target);
+	Py_RETURN_TRUE;
+}
+
+/* Return the chunk sizes of a netCDF-4 variable, or None if the variable
+ * is stored contiguously or the file is not a netCDF file. */
+static PyObject *
+PyCdunifVariableObject_chunking(PyCdunifVariableObject *self, PyObject *args) {
+	size_t chunksizes[CU_MAX_VAR_DIMS];
+	PyObject *tuple;
+	int storage, ret, i;
+
+	if (!PyArg_ParseTuple(args, ""))
+		return NULL;
+	if (!check_if_open(self->file, -1))
+		return NULL;
+	if (self->file->filetype != CuNetcdf || self->nd == 0)
+		Py_RETURN_NONE;
+	Py_BEGIN_ALLOW_THREADS
+	;
+	acquire_file_lock(self->file)
+	;
+	ret = nc_inq_var_chunking(self->file->id, self->id, &storage, chunksizes);
+	release_file_lock(self->file)
+	;
+	Py_END_ALLOW_THREADS
+	;
+	if (ret != NC_NOERR || storage != NC_CHUNKED)
+		Py_RETURN_NONE;
+	tuple = PyTuple_New(self->nd);
+	if (tuple == NULL)
+		return NULL;
+	for (i = 0; i < self->nd; i++)
+		PyTuple_SetItem(tuple, i, PyInt_FromLong((long) chunksizes[i]));
+	return tuple;
+}
+
+/* Return 1 if the file is stored in a netCDF-4 (HDF5) format, which
+ * supports chunking, compression and chunk caches. */
+static int is_netcdf4(PyCdunifFileObject *file) {
+	int format, ret;
+	if (file->filetype != CuNetcdf)
+		return 0;
+	Py_BEGIN_ALLOW_THREADS
+	;
+	acquire_file_lock(file)
+	;
+	ret = nc_inq_format(file->id, &format);
+	release_file_lock(file)
+	;
+	Py_END_ALLOW_THREADS
+	;
+	return (ret == NC_NOERR && (format == NC_FORMAT_NETCDF4 ||
+			format == NC_FORMAT_NETCDF4_CLASSIC));
+}
+
+/* Return the (shuffle, deflate, deflate_level) settings of a netCDF-4
+ * variable, or None if the file is not a netCDF-4 file. */
+static PyObject *
+PyCdunifVariableObject_deflate(PyCdunifVariableObject *self, PyObject *args) {
+	int shuffle, deflate, level, ret;
+
+	if (!PyArg_ParseTuple(args, ""))
+		return NULL;
+	if (!check_if_open(self->file, -1))
+		return NULL;
+	if (self->nd == 0 || !is_netcdf4(self->file))
+		Py_RETURN_NONE;
+	Py_BEGIN_ALLOW_THREADS
+	;
+	acquire_file_lock(self->file)
+	;
+	ret = nc_inq_var_deflate(self->file->id, self->id, &shuffle, &deflate,
+			&level);
+	release_file_lock(self->file)
+	;
+	Py_END_ALLOW_THREADS
+	;
+	if (ret != NC_NOERR) {
+		cdunif_signalerror(ret);
+		return NULL;
+	}
+	return Py_BuildValue("iii", shuffle, deflate, level);
+}
+
+/* Set the chunk sizes of a new netCDF-4 variable, or contiguous storage
+ * if the argument is None. Returns False if the file is not a netCDF-4
+ * file, chunking is then left to the library. */
+static PyObject *
+PyCdunifVariableObject_setchunking(PyCdunifVariableObject *self,
+		PyObject *args) {
+	size_t chunksizes[CU_MAX_VAR_DIMS];
+	PyObject *sizes, *item;
+	long size;
+	int storage, ret, i;
+
+	if (!PyArg_ParseTuple(args, "O", &sizes))
+		return NULL;
+	if (!check_if_open(self->file, 1))
+		return NULL;
+	if (self->nd == 0 || !is_netcdf4(self->file))
+		Py_RETURN_FALSE;
+	if (sizes == Py_None)
+		storage = NC_CONTIGUOUS;
+	else {
+		storage = NC_CHUNKED;
+		if (!PyTuple_Check(sizes) || PyTuple_Size(sizes) != self->nd) {
+			PyErr_SetString(PyExc_ValueError,
+					"cdunif: chunk sizes must be a tuple with one size per dimension");
+			return NULL;
+		}
+		for (i = 0; i < self->nd; i++) {
+			item = PyTuple_GetItem(sizes, i);
+			size = PyInt_AsLong(item);
+			if (PyErr_Occurred())
+				return NULL;
+			if (size < 1) {
+				PyErr_SetString(PyExc_ValueError,
+						"cdunif: chunk sizes must be positive");
+				return NULL;
+			}
+			chunksizes[i] = (size_t) size;
+		}
+	}
+	define_mode(self->file, 1);
+	Py_BEGIN_ALLOW_THREADS
+	;
+	acquire_Cdunif_lock()
+	;
+	ret = nc_def_var_chunking(self->file->id, self->id, storage,
+			storage == NC_CHUNKED ? chunksizes : NULL);
+	release_Cdunif_lock()
+	;
+	Py_END_ALLOW_THREADS
+	;
+	if (ret != NC_NOERR) {
+		cdunif_signalerror(ret);
+		return NULL;
+	}
+	Py_RETURN_TRUE;
+}
+
+/* chunkcache([size, nelems, preemption]): set the chunk cache of a netCDF-4
+ * variable, negative values keep the current setting. Returns the
+ * (size, nelems, preemption) in use, or None if the file is not a netCDF-4
+ * file. */
+static PyObject *
+PyCdunifVariableObject_chunkcache(PyCdunifVariableObject *self,
+		PyObject *args) {
+	long size = -1, nelems = -1;
+	double preemption = -1.;
+	size_t cursize, curnelems;
+	float curpreemption;
+	int ret;
+
+	if (!PyArg_ParseTuple(args, "|lld", &size, &nelems, &preemption))
+		return NULL;
+	if (!check_if_open(self->file, -1))
+		return NULL;
+	if (self->nd == 0 || !is_netcdf4(self->file))
+		Py_RETURN_NONE;
+	if (preemption > 1.) {
+		PyErr_SetString(PyExc_ValueError,
+				"cdunif: chunk cache preemption must be between 0 and 1");
+		return NULL;
+	}
+	Py_BEGIN_ALLOW_THREADS
+	;
+	acquire_file_lock(self->file)
+	;
+	ret = nc_get_var_chunk_cache(self->file->id, self->id, &cursize,
+			&curnelems, &curpreemption);
+	if (ret == NC_NOERR && (size >= 0 || nelems >= 0 || preemption >= 0.)) {
+		if (size >= 0)
+			cursize = (size_t) size;
+		if (nelems >= 0)
+			curnelems = (size_t) nelems;
+		if (preemption >= 0.)
+			curpreemption = (float) preemption;
+		ret = nc_set_var_chunk_cache(self->file->id, self->id, cursize,
+				curnelems, curpreemption);
+	}
+	release_file_lock(self->file)
+	;
+	Py_END_ALLOW_THREADS
+	;
+	if (ret != NC_NOERR) {
+		cdunif_signalerror(ret);
+		return NULL;
+	}
+	return Py_BuildValue("lld", (long) cursize, (long) curnelems,
+			(double) curpreemption);
+}
+
 /* Get an item: wrapper for assign subscript */
 PyObject *
 PyCdunifVariableObject_setitem(PyCdunifVariableObject *self, PyObject *args) {
@@ -2309,7 +2645,12 @@ static PyMethodDef PyCdunifVariableObject_methods[] = { { "assignValue",
 		(PyCFunction) PyCdunifVariableObject_assign, 1 }, { "getValue",
 		(PyCFunction) PyCdunifVariableObject_value, 1 }, { "typecode",
 		(PyCFunction) PyCdunifVariableObject_typecode, 1 }, { "getitem",
-		(PyCFunction) PyCdunifVariableObject_getitem, 1 }, { "getslice",
+		(PyCFunction) PyCdunifVariableObject_getitem, 1 }, { "readinto",
+		(PyCFunction) PyCdunifVariableObject_readinto, 1 }, { "chunking",
+		(PyCFunction) PyCdunifVariableObject_chunking, 1 }, { "setchunking",
+		(PyCFunction) PyCdunifVariableObject_setchunking, 1 }, { "deflate",
+		(PyCFunction) PyCdunifVariableObject_deflate, 1 }, { "chunkcache",
+		(PyCFunction) PyCdunifVariableObject_chunkcache, 1 }, { "getslice",
 		(PyCFunction) PyCdunifVariableObject_getslice, 1 }, { "setitem",
 		(PyCFunction) PyCdunifVariableObject_setitem, 1 }, { "setslice",
 		(PyCFunction) PyCdunifVariableObject_setslice, 1 }, { NULL, NULL } /* sentinel */
@@ -2327,7 +2668,7 @@ PyCdunifVariable_GetShape(PyCdunifVariableObject *var) {
 	if (check_if_open(var->file, -1)) {
 		Py_BEGIN_ALLOW_THREADS
 		;
-		acquire_Cdunif_lock()
+		acquire_file_lock(var->file)
 		;
 		for (i = 0; i < var->nd; i++) {
 			long lng;
@@ -2335,7 +2676,7 @@ PyCdunifVariable_GetShape(PyCdunifVariableObject *var) {
 					&lng);
 			var->dimensions[i] = lng;
 		}
-		release_Cdunif_lock()
+		release_file_lock(var->file)
 		;
 		Py_END_ALLOW_THREADS
 		;
@@ -2377,11 +2718,11 @@ PyCdunifVariable_GetAttribute(PyCdunifVariableObject *self, PyObject *nameobj) {
 				char vname[CU_MAX_NAME + 1];
 				Py_BEGIN_ALLOW_THREADS
 				;
-				acquire_Cdunif_lock()
+				acquire_file_lock(self->file)
 				;
 				cddiminq(self->file, self->dimids[i], name, NULL, NULL,
 						&dimtype, vname, NULL);
-				release_Cdunif_lock()
+				release_file_lock(self->file)
 				;
 				Py_END_ALLOW_THREADS
 				;
@@ -2536,10 +2877,10 @@ PyCdunifVariable_ReadAsArray(PyCdunifVariableObject *self,
 			int ret;
 			Py_BEGIN_ALLOW_THREADS
 			;
-			acquire_Cdunif_lock()
+			acquire_file_lock(self->file)
 			;
 			ret = cdvarget1(self->file, self->id, &zero, array->data);
-			release_Cdunif_lock()
+			release_file_lock(self->file)
 			;
 			Py_END_ALLOW_THREADS
 			;
@@ -2570,7 +2911,7 @@ PyCdunifVariable_ReadAsArray(PyCdunifVariableObject *self,
 				}
 				Py_BEGIN_ALLOW_THREADS
 
-				acquire_Cdunif_lock()
+				acquire_file_lock(self->file)
 
 
                 if (self->type == NPY_STRING) {
@@ -2621,7 +2962,7 @@ PyCdunifVariable_ReadAsArray(PyCdunifVariableObject *self,
                         ret = -1;
                     }
                 }
-				release_Cdunif_lock()
+				release_file_lock(self->file)
 				Py_END_ALLOW_THREADS
 				;
 				if (ret == -1) {
@@ -2663,12 +3004,12 @@ PyCdunifVariable_ReadAsString(PyCdunifVariableObject *self) {
 			return (PyUnicodeObject *) PyErr_NoMemory();
 		Py_BEGIN_ALLOW_THREADS
 		;
-		acquire_Cdunif_lock()
+		acquire_file_lock(self->file)
 		;
 		for (i = 0; i < self->nd; i++)
 			count[i] = self->dimensions[i];
 		ret = cdvarget(self->file, self->id, &zero, count, temp);
-		release_Cdunif_lock()
+		release_file_lock(self->file)
 		;
 		Py_END_ALLOW_THREADS
 		;
@@ -3316,6 +3657,15 @@ PyCdunif_setncflags(PyObject *self, PyObject *args) {
 			return NULL;
 		}
 		cdms_netcdf4 = flagval;
+	} else if (strcmp(flagname, "per_file_lock") == 0) {
+		if (flagval > 1) {
+			sprintf(msg,
+					"invalid flag for per_file_lock: '%i' valid flags are: 0 (global lock) or 1 (per file lock)",
+					flagval);
+			PyErr_SetString(PyExc_TypeError, msg);
+			return NULL;
+		}
+		cdms_per_file_lock = flagval;
 	} else {
 		sprintf(msg,
 				"invalid compression flag: '%s' valid flags are: shuffle, deflate, deflate_level",
@@ -3347,6 +3697,8 @@ PyCdunif_getncflags(PyObject *self, PyObject *args) {
 		return Py_BuildValue("i", cdms_use_define_mode);
 	} else if (strcmp(flagname, "use_parallel") == 0) {
 		return Py_BuildValue("i", cdms_use_parallel);
+	} else if (strcmp(flagname, "per_file_lock") == 0) {
+		return Py_BuildValue("i", cdms_per_file_lock);
 	} else {
 		sprintf(msg,
 				"invalid compression flag: '%s' valid flags are: shuffle, deflate, deflate_level",
@@ -2,7 +2,7 @@
 """
 
 __all__ = ["horizontal", "pressure", "crossSection", "scrip",
-           "error", "mvGenericRegrid", ]
+           "error", "mvGenericRegrid", "mvSparseRegrid", ]
 
 from .error import RegridError  # noqa
 from .horizontal import Horizontal, Regridder  # noqa
@@ -13,6 +13,7 @@ from .scrip import DistwgtRegridder, readRegridder  # noqa
 from regrid2 import gsRegrid  # noqa
 from .mvGenericRegrid import GenericRegrid  # noqa
 from .mvLibCFRegrid import LibCFRegrid  # noqa
+from .mvSparseRegrid import SparseRegrid  # noqa
 try:
     import ESMF
     ESMF.deprecated.__globals__[
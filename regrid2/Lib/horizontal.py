@@ -24,6 +24,18 @@ def extractBounds(bounds):
 
     return (lower.astype(numpy.float32), upper.astype(numpy.float32))
 
+# Map the (index of last contributor, contributor, weight) arrays of maparea
+# to a dense (nout, nin) overlap matrix
+
+
+def overlapMatrix(dx, pt, wt, nout, nin):
+    counts = numpy.diff(numpy.concatenate(([-1], dx[:nout])))
+    nlinks = int(dx[nout - 1]) + 1 if nout > 0 else 0
+    rows = numpy.repeat(numpy.arange(nout), counts)
+    matrix = numpy.zeros((nout, nin), numpy.float32)
+    numpy.add.at(matrix, (rows, pt[:nlinks]), wt[:nlinks])
+    return matrix
+
 # Create a horizontal regridder. ingrid and outgrid are CDMS AbstractGrid
 # objects.
 
@@ -88,8 +100,92 @@ class Horizontal:
         self.londx, self.lonpt, self.wtlon, self.latdx, self.latpt, self.wtlat = _regrid.maparea(
             self.nloni, self.nlono, self.nlati, self.nlato, bnin, bnout, bsin, bsout, bein, beout, bwin, bwout)
 
+        # The weight of input zone (ji, ii) in output zone (jo, io) is
+        # wtlat * wtlon: the area weights are the outer product of a latitude
+        # and a longitude overlap matrix, computed once for all calls.
+        self.latMatrix = overlapMatrix(self.latdx, self.latpt, self.wtlat, self.nlato, self.nlati)
+        self.lonMatrixT = overlapMatrix(self.londx, self.lonpt, self.wtlon, self.nlono, self.nloni).T.copy()
+        self.zoneWeights = numpy.outer(self.latMatrix.sum(axis=1), self.lonMatrixT.sum(axis=0))
+
+    def _product(self, ar):
+        # Apply the overlap matrices to the last two (lat, lon) dimensions of
+        # ar, in the order which takes the fewest operations
+        lead = ar.shape[:-2]
+        if self.nlati * self.nlono * (self.nloni + self.nlato) <= self.nlato * self.nloni * (self.nlati + self.nlono):
+            ar = numpy.dot(numpy.reshape(ar, (-1, self.nloni)), self.lonMatrixT)
+            ar = numpy.matmul(self.latMatrix, numpy.reshape(ar, (-1, self.nlati, self.nlono)))
+        else:
+            ar = numpy.matmul(self.latMatrix, numpy.reshape(ar, (-1, self.nlati, self.nloni)))
+            ar = numpy.dot(numpy.reshape(ar, (-1, self.nloni)), self.lonMatrixT)
+        return numpy.reshape(ar, lead + (self.nlato, self.nlono))
+
+    def _apply(self, ar, inmask, ilon, ilat, flag2D, missing):
+        # Area weighted average of ar, for all non-horizontal slices at once.
+        # Same result as rgdarea, returns (outar, amskout), or None if ar has
+        # non-finite values, which the products would spread beyond the
+        # output zones they overlap.
+        rank = len(ar.shape)
+        axes = [rank - ilat - 1, rank - ilon - 1]
+        src = numpy.moveaxis(ar, axes, [-2, -1])
+        if flag2D:
+            # 2-D masks are laid out (lat, lon), as in rgdarea
+            inmask = numpy.reshape(inmask, (self.nlati, self.nloni))
+        else:
+            inmask = numpy.moveaxis(inmask, axes, [-2, -1])
+        weighted = src * inmask
+        if not numpy.isfinite(weighted).all():
+            weighted = numpy.where(inmask != 0, weighted, numpy.float32(0.))
+            if not numpy.isfinite(weighted).all():
+                return None
+        accum = self._product(weighted)
+        # (nlato, nlono) for 2-D masks
+        wtmsk = self._product(inmask)
+        valid = wtmsk > 0.
+        outar = accum * numpy.divide(numpy.float32(1.), wtmsk, out=numpy.zeros_like(wtmsk), where=valid)
+        if not valid.all():
+            outar[numpy.logical_not(numpy.broadcast_to(valid, outar.shape))] = missing
+        amskout = numpy.divide(wtmsk, self.zoneWeights, out=numpy.zeros_like(wtmsk), where=valid)
+        amskout = numpy.broadcast_to(amskout, outar.shape)
+        outar = numpy.ascontiguousarray(numpy.moveaxis(outar, [-2, -1], axes))
+        amskout = numpy.ascontiguousarray(numpy.moveaxis(amskout, [-2, -1], axes))
+        return outar, amskout
+
+    def _rgdarea(self, ar, inmask, ilon, ilat, itim1, itim2, ntim1, ntim2, flag2D, missing, outshape):
+        # Regrid with the C loops, returns (outar, amskout)
+        outar = numpy.zeros(tuple(outshape), numpy.float32)
+
+        # Perform the regridding. The return array has the same shape
+        # as the output array, and is the fraction of the zone which overlaps
+        # a non-masked zone of the input grid.
+        amskout = _regrid.rgdarea(
+            ilon,
+            ilat,
+            itim1,
+            itim2,
+            ntim1,
+            ntim2,
+            self.nloni,
+            self.nlono,
+            self.nlati,
+            self.nlato,
+            flag2D,
+            missing,
+            self.londx,
+            self.lonpt,
+            self.wtlon,
+            self.latdx,
+            self.latpt,
+            self.wtlat,
+            inmask,
+            ar,
+            outar)
+
+        # Correct the shape of output weights
+        amskout.shape = outar.shape
+        return outar, amskout
+
     def __call__(self, ar, missing=None, order=None,
-                 mask=None, returnTuple=0, **args):
+                 mask=None, returnTuple=0, useMatrix=1, **args):
         """
         Call the regridder function.
 
@@ -112,6 +208,11 @@ class Horizontal:
             If true, return the tuple (outArray, outWeights) where outWeights is
             the fraction of each zone of the output grid which overlaps non-missing
             zones of the input grid; it has the same shape as the output array.
+
+        useMatrix :
+            If true (the default), apply the precomputed overlap matrices to
+            all the non-horizontal slices at once, else call rgdarea. Input
+            with non-finite unmasked values always goes through rgdarea.
         """
 
         from cdms2.avariable import AbstractVariable
@@ -296,40 +397,17 @@ class Horizontal:
         if ar.dtype.char != numpy.float32:
             ar = ar.astype(numpy.float32)
 
-        # Malloc return array
         outshape = list(shape)
         outshape[rank - ilat - 1] = self.nlato
         outshape[rank - ilon - 1] = self.nlono
-        outar = numpy.zeros(tuple(outshape), numpy.float32)
 
-        # Perform the regridding. The return array has the same shape
-        # as the output array, and is the fraction of the zone which overlaps
-        # a non-masked zone of the input grid.
-        amskout = _regrid.rgdarea(
-            ilon,
-            ilat,
-            itim1,
-            itim2,
-            ntim1,
-            ntim2,
-            nloni,
-            self.nlono,
-            nlati,
-            self.nlato,
-            flag2D,
-            missing,
-            self.londx,
-            self.lonpt,
-            self.wtlon,
-            self.latdx,
-            self.latpt,
-            self.wtlat,
-            inmask,
-            ar,
-            outar)
-
-        # Correct the shape of output weights
-        amskout.shape = outar.shape
+        result = None
+        if useMatrix:
+            result = self._apply(ar, inmask, ilon, ilat, flag2D, missing)
+        if result is None:
+            result = self._rgdarea(ar, inmask, ilon, ilat, itim1, itim2, ntim1, ntim2,
+                                   flag2D, missing, outshape)
+        outar, amskout = result
 
         # Set the missing data mask of the output array, if any.
         hasMissing = not numpy.ma.alltrue(numpy.ma.ravel(amskout))
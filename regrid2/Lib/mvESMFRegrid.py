@@ -300,16 +300,44 @@ staggerLoc = %s!""" % self.staggerLoc
         Parameters
         ----------
 
-        args : (not used)
+        args : factors=True keeps the sparse weights so that getWeights()
+               can return them (requires ESMF >= 8)
 
         """
+        kw = {}
+        if args.get('factors', False):
+            kw['factors'] = True
         self.regridObj = ESMF.Regrid(srcfield=self.srcFld.field,
                                      dstfield=self.dstFld.field,
                                      src_mask_values=self.srcMaskValues,
                                      dst_mask_values=self.dstMaskValues,
                                      regrid_method=self.regridMethod,
                                      unmapped_action=self.unMappedAction,
-                                     ignore_degenerate=True)
+                                     ignore_degenerate=True,
+                                     **kw)
+
+    def getWeights(self):
+        """
+        Get the interpolation weights as a sparse matrix
+
+        Returns
+        -------
+
+        (row, col, S) zero based flat destination/source indices and weights,
+        or None if the weights were not kept (see computeWeights) or the
+        grids are distributed over several processors
+        """
+        if self.nprocs > 1 or not hasattr(self.regridObj, 'get_weights_dict'):
+            return None
+        try:
+            wd = self.regridObj.get_weights_dict(deep_copy=True)
+        except BaseException:
+            return None
+        # ESMF sequence indices are one based and Fortran ordered over the
+        # transposed fields, i.e. C ordered over our arrays
+        return (numpy.array(wd['row_dst'], numpy.int64) - 1,
+                numpy.array(wd['col_src'], numpy.int64) - 1,
+                numpy.array(wd['weights'], numpy.float64))
 
     def apply(self, srcData, dstData, rootPe, globalIndexing=False, **args):
         """
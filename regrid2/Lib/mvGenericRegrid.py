@@ -6,13 +6,11 @@
 """
 Generic interface to multiple regrid classes. No dependence on cdms2 variables.
 """
-import operator
 import numpy
 
 import regrid2
 import re
 from distarray import MultiArrayIter
-from functools import reduce
 
 # used to locate fully masked cells
 EPS = 10 * 1.19209e-07
@@ -177,9 +175,16 @@ class GenericRegrid:
                                 dstGridAreas=dstGridAreas,
                                 globalIndexing=True,
                                 **args)
+        elif re.search('sparse', regridTool.lower()):
+            # precomputed weights, passed in as weights=(row, col, S)
+            self.tool = regrid2.SparseRegrid(srcGrid[0].shape, dstGrid[0].shape,
+                                             args['weights'],
+                                             regridMethod=regridMethod,
+                                             dstGrid=dstGrid,
+                                             diagnostics=args.get('diagnostics'))
         else:
             msg = """mvGenericRegrid.__init__: ERROR unrecognized tool %s,
-valid choices are: 'libcf', 'esmf'""" % regridTool
+valid choices are: 'libcf', 'esmf', 'sparse'""" % regridTool
             raise regrid2.RegridError(msg)
 
     def computeWeights(self, **args):
@@ -188,6 +193,22 @@ valid choices are: 'libcf', 'esmf'""" % regridTool
         """
         self.tool.computeWeights(**args)
 
+    def getWeights(self):
+        """
+        Get the interpolation weights as a sparse matrix
+
+        Returns
+        -------
+        (row, col, S) zero based flat destination/source indices and weights,
+        or None if the tool cannot export its weights
+        """
+        # tool classes derive from GenericRegrid, those that can export
+        # their weights override this method
+        tool = getattr(self, 'tool', None)
+        if tool is None:
+            return None
+        return tool.getWeights()
+
     def apply(self, srcData, dstData,
               rootPe=None,
               missingValue=None,
@@ -269,24 +290,26 @@ valid choices are: 'libcf', 'esmf'""" % regridTool
                                           str(nonHorizShape))
                 raise regrid2.RegridError(msg)
 
+            if hasattr(self.tool, 'applyBatch'):
+                # the tool can regrid all the non lat/lon slices at once
+                self._applyBatch(srcData, dstData, missingValue)
+                return
+
             #
             # iterate over all axes
             #
 
             # create containers to hold input/output values
             # (a copy is essential here)
-            zros = '[' + ('0,' * len(nonHorizShape)) + '...]'
-            indata = numpy.array(eval('srcData' + zros))
-            outdata = numpy.array(eval('dstData' + zros))
+            zros = (0,) * len(nonHorizShape) + (Ellipsis,)
+            indata = numpy.array(srcData[zros])
+            outdata = numpy.array(dstData[zros])
 
             # now iterate over all non lat/lon coordinates
             for it in MultiArrayIter(nonHorizShape):
 
-                indices = it.getIndices()
-                slce = '['
-                slce += reduce(operator.add, ['%d,' % i for i in indices])
-                slce += '...]'
-                indata = eval('srcData' + slce)
+                slce = tuple(it.getIndices()) + (Ellipsis,)
+                indata = srcData[slce]
 
                 # adjust for masking
                 if missingValue is not None:
@@ -332,7 +355,53 @@ valid choices are: 'libcf', 'esmf'""" % regridTool
                     outdata += dstMask * missingValue
 
                 # fill in dstData
-                exec('dstData' + slce + ' = outdata')
+                dstData[slce] = outdata
+
+    def _applyBatch(self, srcData, dstData, missingValue=None):
+        """
+        Regrid all the non horizontal slices in one pass, for tools
+        which provide applyBatch (precomputed sparse weights)
+
+        Parameters
+        ----------
+
+        srcData : array (input)
+
+        dstData : array (output), updated in place
+
+        missingValue : if not None, then data mask will be interpolated
+                       and data value set to missingValue when masked
+        """
+        srcHorizShape = srcData.shape[-self.nGridDims:]
+        dstHorizShape = dstData.shape[-self.nGridDims:]
+        indata = numpy.reshape(srcData, (-1,) + srcHorizShape)
+        outdata = numpy.array(dstData).reshape((-1,) + dstHorizShape)
+
+        if missingValue is None:
+            self.tool.applyBatch(indata, outdata)
+        else:
+            # interpolate the mask of every slice
+            srcDataMaskFloat = numpy.array(indata == missingValue, indata.dtype)
+            dstDataMaskFloat = numpy.zeros(outdata.shape, outdata.dtype)
+            self.tool.applyBatch(srcDataMaskFloat, dstDataMaskFloat)
+            if re.search('conserv', self.regridMethod.lower(), re.I):
+                # cell interpolation
+                dstMask = numpy.array(
+                    (dstDataMaskFloat > 1 - EPS), numpy.int32)
+            else:
+                # nodal interpolation
+                dstMask = numpy.array(
+                    (dstDataMaskFloat > 0), numpy.int32)
+
+            # interpolate the data; as in the per slice loop, the missing
+            # values are not zeroed first
+            self.tool.applyBatch(indata, outdata)
+
+            # apply missing value contribution
+            outdata *= (1 - dstMask)
+            outdata += dstMask * missingValue
+
+        dstData[...] = outdata.reshape(dstData.shape)
 
     def getDstGrid(self):
         """
@@ -0,0 +1,172 @@
+"""
+Regridding with precomputed sparse weights
+
+"""
+import numpy
+
+from regrid2 import GenericRegrid
+
+
+class SparseRegrid(GenericRegrid):
+    """
+    Apply precomputed interpolation weights stored as a sparse matrix.
+
+    The weights follow the SCRIP/ESMF convention dst[row] += S * src[col],
+    with row and col flat (C order) zero-based indices into the destination
+    and source grids. Destination points without weights are left untouched,
+    which mirrors the ESMF 'select' zero region.
+
+    Parameters
+    ----------
+
+         srcGridShape
+             tuple source grid shape
+
+         dstGridShape
+             tuple destination grid shape
+
+         weights
+             (row, col, S) tuple of arrays
+
+         regridMethod
+             name of the method the weights were computed with
+
+         dstGrid
+             list of destination coordinate arrays (optional)
+
+         diagnostics
+             diagnostic data of the tool the weights were computed with
+             (optional), reported by fillInDiagnosticData
+    """
+
+    # Diagnostic entries which are only filled in when requested
+    _requestedEntries = ('srcAreaFractions', 'dstAreaFractions', 'srcAreas', 'dstAreas')
+
+    def __init__(self, srcGridShape, dstGridShape, weights,
+                 regridMethod='linear', dstGrid=None, diagnostics=None, **args):
+        """
+
+        """
+        row, col, S = weights
+        row = numpy.array(row, numpy.int64).ravel()
+        col = numpy.array(col, numpy.int64).ravel()
+        S = numpy.array(S, numpy.float64).ravel()
+
+        self.srcGridShape = tuple(srcGridShape)
+        self.dstGridShape = tuple(dstGridShape)
+        self.nSrc = int(numpy.prod(self.srcGridShape))
+        self.nDst = int(numpy.prod(self.dstGridShape))
+        self.regridMethodStr = regridMethod
+        self.dstGrid = dstGrid
+        self.diagnostics = diagnostics
+
+        # sort the links by destination so rows can be reduced in one pass
+        order = numpy.argsort(row, kind='mergesort')
+        self.row = row[order]
+        self.col = col[order]
+        self.S = S[order]
+        if len(self.row) > 0:
+            starts = numpy.concatenate(([True], self.row[1:] != self.row[:-1]))
+            self.offsets = numpy.nonzero(starts)[0]
+        else:
+            self.offsets = numpy.zeros((0,), numpy.int64)
+        self.dstIndices = self.row[self.offsets]
+
+    def computeWeights(self, **args):
+        """
+        Nothing to do, weights are precomputed
+        """
+        pass
+
+    def getWeights(self):
+        """
+        Return the sparse weights
+
+        Returns
+        -------
+            (row, col, S) arrays, zero based flat indices
+        """
+        return self.row, self.col, self.S
+
+    def applyBatch(self, srcData, dstData):
+        """
+        Apply the weights to a stack of fields in a single pass
+
+        Parameters
+        ----------
+
+            srcData
+                array of shape (n,) + srcGridShape
+
+            dstData
+                array of shape (n,) + dstGridShape, updated in place
+        """
+        src = numpy.reshape(srcData, (-1, self.nSrc))
+        dst = numpy.reshape(dstData, (-1, self.nDst))
+        if len(self.offsets) > 0:
+            prod = src[:, self.col] * self.S
+            vals = numpy.add.reduceat(prod, self.offsets, axis=1)
+            dst[:, self.dstIndices] = vals
+        if not numpy.may_share_memory(dst, dstData):
+            # dstData was not contiguous, copy back
+            dstData[...] = dst.reshape(dstData.shape)
+
+    def apply(self, srcData, dstData, rootPe=None, globalIndexing=False, **args):
+        """
+        Regrid source to destination
+
+        Parameters
+        ----------
+
+            srcData
+                array (input)
+
+            dstData
+                array (output)
+
+            rootPe
+                not used
+
+            globalIndexing
+                not used
+        """
+        self.applyBatch(srcData, dstData)
+
+    def getDstGrid(self):
+        """
+        Get the destination grid
+
+        Returns
+        -------
+            grid
+        """
+        return self.dstGrid
+
+    def fillInDiagnosticData(self, diag, rootPe):
+        """
+        Fill in diagnostic data
+
+        Parameters
+        ----------
+
+            diag
+                a dictionary, 'numDstPoints' and 'numValid' will be filled if present.
+                If the diagnostics of the tool the weights were computed with were
+                given, they are filled in instead, as that tool would.
+
+            rootPe
+                not used
+        """
+        if self.diagnostics:
+            for entry, value in self.diagnostics.items():
+                if entry not in self._requestedEntries:
+                    diag[entry] = value
+                elif entry in diag:
+                    diag[entry] = numpy.array(value)
+            return
+        if 'numDstPoints' in diag:
+            diag['numDstPoints'] = self.nDst
+        if 'numValid' in diag:
+            diag['numValid'] = len(self.dstIndices)
+        diag['regridTool'] = 'sparse'
+        diag['regridMethod'] = self.regridMethodStr
@@ -0,0 +1,50 @@
+"""
+Time and peak memory of MV2 operations on variables with long axes.
+
+    python benchmark_axis_copy.py [--ntime 200000] [--nlat 4] [--ops 50]
+
+Every MV2 result copies the axes of its operands. Transient axes are copied
+on write: the copies share the coordinate and bounds arrays of the original
+until one of them is written to, so the axis memory of a chain of operations
+does not grow with the number of results. The peak is measured with
+tracemalloc and includes the data of the results.
+"""
+from __future__ import print_function
+import argparse
+import time
+import tracemalloc
+import numpy
+import cdms2
+import MV2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ntime', type=int, default=200000)
+    parser.add_argument('--nlat', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=50)
+    args = parser.parse_args()
+
+    tim = cdms2.createAxis(numpy.arange(float(args.ntime)), id='time')
+    tim.designateTime()
+    tim.units = 'hours since 2000-1-1'
+    tim.setBounds(numpy.array([tim[:] - .5, tim[:] + .5]).T)
+    lat = cdms2.createUniformLatitudeAxis(-90. + 90. / args.nlat, args.nlat, 180. / args.nlat)
+    var = cdms2.createVariable(numpy.random.random((args.ntime, args.nlat)), axes=[tim, lat], id='tas')
+
+    tracemalloc.start()
+    t0 = time.time()
+    results = []
+    for i in range(args.ops):
+        results.append(MV2.absolute(var * 2. - 1.))
+    t = time.time() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    bounds = set(id(res.getTime()._bounds_) for res in results)
+    print("%d results of shape %s: %.3fs, peak memory %.1f MB, %d time bounds arrays" %
+          (args.ops, repr(var.shape), t, peak / 1.e6, len(bounds)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Time chained MV2 expressions on variables with equal but distinct axes.
+
+    python benchmark_mv2_expressions.py [--ntime 12 --nlev 17 --nlat 180 --nlon 360] [--terms 8] [--shared]
+
+Each binary operation compares the axes of its operands. Variables read
+separately, or built from cloned axes, do not share axis objects, so the
+axes are compared by value. With --shared the variables get copies of the
+axes of the first one through copyAxis, which share its data arrays, and
+the values are not compared. The metadata time printed here is the time
+spent in MV2.commonDomain for one expression, against comparing the values
+of every axis with numpy.ma.allclose.
+"""
+from __future__ import print_function
+import argparse
+import time
+import numpy
+import cdms2
+import MV2
+
+
+def timeit(func, repeat):
+    best = None
+    for i in range(repeat):
+        t0 = time.time()
+        res = func()
+        t = time.time() - t0
+        best = t if best is None else min(best, t)
+    return best, res
+
+
+def makeVariable(args, k):
+    # New axes for each variable
+    tim = cdms2.createAxis(numpy.arange(float(args.ntime)), id='time')
+    tim.designateTime()
+    tim.units = 'days since 2000-1-1'
+    lev = cdms2.createAxis(numpy.linspace(1000., 10., args.nlev), id='plev')
+    lev.designateLevel()
+    lat = cdms2.createUniformLatitudeAxis(-90. + 90. / args.nlat, args.nlat, 180. / args.nlat)
+    lon = cdms2.createUniformLongitudeAxis(0., args.nlon, 360. / args.nlon)
+    data = numpy.random.random((args.ntime, args.nlev, args.nlat, args.nlon)).astype(numpy.float32)
+    return cdms2.createVariable(data, axes=[tim, lev, lat, lon], id='v%d' % k)
+
+
+def expression(variables):
+    result = variables[0]
+    for k, var in enumerate(variables[1:]):
+        result = result * var if k % 2 else result + var
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ntime', type=int, default=12)
+    parser.add_argument('--nlev', type=int, default=17)
+    parser.add_argument('--nlat', type=int, default=180)
+    parser.add_argument('--nlon', type=int, default=360)
+    parser.add_argument('--terms', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--shared', action='store_true',
+                        help='share the axis data of the first variable')
+    args = parser.parse_args()
+
+    variables = [makeVariable(args, k) for k in range(args.terms)]
+    first = variables[0]
+    if args.shared:
+        for var in variables[1:]:
+            for i, axis in enumerate(first.getAxisList()):
+                var.copyAxis(i, axis)
+
+    def domains():
+        for var in variables[1:]:
+            MV2.commonDomain(first, var)
+
+    def values():
+        for var in variables[1:]:
+            for a, b in zip(first.getAxisList(), var.getAxisList()):
+                numpy.ma.allclose(a[:], b[:])
+
+    data = [numpy.ma.getdata(var) for var in variables]
+    tplain, rplain = timeit(lambda: expression(data), args.repeat)
+    texpr, rexpr = timeit(lambda: expression(variables), args.repeat)
+    tdomain, r = timeit(domains, args.repeat)
+    tvalues, r = timeit(values, args.repeat)
+    assert numpy.allclose(rplain, rexpr)
+    print("%d terms of shape %s" % (args.terms, repr(first.shape)))
+    print("numpy: %.3fs, MV2: %.3fs" % (tplain, texpr))
+    print("axis comparisons: %.5fs, numpy.ma.allclose: %.5fs" % (tdomain, tvalues))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Compare eager MV2 operations with a deferred MV2.lazy expression.
+
+    python benchmark_mv2_lazy.py [--ntime 100 --nlat 180 --nlon 360] [--blocksize 262144]
+
+Both compute sqrt((a - b) ** 2 / c) + 1 on masked float64 fields. The eager
+operations make a full size TransientVariable, data and mask, for each
+intermediate result; the expression computes the result in blocks, so its
+peak memory is the result plus a few blocks. Peak memory is measured with
+tracemalloc, on top of the inputs.
+"""
+from __future__ import print_function
+import argparse
+import time
+import tracemalloc
+import numpy
+import cdms2
+import MV2
+
+
+def measure(func):
+    tracemalloc.start()
+    t0 = time.time()
+    result = func()
+    t = time.time() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return t, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ntime', type=int, default=100)
+    parser.add_argument('--nlat', type=int, default=180)
+    parser.add_argument('--nlon', type=int, default=360)
+    parser.add_argument('--blocksize', type=int, default=None)
+    args = parser.parse_args()
+
+    tim = cdms2.createAxis(numpy.arange(float(args.ntime)), id='time')
+    tim.designateTime()
+    lat = cdms2.createUniformLatitudeAxis(-90. + 90. / args.nlat, args.nlat, 180. / args.nlat)
+    lon = cdms2.createUniformLongitudeAxis(0., args.nlon, 360. / args.nlon)
+    shape = (args.ntime, args.nlat, args.nlon)
+    a, b, c = [cdms2.createVariable(numpy.ma.masked_less(numpy.random.random(shape), .05),
+                                    axes=[tim, lat, lon], id=name) for name in 'abc']
+
+    teager, peager, eager = measure(lambda: MV2.sqrt((a - b) ** 2 / c) + 1.)
+    del eager
+    tlazy, plazy, result = measure(lambda: (MV2.sqrt((MV2.lazy(a) - b) ** 2 / c) + 1.).evaluate(args.blocksize))
+    assert MV2.allclose(result, MV2.sqrt((a - b) ** 2 / c) + 1.)
+    print("%s, result %.1f MB" % (repr(shape), result.nbytes / 1.e6))
+    print("eager: %.3fs, peak %.1f MB" % (teager, peager / 1.e6))
+    print("lazy:  %.3fs, peak %.1f MB" % (tlazy, plazy / 1.e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare the overlap matrix and rgdarea paths of regrid2.Horizontal.
+
+    python benchmark_regrid2_horizontal.py [--nlev 100] [--nlat 180 --nlon 360] [--nlatout 90 --nlonout 180]
+
+Both paths regrid all the levels of a masked variable with the same
+Horizontal object, so the area weights are only computed once. The matrix
+path does one product per horizontal axis for all levels; its speedup grows
+with the number of levels and with the number of threads of the BLAS library.
+"""
+from __future__ import print_function
+import argparse
+import time
+import numpy
+import cdms2
+from regrid2 import Horizontal
+
+
+def timeit(func, repeat):
+    best = None
+    for i in range(repeat):
+        t0 = time.time()
+        res = func()
+        t = time.time() - t0
+        best = t if best is None else min(best, t)
+    return best, res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nlev', type=int, default=100)
+    parser.add_argument('--nlat', type=int, default=180)
+    parser.add_argument('--nlon', type=int, default=360)
+    parser.add_argument('--nlatout', type=int, default=90)
+    parser.add_argument('--nlonout', type=int, default=180)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    dlat, dlon = 180. / args.nlat, 360. / args.nlon
+    ingrid = cdms2.createUniformGrid(-90. + dlat / 2., args.nlat, dlat, 0., args.nlon, dlon)
+    dlat, dlon = 180. / args.nlatout, 360. / args.nlonout
+    outgrid = cdms2.createUniformGrid(-90. + dlat / 2., args.nlatout, dlat, 0., args.nlonout, dlon)
+
+    data = numpy.random.random((args.nlev, args.nlat, args.nlon)).astype(numpy.float32)
+    data = numpy.ma.masked_greater(data, 0.9)
+    level = cdms2.createAxis(numpy.arange(float(args.nlev)), id='lev')
+    level.designateLevel()
+    var = cdms2.createVariable(data, axes=[level, ingrid.getLatitude(), ingrid.getLongitude()], id='ta')
+
+    t0 = time.time()
+    regridf = Horizontal(ingrid, outgrid)
+    tinit = time.time() - t0
+    tmatrix, rmatrix = timeit(lambda: regridf(var), args.repeat)
+    trgdarea, rrgdarea = timeit(lambda: regridf(var, useMatrix=0), args.repeat)
+    assert numpy.ma.allclose(rmatrix, rrgdarea, rtol=1.e-5)
+    print("%dx%d -> %dx%d, %d levels, weights: %.3fs" %
+          (args.nlat, args.nlon, args.nlatout, args.nlonout, args.nlev, tinit))
+    print("rgdarea: %.3fs, matrix: %.3fs, speedup %.2f" % (trgdarea, tmatrix, trgdarea / tmatrix))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare the bin index of the bindex module with spatialindex.SpatialIndex.
+
+    python benchmark_spatial_index.py [--nlat 1000 --nlon 1440] [--regions 200] [--queries 100000]
+
+The grid is a distorted global curvilinear grid, with longitudes in
+[-180, 180), such as ocean model grids. The bin index is built and queried
+as AbstractCurveGrid.getIndex and intersect used to; it does not support
+nearest neighbour queries. The octree of SpatialIndex is built by its first
+nearest neighbour query, and timed separately.
+"""
+from __future__ import print_function
+import argparse
+import time
+import numpy
+from cdms2 import bindex, _bindex, spatialindex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nlat', type=int, default=1000)
+    parser.add_argument('--nlon', type=int, default=1440)
+    parser.add_argument('--regions', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = numpy.random.RandomState(0)
+    lon, lat = numpy.meshgrid(numpy.linspace(-180., 180., args.nlon, endpoint=False),
+                              numpy.linspace(-78., 89., args.nlat))
+    lat = lat + 2. * numpy.sin(numpy.radians(lon)) * numpy.cos(numpy.radians(lat))
+    lon = lon + 3. * numpy.cos(numpy.radians(lat))
+    regions = []
+    for i in range(args.regions):
+        slat, slon = rng.uniform(-80., 80.), rng.uniform(-180., 180.)
+        regions.append(((slat, slat + rng.uniform(1., 20.), 'cc'), (slon, slon + rng.uniform(1., 40.), 'co')))
+
+    print("%d x %d grid, %d regions" % (args.nlat, args.nlon, args.regions))
+    t0 = time.time()
+    nj, ni = lat.shape
+    dx = max(numpy.ptp(lon) / ni, numpy.ptp(lon) / nj)
+    dy = max(numpy.ptp(lat) / ni, numpy.ptp(lat) / nj)
+    latlin, lonlin = lat.ravel(), lon.ravel()
+    _bindex.setDeltas(dx, dy)
+    index = bindex.bindexHorizontalGrid(latlin, lonlin)
+    t1 = time.time()
+    for latspec, lonspec in regions:
+        bindex.intersectHorizontalGrid(latspec, lonspec, latlin, numpy.mod(lonlin, 360.), index)
+    t2 = time.time()
+    print("bindex:       build %.3fs, regions %.3fs" % (t1 - t0, t2 - t1))
+
+    t0 = time.time()
+    index = spatialindex.SpatialIndex(lat, lon)
+    t1 = time.time()
+    for latspec, lonspec in regions:
+        index.intersect(latspec, lonspec)
+    t2 = time.time()
+    # the octree is built by the first nearest query
+    index.nearest(0., 0.)
+    t3 = time.time()
+    ql, qo = rng.uniform(-90., 90., args.queries), rng.uniform(-180., 180., args.queries)
+    index.nearest(ql, qo, k=4)
+    t4 = time.time()
+    print("SpatialIndex: build %.3fs, regions %.3fs, octree %.3fs, %d nearest(k=4) %.3fs" %
+          (t1 - t0, t2 - t1, t3 - t2, args.queries, t4 - t3))
+
+    t0 = time.time()
+    spatialindex.getSpatialIndex(lat, lon)
+    t1 = time.time()
+    spatialindex.getSpatialIndex(lat, lon)
+    t2 = time.time()
+    print("getSpatialIndex: first %.3fs, cached %.3fs" % (t1 - t0, t2 - t1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Read N netCDF files from N threads and compare with a sequential read.
+
+    python benchmark_threaded_read.py [--files 8] [--ntime 50] [--global-lock]
+
+With per-file locking the threaded read should scale with the number of
+threads, up to the available disk bandwidth and cores (decompression is done
+inside the netCDF library, with the GIL released). With --global-lock every
+read goes through the process wide Cdunif lock, which is the old behavior.
+"""
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy
+import cdms2
+
+
+def makeFiles(dirname, nfiles, ntime, nlat, nlon):
+    cdms2.setNetcdfShuffleFlag(1)
+    cdms2.setNetcdfDeflateFlag(1)
+    cdms2.setNetcdfDeflateLevelFlag(4)
+    paths = []
+    for i in range(nfiles):
+        data = numpy.random.random((ntime, nlat, nlon)).astype(numpy.float32)
+        var = cdms2.createVariable(data, id='ta')
+        path = os.path.join(dirname, 'bench_%03d.nc' % i)
+        f = cdms2.open(path, 'w')
+        f.write(var)
+        f.close()
+        paths.append(path)
+    return paths
+
+
+def readOne(path, results, index):
+    f = cdms2.open(path)
+    results[index] = float(f('ta').sum())
+    f.close()
+
+
+def sequential(paths):
+    results = [None] * len(paths)
+    for i, path in enumerate(paths):
+        readOne(path, results, i)
+    return results
+
+
+def threaded(paths):
+    results = [None] * len(paths)
+    threads = [threading.Thread(target=readOne, args=(path, results, i))
+               for i, path in enumerate(paths)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def timeit(func, paths, repeat):
+    best = None
+    for i in range(repeat):
+        t0 = time.time()
+        res = func(paths)
+        t = time.time() - t0
+        best = t if best is None else min(best, t)
+    return best, res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=8, help='number of files and threads')
+    parser.add_argument('--ntime', type=int, default=50)
+    parser.add_argument('--nlat', type=int, default=180)
+    parser.add_argument('--nlon', type=int, default=360)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--global-lock', action='store_true',
+                        help='disable per-file locking')
+    args = parser.parse_args()
+
+    cdms2.setNetcdfPerFileLockFlag(0 if args.global_lock else 1)
+    cdms2.setFilePoolSize(0)
+    dirname = tempfile.mkdtemp()
+    try:
+        paths = makeFiles(dirname, args.files, args.ntime, args.nlat, args.nlon)
+        tseq, rseq = timeit(sequential, paths, args.repeat)
+        tthr, rthr = timeit(threaded, paths, args.repeat)
+        assert numpy.allclose(rseq, rthr)
+        print("per-file lock: %d" % cdms2.getNetcdfPerFileLockFlag())
+        print("%d files, sequential: %.3fs, %d threads: %.3fs, speedup %.2f" %
+              (args.files, tseq, args.files, tthr, tseq / tthr))
+    finally:
+        shutil.rmtree(dirname)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare the legacy ASCII, legacy binary and XML outputs of the VTK writers.
+
+    python benchmark_vtk_writers.py [--nlev 20] [--nlat 180 --nlon 360] [--writer sg|ug]
+
+Prints the write time and file size of each output. The XML files are
+written with raw and with zlib compressed appended data.
+"""
+from __future__ import print_function
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy
+import cdms2
+from cdms2 import mvVTKSGWriter, mvVTKUGWriter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--nlev', type=int, default=20)
+    parser.add_argument('--nlat', type=int, default=180)
+    parser.add_argument('--nlon', type=int, default=360)
+    parser.add_argument('--writer', choices=['sg', 'ug'], default='sg')
+    args = parser.parse_args()
+
+    lev = cdms2.createAxis(numpy.linspace(1000., 100., args.nlev), id='lev')
+    lev.designateLevel()
+    lat = cdms2.createUniformLatitudeAxis(-90. + 90. / args.nlat, args.nlat, 180. / args.nlat)
+    lon = cdms2.createUniformLongitudeAxis(0., args.nlon, 360. / args.nlon)
+    data = numpy.random.random((args.nlev, args.nlat, args.nlon)).astype(numpy.float32)
+    var = cdms2.createVariable(numpy.ma.masked_greater(data, 0.95), axes=[lev, lat, lon], id='ta')
+    writer = mvVTKSGWriter.VTKSGWriter if args.writer == 'sg' else mvVTKUGWriter.VTKUGWriter
+    suffix = 'vts' if args.writer == 'sg' else 'vtu'
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        outputs = [('ascii', 'vtk', lambda w, path: w.write(path)),
+                   ('binary', 'vtk', lambda w, path: w.write(path, binary=True)),
+                   ('xml raw', suffix, lambda w, path: w.writeXML(path, compress=False)),
+                   ('xml zlib', suffix, lambda w, path: w.writeXML(path, compress=True))]
+        print("%d x %d x %d points, %s writer" % (args.nlev, args.nlat, args.nlon, args.writer))
+        for i, (name, ext, write) in enumerate(outputs):
+            path = os.path.join(tempdir, 'ta%d.%s' % (i, ext))
+            t0 = time.time()
+            write(writer(var), path)
+            t = time.time() - t0
+            print("%-8s %7.3fs %9.1f MB" % (name, t, os.path.getsize(path) / 1.e6))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import copy
+import numpy
+import cdms2
+import MV2
+import basetest
+
+
+class TestAxisCopyOnWrite(basetest.CDMSBaseTest):
+
+    def variable(self):
+        time = cdms2.createAxis(numpy.arange(100.), id="time")
+        time.designateTime()
+        time.units = "days since 2000-1-1"
+        time.setBounds(numpy.array([time[:] - .5, time[:] + .5]).T)
+        lat = cdms2.createUniformLatitudeAxis(-80., 9, 20.)
+        return cdms2.createVariable(numpy.ones((100, 9)), axes=[time, lat], id="tas"), time
+
+    def testShared(self):
+        var, time = self.variable()
+        result = MV2.sqrt(var * 2. + var)
+        axis = result.getTime()
+        self.assertIsNot(axis, time)
+        self.assertIs(axis[:].base, time[:].base)
+        self.assertIs(axis.getBounds().base, None)
+        self.assertEqual(axis.getBounds().tolist(), time.getBounds().tolist())
+        self.assertEqual(axis.units, "days since 2000-1-1")
+        self.assertTrue(axis.isTime())
+        self.assertTrue(result.getLatitude().isLatitude())
+
+    def testWrite(self):
+        var, time = self.variable()
+        result = var * 2.
+        axis = result.getTime()
+        axis[0] = -10.
+        self.assertEqual(axis[0], -10.)
+        self.assertEqual(time[0], 0.)
+        self.assertEqual(var.getTime()[0], 0.)
+        time[1] = 20.
+        self.assertEqual(var.getTime()[1], 1.)
+        self.assertEqual(axis[1], 1.)
+        axis.toRelativeTime("hours since 2000-1-1")
+        self.assertEqual(axis[2], 48.)
+        self.assertEqual(var.getTime()[2], 2.)
+        self.assertEqual(var.getTime().units, "days since 2000-1-1")
+
+        # the last user of the data writes in place
+        other = var.getTime()
+        data = other[:].base
+        del var
+        time[3] = 30.
+        other[4] = 40.
+        self.assertIs(other[:].base, data)
+        self.assertEqual(other[3:5].tolist(), [3., 40.])
+
+    def testCopies(self):
+        var, time = self.variable()
+        for other in [copy.deepcopy(var), var.clone()]:
+            axis = other.getTime()
+            axis[0] = 5.
+            self.assertEqual(var.getTime()[0], 0.)
+            self.assertEqual(time[0], 0.)
+
+
+if __name__ == "__main__":
+    basetest.run()
@@ -0,0 +1,87 @@
+import numpy
+import cdms2
+import basetest
+
+
+class TestAxisLookup(basetest.CDMSBaseTest):
+
+    def testMapIntervals(self):
+        time = cdms2.createAxis(numpy.arange(100000.), id="time")
+        irregular = cdms2.createAxis(numpy.cumsum(numpy.arange(1., 50.))[::-1].copy(), id="x")
+        lon = cdms2.createUniformLongitudeAxis(0., 36, 10.)
+        for axis in [time, irregular, lon]:
+            lo, hi = min(axis[0], axis[-1]), max(axis[0], axis[-1])
+            span = hi - lo
+            intervals = [(lo + k * span / 7., lo + k * span / 5., ind)
+                         for k in range(-1, 7) for ind in ['ccn', 'cob', 'oos', 'cce']]
+            intervals += [(axis[3], axis[3]), None]
+            self.assertEqual(axis.mapIntervals(intervals), [axis.mapIntervalExt(i) for i in intervals])
+        # wraparound
+        self.assertEqual(lon.mapIntervals([(-25., 25.), (355., 375.)]), [(-2, 3, 1), (36, 38, 1)])
+
+    def testLookupArray(self):
+        axis = cdms2.createAxis(numpy.arange(20.)[::-1].copy())
+        values = numpy.array([-1., 0., 4.5, 19., 30.])
+        expected = [cdms2.axis.lookupArray(axis[:], v) for v in values]
+        self.assertEqual(list(cdms2.axis.lookupArray(axis, values)), expected)
+        self.assertEqual(cdms2.axis.lookupArray(axis, 4.5), expected[2])
+
+    def testInvalidate(self):
+        axis = cdms2.createAxis(numpy.arange(10.), id="x")
+        self.assertEqual(axis.mapIntervalExt((2., 5.)), (2, 6, 1))
+        axis[:] = numpy.arange(10.) * 2.
+        self.assertEqual(axis.mapIntervalExt((2., 5.)), (1, 3, 1))
+        bounds = numpy.array([axis[:] - .1, axis[:] + .1]).T
+        axis.setBounds(bounds)
+        self.assertEqual(axis.mapIntervalExt((2.5, 5., 'ccb')), (2, 3, 1))
+
+        path = self.tempdir + "/lookup.nc"
+        f = self.getFile(path, "w")
+        faxis = f.createAxis("time", None)
+        faxis[0:3] = numpy.array([0., 1., 2.])
+        self.assertEqual(faxis.mapIntervalExt((1., 10.)), (1, 3, 1))
+        faxis[3:5] = numpy.array([3., 4.])
+        self.assertEqual(faxis.mapIntervalExt((1., 10.)), (1, 5, 1))
+
+    def testFingerprint(self):
+        lat = cdms2.createUniformLatitudeAxis(-89., 90, 2.)
+        fingerprint = lat.fingerprint()
+        self.assertEqual(lat.fingerprint(), fingerprint)
+        self.assertEqual(cdms2.createUniformLatitudeAxis(-89., 90, 2.).fingerprint(), fingerprint)
+        self.assertEqual(lat.clone().fingerprint(), fingerprint)
+        var = cdms2.createVariable(numpy.ones((90, 3)), axes=[lat, cdms2.createAxis(numpy.arange(3.))])
+        var.copyAxis(0, lat)
+        self.assertIsNot(var.getAxis(0), lat)
+        self.assertEqual(var.getAxis(0).fingerprint(), fingerprint)
+        self.assertTrue(cdms2.axis.allclose(var.getAxis(0), lat))
+
+        copy = lat.clone()
+        copy[0] = -90.
+        self.assertNotEqual(copy.fingerprint(), fingerprint)
+        self.assertFalse(cdms2.axis.allclose(copy, lat))
+        copy[0] = -89.
+        self.assertEqual(copy.fingerprint(), fingerprint)
+        self.assertTrue(cdms2.axis.allclose(copy, lat))
+        self.assertNotEqual(cdms2.createAxis(numpy.arange(90.)).fingerprint(),
+                            cdms2.createAxis(numpy.arange(90.).astype(numpy.float32)).fingerprint())
+
+        # NaN is not close to itself
+        x = cdms2.createAxis(numpy.array([0., numpy.nan, 2.]))
+        self.assertEqual(x.fingerprint(), x.clone().fingerprint())
+        self.assertFalse(cdms2.axis.allclose(x, x.clone()))
+
+    def testMutatedView(self):
+        # values changed through a view of the axis data
+        lon = cdms2.createAxis(numpy.arange(-180., 180., 10.), id="longitude")
+        other = cdms2.createAxis(numpy.arange(-180., 180., 10.), id="longitude")
+        fingerprint = lon.fingerprint()
+        self.assertTrue(cdms2.axis.allclose(lon, other))
+        v = lon[:]
+        v[v < 0] += 360.
+        self.assertFalse(cdms2.axis.allclose(lon, other))
+        self.assertFalse(cdms2.axis.allclose(other, lon))
+        self.assertNotEqual(lon.fingerprint(), fingerprint)
+
+
+if __name__ == "__main__":
+    basetest.run()
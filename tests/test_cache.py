@@ -0,0 +1,75 @@
+import os
+import shutil
+import basetest
+from cdms2 import cache
+
+
+class TestCache(basetest.CDMSBaseTest):
+
+    def setUp(self):
+        super(TestCache, self).setUp()
+        self.origdir = cache._cache_tempdir
+        self.origcopy = cache.copyFile
+        self.copies = []
+        cache._cache_tempdir = os.path.join(self.tempdir, "cache")
+        os.mkdir(cache._cache_tempdir)
+
+        def copyFile(fromURL, toURL, **keywords):
+            self.copies.append(fromURL)
+            shutil.copy(fromURL, toURL)
+        cache.copyFile = copyFile
+
+        self.sources = []
+        for i in range(3):
+            path = os.path.join(self.tempdir, "source%d.nc" % i)
+            with open(path, "w") as f:
+                f.write("x" * 100)
+            self.sources.append(path)
+
+    def tearDown(self):
+        cache.copyFile = self.origcopy
+        cache._cache_tempdir = self.origdir
+        cache.setCacheMaxSize(None)
+        super(TestCache, self).tearDown()
+
+    def testGetFile(self):
+        c = cache.Cache()
+        stats = c.stats()
+        path = c.getFile(self.sources[0], ("dataset", "source0.nc"))
+        self.assertEqual(os.path.dirname(path), cache._cache_tempdir)
+        with open(path) as f:
+            self.assertEqual(f.read(), "x" * 100)
+        self.assertEqual(c.getFile(self.sources[0], ("dataset", "source0.nc")), path)
+        # a second cache object shares the index
+        self.assertEqual(cache.Cache().get(("dataset", "source0.nc")), path)
+        self.assertEqual(self.copies, [self.sources[0]])
+        newstats = c.stats()
+        self.assertEqual(newstats['misses'] - stats['misses'], 1)
+        self.assertEqual(newstats['hits'] - stats['hits'], 2)
+        self.assertEqual((newstats['entries'], newstats['bytes']), (1, 100))
+        self.assertFalse([name for name in os.listdir(cache._cache_tempdir) if name.endswith(".part")])
+
+    def testEviction(self):
+        cache.setCacheMaxSize(250)
+        c = cache.Cache()
+        paths = [c.getFile(source, source) for source in self.sources]
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertEqual(c.get(self.sources[0]), None)
+        self.assertEqual(c.get(self.sources[2]), paths[2])
+        self.assertEqual(c.stats()['bytes'], 200)
+
+    def testDeadTransfer(self):
+        c = cache.Cache()
+        c.index.put("pending", cache.ReadPending)
+        self.assertEqual(c.get("pending"), cache.ReadPending)
+        # the transfer of a process which no longer exists is abandoned
+        with c.index._transaction() as cur:
+            cur.execute("UPDATE entries SET owner=? WHERE key=?",
+                        (cache._owner().rpartition(':')[0] + ':999999999', "pending"))
+        path = c.getFile(self.sources[1], "pending", naptime=0.01)
+        self.assertEqual(self.copies, [self.sources[1]])
+        self.assertTrue(os.path.isfile(path))
+
+
+if __name__ == "__main__":
+    basetest.run()
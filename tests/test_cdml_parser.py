@@ -0,0 +1,62 @@
+import os
+import shutil
+import cdms2
+import cdat_info
+import basetest
+from six import StringIO
+from cdms2 import CDMLParser, dataset
+
+
+class TestCDMLParser(basetest.CDMSBaseTest):
+
+    def setUp(self):
+        super(TestCDMLParser, self).setUp()
+        self.origflag = cdms2.getCdmlCacheFlag()
+        pth = cdat_info.get_sampledata_path()
+        self.path = os.path.join(self.tempdir, "test.xml")
+        shutil.copy(os.path.join(pth, "test.xml"), self.path)
+
+    def tearDown(self):
+        cdms2.setCdmlCacheFlag(self.origflag)
+        super(TestCDMLParser, self).tearDown()
+
+    def dump(self, root):
+        out = StringIO()
+        root.write(out)
+        return out.getvalue()
+
+    def testSameTree(self):
+        with open(self.path) as fd:
+            text = fd.read()
+        p = CDMLParser.CDMLParser()
+        p.feed(text)
+        p.close()
+        reference = p.getRoot()
+        self.assertEqual(self.dump(reference), self.dump(CDMLParser.parseCDML(text)))
+        self.assertEqual(self.dump(reference), self.dump(CDMLParser.parseCDML(text.encode("utf-8"))))
+
+    def testCache(self):
+        cachepath = dataset._cdmlCachePath(self.path)
+        cdms2.setCdmlCacheFlag(0)
+        f = cdms2.open(self.path)
+        f.close()
+        self.assertFalse(os.path.exists(cachepath))
+
+        cdms2.setCdmlCacheFlag(1)
+        reference = self.dump(dataset.load(self.path))
+        self.assertTrue(os.path.exists(cachepath))
+        st = os.stat(self.path)
+        self.assertEqual(self.dump(dataset._readCdmlCache(self.path, st)), reference)
+        f = self.getFile(self.path)
+        self.assertEqual(f.id, "test")
+        self.assertEqual(f['u'].shape, (3, 16, 32))
+
+        # A modified CDML file is parsed again
+        with open(self.path, "a") as fd:
+            fd.write("\n")
+        self.assertEqual(dataset._readCdmlCache(self.path, os.stat(self.path)), None)
+        self.assertEqual(self.dump(dataset.load(self.path)), reference)
+
+
+if __name__ == "__main__":
+    basetest.run()
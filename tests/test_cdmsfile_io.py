@@ -55,6 +55,49 @@ class TestCDMSFileIO(basetest.CDMSBaseTest):
         g = self.u.getGrid()
         self.assertEqual(g.id, "grid_16x32")
 
+    def testLazyMetadata(self):
+        for name in ["readonly.nc", "sampleCurveGrid4.nc"]:
+            eager = self.getDataFile(name)
+            cdms2.setLazyMetadataFlag(1)
+            try:
+                lazy = self.getDataFile(name)
+            finally:
+                cdms2.setLazyMetadataFlag(0)
+            self.assertEqual(lazy.listvariables(), eager.listvariables())
+            # access the variables in reverse order, grid names must not change
+            for varname in reversed(eager.listvariables()):
+                var = lazy[varname]
+                self.assertTrue(var is lazy.variables[varname])
+                self.assertEqual(var.getAxisIds(), eager[varname].getAxisIds())
+                for axis in var.getAxisList():
+                    self.assertTrue(axis is lazy.axes[axis.id])
+                egrid = eager[varname].getGrid()
+                if egrid is None:
+                    self.assertEqual(var.getGrid(), None)
+                else:
+                    self.assertEqual(var.getGrid().id, egrid.id)
+                    self.assertTrue(var.getGrid() is lazy.getGrid(egrid.id))
+            self.assertEqual(sorted(lazy.grids.keys()), sorted(eager.grids.keys()))
+        self.assertTrue(numpy.ma.allequal(lazy("sample"), eager("sample")))
+
+        # accessing one variable builds it alone, with its grid
+        cdms2.setLazyMetadataFlag(1)
+        try:
+            lazy = self.getDataFile("readonly.nc")
+        finally:
+            cdms2.setLazyMetadataFlag(0)
+        var = lazy["u"]
+        self.assertEqual(lazy.variables.builtValues(), [var])
+        self.assertEqual(var.getGrid().id, "grid_16x32")
+        self.assertEqual(lazy.variables.builtValues(), [var])
+        # copies build the values instead of exposing placeholders
+        for copy in (dict(lazy.variables), lazy.variables.copy(), dict(**lazy.variables)):
+            self.assertEqual(sorted(copy.keys()), sorted(self.readOnly.variables.keys()))
+            for name, value in copy.items():
+                self.assertTrue(value is lazy.variables[name])
+                self.assertEqual(value.id, name)
+        self.assertTrue(lazy["umasked"].getGrid() is var.getGrid())
+
     def testShuffleDeflateFlags(self):
         cdms2.setNetcdfShuffleFlag(1)
         cdms2.setNetcdfDeflateFlag(1)
@@ -6,8 +6,11 @@ except:
     pass
 import cdms2
 from cdms2.cdscan import main as cdscan
+from cdms2 import cdscan as cdscanmodule
 import os
+import shutil
 import sys
+import numpy
 import xml.etree.ElementTree as ET
 import cdat_info
 
@@ -52,6 +55,46 @@ class TestCDScan(basetest.CDMSBaseTest):
         self.assertIsNone(results)
         os.unlink("some_junk.xml")
 
+    def testScanWorkers(self):
+        argv = 'cdscan -q --workers 3 -d test -x %s u_2000.nc u_2001.nc u_2002.nc v_2000.nc v_2001.nc v_2002.nc'
+        pth = cdat_info.get_sampledata_path()
+        os.chdir(pth)
+        xmlpath = os.path.join(self.tempdir, "workers.xml")
+        cdscan((argv % xmlpath).split())
+        baseline = ET.parse("test.xml")
+        new = ET.parse(xmlpath)
+        self.assertIsNone(diffElements(baseline.getroot(), new.getroot()))
+
+    def testIncremental(self):
+        names = ['u_2000.nc', 'u_2001.nc', 'u_2002.nc', 'v_2000.nc', 'v_2001.nc', 'v_2002.nc']
+        pth = cdat_info.get_sampledata_path()
+        for name in names:
+            shutil.copy(os.path.join(pth, name), self.tempdir)
+        os.chdir(self.tempdir)
+        argv = 'cdscan -q --incremental -d test -x incr.xml '.split()
+        cdscan(argv + names[:2] + names[3:5])
+        self.assertTrue(os.path.exists("incr.xml.manifest"))
+
+        opened = []
+        openFiles = cdscanmodule.openFiles
+
+        def recordOpenFiles(paths, workers=1):
+            opened.extend(paths)
+            return openFiles(paths, workers)
+        cdscanmodule.openFiles = recordOpenFiles
+        try:
+            cdscan(argv + names)
+        finally:
+            cdscanmodule.openFiles = openFiles
+        self.assertEqual(sorted(opened), ['u_2002.nc', 'v_2002.nc'])
+
+        cdscan('cdscan -q -d test -x full.xml'.split() + names)
+        incr = self.getFile("incr.xml")
+        full = self.getFile("full.xml")
+        for name in ['u', 'v']:
+            self.assertTrue(numpy.ma.allequal(incr(name), full(name)))
+            self.assertTrue(numpy.allclose(incr[name].getTime()[:], full[name].getTime()[:]))
+
     def testopenFile(self):
         '''
         retrieve value from cdscan 
@@ -1,4 +1,5 @@
 import cdms2
+import numpy
 import os
 import basetest
 
@@ -43,6 +44,57 @@ class TestCompression(basetest.CDMSBaseTest):
         f = self.getTempFile("crap_justdeflate9.nc", 'w')
         f.write(a)
 
+    def testDefaultChunkSizes(self):
+        # map and time series reads touch about the same number of chunks
+        self.assertEqual(cdms2.dataset.defaultChunkSizes((3650, 180, 360), 4), (122, 33, 66))
+        self.assertEqual(cdms2.dataset.defaultChunkSizes((3650, 17, 180, 360), 4), (122, 1, 33, 66))
+        self.assertEqual(cdms2.dataset.defaultChunkSizes((12, 10), 4), (12, 10))
+        self.assertEqual(cdms2.dataset.defaultChunkSizes((10,), 4), None)
+
+    def testPerVariable(self):
+        cdms2.setNetcdfShuffleFlag(0)
+        cdms2.setNetcdfDeflateFlag(1)
+        cdms2.setNetcdfDeflateLevelFlag(1)
+        time = cdms2.createAxis(numpy.arange(365.), id="time")
+        time.designateTime()
+        time.units = "days since 2000-1-1"
+        a = cdms2.createVariable(numpy.ma.zeros((365, 90, 180), 'f'),
+                                 axes=[time, cdms2.createUniformLatitudeAxis(-89., 90, 2.),
+                                       cdms2.createUniformLongitudeAxis(1., 180, 2.)])
+        f = self.getTempFile("pervariable.nc", 'w')
+        f.write(a, id="packed", shuffle=1, deflate_level=6, chunksizes=(10, 90, 180),
+                chunk_cache=4 * 2 ** 20)
+        f.write(a, id="default")
+        f.write(a[0], id="raw", deflate=0, chunksizes='contiguous')
+        self.assertEqual(f["packed"].getCompression(), (1, 1, 6))
+        self.assertEqual(f["packed"].getChunkCache()[0], 4 * 2 ** 20)
+        self.assertEqual(f["default"].getCompression(), (0, 1, 1))
+        self.assertEqual(f["raw"].getCompression()[:2], (0, 0))
+        f.close()
+
+        f = self.getTempFile("pervariable.nc")
+        self.assertEqual(f["packed"].getChunking(), (10, 90, 180))
+        self.assertEqual(f["default"].getChunking(), cdms2.dataset.defaultChunkSizes((365, 90, 180), 4))
+        self.assertEqual(f["raw"].getChunking(), None)
+        self.assertTrue(numpy.ma.allequal(f("packed"), a))
+        self.assertRaises(cdms2.CDMSError, f["packed"].setChunkCache, 2 ** 20, None, 2.)
+
+    def testContiguous(self):
+        # the default module flags deflate, contiguous variables must not be
+        cdms2.setNetcdfShuffleFlag(1)
+        cdms2.setNetcdfDeflateFlag(1)
+        cdms2.setNetcdfDeflateLevelFlag(1)
+        a = cdms2.MV2.reshape(cdms2.MV2.arange(12000.), (120, 100))
+        f = self.getTempFile("contiguous.nc", 'w')
+        f.write(a, id="raw", chunksizes='contiguous')
+        self.assertEqual(f["raw"].getCompression()[:2], (0, 0))
+        self.assertRaises(cdms2.CDMSError, f.write, a, id="packed", deflate=1, chunksizes='contiguous')
+        f.close()
+
+        f = self.getTempFile("contiguous.nc")
+        self.assertEqual(f["raw"].getChunking(), None)
+        self.assertTrue(numpy.ma.allequal(f("raw"), a))
+
 
 if __name__ == "__main__":
     basetest.run()
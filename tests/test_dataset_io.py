@@ -1,8 +1,11 @@
+import concurrent.futures
 import cdms2
 import numpy
 import string
 import os
 import sys
+import cdat_info
+from unittest import mock
 
 cdms2.setNetcdfUseParallelFlag(0)
 
@@ -82,6 +85,79 @@ class TestDatasetIO(basetest.CDMSBaseTest):
     def testStridePartitioned(self):
         strided = self.u[0:3:2, 0:16:2, 0:32:2]
 
+    def testReversedPartitioned(self):
+        u = self.u[::-1, ::-2, 4:12]
+        self.assertTrue(numpy.ma.allequal(u, self.test_arr[0, ::-1, ::-2, 4:12]))
+
+    def testReadInto(self):
+        pth = os.path.join(cdat_info.get_sampledata_path(), 'u_2000.nc')
+        f = cdms2.Cdunif.CdunifFile(pth)
+        try:
+            var = f.variables['u']
+            buf = numpy.zeros((1, 16, 64), numpy.dtype(var.typecode()))
+            out = buf[:, ::-1, ::4]
+            self.assertTrue(var.readinto(out, (slice(0, 1), slice(0, 16), slice(0, 32, 2))))
+            self.assertTrue(numpy.ma.allequal(out, self.test_arr[0, 0:1, :, ::2]))
+            self.assertTrue(numpy.ma.allequal(buf[:, :, 1::4], 0))
+            # contiguous destination, read in place
+            out = numpy.zeros((2, 4, 32), numpy.dtype(var.typecode()))[1:]
+            self.assertTrue(var.readinto(out, (slice(0, 1), slice(0, 4), slice(0, 32))))
+            self.assertTrue(numpy.ma.allequal(out, self.test_arr[0, 0:1, 0:4, :]))
+        finally:
+            f.close()
+
+    def testReadExecutor(self):
+        self.file.setReadExecutor(2)
+        executor = self.file.getReadExecutor()
+        try:
+            self.assertTrue(numpy.ma.allequal(self.u[:], self.test_arr[0]))
+            self.assertTrue(numpy.ma.allequal(self.u[::-1, :, 4:12],
+                                              self.test_arr[0, ::-1, :, 4:12]))
+        finally:
+            self.file.setReadExecutor(None)
+        # thread pools created from a number of threads are shut down when replaced
+        with self.assertRaises(RuntimeError):
+            executor.submit(int)
+        cdms2.setReadExecutor(2)
+        executor = cdms2.getReadExecutor()
+        try:
+            self.assertTrue(self.file.getReadExecutor() is cdms2.getReadExecutor())
+            self.assertTrue(numpy.ma.allequal(self.u[1:], self.test_arr[0, 1:]))
+        finally:
+            cdms2.setReadExecutor(None)
+        with self.assertRaises(RuntimeError):
+            executor.submit(int)
+        with self.assertRaises(cdms2.CDMSError):
+            cdms2.setReadExecutor(0)
+
+    def testReadExecutorClose(self):
+        # ... or when the dataset is closed; executors passed in are left running
+        f = self.getDataFile('test.xml')
+        f.setReadExecutor(2)
+        executor = f.getReadExecutor()
+        f.close()
+        with self.assertRaises(RuntimeError):
+            executor.submit(int)
+        executor = concurrent.futures.ThreadPoolExecutor(1)
+        f = self.getDataFile('test.xml')
+        f.setReadExecutor(executor)
+        f.close()
+        self.assertEqual(executor.submit(int).result(), 0)
+        executor.shutdown()
+
+    def testReadProcessPool(self):
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            self.file.setReadExecutor(executor)
+            try:
+                # local CDML dataset: the workers read the files
+                self.assertTrue(numpy.ma.allequal(self.u[:], self.test_arr[0]))
+                # other datasets, e.g. from a remote CDML file, are read in this process
+                with mock.patch.object(cdms2.dataset.Dataset, "_localFilePath", return_value=None):
+                    self.assertTrue(numpy.ma.allequal(self.u[::-1, :, 4:12],
+                                                      self.test_arr[0, ::-1, :, 4:12]))
+            finally:
+                self.file.setReadExecutor(None)
+
     def testClosedOperations(self):
         u = self.u
         transient_u = self.u[:]
@@ -0,0 +1,113 @@
+import os
+import numpy
+from unittest import mock
+import cdms2
+import basetest
+from cdms2 import filepool
+from cdms2.cdscan import main as cdscan
+
+
+class TestFilePool(basetest.CDMSBaseTest):
+
+    def setUp(self):
+        super(TestFilePool, self).setUp()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.tempdir, "pool_%d.nc" % i)
+            f = cdms2.open(path, "w")
+            f.write(numpy.ma.arange(12.) + i, id="u")
+            f.close()
+            self.paths.append(path)
+        self.origsize = cdms2.getFilePoolSize()
+        filepool.invalidate()
+
+    def tearDown(self):
+        filepool.invalidate()
+        cdms2.setFilePoolSize(self.origsize)
+        super(TestFilePool, self).tearDown()
+
+    def testReuse(self):
+        pool = filepool.getFilePool()
+        hits = pool.hits
+        f = filepool.openFile(self.paths[0])
+        self.assertTrue(numpy.ma.allclose(f.variables["u"].getValue(), numpy.arange(12.)))
+        f.close()
+        g = filepool.openFile(self.paths[0])
+        self.assertEqual(pool.hits, hits + 1)
+        g.close()
+        self.assertEqual(len(pool), 1)
+
+    def testEviction(self):
+        pool = filepool.getFilePool()
+        cdms2.setFilePoolSize(2)
+        for path in self.paths:
+            f = filepool.openFile(path)
+            f.close()
+        self.assertEqual(len(pool), 2)
+        self.assertFalse(os.path.realpath(self.paths[0]) in pool._entries)
+
+    def testInUseNotEvicted(self):
+        pool = filepool.getFilePool()
+        cdms2.setFilePoolSize(1)
+        f = filepool.openFile(self.paths[0])
+        g = filepool.openFile(self.paths[1])
+        # f is still in use, so both handles stay open
+        self.assertEqual(len(pool), 2)
+        self.assertEqual(f.variables["u"].shape, (12,))
+        f.close()
+        g.close()
+        self.assertEqual(len(pool), 1)
+
+    def testInvalidate(self):
+        pool = filepool.getFilePool()
+        f = filepool.openFile(self.paths[0])
+        filepool.invalidate([self.paths[0]])
+        self.assertEqual(len(pool), 0)
+        # The handle stays usable until released
+        self.assertEqual(f.variables["u"].shape, (12,))
+        f.close()
+
+    def testDisabled(self):
+        cdms2.setFilePoolSize(0)
+        f = filepool.openFile(self.paths[0])
+        self.assertFalse(isinstance(f, filepool.PooledFile))
+        f.close()
+        with self.assertRaises(cdms2.CDMSError):
+            cdms2.setFilePoolSize(-1)
+
+    def testRemoteDatapath(self):
+        # A CDML dataset whose directory is an OPeNDAP URL is opened by Cdunif, not the pool
+        time = cdms2.createAxis([0., 1.], id="time")
+        time.designateTime()
+        time.units = "days since 2000-1-1"
+        path = os.path.join(self.tempdir, "pool_t.nc")
+        f = cdms2.open(path, "w")
+        f.write(numpy.ma.arange(2.), axes=[time], id="t")
+        f.close()
+        xmlpath = os.path.join(self.tempdir, "remote.xml")
+        cdscan(["cdscan", "-q", "-x", xmlpath, path])
+        with open(xmlpath) as fd:
+            text = fd.read()
+        url = "http://localhost:1/data"
+        with open(xmlpath, "w") as fd:
+            fd.write(text.replace('directory="%s' % self.tempdir, 'directory="%s' % url))
+
+        opened = []
+
+        def cdunifFile(path, mode):
+            opened.append(path)
+            raise IOError("Cannot open %s" % path)
+
+        pool = filepool.getFilePool()
+        dset = cdms2.open(xmlpath)
+        self.assertEqual(dset.datapath, url + "/")
+        with mock.patch.object(filepool.Cdunif, "CdunifFile", cdunifFile):
+            with self.assertRaises(IOError):
+                dset["t"][:]
+        dset.close()
+        self.assertEqual(opened, [url + "/pool_t.nc"])
+        self.assertEqual(len(pool), 0)
+
+
+if __name__ == "__main__":
+    basetest.run()
@@ -0,0 +1,79 @@
+import os
+import pickle
+import unittest
+import numpy
+import cdms2
+import cdat_info
+import basetest
+
+try:
+    import dask  # noqa
+    HAVE_DASK = True
+except ImportError:
+    HAVE_DASK = False
+
+
+@unittest.skipIf(not HAVE_DASK, "dask is not installed")
+class TestLazy(basetest.CDMSBaseTest):
+
+    def testFileVariable(self):
+        path = os.path.join(self.tempdir, "lazy.nc")
+        f = cdms2.open(path, "w")
+        var = cdms2.createVariable(self.test_arr[0], id="u")
+        var[0, 0, 0] = numpy.ma.masked
+        f.write(var)
+        f.close()
+
+        f = self.getFile(path)
+        lazy = f["u"].to_dask(chunks=(1, 8, 32))
+        self.assertEqual(lazy.shape, (self.NTIME, self.NLAT, self.NLON))
+        self.assertEqual(lazy.chunks, ((1, 1, 1), (8, 8), (32,)))
+        result = lazy.compute()
+        self.assertTrue(numpy.ma.allequal(result, f("u")))
+        self.assertTrue(result.mask[0, 0, 0])
+        self.assertEqual(result.getAxis(1).id, f["u"].getAxis(1).id)
+
+        sub = lazy[1:, ::-1, 3]
+        self.assertEqual(len(sub.getAxisList()), 2)
+        self.assertTrue(numpy.ma.allequal(sub.compute(), f("u")[1:, ::-1, 3]))
+        self.assertTrue(numpy.allclose(sub.getAxis(1)[:], f["u"].getAxis(1)[::-1]))
+
+        # the data is sent to workers by URI and reopened there
+        copy = pickle.loads(pickle.dumps(lazy[0, :2].data))
+        self.assertTrue(numpy.ma.allequal(copy.compute(), f("u")[0, :2]))
+
+    def testPartitions(self):
+        path = os.path.join(cdat_info.get_sampledata_path(), "test.xml")
+        f = cdms2.open(path, lazy=True)
+        self.files.append(f)
+        u = f("u")
+        # one chunk per file along time
+        self.assertEqual(u.chunks[0], (1, 1, 1))
+        self.assertEqual(f["u"].to_dask(chunks="native").chunks, ((1, 1, 1), (16,), (32,)))
+        self.assertTrue(numpy.ma.allequal(u.compute(), self.test_arr[0]))
+        self.assertTrue(numpy.ma.allequal(f("u", slice(1, 3)).compute(), self.test_arr[0, 1:3]))
+        with self.assertRaises(cdms2.CDMSError):
+            f("u", time=0.)
+        with self.assertRaises(cdms2.CDMSError):
+            cdms2.open(path, "w", lazy=True)
+
+    def testArray(self):
+        import dask.array
+        from cdms2.lazy import LazyVariable
+        source = numpy.arange(6.).reshape((2, 3))
+        lazy = LazyVariable(dask.array.from_array(source, chunks=(1, 3)), [], {}, "x")
+        self.assertTrue(numpy.array_equal(numpy.asarray(lazy), source))
+        self.assertEqual(numpy.asarray(lazy, dtype=numpy.float32).dtype, numpy.float32)
+        ar = lazy.__array__(copy=True)
+        self.assertTrue(numpy.array_equal(ar, source))
+        self.assertFalse(numpy.may_share_memory(ar, source))
+        with self.assertRaises(ValueError):
+            lazy.__array__(copy=False)
+        if numpy.lib.NumpyVersion(numpy.__version__) >= "2.0.0":
+            with self.assertRaises(ValueError):
+                numpy.asarray(lazy, copy=False)
+            self.assertFalse(numpy.may_share_memory(numpy.asarray(lazy, copy=True), source))
+
+
+if __name__ == "__main__":
+    basetest.run()
@@ -0,0 +1,63 @@
+import numpy
+import cdms2
+import MV2
+import basetest
+
+
+class TestMV2Expression(basetest.CDMSBaseTest):
+
+    def setUp(self):
+        super(TestMV2Expression, self).setUp()
+        time = cdms2.createAxis(numpy.arange(12.), id="time")
+        time.designateTime()
+        time.units = "months since 2000-1"
+        lat = cdms2.createUniformLatitudeAxis(-85., 18, 10.)
+        lon = cdms2.createUniformLongitudeAxis(0., 36, 10.)
+        values = numpy.random.random((3, 12, 18, 36))
+        self.a, self.b, self.c = [
+            cdms2.createVariable(numpy.ma.masked_less(v, .1), axes=[time, lat, lon], id=name,
+                                 attributes={"units": "K"})
+            for name, v in zip("abc", values)]
+        self.c[2, 3, 4] = 0.
+
+    def assertSame(self, result, reference):
+        self.assertEqual(result.shape, reference.shape)
+        self.assertTrue(numpy.array_equal(numpy.ma.getmaskarray(result), numpy.ma.getmaskarray(reference)))
+        self.assertTrue(MV2.allclose(result, reference))
+        self.assertEqual([axis.id for axis in result.getAxisList()],
+                         [axis.id for axis in reference.getAxisList()])
+
+    def testEvaluate(self):
+        a, b, c = self.a, self.b, self.c
+        expr = MV2.sqrt((MV2.lazy(a) - b) ** 2 / c) + 1.
+        self.assertIsInstance(expr, MV2.Expression)
+        self.assertEqual(expr.shape, a.shape)
+        reference = MV2.sqrt((a - b) ** 2 / c) + 1.
+        for blocksize in [None, 1000, 1]:
+            self.assertSame(expr.evaluate(blocksize), reference)
+        result = MV2.sin(MV2.lazy(a)).evaluate()
+        self.assertEqual(result.units, "K")
+        self.assertTrue(result.getTime().isTime())
+
+        # numpy arrays and scalars on either side, shared subexpressions
+        n = numpy.linspace(0., 1., 36)
+        diff = MV2.lazy(a) - b
+        self.assertSame((n * diff * diff - 2. + 2 ** MV2.lazy(c)).evaluate(100),
+                        n * (a - b) * (a - b) - 2. + 2 ** c)
+        self.assertSame((MV2.lazy(a) > b).evaluate(), a > b)
+        # other functions evaluate the expression
+        self.assertAlmostEqual(float(MV2.sum(MV2.lazy(a) * 2.)), float(MV2.sum(a * 2.)))
+
+    def testFileVariable(self):
+        path = self.tempdir + "/expression.nc"
+        f = self.getFile(path, "w")
+        f.write(self.a)
+        f.write(self.b)
+        f.close()
+        f = self.getFile(path)
+        result = (MV2.lazy(f["a"]) * f["b"] - self.c).evaluate(blocksize=18 * 36)
+        self.assertSame(result, self.a * self.b - self.c)
+
+
+if __name__ == "__main__":
+    basetest.run()
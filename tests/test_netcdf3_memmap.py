@@ -0,0 +1,76 @@
+import numpy
+import cdms2
+import MV2
+import basetest
+
+
+class TestNetcdf3Memmap(basetest.CDMSBaseTest):
+
+    def setUp(self):
+        super(TestNetcdf3Memmap, self).setUp()
+        self.flags = (cdms2.getNetcdf4Flag(), cdms2.getNetcdfShuffleFlag(), cdms2.getNetcdfDeflateFlag(),
+                      cdms2.getNetcdfDeflateLevelFlag(), cdms2.getNetcdfMemmapFlag())
+
+    def tearDown(self):
+        netcdf4, shuffle, deflate, level, memmap = self.flags
+        cdms2.setNetcdf4Flag(netcdf4)
+        cdms2.setNetcdfShuffleFlag(shuffle)
+        cdms2.setNetcdfDeflateFlag(deflate)
+        cdms2.setNetcdfDeflateLevelFlag(level)
+        cdms2.setNetcdfMemmapFlag(memmap)
+        super(TestNetcdf3Memmap, self).tearDown()
+
+    def writeFile(self, name):
+        path = self.tempdir + "/" + name
+        f = cdms2.open(path, "w")
+        time = f.createAxis("time", None)
+        time.designateTime()
+        time.units = "days since 2000-1-1"
+        lat = f.createAxis("lat", numpy.arange(-80., 90., 20.))
+        lon = f.createAxis("lon", numpy.arange(0., 360., 30.))
+        tas = f.createVariable("tas", "f", (time, lat, lon), fill_value=1.e20)
+        pr = f.createVariable("pr", "d", (time, lat))
+        orog = f.createVariable("orog", "h", (lat, lon))
+        data = numpy.ma.masked_greater(numpy.arange(6 * 9 * 12.).reshape(6, 9, 12), 600.)
+        tas[0:6] = data
+        pr[0:6] = numpy.arange(54.).reshape(6, 9) / 7.
+        orog[:] = numpy.arange(-54, 54).reshape(9, 12)
+        time[0:6] = numpy.arange(6.)
+        f.close()
+        return path
+
+    def testRead(self):
+        cdms2.useNetcdf3()
+        path = self.writeFile("classic.nc")
+        f = self.getFile(path)
+        reference = dict((name, f(name)) for name in ["tas", "pr", "orog"])
+        self.assertIsNone(f._netcdf3_)
+
+        cdms2.setNetcdfMemmapFlag(1)
+        g = self.getFile(path)
+        self.assertIsNotNone(g._netcdf3_)
+        for name, ref in reference.items():
+            var = g[name]
+            self.assertIsNotNone(var._mappedArray())
+            result = var()
+            self.assertTrue(MV2.allequal(result, ref))
+            self.assertTrue(numpy.array_equal(numpy.ma.getmaskarray(result), numpy.ma.getmaskarray(ref)))
+            self.assertFalse(numpy.ma.getdata(result).flags.writeable)
+        tas = g["tas"]
+        self.assertTrue(MV2.allequal(tas[4:1:-1, ::2, 3], reference["tas"][4:1:-1, ::2, 3]))
+        self.assertTrue(MV2.allequal(tas(time=(2., 4.), lat=(0., 40.)),
+                                     reference["tas"](time=(2., 4.), lat=(0., 40.))))
+        self.assertEqual(tas.getTime()[:].tolist(), list(range(6)))
+
+    def testNetcdf4(self):
+        cdms2.setNetcdfMemmapFlag(1)
+        cdms2.setNetcdf4Flag(1)
+        path = self.writeFile("netcdf4.nc")
+        f = self.getFile(path)
+        self.assertIsNone(f._netcdf3_)
+        self.assertEqual(f("orog")[0, 0], -54)
+        self.assertRaises(cdms2.CDMSError, cdms2.setNetcdfMemmapFlag, 2)
+
+
+if __name__ == "__main__":
+    basetest.run()
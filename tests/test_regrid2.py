@@ -121,6 +121,37 @@ class TestRegridding(basetest.CDMSBaseTest):
         self.assertLess(abs(dat2[0, 0] - 3.26185), 1.e-4)
 
 
+    def testRegrid2Matrix(self):
+        ingrid = cdms2.createUniformGrid(-88.75, 72, 2.5, 0., 144, 2.5)
+        outgrid = cdms2.createGaussianGrid(32)
+        regridf = Horizontal(ingrid, outgrid)
+        data = numpy.random.RandomState(0).random_sample((2, 3, 72, 144)).astype(numpy.float32)
+        mask = numpy.zeros(data.shape, bool)
+        mask[:, :, 30:40, 50:90] = True
+        mask[1, 2, :, :10] = True
+        for ar, keys in [(data, {}), (numpy.ma.array(data, mask=mask), {}), (data, {'mask': mask[0, 0]})]:
+            new, weights = regridf(ar, returnTuple=1, **keys)
+            ref, refweights = regridf(ar, returnTuple=1, useMatrix=0, **keys)
+            self.assertTrue(numpy.array_equal(numpy.ma.getmaskarray(new), numpy.ma.getmaskarray(ref)))
+            self.assertTrue(numpy.ma.allclose(new, ref, rtol=1.e-5))
+            self.assertTrue(numpy.allclose(weights, refweights, rtol=1.e-5, atol=1.e-6))
+
+        # lat, lon in the middle
+        time = cdms2.createAxis(numpy.arange(2.), id='time')
+        time.designateTime()
+        lev = cdms2.createAxis(numpy.arange(3.), id='lev')
+        lev.designateLevel()
+        tv = cdms2.createVariable(numpy.ma.array(data, mask=mask).transpose(0, 2, 1, 3), id='ta',
+                                  axes=[time, ingrid.getLatitude(), lev, ingrid.getLongitude()])
+        self.assertEqual(tv.getOrder(), 'tyzx')
+        self.assertTrue(numpy.ma.allclose(regridf(tv), regridf(tv, useMatrix=0), rtol=1.e-5))
+
+        # non-finite values are left to rgdarea
+        data[0, 0, 0, 0] = numpy.nan
+        new = regridf(data)
+        self.assertTrue(numpy.isnan(new[0, 0, 0, 0]))
+        self.assertTrue(numpy.isfinite(new[0, 0, 10]).all())
+
     def testRegrid2Attributes(self):
         f = cdms2.open(cdms2.cdat_info.get_sampledata_path()+"/clt.nc")
         s= f("clt")
@@ -0,0 +1,159 @@
+import os
+import numpy
+from unittest import mock
+import cdms2
+import regrid2
+import basetest
+from cdms2 import regridcache
+
+
+class TestRegridCache(basetest.CDMSBaseTest):
+
+    def setUp(self):
+        super(TestRegridCache, self).setUp()
+        regridcache.clearRegridCache()
+        self.origdir = cdms2.getRegridCacheDir()
+
+    def tearDown(self):
+        cdms2.setRegridCacheDir(self.origdir)
+        regridcache.clearRegridCache()
+        super(TestRegridCache, self).tearDown()
+
+    def testMemoryTier(self):
+        ingrid = cdms2.createUniformGrid(-90., 19, 10., 0., 36, 10.)
+        outgrid = cdms2.createGaussianGrid(16)
+        data = numpy.ma.ones((2, 19, 36), numpy.float32)
+        var = cdms2.createVariable(data, axes=[cdms2.createAxis([0., 1.]),
+                                               ingrid.getLatitude(),
+                                               ingrid.getLongitude()])
+        first = var.regrid(outgrid, regridTool='regrid2')
+        second = var.regrid(outgrid, regridTool='regrid2')
+        stats = regridcache.getRegridCacheStats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertTrue(numpy.ma.allclose(first, second))
+
+        # Same coordinates in a new grid object share the weights
+        samegrid = cdms2.createUniformGrid(-90., 19, 10., 0., 36, 10.)
+        self.assertEqual(regridcache.gridFingerprint(ingrid),
+                         regridcache.gridFingerprint(samegrid))
+
+    def testWeightFile(self):
+        path = os.path.join(self.tempdir, "weights.nc")
+        row = numpy.array([0, 0, 1, 2])
+        col = numpy.array([0, 1, 1, 3])
+        S = numpy.array([0.5, 0.5, 1., 1.])
+        regridcache.writeWeights(path, (row, col, S), (2, 2), (1, 3), 'linear', 'abc')
+        self.assertEqual(regridcache.readWeights(path, 'other'), None)
+        (row2, col2, S2), srcShape, dstShape, method = regridcache.readWeights(path, 'abc')
+        self.assertTrue(numpy.array_equal(row, row2))
+        self.assertTrue(numpy.array_equal(col, col2))
+        self.assertTrue(numpy.allclose(S, S2))
+        self.assertEqual(srcShape, (2, 2))
+        self.assertEqual(dstShape, (1, 3))
+        self.assertEqual(method, 'linear')
+
+    def testDiagnostics(self):
+        # a disk hit reports the diagnostics of the tool that computed the weights
+        path = os.path.join(self.tempdir, "weights.nc")
+        fractions = numpy.array([[1., 0.5], [0.25, 1.]])
+        diagnostics = {'regridTool': 'esmf', 'regridMethod': 'conserve', 'periodicity': 1,
+                       'coordSys': 'deg', 'staggerLoc': 'center', 'srcAreaFractions': fractions}
+        weights = (numpy.array([0, 1]), numpy.array([0, 3]), numpy.array([1., 1.]))
+        regridcache.writeWeights(path, weights, (2, 2), (1, 3), 'conserve', 'abc', diagnostics)
+        stored = {}
+        weights, srcShape, dstShape, method = regridcache.readWeights(path, 'abc', stored)
+        self.assertEqual(sorted(stored.keys()), sorted(diagnostics.keys()))
+        self.assertTrue(numpy.array_equal(stored['srcAreaFractions'], fractions))
+        self.assertEqual(stored['periodicity'], 1)
+
+        srcGrid = [numpy.zeros((2, 2)), numpy.zeros((2, 2))]
+        dstGrid = [numpy.zeros((1, 3)), numpy.zeros((1, 3))]
+        ro = regrid2.GenericRegrid(srcGrid, dstGrid, numpy.float64, 'conserve', 'sparse',
+                                   weights=weights, diagnostics=stored)
+        diag = {'srcAreaFractions': None}
+        ro.fillInDiagnosticData(diag, rootPe=0)
+        self.assertEqual(diag['regridTool'], 'esmf')
+        self.assertEqual(diag['staggerLoc'], 'center')
+        self.assertTrue(numpy.array_equal(diag['srcAreaFractions'], fractions))
+        self.assertFalse('dstAreaFractions' in diag)
+
+    def testFactorsOnlyForESMF(self):
+        ingrid = cdms2.createUniformGrid(-90., 19, 10., 0., 36, 10.)
+        outgrid = cdms2.createGaussianGrid(16)
+        cdms2.setRegridCacheDir(self.tempdir)
+        created = []
+
+        class Recorder(object):
+            def __init__(self, *args, **keywords):
+                created.append(keywords)
+
+            def getWeights(self):
+                return None
+
+        with mock.patch("cdms2.mvCdmsRegrid.CdmsRegrid", Recorder):
+            regridcache.getCdmsRegrid(ingrid, outgrid, numpy.float32, 'linear', 'libcf')
+            regridcache.getCdmsRegrid(ingrid, outgrid, numpy.float32, 'linear', 'esmf')
+        self.assertFalse('factors' in created[0])
+        self.assertTrue(created[1]['factors'])
+
+    def testSparseRegrid(self):
+        row = numpy.array([0, 0, 2])
+        col = numpy.array([0, 1, 3])
+        S = numpy.array([0.25, 0.75, 1.])
+        tool = regrid2.SparseRegrid((2, 2), (1, 3), (row, col, S))
+        src = numpy.array([[4., 8.], [1., 2.]])
+        dst = -numpy.ones((1, 3))
+        tool.apply(src, dst)
+        # destination point 1 has no weights and is left untouched
+        self.assertTrue(numpy.allclose(dst, [[7., -1., 2.]]))
+
+    def testBatchApply(self):
+        srcGrid = [numpy.zeros((3, 4)), numpy.zeros((3, 4))]
+        dstGrid = [numpy.zeros((2, 3)), numpy.zeros((2, 3))]
+        row = numpy.repeat(numpy.arange(6), 2)
+        col = numpy.array([0, 1, 1, 2, 2, 3, 4, 5, 5, 6, 10, 11])
+        S = numpy.ones(12) * 0.5
+        ro = regrid2.GenericRegrid(srcGrid, dstGrid, numpy.float64, 'linear', 'sparse',
+                                   weights=(row, col, S))
+        src = numpy.arange(5 * 12, dtype=numpy.float64).reshape((5, 3, 4))
+        src[1, 0, 0] = 1.e20
+        dst = numpy.ones((5, 2, 3)) * 1.e20
+        ro.apply(src, dst, missingValue=1.e20)
+        for k in range(5):
+            ref = numpy.ones((2, 3)) * 1.e20
+            ro.apply(src[k], ref, missingValue=1.e20)
+            self.assertTrue(numpy.allclose(dst[k], ref))
+        self.assertEqual(dst[1, 0, 0], 1.e20)
+
+    def testBatchMatchesLoop(self):
+        # tools without applyBatch are applied slice by slice
+        class PerSlice(object):
+            def __init__(self, tool):
+                self.tool = tool
+
+            def apply(self, srcData, dstData, **args):
+                self.tool.apply(srcData, dstData)
+
+        srcGrid = [numpy.zeros((3, 4)), numpy.zeros((3, 4))]
+        dstGrid = [numpy.zeros((2, 3)), numpy.zeros((2, 3))]
+        row = numpy.repeat(numpy.arange(6), 2)
+        col = numpy.array([0, 1, 1, 2, 2, 3, 4, 5, 5, 6, 10, 11])
+        S = numpy.ones(12) * 0.5
+        src = numpy.arange(4 * 12, dtype=numpy.float64).reshape((2, 2, 3, 4))
+        src[0, 1, 0, 0] = src[1, 0, 1, 2] = src[1, 1, 2, 3] = 1.e20
+        for method in ('linear', 'conserve'):
+            batch = regrid2.GenericRegrid(srcGrid, dstGrid, numpy.float64, method, 'sparse',
+                                          weights=(row, col, S))
+            loop = regrid2.GenericRegrid(srcGrid, dstGrid, numpy.float64, method, 'sparse',
+                                         weights=(row, col, S))
+            loop.tool = PerSlice(loop.tool)
+            dst = numpy.ones((2, 2, 2, 3)) * 1.e20
+            ref = numpy.ones((2, 2, 2, 3)) * 1.e20
+            batch.apply(src, dst, missingValue=1.e20)
+            loop.apply(src, ref, missingValue=1.e20)
+            self.assertTrue(numpy.array_equal(dst, ref))
+
+
+if __name__ == "__main__":
+    basetest.run()
@@ -0,0 +1,124 @@
+import os
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import basetest
+from cdms2 import restApi
+
+NFOUND = 23
+FACETS = """<?xml version="1.0" encoding="UTF-8"?>
+<response><lst name="responseHeader"><lst name="params">
+<arr name="facet.field"><str>project</str><str>variable</str></arr>
+</lst></lst><result name="response" numFound="0" start="0"/></response>"""
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    # Stand-in for an ESGF search node
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        self.requests.append(query)
+        if "facets" in query:
+            body = FACETS
+        else:
+            kind = query["type"][0]
+            offset = int(query["offset"][0])
+            limit = int(query["limit"][0])
+            docs = ""
+            for i in range(offset, min(offset + limit, NFOUND)):
+                docs += ('<doc><str name="id">%s%02i</str><str name="type">%s</str>'
+                         '<arr name="url"><str>http://host/f%02i.nc|application/netcdf|HTTPServer</str></arr>'
+                         '</doc>' % (kind, i, kind, i))
+            body = ('<response><result name="response" numFound="%i" start="%i">%s</result></response>' %
+                    (NFOUND, offset, docs))
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRestApi(basetest.CDMSBaseTest):
+
+    def setUp(self):
+        super(TestRestApi, self).setUp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SearchHandler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        SearchHandler.requests = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super(TestRestApi, self).tearDown()
+
+    def connect(self, **keys):
+        return restApi.esgfConnection("http://127.0.0.1", port=self.port, **keys)
+
+    def ids(self, pages):
+        return [d[0].text for page in pages for r in page if r.tag == "result" for d in r]
+
+    def testIterRequest(self):
+        conn = self.connect()
+        reference = self.ids(conn.request(project="test"))
+        self.assertEqual(reference, ["Dataset%02i" % i for i in range(NFOUND)])
+        del SearchHandler.requests[:]
+        self.assertEqual(self.ids(conn.iterRequest(workers=3, pageSize=5, project="test")), reference)
+        self.assertEqual(len(SearchHandler.requests), 5)
+        self.assertEqual(set(q["project"][0] for q in SearchHandler.requests), set(["test"]))
+        self.assertEqual(self.ids(conn.request(workers=2, project="test")), reference)
+
+        conn["limit"] = 7
+        conn["offset"] = 10
+        self.assertEqual(self.ids(conn.iterRequest(pageSize=3)), reference[10:17])
+
+    def testIterFiles(self):
+        ds = restApi.esgfDataset(host="http://127.0.0.1", port=self.port, keys={"id": "Dataset00"})
+        files = list(ds.iterFiles(workers=4, pageSize=4))
+        self.assertEqual([f.id for f in files], ["File%02i" % i for i in range(NFOUND)])
+        self.assertEqual(files[3].HTTPServer, "http://host/f03.nc")
+        reference = ds._extractFiles(ds._search(ds._searchString({})))
+        self.assertEqual([f.id for f in reference], [f.id for f in files])
+
+    def testQueryCache(self):
+        cache = restApi.QueryCache(os.path.join(self.tempdir, "queries"))
+        conn = self.connect(queryCache=cache)
+        reference = self.ids(conn.iterRequest(pageSize=10))
+        n = len(SearchHandler.requests)
+        self.assertEqual(self.ids(conn.iterRequest(pageSize=10)), reference)
+        self.assertEqual(len(SearchHandler.requests), n)
+
+        # expired entries are fetched again
+        cache.ttl = -1
+        self.assertEqual(self.ids(conn.iterRequest(pageSize=10)), reference)
+        self.assertEqual(len(SearchHandler.requests), n + 3)
+        cache.clear()
+        self.assertEqual(os.listdir(cache.directory), [])
+
+    def testSaveCache(self):
+        ds = restApi.esgfDataset(host="http://127.0.0.1", port=self.port, keys={"id": "Dataset00"},
+                                 originalKeys={"project": ["test"]})
+        ds.resp = ds._search(ds._searchString({}))
+        ds.saveCache(self.tempdir)
+        other = restApi.esgfDataset(host="http://127.0.0.1", port=self.port, keys={"id": "Dataset00"})
+        other.loadCache(self.tempdir)
+        self.assertEqual(other.originalKeys, {"project": ["test"]})
+        self.assertEqual([f.id for f in other._extractFiles(other.resp)],
+                         [f.id for f in ds._extractFiles(ds.resp)])
+
+
+if __name__ == "__main__":
+    basetest.run()
@@ -8,6 +8,7 @@ from distributed.utils_test import gen_cluster
 # import dask.array.ma as dam
 import dask.array as da
 import pickle
+import numpy
 from nose.plugins.attrib import attr
 
 @attr("cdms_dask")
@@ -51,12 +52,25 @@ class TestDask(basetest.CDMSBaseTest):
     @attr("cdms_dask")
     def testTVSerializeDeserialize(self):
         #
-        # make sure that JSON is uncomporessed since
-        # zlib compress is called by __getstate__()
+        # __getstate__() returns the (header, data, mask) state,
+        # the data is not copied
         #
-        TVstate = self.dataTV.__getstate__()
-        newvar=cdms2.fromJSON(TVstate)
+        header, data, mask = self.dataTV.__getstate__()
+        self.assertTrue(numpy.shares_memory(data, self.dataTV))
+        newvar = cdms2.tvariable._restoreTransientVariable(header, data, mask)
+        self.assertTrue(MV2.allclose(self.dataTV, newvar))
+
+    def testpickleOutOfBand(self):
+        buffers = []
+        state = pickle.dumps(self.dataTV, protocol=5, buffer_callback=buffers.append)
+        self.assertTrue(len(buffers) > 0)
+        self.assertTrue(len(state) < self.dataTV.nbytes)
+        newvar = pickle.loads(state, buffers=buffers)
         self.assertTrue(MV2.allclose(self.dataTV, newvar))
+        self.assertEqual(newvar.id, self.dataTV.id)
+        self.assertEqual(newvar.units, self.dataTV.units)
+        self.assertTrue(numpy.allclose(newvar.getLatitude()[:], self.dataTV.getLatitude()[:]))
+        self.assertTrue(newvar.getTime().isTime())
 
     @attr("cdms_dask")
     def testSerializeDeserialize(self):
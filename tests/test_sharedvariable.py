@@ -0,0 +1,56 @@
+import pickle
+import concurrent.futures
+import numpy
+import cdms2
+import MV2
+import basetest
+
+
+def fill(handle, row):
+    var = handle.attach()
+    var[row] = row
+    return var.shape
+
+
+class TestSharedVariable(basetest.CDMSBaseTest):
+
+    def variable(self):
+        lat = cdms2.createUniformLatitudeAxis(-90., 20, 9.)
+        lon = cdms2.createUniformLongitudeAxis(0., 40, 9.)
+        data = numpy.ma.masked_greater(numpy.arange(800.).reshape(20, 40), 700.)
+        return cdms2.createVariable(data, axes=[lat, lon], id="tas", attributes={"units": "K"})
+
+    def testAttach(self):
+        var = self.variable()
+        with var.share() as handle:
+            self.assertLess(len(pickle.dumps(handle)), var.nbytes)
+            other = pickle.loads(pickle.dumps(handle))
+            a = handle.attach()
+            b = other.attach()
+            self.assertTrue(numpy.shares_memory(a, b))
+            self.assertTrue(MV2.allequal(a, var))
+            self.assertEqual(a.id, "tas")
+            self.assertEqual(a.units, "K")
+            self.assertEqual(a.getLatitude()[:].tolist(), var.getLatitude()[:].tolist())
+            self.assertTrue(numpy.array_equal(a.mask, var.mask))
+            b[1, 1] = -5.
+            self.assertEqual(a[1, 1], -5.)
+            self.assertEqual(var[1, 1], 41.)
+            self.assertRaises(cdms2.CDMSError, other.unlink)
+            other.close()
+        # attached variables outlive the handle
+        self.assertEqual(float(a.sum()), float(var.sum()) - 46.)
+
+    def testWorkers(self):
+        var = self.variable()
+        with var.share() as handle:
+            with concurrent.futures.ProcessPoolExecutor(2) as pool:
+                shapes = list(pool.map(fill, [handle] * 20, range(20)))
+            self.assertEqual(shapes, [(20, 40)] * 20)
+            shared = handle.attach()
+            self.assertEqual(numpy.ma.getdata(shared)[:, 3].tolist(), list(range(20)))
+            self.assertTrue(numpy.array_equal(shared.mask, var.mask))
+
+
+if __name__ == "__main__":
+    basetest.run()
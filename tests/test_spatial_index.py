@@ -0,0 +1,125 @@
+import concurrent.futures
+import numpy
+import cdms2
+import basetest
+from cdms2 import spatialindex
+
+
+def bruteNearest(lat, lon, qlat, qlon, k):
+    points = spatialindex._toXYZ(lat, lon)
+    query = spatialindex._toXYZ(qlat, qlon)
+    distance = numpy.sqrt(((query[:, numpy.newaxis, :] - points) ** 2).sum(axis=-1))
+    return numpy.argsort(distance, axis=1, kind='mergesort')[:, :k]
+
+
+class TestSpatialIndex(basetest.CDMSBaseTest):
+
+    def setUp(self):
+        super(TestSpatialIndex, self).setUp()
+        self.size = spatialindex.getSpatialIndexCacheSize()
+        spatialindex.clearSpatialIndexCache()
+
+    def tearDown(self):
+        spatialindex.setSpatialIndexCacheSize(self.size)
+        spatialindex.clearSpatialIndexCache()
+        super(TestSpatialIndex, self).tearDown()
+
+    def curveGrid(self, lon0=-180.):
+        # 5 degree grid, distorted, with longitudes in [-180, 180)
+        lon, lat = numpy.meshgrid(numpy.arange(lon0, lon0 + 360., 5.), numpy.arange(-77.5, 90., 5.))
+        lat = lat + numpy.sin(numpy.radians(lon))
+        return lat, lon
+
+    def testIntersect(self):
+        lat, lon = self.curveGrid()
+        lat = numpy.ma.masked_greater(lat, 86.)
+        index = spatialindex.SpatialIndex(lat, lon)
+        flatlat = lat.filled(1.e20).ravel()
+        flatlon = numpy.mod(lon.ravel(), 360.)
+        for latspec, lonspec in [((-10., 10., 'cc'), (-20., 30., 'co')),
+                                 ((60., 0., 'oo'), (350., 370., 'cc')),
+                                 (None, (100., 100., 'cc')),
+                                 ((20., 30., 'cc'), (100., 100., 'co')),
+                                 ((-90., 90., 'cc'), (0., 360., 'cc'))]:
+            points = index.intersect(latspec, lonspec)
+            slat, elat, latopt = latspec if latspec is not None else (-90., 90., 'cc')
+            slat, elat = min(slat, elat), max(slat, elat)
+            inside = (flatlat >= slat if latopt[0] == 'c' else flatlat > slat) & \
+                (flatlat <= elat if latopt[1] == 'c' else flatlat < elat)
+            if lonspec[1] - lonspec[0] < 360.:
+                offset = numpy.mod(flatlon - lonspec[0], 360.)
+                width = lonspec[1] - lonspec[0]
+                inside &= (offset <= width if lonspec[2][1] == 'c' else offset < width)
+                inside &= (offset >= 0. if lonspec[2][0] == 'c' else offset > 0.)
+            self.assertEqual(points.tolist(), numpy.flatnonzero(inside).tolist())
+
+    def testNearest(self):
+        lat, lon = self.curveGrid()
+        index = spatialindex.SpatialIndex(lat, lon)
+        rng = numpy.random.RandomState(1)
+        qlat, qlon = rng.uniform(-90., 90., 500), rng.uniform(-360., 360., 500)
+        for k in (1, 5):
+            distance, points = index.nearest(qlat, qlon, k)
+            expected = bruteNearest(lat.ravel(), lon.ravel(), qlat, qlon, k)
+            self.assertEqual(points.reshape((500, k)).tolist(), expected.tolist())
+            self.assertTrue((numpy.diff(distance.reshape((500, k)), axis=1) >= 0.).all())
+        distance, points = index.nearest(lat[3, 4], lon[3, 4])
+        self.assertEqual(points, 3 * lat.shape[1] + 4)
+        self.assertAlmostEqual(distance, 0.)
+
+        # regional grid, masked points
+        lat = numpy.ma.masked_less(numpy.linspace(30., 40., 50)[:, numpy.newaxis] + numpy.zeros(40), 31.)
+        lon = numpy.linspace(-5., 5., 40) + numpy.zeros((50, 1))
+        index = spatialindex.SpatialIndex(lat, lon)
+        valid = numpy.flatnonzero(~lat.mask.ravel())
+        distance, points = index.nearest([35., -60., 0.], [0., 100., 180.], 3)
+        expected = bruteNearest(lat.compressed(), lon.ravel()[valid], [35., -60., 0.], [0., 100., 180.], 3)
+        self.assertEqual(points.tolist(), valid[expected].tolist())
+        distance, points = spatialindex.SpatialIndex([1., 2.], [3., 4.]).nearest([0.], [0.], 3)
+        self.assertEqual(points.tolist(), [[0, 1, -1]])
+        self.assertEqual(distance[0, 2], numpy.inf)
+
+    def testGrids(self):
+        rect = cdms2.createUniformGrid(-88.75, 72, 2.5, -180., 144, 2.5)
+        curve = rect.toCurveGrid()
+        generic = rect.toGenericGrid()
+        data = numpy.arange(72 * 144.).reshape((72, 144))
+        expected = cdms2.createVariable(data, axes=rect.getAxisList())(latitude=(-10., 10.), longitude=(20., 60.))
+        var = cdms2.createVariable(data, grid=curve, axes=curve.getAxisList())
+        result = var(latitude=(-10., 10.), longitude=(20., 60.))
+        self.assertEqual(result.shape, expected.shape)
+        self.assertTrue(numpy.ma.allequal(result, expected))
+        var = cdms2.createVariable(data.ravel(), grid=generic, axes=generic.getAxisList())
+        result = var(latitude=(-10., 10.), longitude=(20., 60.))
+        self.assertEqual(sorted(result.compressed().tolist()), sorted(expected.compressed().tolist()))
+
+        cells = curve.findCells([0.5, -89., 45.2, 95.], [10.2, 179.9, -170., 0.])
+        self.assertEqual(cells.tolist(), [36 * 144 + 76, 0, 54 * 144 + 4, -1])
+        self.assertEqual(generic.findCells([0.5], [10.2]).tolist(), [36 * 144 + 76])
+
+        # grids with the same coordinates share their index, the generic grid
+        # has the raveled coordinates of the curvilinear grid
+        self.assertIs(rect.toCurveGrid().getIndex(), curve.getIndex())
+        self.assertIs(generic.getIndex(), curve.getIndex())
+        self.assertEqual(spatialindex.getSpatialIndexCacheStats(), {'hits': 2, 'misses': 1})
+        spatialindex.setSpatialIndexCacheSize(0)
+        self.assertIsNot(rect.toCurveGrid().getIndex(), curve.getIndex())
+        self.assertRaises(cdms2.CDMSError, spatialindex.setSpatialIndexCacheSize, -1)
+
+    def testThreads(self):
+        grids = [self.curveGrid(lon0) for lon0 in (-180., -177.5)]
+        expected = [spatialindex.SpatialIndex(lat, lon).intersect((0., 10., 'cc'), (0., 30., 'cc')).tolist()
+                    for lat, lon in grids]
+        spatialindex.clearSpatialIndexCache()
+
+        def work(i):
+            lat, lon = grids[i % 2]
+            return spatialindex.getSpatialIndex(lat, lon).intersect((0., 10., 'cc'), (0., 30., 'cc')).tolist()
+
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(work, range(16)))
+        self.assertEqual(results, [expected[i % 2] for i in range(16)])
+
+
+if __name__ == "__main__":
+    basetest.run()
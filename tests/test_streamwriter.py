@@ -0,0 +1,73 @@
+import os
+import numpy
+import cdms2
+import basetest
+
+
+class TestStreamWriter(basetest.CDMSBaseTest):
+
+    def step(self, t, id="tas", masked=3):
+        time = cdms2.createAxis([float(t)], bounds=numpy.array([[t - 0.5, t + 0.5]]), id="time")
+        time.designateTime()
+        time.units = "days since 2000-1-1"
+        lat = cdms2.createUniformLatitudeAxis(-80., 5, 40.)
+        lon = cdms2.createUniformLongitudeAxis(0., 8, 45.)
+        data = numpy.ma.ones((1, 5, 8), numpy.float32) * t
+        if t == masked:
+            data[0, 0, 0] = numpy.ma.masked
+        return cdms2.createVariable(data, axes=[time, lat, lon], id=id)
+
+    def testAppend(self):
+        path = os.path.join(self.tempdir, "stream.nc")
+        f = self.getFile(path, 'w')
+        with f.createStreamWriter(buffersize=4) as w:
+            for t in range(10):
+                w.append(self.step(t))
+            # two blocks of four steps are written, two steps are buffered
+            self.assertEqual(len(f["tas"]), 8)
+        self.assertRaises(cdms2.CDMSError, w.append, self.step(10))
+        f.close()
+
+        f = self.getFile(path, 'a')
+        with f.createStreamWriter("tas", buffersize=4) as w:
+            self.assertRaises(cdms2.CDMSError, w.append, self.step(9))
+            w.append(self.step(10))
+        f.close()
+
+        f = self.getFile(path)
+        tas = f("tas")
+        self.assertEqual(tas.shape, (11, 5, 8))
+        self.assertTrue(numpy.array_equal(tas.getTime()[:], numpy.arange(11.)))
+        self.assertTrue(numpy.array_equal(tas.getTime().getBounds()[:, 0], numpy.arange(11.) - 0.5))
+        self.assertTrue(numpy.ma.allequal(tas[:, 1, 1], numpy.arange(11.)))
+        self.assertTrue(tas.mask[3, 0, 0])
+        self.assertEqual(tas.mask.sum(), 1)
+
+    def testMaskedLaterBlock(self):
+        # steps after the first block are written by FileVariable.__setitem__
+        path = os.path.join(self.tempdir, "streammasked.nc")
+        f = self.getFile(path, 'w')
+        with f.createStreamWriter(buffersize=4, fill_value=-999.) as w:
+            for t in range(10):
+                w.append(self.step(t, masked=6))
+        f.close()
+
+        f = self.getFile(path, 'a')
+        with f.createStreamWriter("tas", buffersize=4) as w:
+            w.append(self.step(10, masked=10))
+        f.close()
+
+        f = self.getFile(path)
+        tas = f("tas")
+        self.assertEqual(tas.shape, (11, 5, 8))
+        self.assertEqual(f["tas"].getMissing(), -999.)
+        self.assertTrue(tas.mask[6, 0, 0])
+        self.assertTrue(tas.mask[10, 0, 0])
+        self.assertEqual(tas.mask.sum(), 2)
+        self.assertEqual(numpy.ma.getdata(tas)[6, 0, 0], -999.)
+        self.assertEqual(numpy.ma.getdata(tas)[10, 0, 0], -999.)
+        self.assertTrue(numpy.ma.allequal(tas[:, 1, 1], numpy.arange(11.)))
+
+
+if __name__ == "__main__":
+    basetest.run()
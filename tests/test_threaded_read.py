@@ -0,0 +1,88 @@
+import os
+import threading
+import numpy
+import cdms2
+import basetest
+from cdms2 import Cdunif
+
+
+class TestThreadedRead(basetest.CDMSBaseTest):
+
+    def setUp(self):
+        super(TestThreadedRead, self).setUp()
+        self.flag = cdms2.getNetcdfPerFileLockFlag()
+        self.paths = []
+        for i in range(4):
+            var = cdms2.createVariable(self.test_arr[0] + i, id='ta')
+            path = os.path.join(self.tempdir, 'ta_%d.nc' % i)
+            f = cdms2.open(path, 'w')
+            f.write(var)
+            f.close()
+            self.paths.append(path)
+
+    def tearDown(self):
+        cdms2.setNetcdfPerFileLockFlag(self.flag)
+        super(TestThreadedRead, self).tearDown()
+
+    def readAll(self):
+        results = [None] * len(self.paths)
+
+        def read(i):
+            for j in range(5):
+                f = cdms2.open(self.paths[i])
+                results[i] = f('ta')
+                f.close()
+
+        threads = [threading.Thread(target=read, args=(i,)) for i in range(len(self.paths))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for i, res in enumerate(results):
+            self.assertTrue(numpy.ma.allclose(res, self.test_arr[0] + i))
+
+    def testPerFileLock(self):
+        cdms2.setNetcdfPerFileLockFlag(1)
+        self.assertEqual(cdms2.getNetcdfPerFileLockFlag(), 1)
+        self.readAll()
+
+    def testSharedFile(self):
+        # Threads share one read-only file while another opens and closes files
+        cdms2.setNetcdfPerFileLockFlag(1)
+        f = Cdunif.CdunifFile(self.paths[0], 'r')
+        var = f.variables['ta']
+        results = []
+
+        def read():
+            for j in range(20):
+                results.append((var.dimensions, var.shape, var.getValue().sum()))
+
+        def reopen():
+            for j in range(20):
+                g = Cdunif.CdunifFile(self.paths[1 + j % 3], 'r')
+                g.variables['ta'].dimensions
+                g.close()
+
+        threads = [threading.Thread(target=read) for i in range(3)] + [threading.Thread(target=reopen)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        f.close()
+        self.assertEqual(len(results), 60)
+        self.assertEqual(len(set(results)), 1)
+        # The file lock outlives close, other open files are unaffected
+        g = Cdunif.CdunifFile(self.paths[1], 'r')
+        self.assertTrue(numpy.ma.allclose(g.variables['ta'].getValue(), self.test_arr[0] + 1))
+        g.close()
+
+    def testGlobalLock(self):
+        cdms2.setNetcdfPerFileLockFlag(0)
+        self.assertEqual(cdms2.getNetcdfPerFileLockFlag(), 0)
+        self.readAll()
+        with self.assertRaises(cdms2.CDMSError):
+            cdms2.setNetcdfPerFileLockFlag(2)
+
+
+if __name__ == "__main__":
+    basetest.run()
@@ -0,0 +1,65 @@
+import numpy
+import cdtime
+import cdms2
+import basetest
+from cdms2 import timeconv
+
+
+class TestTimeConversion(basetest.CDMSBaseTest):
+
+    def timeAxis(self, values, units, calendar):
+        axis = cdms2.createAxis(numpy.array(values, numpy.float64), id="time")
+        axis.designateTime(calendar=calendar)
+        axis.units = units
+        return axis
+
+    def testComponents(self):
+        values = numpy.arange(-1000., 3000.) * 7.25
+        for calendar in [cdtime.GregorianCalendar, cdtime.MixedCalendar, cdtime.NoLeapCalendar,
+                         cdtime.Calendar360, cdtime.JulianCalendar]:
+            for units in ["days since 1900-01-01", "hours since 2000-2-28 12:00:00", "minutes since 1979-1-1 0:30"]:
+                comps = timeconv.components(values, units, calendar)
+                self.assertIsNotNone(comps)
+                for i in range(0, len(values), 37):
+                    c = cdtime.reltime(values[i], units).tocomp(calendar)
+                    self.assertEqual((c.year, c.month, c.day, c.hour, c.minute),
+                                     tuple(int(a[i]) for a in comps[:5]))
+                    self.assertAlmostEqual(c.second, comps[5][i], places=3)
+
+        # Month units and dates before the gregorian changeover are left to cdtime
+        self.assertIsNone(timeconv.components(values, "months since 1900-1-1", cdtime.GregorianCalendar))
+        self.assertIsNone(timeconv.components(values, "days since 1582-10-15", cdtime.MixedCalendar))
+
+    def testAxis(self):
+        values = numpy.arange(0., 24 * 800., 7.)
+        axis = self.timeAxis(values, "hours since 1999-12-01", cdtime.NoLeapCalendar)
+        reference = [cdtime.reltime(v, axis.units).tocomp(cdtime.NoLeapCalendar) for v in values]
+        comptimes = axis.asComponentTime()
+        self.assertEqual([str(c) for c in comptimes], [str(c) for c in reference])
+        self.assertEqual(axis.asDTGTime()[:2], ["1999120100", "1999120107"])
+        year, month, day, hour, minute, second = axis.asComponentArrays()
+        self.assertEqual((year[-1], month[-1], day[-1]), (reference[-1].year, reference[-1].month, reference[-1].day))
+        self.assertRaises(cdms2.CDMSError, axis.asDatetime64)
+
+        axis = self.timeAxis(values, "hours since 1999-12-01", cdtime.GregorianCalendar)
+        dt = axis.asDatetime64()
+        self.assertEqual(dt[0], numpy.datetime64("1999-12-01T00:00"))
+        self.assertEqual(dt[1] - dt[0], numpy.timedelta64(7, 'h'))
+        self.assertEqual(axis.asdatetime()[-1], dt[-1].astype(object))
+
+    def testToRelativeTime(self):
+        values = numpy.arange(0., 500.) + 0.5
+        axis = self.timeAxis(values, "days since 2000-1-1", cdtime.MixedCalendar)
+        axis.setBounds(numpy.array([values - 0.5, values + 0.5]).T)
+        reference = [cdtime.reltime(v, axis.units).torel("hours since 1999-12-31 12:00").value for v in values]
+        relative = axis.asRelativeTime("hours since 1999-12-31 12:00")
+        self.assertTrue(numpy.allclose([r.value for r in relative], reference))
+        axis.toRelativeTime("hours since 1999-12-31 12:00")
+        self.assertTrue(numpy.allclose(axis[:], reference))
+        self.assertTrue(numpy.allclose(axis.getBounds()[:, 0], numpy.array(reference) - 12.))
+        self.assertEqual(axis.units, "hours since 1999-12-31 12:00")
+        self.assertEqual(str(axis.asComponentTime()[0]), "2000-1-1 12:0:0.0")
+
+
+if __name__ == "__main__":
+    basetest.run()
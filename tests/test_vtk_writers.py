@@ -0,0 +1,111 @@
+import os
+import re
+import zlib
+import numpy
+import cdms2
+import basetest
+from cdms2 import mvVTKSGWriter, mvVTKUGWriter
+
+
+def readAppended(path):
+    # DataArray elements and decoded arrays of a VTK XML file
+    content = open(path, 'rb').read()
+    head, data = content.split(b'<AppendedData encoding="raw">\n   _', 1)
+    head = head.decode()
+    compressed = 'vtkZLibDataCompressor' in head
+    types = {'Float32': '<f4', 'Float64': '<f8', 'Int32': '<i4', 'Int64': '<i8', 'UInt8': 'u1'}
+    arrays = []
+    for element in re.findall(r'<DataArray [^>]*/>', head):
+        dtype = types[re.search(r'type="(\w+)"', element).group(1)]
+        offset = int(re.search(r'offset="(\d+)"', element).group(1))
+        if compressed:
+            nblocks = int(numpy.frombuffer(data, '<u8', 1, offset)[0])
+            header = numpy.frombuffer(data, '<u8', 3 + nblocks, offset)
+            start = offset + 8 * (3 + nblocks)
+            raw = b''
+            for size in header[3:]:
+                raw += zlib.decompress(data[start:start + int(size)])
+                start += int(size)
+        else:
+            size = int(numpy.frombuffer(data, '<u8', 1, offset)[0])
+            raw = data[offset + 8:offset + 8 + size]
+        arrays.append((element, numpy.frombuffer(raw, dtype)))
+    return head, arrays
+
+
+class TestVTKWriters(basetest.CDMSBaseTest):
+
+    def variable(self):
+        lev = cdms2.createAxis([1000., 850., 500.], id='lev')
+        lev.designateLevel()
+        lat = cdms2.createUniformLatitudeAxis(-80., 9, 20.)
+        lon = cdms2.createUniformLongitudeAxis(0., 12, 30.)
+        data = numpy.ma.masked_greater(numpy.arange(3 * 9 * 12.).reshape(3, 9, 12), 300.)
+        return cdms2.createVariable(data, axes=[lev, lat, lon], id='ta')
+
+    def testLegacy(self):
+        var = self.variable()
+        ascii = os.path.join(self.tempdir, 'ascii.vtk')
+        binary = os.path.join(self.tempdir, 'binary.vtk')
+        mvVTKSGWriter.VTKSGWriter(var).write(ascii)
+        mvVTKSGWriter.VTKSGWriter(var).write(binary, binary=True)
+        lines = open(ascii).read().splitlines()
+        self.assertEqual(lines[2], 'ASCII')
+        self.assertEqual(lines[4], 'DIMENSIONS 12 9 3')
+        self.assertEqual(lines[5], 'POINTS 324 float')
+        content = open(binary, 'rb').read()
+        self.assertIn(b'\nBINARY\n', content)
+        start = content.index(b'POINTS 324 float\n') + len(b'POINTS 324 float\n')
+        points = numpy.frombuffer(content, '>f4', 324 * 3, start).reshape((324, 3))
+        ascii_points = numpy.array([line.split() for line in lines[6:6 + 324]], numpy.float64)
+        self.assertTrue(numpy.allclose(points, ascii_points, atol=1.e-5))
+        start = content.index(b'LOOKUP_TABLE default\n') + len(b'LOOKUP_TABLE default\n')
+        values = numpy.frombuffer(content, '>f4', 324, start)
+        self.assertTrue(numpy.array_equal(values[:301], numpy.arange(301.)))
+        self.assertTrue(numpy.isnan(values[301:]).all())
+
+        unstructured = os.path.join(self.tempdir, 'ug.vtk')
+        mvVTKUGWriter.VTKUGWriter(var).write(unstructured)
+        lines = open(unstructured).read().splitlines()
+        self.assertIn('CELLS 176 1584', lines)
+        cells = lines[lines.index('CELLS 176 1584') + 1].split()
+        self.assertEqual(cells, ['8', '0', '1', '13', '12', '108', '109', '121', '120'])
+        self.assertIn('CELL_TYPES 176', lines)
+
+    def testXML(self):
+        var = self.variable()
+        for compress in (False, True):
+            path = os.path.join(self.tempdir, 'ta.vts')
+            mvVTKSGWriter.VTKSGWriter(var).writeXML(path, compress=compress)
+            head, arrays = readAppended(path)
+            self.assertIn('WholeExtent="0 11 0 8 0 2"', head)
+            self.assertEqual(compress, 'vtkZLibDataCompressor' in head)
+            values = [a for element, a in arrays if 'Name="ta"' in element][0]
+            self.assertTrue(numpy.array_equal(values[:301], numpy.arange(301.)))
+            self.assertTrue(numpy.isnan(values[301:]).all())
+
+            path = os.path.join(self.tempdir, 'ta.vtu')
+            mvVTKUGWriter.VTKUGWriter(var).writeXML(path, compress=compress)
+            head, arrays = readAppended(path)
+            self.assertIn('NumberOfPoints="324" NumberOfCells="176"', head)
+            arrays = dict((re.search(r'Name="(\w+)"', e).group(1), a) for e, a in arrays if 'Name=' in e)
+            self.assertEqual(arrays['connectivity'][:8].tolist(), [0, 1, 13, 12, 108, 109, 121, 120])
+            self.assertEqual(arrays['offsets'][-1], 176 * 8)
+            self.assertTrue((arrays['types'] == 12).all())
+
+    def testTimeSeries(self):
+        var = self.variable()
+        time = cdms2.createAxis([0., 1.], id='time')
+        time.designateTime()
+        time.units = 'days since 2000-1-1'
+        series = cdms2.createVariable(numpy.ma.array([var, var + 1.]), axes=[time] + var.getAxisList(), id='ta')
+        series.toVisit(os.path.join(self.tempdir, 'ta'), format='VTU')
+        self.assertEqual(sorted(os.listdir(self.tempdir)), ['ta.pvd', 'ta_0.vtu', 'ta_1.vtu'])
+        collection = open(os.path.join(self.tempdir, 'ta.pvd')).read()
+        self.assertIn('timestep="1.0" group="" part="0" file="ta_1.vtu"', collection)
+        series[1].toVisit(os.path.join(self.tempdir, 'static'), format='VTK', binary=True)
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, 'static.vtk')))
+
+
+if __name__ == "__main__":
+    basetest.run()